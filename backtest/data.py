@@ -0,0 +1,84 @@
+"""
+📼 Fontes de Candles para Backtest - Maria Helena
+"Pra rever o jogo, primeiro tem que achar a fita"
+
+Todas as fontes devolvem o mesmo formato: np.ndarray float64 (N × 6) com
+[open_time_ms, open, high, low, close, volume], ordenado por open_time.
+"""
+
+import sqlite3
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from data.columnar import ColumnarStore
+from data.storage import DB_PATH
+
+
+def load_klines_csv(path: Path, start: Optional[int] = None, end: Optional[int] = None) -> np.ndarray:
+    """
+    Arquivo de klines no formato da Binance (open_time, open, high, low,
+    close, volume, ...), com ou sem cabeçalho. start/end em ms.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        first = f.readline().split(',')[0].strip()
+    header = 0 if not first.replace('.', '', 1).isdigit() else None
+    frame = pd.read_csv(path, header=header, usecols=range(6))
+    candles = frame.to_numpy(dtype=np.float64)
+    return _time_slice(candles[np.argsort(candles[:, 0], kind='stable')], start, end)
+
+
+def load_analysis(asset: str, db_path: Path = DB_PATH, start: Optional[int] = None,
+                  end: Optional[int] = None) -> np.ndarray:
+    """
+    Série do market_analysis_v2 (timestamp em segundos, só price/volume):
+    o preço vira open/high/low/close do candle. start/end em ms.
+    """
+    sql = "SELECT timestamp * 1000, price, volume FROM market_analysis_v2 WHERE asset = ?"
+    params = [asset]
+    if start is not None:
+        sql += " AND timestamp >= ?"
+        params.append(start // 1000)
+    if end is not None:
+        sql += " AND timestamp < ?"
+        params.append(-(-end // 1000))
+    conn = sqlite3.connect(str(db_path))
+    try:
+        rows = conn.execute(sql + " ORDER BY timestamp", params).fetchall()
+    finally:
+        conn.close()
+    data = np.array(rows, dtype=np.float64).reshape(-1, 3)
+    return _time_slice(_from_price_volume(data[:, 0], data[:, 1], data[:, 2]), start, end)
+
+
+def load_columnar(asset: str, root: Optional[Path] = None, start: Optional[int] = None,
+                  end: Optional[int] = None) -> np.ndarray:
+    """
+    Export colunar (data/columnar.py): velas ('<ATIVO>_<intervalo>') ou
+    market_analysis_v2 ('<ATIVO>'). start/end em ms.
+    """
+    store = ColumnarStore(root) if root else ColumnarStore()
+    meta = store.meta(asset)
+    if meta['time_column'] == 'open_time':
+        cols = store.load(asset, start, end, ['open_time', 'open', 'high', 'low', 'close', 'volume'])
+        return np.column_stack(list(cols.values())).astype(np.float64)
+    cols = store.load(
+        asset,
+        None if start is None else start // 1000,
+        None if end is None else -(-end // 1000),
+        ['timestamp', 'price', 'volume']
+    )
+    candles = _from_price_volume(cols['timestamp'] * 1000.0, cols['price'], cols['volume'])
+    return _time_slice(candles, start, end)
+
+
+def _from_price_volume(times, prices, volumes) -> np.ndarray:
+    return np.column_stack([times, prices, prices, prices, prices, volumes]).astype(np.float64)
+
+
+def _time_slice(candles: np.ndarray, start: Optional[int], end: Optional[int]) -> np.ndarray:
+    lo = 0 if start is None else np.searchsorted(candles[:, 0], start, side='left')
+    hi = len(candles) if end is None else np.searchsorted(candles[:, 0], end, side='left')
+    return candles[lo:hi]
@@ -0,0 +1,277 @@
+"""
+🎬 Backtest Orientado a Eventos - Maria Helena
+"O passado não volta, mas dá pra ensaiar nele"
+
+Reproduz candles um a um pelo mesmo pipeline do Estrategista:
+
+    Normalizer.process → estratégia.evaluate → OrderManager
+        (CircuitBreaker, TechnicalGuard, RiskManager, CashGate)
+
+contra uma SimulatedExchange com taxa e slippage (ou a PaperExchange, com
+livro de profundidade finita, via depth). Stop-loss e take-profit
+do RiskManager são verificados no high/low de cada candle.
+
+O laço quente não monta DataFrame: os candles viram uma lista de listas uma
+única vez e cada passo entrega ao Normalizer uma fatia da janela (o motor
+incremental só processa o candle novo).
+"""
+
+import logging
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from backtest.exchange import SimulatedExchange
+from config import CONFIG
+from core.orders import order_manager as order_manager_module
+from core.orders.order_manager import OrderManager
+from core.paper_exchange import PaperExchange
+from data.normalizer import Normalizer
+from protection import circuit_breaker as circuit_breaker_module
+from protection import risk_manager as risk_manager_module
+from protection import technical_guard as technical_guard_module
+from protection.cash_gate import cash_gate as cash_gate_module
+from protection.cash_gate.cash_gate import CashGate
+from protection.circuit_breaker import CircuitBreaker
+from protection.risk_manager import RiskManager
+from protection.technical_guard import TechnicalGuard
+from strategies import rsi_volume_strategy as strategy_module
+from strategies.rsi_volume_strategy import RSIVolumeStrategy
+
+logger = logging.getLogger('MariaHelena.Backtest')
+
+DAY_MS = 86_400_000
+
+# Loggers dos componentes reais, silenciados durante o replay (rejeições viram contagem)
+COMPONENT_LOGGERS = (
+    order_manager_module.logger, cash_gate_module.logger, risk_manager_module.logger,
+    circuit_breaker_module.logger, technical_guard_module.logger, strategy_module.logger,
+)
+
+
+@contextmanager
+def _quiet_components(enabled: bool):
+    if not enabled:
+        yield
+        return
+    levels = [lg.level for lg in COMPONENT_LOGGERS]
+    for lg in COMPONENT_LOGGERS:
+        lg.setLevel(logging.CRITICAL)
+    try:
+        yield
+    finally:
+        for lg, level in zip(COMPONENT_LOGGERS, levels):
+            lg.setLevel(level)
+
+
+class EventBacktester:
+    """
+    Backtester candle a candle sobre os componentes reais do bot.
+
+    Modelo de execução: o sinal é avaliado no fechamento do candle e a
+    ordem sai no close ± slippage; stops/alvos de uma posição aberta são
+    checados no high/low dos candles seguintes (stop primeiro, pior caso)
+    e executados no nível do stop/alvo ou na abertura, se houve gap.
+
+    Parâmetros:
+    - config (dict): Configuração do bot (padrão: CONFIG)
+    - fee_rate (float): Taxa por execução
+    - slippage (float): Slippage relativo por execução
+    - strategy: Objeto com evaluate(normalized) (padrão: RSIVolumeStrategy)
+    - reset_breaker_daily (bool): Rearma o CircuitBreaker na virada do dia
+      (sem isso, 5 perdas seguidas desligam o resto do histórico)
+    - quiet (bool): Silencia os logs dos componentes durante o replay
+    - depth (float): Liquidez por nível (moeda de cotação) do livro da
+      PaperExchange, que passa a executar as ordens: ordens grandes pagam o
+      impacto de preço. None = SimulatedExchange (profundidade infinita)
+    """
+
+    def __init__(self, config: Dict[str, Any] = CONFIG, fee_rate: float = 0.001, slippage: float = 0.0005,
+                 strategy=None, reset_breaker_daily: bool = True, quiet: bool = True,
+                 depth: Optional[float] = None):
+        self.config = dict(config)
+        self.config['state_file'] = None  # CircuitBreaker sem estado em disco
+        self.symbol = self.config['SYMBOL']
+        self.initial_capital = float(self.config['INITIAL_CAPITAL'])
+        self.fee_rate = fee_rate
+        self.slippage = slippage
+        self.strategy = strategy
+        self.reset_breaker_daily = reset_breaker_daily
+        self.quiet = quiet
+        self.depth = depth
+
+    def _build(self):
+        if self.depth is None:
+            exchange = SimulatedExchange(self.symbol, self.initial_capital, self.fee_rate, self.slippage)
+        else:
+            exchange = PaperExchange(self.symbol, self.initial_capital, self.fee_rate, spread=2 * self.slippage,
+                                     level_notional=self.depth)
+        risk_manager = RiskManager(self.config)
+        circuit_breaker = CircuitBreaker(self.config)
+        cash_gate = CashGate(self.initial_capital, state_path=None)
+        order_manager = OrderManager(exchange, risk_manager, TechnicalGuard(), circuit_breaker, cash_gate,
+                                     symbol=self.symbol)
+        strategy = self.strategy or RSIVolumeStrategy(self.config, verbose=False)
+        return exchange, risk_manager, circuit_breaker, order_manager, strategy
+
+    def run(self, candles) -> Dict[str, Any]:
+        """
+        Executa o backtest.
+
+        Args:
+            candles: array/lista (N × 6) [open_time_ms, o, h, l, c, v]
+
+        Returns:
+            dict: 'timestamps' e 'equity' (arrays N), 'trades' (lista de
+                  dicts por operação fechada) e 'stats'
+        """
+        rows = np.asarray(candles, dtype=np.float64)[:, :6].tolist()
+        n = len(rows)
+        timestamps = np.empty(n, dtype=np.int64)
+        equity = np.empty(n, dtype=np.float64)
+        trades: List[Dict[str, Any]] = []
+        rejected = 0
+
+        with _quiet_components(self.quiet):
+            exchange, risk_manager, circuit_breaker, order_manager, strategy = self._build()
+            normalizer = Normalizer(self.config)
+            window = normalizer.lookback + 5
+            quote = exchange.quote
+            symbol = self.symbol
+            current_day = None
+
+            def close(ts, price, reason):
+                entry = (risk_manager.entry_time, risk_manager.entry_price, risk_manager.position_size,
+                         risk_manager.entry_cost)
+                exchange.update_market(ts, price)
+                signal = {'action': 'SELL', 'symbol': symbol, 'price': price, 'timestamp': ts, 'reason': reason}
+                order = order_manager.close_position(price, signal, reason)
+                if order is not None:
+                    trades.append({
+                        'entry_time': int(entry[0].timestamp() * 1000), 'exit_time': int(ts),
+                        'entry_price': entry[1], 'exit_price': order['average'], 'size': entry[2],
+                        'cost': entry[3], 'pnl': order['pnl'], 'return': order['pnl'] / entry[3] if entry[3] else 0.0,
+                        'reason': reason,
+                    })
+
+            started = time.perf_counter()
+            for i in range(n):
+                row = rows[i]
+                ts, open_, high, low, price, volume = row
+
+                day = ts // DAY_MS
+                if day != current_day:
+                    current_day = day
+                    if self.reset_breaker_daily and circuit_breaker.is_tripped:
+                        circuit_breaker.reset()
+
+                # Stop-loss / take-profit da posição aberta, dentro do candle
+                if risk_manager.is_in_position:
+                    if low <= risk_manager.stop_loss:
+                        close(ts, min(open_, risk_manager.stop_loss), 'stop_loss')
+                    elif high >= risk_manager.take_profit:
+                        close(ts, max(open_, risk_manager.take_profit), 'take_profit')
+
+                exchange.update_market(ts, price)
+                data = normalizer.process(
+                    rows[i - window + 1:i + 1] if i >= window else rows[:i + 1],
+                    {'last': price, 'quoteVolume': volume, 'timestamp': ts}
+                )
+                signal = strategy.evaluate(data)
+                if signal is not None:
+                    action = signal['action']
+                    if action == 'SELL' and risk_manager.is_in_position:
+                        close(ts, price, 'signal')
+                    elif action == 'BUY' and not risk_manager.is_in_position:
+                        signal['symbol'] = symbol
+                        if order_manager.execute_trade(signal)['status'] != 'executed':
+                            rejected += 1
+
+                timestamps[i] = ts
+                equity[i] = exchange.balances[quote] + exchange.balances[exchange.base] * price
+
+            if n and risk_manager.is_in_position:
+                close(rows[-1][0], rows[-1][4], 'end')
+                equity[-1] = exchange.equity()
+            elapsed = time.perf_counter() - started
+
+        stats = self._stats(equity, trades, exchange, elapsed, n)
+        stats['rejected_entries'] = rejected
+        logger.info(
+            f"🎬 Backtest: {n} candles em {elapsed:.2f}s ({stats['candles_per_sec']:,.0f}/s) | "
+            f"{stats['trades']} trades | retorno {stats['total_return']:+.2%}"
+        )
+        return {'timestamps': timestamps, 'equity': equity, 'trades': trades, 'stats': stats}
+
+    def _stats(self, equity: np.ndarray, trades: List[dict], exchange: SimulatedExchange,
+               elapsed: float, n: int) -> Dict[str, Any]:
+        final = float(equity[-1]) if n else self.initial_capital
+        peak = np.maximum.accumulate(equity) if n else equity
+        drawdown = float(((peak - equity) / peak).max()) if n else 0.0
+        wins = sum(1 for t in trades if t['pnl'] > 0)
+        return {
+            'candles': n,
+            'initial_capital': self.initial_capital,
+            'final_equity': final,
+            'total_return': final / self.initial_capital - 1,
+            'max_drawdown': drawdown,
+            'trades': len(trades),
+            'win_rate': wins / len(trades) if trades else 0.0,
+            'fees': exchange.total_fees,
+            'elapsed': elapsed,
+            'candles_per_sec': n / elapsed if elapsed > 0 else 0.0,
+        }
+
+
+def save_trades_csv(trades: List[Dict[str, Any]], path) -> None:
+    """Grava o log de operações em CSV"""
+    import csv
+    fields = ['entry_time', 'exit_time', 'entry_price', 'exit_price', 'size', 'cost', 'pnl', 'return', 'reason']
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(trades)
+
+
+if __name__ == "__main__":
+    import argparse
+    from pathlib import Path
+
+    from backtest.data import load_analysis, load_columnar, load_klines_csv
+    from backtest.vectorized import VectorizedBacktester
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(name)s: %(message)s')
+    parser = argparse.ArgumentParser(description='Backtest do Estrategista (orientado a eventos ou vetorizado)')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--csv', type=Path, help='Arquivo de klines (formato Binance)')
+    source.add_argument('--asset', help='Ativo no market_analysis_v2')
+    source.add_argument('--columnar', help="Diretório no export colunar (ex: 'BTCUSDT_1m')")
+    parser.add_argument('--db', type=Path, help='Banco do market_analysis_v2')
+    parser.add_argument('--vectorized', action='store_true', help='Triagem rápida vetorizada (backtest/vectorized.py)')
+    parser.add_argument('--fee', type=float, default=0.001)
+    parser.add_argument('--slippage', type=float, default=0.0005)
+    parser.add_argument('--depth', type=float, help='Liquidez por nível do livro (PaperExchange com impacto de preço)')
+    parser.add_argument('--trades-csv', type=Path, help='Salva o log de operações')
+    parser.add_argument('--equity-npy', type=Path, help='Salva a curva de capital (.npy)')
+    args = parser.parse_args()
+
+    if args.csv:
+        candles = load_klines_csv(args.csv)
+    elif args.asset:
+        candles = load_analysis(args.asset, args.db) if args.db else load_analysis(args.asset)
+    else:
+        candles = load_columnar(args.columnar)
+
+    if args.vectorized:
+        backtester = VectorizedBacktester(fee_rate=args.fee, slippage=args.slippage)
+    else:
+        backtester = EventBacktester(fee_rate=args.fee, slippage=args.slippage, depth=args.depth)
+    result = backtester.run(candles)
+    for key, value in result['stats'].items():
+        print(f"{key:>16}: {value:,.4f}" if isinstance(value, float) else f"{key:>16}: {value}")
+    if args.trades_csv:
+        save_trades_csv(result['trades'], args.trades_csv)
+    if args.equity_npy:
+        np.save(args.equity_npy, np.column_stack([result['timestamps'], result['equity']]))
@@ -0,0 +1,129 @@
+"""
+🏦 Exchange Simulada para Backtest - Maria Helena
+"Treino é treino, jogo é jogo — mas o treino tem que ter cara de jogo"
+
+Subconjunto da API do ccxt usado pelo OrderManager e pelo TechnicalGuard
+(fetch_status, create_order, fetch_balance, fetch_order, ...), com
+execução a mercado no preço corrente, slippage e taxa na moeda de cotação.
+"""
+
+import logging
+from typing import Any, Dict, List, Optional
+
+import ccxt  # type: ignore
+
+logger = logging.getLogger('MariaHelena.Backtest.Exchange')
+
+
+class SimulatedExchange:
+    """
+    Exchange em memória para um par spot.
+
+    O motor de backtest chama update_market() a cada candle; ordens a
+    mercado são executadas no preço corrente ± slippage.
+
+    Parâmetros:
+    - symbol (str): Par negociado (ex: 'BTC/USDT')
+    - initial_quote (float): Saldo inicial na moeda de cotação
+    - fee_rate (float): Taxa por execução (0.001 = 0,1%)
+    - slippage (float): Deslocamento do preço contra a ordem (0.0005 = 5 bps)
+    """
+
+    def __init__(self, symbol: str, initial_quote: float, fee_rate: float = 0.001, slippage: float = 0.0005):
+        self.id = 'simulated'
+        self.symbol = symbol
+        self.base, self.quote = symbol.split('/')
+        self.fee_rate = fee_rate
+        self.slippage = slippage
+        self.balances = {self.base: 0.0, self.quote: float(initial_quote)}
+
+        self.price = 0.0
+        self.timestamp = 0
+        self.orders: Dict[str, Dict[str, Any]] = {}
+        self.total_fees = 0.0
+        self._next_id = 1
+
+    def update_market(self, timestamp: int, price: float) -> None:
+        self.timestamp = timestamp
+        self.price = price
+
+    def equity(self, price: Optional[float] = None) -> float:
+        """Valor da carteira na moeda de cotação"""
+        return self.balances[self.quote] + self.balances[self.base] * (self.price if price is None else price)
+
+    # ------------------------------------------------------------------ #
+    #                         API compatível com ccxt                     #
+    # ------------------------------------------------------------------ #
+
+    def fetch_status(self, params=None) -> Dict[str, Any]:
+        return {'status': 'ok', 'updated': self.timestamp}
+
+    def load_markets(self, reload=False, params=None) -> Dict[str, Any]:
+        return {self.symbol: {'symbol': self.symbol, 'base': self.base, 'quote': self.quote, 'spot': True}}
+
+    def create_order(self, symbol: str, type: str, side: str, amount: float,
+                     price: Optional[float] = None, params=None) -> Dict[str, Any]:
+        if symbol != self.symbol:
+            raise ccxt.BadSymbol(f"{self.id} não negocia {symbol}")
+        if type != 'market':
+            raise ccxt.NotSupported(f"{self.id}: apenas ordens a mercado")
+        if amount <= 0 or self.price <= 0:
+            raise ccxt.InvalidOrder(f"{self.id}: quantidade ou preço inválido")
+
+        if side == 'buy':
+            fill_price = self.price * (1 + self.slippage)
+            cost = amount * fill_price
+            fee = cost * self.fee_rate
+            if cost + fee > self.balances[self.quote] + 1e-9:
+                raise ccxt.InsufficientFunds(
+                    f"{self.id}: saldo {self.balances[self.quote]:.2f} {self.quote} < {cost + fee:.2f}"
+                )
+            self.balances[self.quote] -= cost + fee
+            self.balances[self.base] += amount
+        elif side == 'sell':
+            if amount > self.balances[self.base] * (1 + 1e-9):
+                raise ccxt.InsufficientFunds(f"{self.id}: saldo {self.balances[self.base]:.8f} {self.base} < {amount:.8f}")
+            fill_price = self.price * (1 - self.slippage)
+            cost = amount * fill_price
+            fee = cost * self.fee_rate
+            self.balances[self.base] = max(0.0, self.balances[self.base] - amount)
+            self.balances[self.quote] += cost - fee
+        else:
+            raise ccxt.InvalidOrder(f"{self.id}: lado inválido '{side}'")
+
+        self.total_fees += fee
+        order_id = str(self._next_id)
+        self._next_id += 1
+        order = {
+            'id': order_id,
+            'clientOrderId': (params or {}).get('clientOrderId'),
+            'timestamp': self.timestamp,
+            'symbol': symbol,
+            'type': type,
+            'side': side,
+            'amount': amount,
+            'filled': amount,
+            'remaining': 0.0,
+            'price': fill_price,
+            'average': fill_price,
+            'cost': cost,
+            'fee': {'cost': fee, 'currency': self.quote},
+            'status': 'closed',
+        }
+        self.orders[order_id] = order
+        return dict(order)
+
+    def fetch_order(self, id: str, symbol: Optional[str] = None, params=None) -> Dict[str, Any]:
+        if id not in self.orders:
+            raise ccxt.OrderNotFound(f"{self.id}: ordem {id} não encontrada")
+        return dict(self.orders[id])
+
+    def fetch_open_orders(self, symbol: Optional[str] = None, since=None, limit=None, params=None) -> List[dict]:
+        return []  # ordens a mercado são executadas na hora
+
+    def cancel_order(self, id: str, symbol: Optional[str] = None, params=None) -> Dict[str, Any]:
+        raise ccxt.OrderNotFound(f"{self.id}: ordem {id} já executada")
+
+    def fetch_balance(self, params=None) -> Dict[str, Any]:
+        total = dict(self.balances)
+        return {'free': dict(total), 'used': {k: 0.0 for k in total}, 'total': total}
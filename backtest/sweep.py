@@ -0,0 +1,330 @@
+"""
+🧪 Varredura de Parâmetros - Maria Helena
+"Quem testa uma receita só, nunca descobre que o bolo podia crescer mais"
+
+Grid search sobre os limiares da RSIVolumeStrategy e o stop/alvo do config
+(RSI_OVERSOLD, RSI_OVERBOUGHT, VOLUME_THRESHOLD, RSI_SELL_*, STOP_LOSS,
+TAKE_PROFIT), em vez de editar o config.py na mão com os scripts/update_*.
+
+As features são calculadas UMA vez (Normalizer.process_series) e os arrays
+vão para memória compartilhada (multiprocessing.shared_memory): cada
+processo do pool só mapeia os blocos e roda o VectorizedBacktester com os
+parâmetros de cada combinação. O resultado é uma tabela ordenada pela
+métrica escolhida.
+
+Uso (na raiz do projeto):
+    python -m backtest.sweep --csv klines.csv \\
+        --grid RSI_OVERSOLD=0.25:0.45:0.05 --grid STOP_LOSS=0.01,0.02,0.03 \\
+        --top 20 --out sweep.csv
+"""
+
+import csv
+import itertools
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from backtest.vectorized import VectorizedBacktester, strategy_params
+from config import CONFIG
+
+logger = logging.getLogger('MariaHelena.Backtest.Sweep')
+
+# Chaves do config.py que a varredura aceita
+SWEEP_KEYS = (
+    'RSI_OVERSOLD', 'RSI_OVERBOUGHT', 'VOLUME_THRESHOLD',
+    'RSI_SELL_UPTREND', 'RSI_SELL_NEUTRAL', 'RSI_SELL_DOWNTREND',
+    'STOP_LOSS', 'TAKE_PROFIT',
+)
+SELL_KEYS = ('RSI_SELL_UPTREND', 'RSI_SELL_NEUTRAL', 'RSI_SELL_DOWNTREND')
+
+# Features que o VectorizedBacktester consome (o resto não vai para o pool)
+SHARED_FEATURES = ('rsi_norm', 'volume_norm', 'trend')
+
+# Métricas em que menor é melhor
+ASCENDING_METRICS = {'max_drawdown', 'fees'}
+
+RESULT_STATS = ('total_return', 'max_drawdown', 'trades', 'win_rate', 'fees', 'final_equity')
+
+# Estado de cada processo do pool (preenchido por _init_worker)
+_worker: Dict[str, Any] = {}
+
+
+def expand_grid(ranges: Dict[str, Sequence[float]]) -> List[Dict[str, float]]:
+    """Produto cartesiano {chave: valores} → lista de combinações"""
+    unknown = set(ranges) - set(SWEEP_KEYS)
+    if unknown:
+        raise ValueError(f"Chaves fora da varredura: {sorted(unknown)} (aceitas: {', '.join(SWEEP_KEYS)})")
+    keys = list(ranges)
+    return [dict(zip(keys, values)) for values in itertools.product(*(ranges[k] for k in keys))]
+
+
+def parse_range(text: str) -> List[float]:
+    """'0.1,0.2,0.3' (lista) ou '0.1:0.3:0.05' (início:fim:passo, fim incluso)"""
+    if ':' in text:
+        start, stop, step = (float(v) for v in text.split(':'))
+        if step <= 0:
+            raise ValueError(f"Passo inválido em '{text}'")
+        count = int(np.floor((stop - start) / step + 1e-9)) + 1
+        return [round(start + i * step, 10) for i in range(count)]
+    return [float(v) for v in text.split(',') if v.strip()]
+
+
+def combo_params(combo: Dict[str, float], config: Dict[str, Any] = CONFIG) -> Dict[str, float]:
+    """
+    Combinação em chaves do config → parâmetros do VectorizedBacktester.
+
+    RSI_OVERBOUGHT é o padrão dos RSI_SELL_*: se ele entra na combinação,
+    os RSI_SELL_* que não entram passam a segui-lo (como na estratégia
+    quando o config não os define).
+    """
+    merged = dict(config)
+    if 'RSI_OVERBOUGHT' in combo:
+        for key in SELL_KEYS:
+            if key not in combo:
+                merged.pop(key, None)
+                merged.pop(key.lower(), None)
+    for key, value in combo.items():
+        merged.pop(key.lower(), None)  # chaves antigas em minúsculas têm prioridade na estratégia
+        merged[key] = value
+    return strategy_params(merged)
+
+
+def _share(arrays: Dict[str, np.ndarray]):
+    """Copia os arrays para blocos de memória compartilhada"""
+    blocks, spec = [], {}
+    try:
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            blocks.append(block)
+            np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+            spec[name] = (block.name, array.shape, array.dtype.str)
+    except Exception:
+        _release(blocks)
+        raise
+    return blocks, spec
+
+
+def _release(blocks) -> None:
+    for block in blocks:
+        block.close()
+        try:
+            block.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def _init_worker(spec, config, fee_rate, slippage, enforce_limits) -> None:
+    """Inicializador do pool: mapeia os blocos (sem cópia) e monta o backtester"""
+    logging.getLogger('MariaHelena').setLevel(logging.WARNING)
+    blocks, arrays = [], {}
+    for name, (block_name, shape, dtype) in spec.items():
+        block = shared_memory.SharedMemory(name=block_name)
+        blocks.append(block)
+        arrays[name] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+    _worker['blocks'] = blocks  # mantém os mapeamentos vivos
+    _worker['candles'] = arrays.pop('candles')
+    _worker['features'] = arrays
+    _worker['config'] = config
+    _worker['backtester'] = VectorizedBacktester(config, fee_rate, slippage, enforce_limits)
+
+
+def _run_chunk(task) -> List[Dict[str, Any]]:
+    """Tarefa do pool: (combinações, início, fim) sobre a fatia [início:fim] da série"""
+    combos, start, end = task
+    backtester = _worker['backtester']
+    candles = _worker['candles'][start:end]
+    features = {name: array[start:end] for name, array in _worker['features'].items()}
+    rows = []
+    for combo in combos:
+        stats = backtester.run(candles, features, combo_params(combo, _worker['config']))['stats']
+        row = dict(combo)
+        row.update({key: stats[key] for key in RESULT_STATS})
+        rows.append(row)
+    return rows
+
+
+class ParameterSweep:
+    """
+    Grid search paralelo sobre o VectorizedBacktester.
+
+    Parâmetros:
+    - config (dict): Configuração base (padrão: CONFIG)
+    - fee_rate (float), slippage (float), enforce_limits (bool): Como no
+      VectorizedBacktester
+    - workers (int): Processos do pool (padrão: todos os núcleos)
+    """
+
+    def __init__(self, config: Dict[str, Any] = CONFIG, fee_rate: float = 0.001, slippage: float = 0.0005,
+                 enforce_limits: bool = True, workers: Optional[int] = None):
+        self.config = dict(config)
+        self.fee_rate = fee_rate
+        self.slippage = slippage
+        self.enforce_limits = enforce_limits
+        self.workers = workers or os.cpu_count() or 1
+
+    def run(self, candles, grid: Iterable[Dict[str, float]], rank_by: str = 'total_return',
+            min_trades: int = 0, features: Optional[Dict[str, np.ndarray]] = None,
+            chunk_size: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Executa todas as combinações.
+
+        Args:
+            candles: array (N × 6) [open_time_ms, o, h, l, c, v]
+            grid: Combinações {chave do config: valor} (ver expand_grid)
+            rank_by: Métrica de ordenação (chave de RESULT_STATS)
+            min_trades: Combinações com menos trades vão para o fim da tabela
+            features: Saída de process_series (calculada se None)
+            chunk_size: Combinações por tarefa (padrão: ~4 tarefas por processo)
+
+        Returns:
+            list: Uma linha por combinação (parâmetros + métricas), ordenada
+        """
+        if rank_by not in RESULT_STATS:
+            raise ValueError(f"Métrica inválida '{rank_by}' (aceitas: {', '.join(RESULT_STATS)})")
+        combos = list(grid)
+        if not combos:
+            return []
+        started = time.perf_counter()
+        candles = np.asarray(candles, dtype=np.float64)
+        if features is None:
+            features = VectorizedBacktester(self.config).features(candles)
+        features_done = time.perf_counter()
+
+        rows = self.evaluate(candles, features, [(combos, 0, len(candles))], chunk_size)[0]
+        rank_rows(rows, rank_by, min_trades)
+
+        elapsed = time.perf_counter() - started
+        logger.info(
+            f"🧪 Varredura: {len(combos)} combinações × {len(candles)} candles em {elapsed:.1f}s "
+            f"(features em {features_done - started:.2f}s) | melhor {rank_by}: {rows[0][rank_by]:+.4f}"
+        )
+        return rows
+
+    def evaluate(self, candles: np.ndarray, features: Dict[str, np.ndarray], segments, chunk_size: Optional[int] = None):
+        """
+        Roda combinações sobre fatias da mesma série num único pool.
+
+        Args:
+            candles, features: Série completa (vai uma vez para a memória compartilhada)
+            segments: Lista de (combinações, início, fim) em índices de candle
+            chunk_size: Combinações por tarefa (padrão: ~4 tarefas por processo)
+
+        Returns:
+            list: Para cada segmento, as linhas (parâmetros + métricas) na ordem das combinações
+        """
+        segments = [(list(combos), start, end) for combos, start, end in segments]
+        for combos, _, _ in segments:
+            for combo in combos:
+                combo_params(combo, self.config)  # valida antes de subir o pool
+        total = sum(len(combos) for combos, _, _ in segments)
+        workers = max(1, min(self.workers, total))
+        chunk_size = chunk_size or max(1, -(-total // (workers * 4)))
+        tasks, owners = [], []
+        for index, (combos, start, end) in enumerate(segments):
+            for i in range(0, len(combos), chunk_size):
+                tasks.append((combos[i:i + chunk_size], start, end))
+                owners.append(index)
+
+        shared = {'candles': np.asarray(candles, dtype=np.float64)}
+        shared.update({name: features[name] for name in SHARED_FEATURES})
+        blocks, spec = _share(shared)
+        results: List[List[Dict[str, Any]]] = [[] for _ in segments]
+        try:
+            with ProcessPoolExecutor(
+                max_workers=workers, initializer=_init_worker,
+                initargs=(spec, self.config, self.fee_rate, self.slippage, self.enforce_limits)
+            ) as pool:
+                for done, (owner, rows) in enumerate(zip(owners, pool.map(_run_chunk, tasks)), 1):
+                    results[owner].extend(rows)
+                    logger.debug(f"🧪 {done}/{len(tasks)} lotes")
+        finally:
+            _release(blocks)
+        return results
+
+
+def rank_rows(rows: List[Dict[str, Any]], rank_by: str = 'total_return', min_trades: int = 0) -> List[Dict[str, Any]]:
+    """Ordena (in-place) pela métrica; menos de min_trades vai para o fim. Preenche 'rank'."""
+    if rank_by not in RESULT_STATS:
+        raise ValueError(f"Métrica inválida '{rank_by}' (aceitas: {', '.join(RESULT_STATS)})")
+    descending = rank_by not in ASCENDING_METRICS
+    rows.sort(key=lambda r: (r['trades'] < min_trades, -r[rank_by] if descending else r[rank_by]))
+    for rank, row in enumerate(rows, 1):
+        row['rank'] = rank
+    return rows
+
+
+def save_results_csv(rows: List[Dict[str, Any]], path) -> None:
+    """Grava a tabela ordenada em CSV"""
+    if not rows:
+        return
+    params = [k for k in rows[0] if k in SWEEP_KEYS]
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=['rank'] + params + list(RESULT_STATS))
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def format_table(rows: List[Dict[str, Any]], top: int = 20) -> str:
+    """Tabela de texto com as primeiras linhas do ranking"""
+    if not rows:
+        return "(sem resultados)"
+    params = [k for k in rows[0] if k in SWEEP_KEYS]
+    header = ['#'] + params + ['retorno', 'drawdown', 'trades', 'acerto']
+    lines = [header]
+    for row in rows[:top]:
+        lines.append(
+            [str(row['rank'])] + [f"{row[k]:g}" for k in params] +
+            [f"{row['total_return']:+.2%}", f"{row['max_drawdown']:.2%}", str(row['trades']),
+             f"{row['win_rate']:.1%}"]
+        )
+    widths = [max(len(line[i]) for line in lines) for i in range(len(header))]
+    return '\n'.join('  '.join(cell.rjust(w) for cell, w in zip(line, widths)) for line in lines)
+
+
+if __name__ == "__main__":
+    import argparse
+    from pathlib import Path
+
+    from backtest.data import load_analysis, load_columnar, load_klines_csv
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(name)s: %(message)s')
+    parser = argparse.ArgumentParser(description='Varredura paralela de parâmetros da RSIVolumeStrategy')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--csv', type=Path, help='Arquivo de klines (formato Binance)')
+    source.add_argument('--asset', help='Ativo no market_analysis_v2')
+    source.add_argument('--columnar', help="Diretório no export colunar (ex: 'BTCUSDT_1m')")
+    parser.add_argument('--db', type=Path, help='Banco do market_analysis_v2')
+    parser.add_argument('--grid', action='append', required=True, metavar='CHAVE=VALORES',
+                        help="Ex: RSI_OVERSOLD=0.25:0.45:0.05 ou STOP_LOSS=0.01,0.02 (repetível)")
+    parser.add_argument('--rank-by', default='total_return', choices=RESULT_STATS)
+    parser.add_argument('--min-trades', type=int, default=0)
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--fee', type=float, default=0.001)
+    parser.add_argument('--slippage', type=float, default=0.0005)
+    parser.add_argument('--top', type=int, default=20)
+    parser.add_argument('--out', type=Path, help='Salva a tabela completa em CSV')
+    args = parser.parse_args()
+
+    ranges = {}
+    for item in args.grid:
+        key, _, values = item.partition('=')
+        ranges[key.strip().upper()] = parse_range(values)
+
+    if args.csv:
+        candles = load_klines_csv(args.csv)
+    elif args.asset:
+        candles = load_analysis(args.asset, args.db) if args.db else load_analysis(args.asset)
+    else:
+        candles = load_columnar(args.columnar)
+
+    sweep = ParameterSweep(fee_rate=args.fee, slippage=args.slippage, workers=args.workers)
+    results = sweep.run(candles, expand_grid(ranges), rank_by=args.rank_by, min_trades=args.min_trades)
+    print(format_table(results, args.top))
+    if args.out:
+        save_results_csv(results, args.out)
@@ -0,0 +1,257 @@
+"""
+⚡ Backtest Vetorizado - Maria Helena
+"Peneira grossa primeiro, peneira fina depois"
+
+Triagem rápida para estratégias de limiar (RSIVolumeStrategy): as features
+de toda a série saem de Normalizer.process_series, os sinais viram máscaras
+booleanas e a curva de capital é montada com cumsum de deltas de caixa e
+de posição. O único laço em Python é por operação (não por candle), para
+encontrar a saída de cada entrada (stop, alvo ou sinal de venda) e aplicar
+os limites do RiskManager/CircuitBreaker.
+
+Mesmo modelo de execução do EventBacktester: resultados equivalentes,
+salvo arredondamento, em uma fração do tempo.
+"""
+
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from config import CONFIG
+from data.normalizer import Normalizer
+from strategies.rsi_volume_strategy import RSIVolumeStrategy
+
+logger = logging.getLogger('MariaHelena.Backtest.Vectorized')
+
+DAY_MS = 86_400_000
+
+
+def strategy_params(config: Dict[str, Any] = CONFIG) -> Dict[str, float]:
+    """Limiares da RSIVolumeStrategy e stop/alvo do config, em 0-1."""
+    strategy = RSIVolumeStrategy(config, verbose=False)
+    return {
+        'rsi_oversold': strategy.rsi_oversold,
+        'volume_threshold': strategy.volume_threshold,
+        'rsi_sell_up': strategy.rsi_sell['up'],
+        'rsi_sell_neutral': strategy.rsi_sell['neutral'],
+        'rsi_sell_down': strategy.rsi_sell['down'],
+        'stop_loss': config['STOP_LOSS'],
+        'take_profit': config.get('TAKE_PROFIT', 0.05),
+    }
+
+
+def signal_masks(features: Dict[str, np.ndarray], params: Dict[str, float]):
+    """
+    Regras de RSIVolumeStrategy.evaluate como máscaras.
+
+    Returns:
+        (buy, sell): arrays booleanos; COMPRA tem prioridade sobre VENDA
+    """
+    rsi = features['rsi_norm']
+    trend = features['trend']
+    buy = (rsi < params['rsi_oversold']) & (features['volume_norm'] > params['volume_threshold']) & (trend != 'down')
+    sell_threshold = np.where(trend == 'up', params['rsi_sell_up'],
+                              np.where(trend == 'down', params['rsi_sell_down'], params['rsi_sell_neutral']))
+    sell = (rsi > sell_threshold) & ~buy
+    return buy, sell
+
+
+def _next_true(mask: np.ndarray) -> np.ndarray:
+    """next[k] = menor j >= k com mask[j] (len(mask) se não houver)."""
+    n = mask.size
+    idx = np.where(mask, np.arange(n), n)
+    return np.minimum.accumulate(idx[::-1])[::-1]
+
+
+class VectorizedBacktester:
+    """
+    Parâmetros:
+    - config (dict): Configuração do bot (padrão: CONFIG)
+    - fee_rate (float), slippage (float): Como no EventBacktester
+    - enforce_limits (bool): Aplica intervalo mínimo entre trades, trades/dia,
+      perda diária e perdas consecutivas (CircuitBreaker rearmado por dia)
+    """
+
+    def __init__(self, config: Dict[str, Any] = CONFIG, fee_rate: float = 0.001, slippage: float = 0.0005,
+                 enforce_limits: bool = True):
+        self.config = config
+        self.fee_rate = fee_rate
+        self.slippage = slippage
+        self.enforce_limits = enforce_limits
+        self.initial_capital = float(config['INITIAL_CAPITAL'])
+        self.position_pct = config['MAX_POSITION_SIZE']
+        self.min_gap_ms = config.get('MIN_TIME_BETWEEN_TRADES', 300) * 1000
+        self.max_trades_per_day = config.get('MAX_TRADES_PER_DAY', 5)
+        self.max_daily_loss = config['MAX_DAILY_LOSS']
+        self.max_consecutive_losses = config.get('max_consecutive_losses', 5)
+        self.params = strategy_params(config)
+
+    def features(self, candles) -> Dict[str, np.ndarray]:
+        """Features de toda a série (reaproveitáveis entre execuções)."""
+        normalizer = Normalizer(self.config)
+        return normalizer.process_series(candles)
+
+    def run(self, candles, features: Optional[Dict[str, np.ndarray]] = None,
+            params: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+        """
+        Executa o backtest.
+
+        Args:
+            candles: array (N × 6) [open_time_ms, o, h, l, c, v]
+            features: Saída de process_series (calculada se None)
+            params: Sobrescreve limiares/stop/alvo (chaves de strategy_params)
+
+        Returns:
+            dict: 'timestamps', 'equity', 'trades', 'stats' (como o EventBacktester)
+        """
+        started = time.perf_counter()
+        candles = np.asarray(candles, dtype=np.float64)
+        if features is None:
+            features = self.features(candles)
+        p = dict(self.params)
+        p.update({k: v for k, v in (params or {}).items() if v is not None})
+
+        times = candles[:, 0]
+        opens, highs, lows, closes = candles[:, 1], candles[:, 2], candles[:, 3], candles[:, 4]
+        n = len(candles)
+        buy, sell = signal_masks(features, p)
+        buy_idx = np.flatnonzero(buy)
+        next_sell = np.append(_next_true(sell), n)
+
+        trades, fees = self._simulate(times, opens, highs, lows, closes, buy_idx, next_sell, p)
+
+        # Curva de capital: caixa e quantidade mudam só nas entradas/saídas
+        cash_delta = np.zeros(n)
+        units_delta = np.zeros(n)
+        for trade in trades:
+            cash_delta[trade['entry_index']] -= trade['cost']
+            cash_delta[trade['exit_index']] += trade['cost'] + trade['pnl']
+            units_delta[trade['entry_index']] += trade['size']
+            units_delta[trade['exit_index']] -= trade['size']
+        cash = self.initial_capital + np.cumsum(cash_delta)
+        units = np.cumsum(units_delta)
+        equity = cash + units * closes
+        elapsed = time.perf_counter() - started
+
+        return {
+            'timestamps': times.astype(np.int64),
+            'equity': equity,
+            'trades': trades,
+            'stats': self._stats(equity, trades, fees, elapsed, n),
+        }
+
+    def _simulate(self, times, opens, highs, lows, closes, buy_idx, next_sell, p):
+        """Laço por operação: próxima entrada permitida → primeira saída."""
+        n = len(times)
+        slip, fee = self.slippage, self.fee_rate
+        cash = self.initial_capital
+        trades = []
+        fees = 0.0
+
+        last_trade = None
+        day = None
+        daily_trades = 0
+        daily_pnl = 0.0
+        losses = 0
+        breaker_until = -np.inf
+        cursor = 0
+
+        def roll_day(ts):
+            nonlocal day, daily_trades, daily_pnl
+            today = datetime.fromtimestamp(ts / 1000).date()
+            if today != day:
+                day, daily_trades, daily_pnl = today, 0, 0.0
+
+        while True:
+            k = np.searchsorted(buy_idx, cursor)
+            if k >= buy_idx.size:
+                break
+            e = int(buy_idx[k])
+            ts = times[e]
+
+            if self.enforce_limits:
+                # Mesma ordem de checagem do OrderManager/RiskManager
+                blocked_until = None
+                roll_day(ts)
+                if ts < breaker_until:
+                    blocked_until = breaker_until
+                elif daily_pnl <= -self.max_daily_loss * cash or daily_trades >= self.max_trades_per_day:
+                    next_day = datetime.combine(day + timedelta(days=1), datetime.min.time())
+                    blocked_until = next_day.timestamp() * 1000
+                elif last_trade is not None and ts - last_trade < self.min_gap_ms:
+                    blocked_until = last_trade + self.min_gap_ms
+                if blocked_until is not None:
+                    cursor = max(e + 1, int(np.searchsorted(times, blocked_until, side='left')))
+                    continue
+
+            # Entrada no close ± slippage
+            size_quote = cash * self.position_pct
+            amount = size_quote / closes[e]
+            entry_price = closes[e] * (1 + slip)
+            cost = amount * entry_price * (1 + fee)
+            cash -= cost
+            stop = entry_price * (1 - p['stop_loss'])
+            target = entry_price * (1 + p['take_profit'])
+            if self.enforce_limits:
+                daily_trades += 1
+                last_trade = ts
+
+            # Saída: primeiro stop/alvo (high/low) ou sinal de venda após a entrada
+            sell_at = int(next_sell[e + 1])
+            end = min(sell_at + 1, n)
+            hit = (lows[e + 1:end] <= stop) | (highs[e + 1:end] >= target)
+            if hit.any():
+                x = e + 1 + int(hit.argmax())
+                if lows[x] <= stop:
+                    exit_price, reason = min(opens[x], stop), 'stop_loss'
+                else:
+                    exit_price, reason = max(opens[x], target), 'take_profit'
+                cursor = x
+            elif sell_at < n:
+                x, exit_price, reason = sell_at, closes[sell_at], 'signal'
+                cursor = x + 1
+            else:
+                x, exit_price, reason = n - 1, closes[n - 1], 'end'
+                cursor = n
+
+            proceeds = amount * exit_price * (1 - slip) * (1 - fee)
+            pnl = proceeds - cost
+            cash += proceeds
+            fees += amount * entry_price * fee + amount * exit_price * (1 - slip) * fee
+            trades.append({
+                'entry_time': int(times[e]), 'exit_time': int(times[x]),
+                'entry_price': entry_price, 'exit_price': exit_price * (1 - slip), 'size': amount,
+                'cost': cost, 'pnl': pnl, 'return': pnl / cost, 'reason': reason,
+                'entry_index': e, 'exit_index': x,
+            })
+
+            if self.enforce_limits:
+                roll_day(times[x])
+                daily_pnl += pnl
+                last_trade = times[x]
+                losses = losses + 1 if pnl < 0 else 0
+                if losses >= self.max_consecutive_losses:
+                    # Circuit Breaker: só rearma na virada do dia (UTC)
+                    breaker_until = (times[x] // DAY_MS + 1) * DAY_MS
+                    losses = 0
+        return trades, fees
+
+    def _stats(self, equity, trades, fees, elapsed, n) -> Dict[str, Any]:
+        final = float(equity[-1]) if n else self.initial_capital
+        peak = np.maximum.accumulate(equity) if n else equity
+        wins = sum(1 for t in trades if t['pnl'] > 0)
+        return {
+            'candles': n,
+            'initial_capital': self.initial_capital,
+            'final_equity': final,
+            'total_return': final / self.initial_capital - 1,
+            'max_drawdown': float(((peak - equity) / peak).max()) if n else 0.0,
+            'trades': len(trades),
+            'win_rate': wins / len(trades) if trades else 0.0,
+            'fees': float(fees),
+            'elapsed': elapsed,
+            'candles_per_sec': n / elapsed if elapsed > 0 else 0.0,
+        }
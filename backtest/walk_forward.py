@@ -0,0 +1,308 @@
+"""
+🚶 Walk-Forward - Maria Helena
+"Acertar o passado é fácil; o teste é o mês que ainda não veio"
+
+Divide o histórico (market_analysis_v2 ou qualquer fonte de backtest/data.py)
+em janelas móveis de treino/teste. Em cada treino, a varredura
+(backtest/sweep.py) escolhe os limiares da RSIVolumeStrategy; os escolhidos
+rodam no teste seguinte e só essas métricas fora da amostra entram no
+resultado agregado.
+
+As features são causais (cada candle só olha a própria janela), então são
+calculadas UMA vez para a série toda e cada janela usa uma fatia. O cálculo
+fica em cache no formato colunar (data/columnar.py), indexado pelo conteúdo
+dos candles e pelos parâmetros do Normalizer: rodar de novo com outro grid
+ou outras janelas não recalcula indicador nenhum. Os treinos de todas as
+janelas vão para o mesmo pool de processos.
+
+Uso (na raiz do projeto):
+    python -m backtest.walk_forward --asset BTC --train-days 90 --test-days 30 \\
+        --grid RSI_OVERSOLD=0.25:0.45:0.05 --grid RSI_OVERBOUGHT=0.6,0.7,0.8
+"""
+
+import csv
+import hashlib
+import logging
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from backtest.sweep import RESULT_STATS, ParameterSweep, combo_params, rank_rows
+from backtest.vectorized import VectorizedBacktester
+from config import CONFIG
+from data.columnar import COLUMNAR_ROOT, ColumnarStore, write_columns
+from data.normalizer import Normalizer
+
+logger = logging.getLogger('MariaHelena.Backtest.WalkForward')
+
+FEATURE_CACHE = COLUMNAR_ROOT.parent / 'features'
+FEATURE_VERSION = 1  # mudar quando process_series mudar de fórmula
+
+DAY_MS = 86_400_000
+
+
+def cached_features(candles: np.ndarray, config: Dict[str, Any] = CONFIG,
+                    cache_dir: Optional[Path] = FEATURE_CACHE) -> Dict[str, np.ndarray]:
+    """
+    Normalizer.process_series com cache em disco (arrays em memory-map).
+
+    A chave é o hash dos candles + lookback/rsi_period do Normalizer, então
+    qualquer mudança nos dados ou nos parâmetros gera uma entrada nova.
+    """
+    candles = np.ascontiguousarray(candles, dtype=np.float64)
+    normalizer = Normalizer(config)
+    if cache_dir is None:
+        return normalizer.process_series(candles)
+
+    digest = hashlib.sha1(candles.tobytes())
+    digest.update(f'{normalizer.lookback}:{normalizer.rsi_period}:{FEATURE_VERSION}'.encode())
+    key = digest.hexdigest()[:20]
+    store = ColumnarStore(cache_dir)
+    if (Path(cache_dir) / key / 'meta.json').exists():
+        logger.info(f"🚶 Features em cache ({key})")
+        return store.load(key)
+
+    features = normalizer.process_series(candles)
+    write_columns(Path(cache_dir) / key, features, 'timestamp',
+                  {'candles': int(len(candles)), 'lookback': normalizer.lookback,
+                   'rsi_period': normalizer.rsi_period, 'version': FEATURE_VERSION})
+    logger.info(f"🚶 Features calculadas e gravadas em cache ({key})")
+    return store.load(key)
+
+
+def walk_forward_windows(times: np.ndarray, train_days: float, test_days: float,
+                         step_days: Optional[float] = None, anchored: bool = False) -> List[Dict[str, int]]:
+    """
+    Janelas treino/teste em índices de candle.
+
+    Treino = [início, início + train_days), teste = os test_days seguintes;
+    a janela anda step_days (padrão: test_days, testes sem sobreposição).
+    anchored=True mantém o início do treino no começo da série. O último
+    teste pode ser mais curto, se a série acabar antes.
+    """
+    times = np.asarray(times)
+    if not len(times):
+        return []
+    train_ms, test_ms = int(train_days * DAY_MS), int(test_days * DAY_MS)
+    step_ms = int((step_days or test_days) * DAY_MS)
+    if train_ms <= 0 or test_ms <= 0 or step_ms <= 0:
+        raise ValueError("Janelas de treino/teste e passo devem ser positivas")
+
+    first, last = int(times[0]), int(times[-1])
+    windows = []
+    offset = 0
+    while first + offset + train_ms <= last:
+        train_from = first if anchored else first + offset
+        test_from = first + offset + train_ms
+        bounds = np.searchsorted(times, [train_from, test_from, test_from + test_ms], side='left')
+        if bounds[2] > bounds[1] and bounds[1] > bounds[0]:
+            windows.append({
+                'train_start': int(bounds[0]), 'train_end': int(bounds[1]),
+                'test_start': int(bounds[1]), 'test_end': int(bounds[2]),
+            })
+        offset += step_ms
+    return windows
+
+
+class WalkForward:
+    """
+    Otimização walk-forward da RSIVolumeStrategy.
+
+    Parâmetros:
+    - config (dict): Configuração base (padrão: CONFIG)
+    - train_days, test_days, step_days, anchored: Ver walk_forward_windows
+    - rank_by (str): Métrica otimizada no treino (chave de RESULT_STATS)
+    - min_trades (int): Treinos com menos trades não são escolhidos (se houver opção)
+    - fee_rate, slippage, enforce_limits: Como no VectorizedBacktester
+    - workers (int): Processos do pool (padrão: todos os núcleos)
+    - cache_dir (Path): Cache de features (None desliga)
+    """
+
+    def __init__(self, config: Dict[str, Any] = CONFIG, train_days: float = 90, test_days: float = 30,
+                 step_days: Optional[float] = None, anchored: bool = False, rank_by: str = 'total_return',
+                 min_trades: int = 5, fee_rate: float = 0.001, slippage: float = 0.0005,
+                 enforce_limits: bool = True, workers: Optional[int] = None,
+                 cache_dir: Optional[Path] = FEATURE_CACHE):
+        if rank_by not in RESULT_STATS:
+            raise ValueError(f"Métrica inválida '{rank_by}' (aceitas: {', '.join(RESULT_STATS)})")
+        self.config = dict(config)
+        self.train_days = train_days
+        self.test_days = test_days
+        self.step_days = step_days
+        self.anchored = anchored
+        self.rank_by = rank_by
+        self.min_trades = min_trades
+        self.cache_dir = cache_dir
+        self.sweep = ParameterSweep(self.config, fee_rate, slippage, enforce_limits, workers)
+        self.backtester = VectorizedBacktester(self.config, fee_rate, slippage, enforce_limits)
+
+    def run(self, candles, grid: Iterable[Dict[str, float]],
+            features: Optional[Dict[str, np.ndarray]] = None) -> Dict[str, Any]:
+        """
+        Executa o walk-forward.
+
+        Args:
+            candles: array (N × 6) [open_time_ms, o, h, l, c, v]
+            grid: Combinações {chave do config: valor} (ver sweep.expand_grid)
+            features: Saída de process_series (padrão: cached_features)
+
+        Returns:
+            dict: 'windows' (uma linha por janela: limites, parâmetros
+                  escolhidos, métricas de treino e de teste), 'timestamps' e
+                  'equity' (curva fora da amostra encadeada), 'trades' (só
+                  testes) e 'stats' (agregado fora da amostra)
+        """
+        started = time.perf_counter()
+        candles = np.asarray(candles, dtype=np.float64)
+        combos = list(grid)
+        if not combos:
+            raise ValueError("Grid vazio")
+        windows = walk_forward_windows(candles[:, 0], self.train_days, self.test_days,
+                                       self.step_days, self.anchored)
+        if not windows:
+            raise ValueError(f"Histórico curto demais para treino de {self.train_days}d + teste")
+        if features is None:
+            features = cached_features(candles, self.config, self.cache_dir)
+        features_done = time.perf_counter()
+
+        # Treinos de todas as janelas num único pool
+        trained = self.sweep.evaluate(
+            candles, features, [(combos, w['train_start'], w['train_end']) for w in windows]
+        )
+
+        # Testes: uma execução por janela com os parâmetros vencedores
+        rows, trades = [], []
+        timestamps, equity = [], []
+        capital = self.backtester.initial_capital
+        for number, (window, train_rows) in enumerate(zip(windows, trained), 1):
+            best = rank_rows(train_rows, self.rank_by, self.min_trades)[0]
+            combo = {key: best[key] for key in combos[0]}
+            test_slice = slice(window['test_start'], window['test_end'])
+            result = self.backtester.run(
+                candles[test_slice], {name: array[test_slice] for name, array in features.items()},
+                combo_params(combo, self.config)
+            )
+            test = result['stats']
+            # Encadeia: cada teste começa com o capital inicial, a curva é reescalada
+            timestamps.append(result['timestamps'])
+            equity.append(result['equity'] * (capital / test['initial_capital']))
+            capital *= 1 + test['total_return']
+            trades.extend(result['trades'])
+
+            rows.append({
+                'window': number,
+                'train_from': int(candles[window['train_start'], 0]),
+                'test_from': int(candles[window['test_start'], 0]),
+                'test_to': int(candles[window['test_end'] - 1, 0]),
+                **combo,
+                **{f'train_{key}': best[key] for key in RESULT_STATS},
+                **{f'test_{key}': test[key] for key in RESULT_STATS},
+            })
+
+        equity_curve = np.concatenate(equity)
+        stats = self._stats(rows, trades, equity_curve)
+        stats['elapsed'] = time.perf_counter() - started
+        stats['features_elapsed'] = features_done - started
+        logger.info(
+            f"🚶 Walk-forward: {len(windows)} janelas × {len(combos)} combinações em {stats['elapsed']:.1f}s | "
+            f"fora da amostra {stats['oos_return']:+.2%} (eficiência {stats['efficiency']:.2f})"
+        )
+        return {
+            'windows': rows,
+            'timestamps': np.concatenate(timestamps),
+            'equity': equity_curve,
+            'trades': trades,
+            'stats': stats,
+        }
+
+    def _stats(self, rows: List[Dict[str, Any]], trades: List[Dict[str, Any]], equity: np.ndarray) -> Dict[str, Any]:
+        test_returns = np.array([row['test_total_return'] for row in rows])
+        train_returns = np.array([row['train_total_return'] for row in rows])
+        peak = np.maximum.accumulate(equity)
+        mean_train = float(train_returns.mean())
+        return {
+            'windows': len(rows),
+            'oos_return': float(np.prod(1 + test_returns) - 1),
+            'mean_test_return': float(test_returns.mean()),
+            'median_test_return': float(np.median(test_returns)),
+            'positive_windows': float((test_returns > 0).mean()),
+            'mean_train_return': mean_train,
+            # Quanto do retorno de treino sobrevive fora da amostra (~1 = sem overfitting)
+            'efficiency': float(test_returns.mean() / mean_train) if mean_train > 0 else 0.0,
+            'max_drawdown': float(((peak - equity) / peak).max()),
+            'trades': len(trades),
+            'win_rate': sum(1 for t in trades if t['pnl'] > 0) / len(trades) if trades else 0.0,
+        }
+
+
+def save_windows_csv(rows: List[Dict[str, Any]], path) -> None:
+    """Grava uma linha por janela (parâmetros escolhidos + métricas de treino/teste)"""
+    if not rows:
+        return
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+if __name__ == "__main__":
+    import argparse
+    from datetime import datetime, timezone
+
+    from backtest.data import load_analysis, load_columnar, load_klines_csv
+    from backtest.sweep import SWEEP_KEYS, expand_grid, parse_range
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(name)s: %(message)s')
+    parser = argparse.ArgumentParser(description='Walk-forward da RSIVolumeStrategy (otimiza no treino, mede no teste)')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--asset', help='Ativo no market_analysis_v2')
+    source.add_argument('--csv', type=Path, help='Arquivo de klines (formato Binance)')
+    source.add_argument('--columnar', help="Diretório no export colunar (ex: 'BTCUSDT_1m')")
+    parser.add_argument('--db', type=Path, help='Banco do market_analysis_v2')
+    parser.add_argument('--grid', action='append', required=True, metavar='CHAVE=VALORES',
+                        help="Ex: RSI_OVERSOLD=0.25:0.45:0.05 ou STOP_LOSS=0.01,0.02 (repetível)")
+    parser.add_argument('--train-days', type=float, default=90)
+    parser.add_argument('--test-days', type=float, default=30)
+    parser.add_argument('--step-days', type=float)
+    parser.add_argument('--anchored', action='store_true', help='Treino expandindo desde o início da série')
+    parser.add_argument('--rank-by', default='total_return', choices=RESULT_STATS)
+    parser.add_argument('--min-trades', type=int, default=5)
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--fee', type=float, default=0.001)
+    parser.add_argument('--slippage', type=float, default=0.0005)
+    parser.add_argument('--cache-dir', type=Path, default=FEATURE_CACHE)
+    parser.add_argument('--no-cache', action='store_true')
+    parser.add_argument('--out', type=Path, help='Salva as janelas em CSV')
+    args = parser.parse_args()
+
+    ranges = {}
+    for item in args.grid:
+        key, _, values = item.partition('=')
+        ranges[key.strip().upper()] = parse_range(values)
+
+    if args.asset:
+        candles = load_analysis(args.asset, args.db) if args.db else load_analysis(args.asset)
+    elif args.csv:
+        candles = load_klines_csv(args.csv)
+    else:
+        candles = load_columnar(args.columnar)
+
+    walk = WalkForward(
+        train_days=args.train_days, test_days=args.test_days, step_days=args.step_days, anchored=args.anchored,
+        rank_by=args.rank_by, min_trades=args.min_trades, fee_rate=args.fee, slippage=args.slippage,
+        workers=args.workers, cache_dir=None if args.no_cache else args.cache_dir,
+    )
+    result = walk.run(candles, expand_grid(ranges))
+
+    params = [key for key in SWEEP_KEYS if key in ranges]
+    for row in result['windows']:
+        day = datetime.fromtimestamp(row['test_from'] / 1000, tz=timezone.utc).strftime('%Y-%m-%d')
+        chosen = ' '.join(f"{key}={row[key]:g}" for key in params)
+        print(f"#{row['window']:>3} teste {day} | {chosen} | treino {row['train_total_return']:+.2%} "
+              f"→ teste {row['test_total_return']:+.2%} ({row['test_trades']} trades)")
+    for key, value in result['stats'].items():
+        print(f"{key:>20}: {value:,.4f}" if isinstance(value, float) else f"{key:>20}: {value}")
+    if args.out:
+        save_windows_csv(result['windows'], args.out)
@@ -24,6 +24,10 @@ CONFIG: Dict[str, Any] = {
     'EXCHANGE': 'binance',
     'SYMBOL': 'BTC/USDT',
     'TIMEFRAME': '15m',
+    # Universo do Estrategista multi-ativo (core/bot.py): 'BTC/USDT:15m,ETH/USDT:1h'
+    # Vazio = só SYMBOL/TIMEFRAME. UNIVERSE_WORKERS: threads de avaliação/ordens
+    'UNIVERSE': os.getenv('UNIVERSE', ''),
+    'UNIVERSE_WORKERS': int(os.getenv('UNIVERSE_WORKERS', '8')),
     'TESTNET': False,
     'OPTIONS': {
         'defaultType': 'spot'
@@ -36,13 +40,47 @@ CONFIG: Dict[str, Any] = {
     # ======================================================================= #
     'INITIAL_CAPITAL': 1000.0,
     'MAX_POSITION_SIZE': 0.03,
+    # Reserva do CashGate sem confirmação da ordem expira após CASH_RESERVATION_TTL (s).
+    # CASH_SYMBOL_BUDGET_PCT: teto por símbolo (reservado + posições abertas) em fração
+    # do capital; None = sem sub-orçamento
+    'CASH_RESERVATION_TTL': 300.0,
+    'CASH_SYMBOL_BUDGET_PCT': None,
 
     # ======================================================================= #
     #                             BOT BEHAVIOR                                #
     # ======================================================================= #
     'MENTOR_MODE': False,
     'LIVE_MODE': False,
-    'CHECK_INTERVAL': 60,
+    'CHECK_INTERVAL': 60,          # Nova tentativa após erro (s); o loop segue o fechamento do candle
+    'CANDLE_CLOSE_OFFSET': 2.0,    # Segundos após o fechamento do candle para acordar
+    'HEALTH_CHECK_INTERVAL': 15.0,  # Segundos entre fetch_status em segundo plano
+    'HEALTH_MAX_AGE': 60.0,         # Idade máxima do status usado pela ordem (s)
+    'EXIT_MONITOR': True,           # Stop/alvo pelo preço corrente (core/exit_monitor.py), não só no candle
+    'EXIT_POLL_INTERVAL': 1.0,      # Sem stream: segundos entre fetch_ticker dos símbolos com posição
+
+    # Fora do modo AO VIVO as ordens vão para a exchange de papel
+    # (core/paper_exchange.py); os dados de mercado seguem da exchange real/replay.
+    # PAPER_LEVEL_NOTIONAL: liquidez por nível do livro sintético (None = infinita)
+    'PAPER_FEE_RATE': 0.001,
+    'PAPER_SPREAD': 0.001,
+    'PAPER_LEVEL_NOTIONAL': 50000.0,
+    'PAPER_DEPTH_LEVELS': 10,
+    'PAPER_LATENCY': 0.0,           # Segundos por create/cancel
+
+    # Fonte de velas do Estrategista: 'polling' (fetch_ohlcv no fechamento)
+    # ou 'stream' (WebSocket de klines, data/kline_stream.py)
+    'DATA_SOURCE': os.getenv('DATA_SOURCE', 'polling'),
+    'STREAM_URL': os.getenv('STREAM_URL', 'wss://stream.binance.com:9443/stream'),
+    'STREAM_REST_URL': os.getenv('STREAM_REST_URL', 'https://api.binance.com/api/v3'),
+
+    # ======================================================================= #
+    #                      GRAVAÇÃO / REPLAY DE MERCADO                       #
+    # ======================================================================= #
+    # Grava as respostas da exchange (core/replay.py) ou roda offline a
+    # partir de uma gravação (MARKET_REPLAY_SPEED: 0 = o mais rápido possível)
+    'MARKET_RECORD_FILE': os.getenv('MARKET_RECORD_FILE', ''),
+    'MARKET_REPLAY_FILE': os.getenv('MARKET_REPLAY_FILE', ''),
+    'MARKET_REPLAY_SPEED': float(os.getenv('MARKET_REPLAY_SPEED', '0')),
 
     # ======================================================================= #
     #                         ESTRATÉGIA - RSI & VOLUME                       #
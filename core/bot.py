@@ -0,0 +1,471 @@
+"""
+🎼 Estrategista Multi-Ativo - Maria Helena
+"Uma maestra só, e a orquestra inteira tocando"
+
+Roda um universo de pares (símbolo, timeframe) num único processo, em vez
+de um processo (com seu load_markets e sua memória) por par:
+
+- Uma exchange ccxt compartilhada para ordens: um único load_markets
+- CashGate, CircuitBreaker e TechnicalGuard compartilhados (capital e freio
+  são da conta, não do par), com um ExchangeHealthMonitor único
+- PortfolioRiskManager compartilhado: exposição total e perda diária da
+  carteira; stops/alvos num índice por preço, e cada vela só toca as
+  posições do símbolo cujo nível ela cruzou
+- ExitMonitor: stop/alvo também pelo preço corrente (negócios do stream ou
+  fetch_ticker dos símbolos com posição), sem esperar o fechamento
+- Por par: Normalizer, RSIVolumeStrategy, RiskManager e OrderManager próprios
+- Velas: 'polling' (CandleScheduler único + AsyncKlineFetcher, todos os pares
+  devidos numa rodada em paralelo) ou 'stream' (um KlineStream para todos).
+  No polling, par sem a vela recém-fechada (busca falhou ou exchange
+  atrasada) é buscado de novo após CHECK_INTERVAL, sem passar do próximo
+  fechamento dele
+- Avaliação num pool de threads (cada par processa um candle por vez); ordens
+  pelo ExecutionEngine (fila por símbolo, símbolos em paralelo)
+
+Uso:
+    UNIVERSE='BTC/USDT:15m,ETH/USDT:15m,SOL/USDT:1h' python -m core.bot
+"""
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import ccxt  # type: ignore
+
+from config import CONFIG
+from core.exit_monitor import ExitMonitor
+from core.orders.execution_engine import ExecutionEngine
+from core.orders.order_manager import OrderManager
+from core.paper_exchange import PaperExchange, create_paper_exchange
+from core.replay import RecordingExchange
+from core.scheduler import CandleScheduler, closed_candles, timeframe_seconds
+from data.kline_fetcher import AsyncKlineFetcher
+from data.kline_stream import REST_URL, STREAM_URL, KlineStream, market_id, parse_rest_kline
+from data.normalizer import Normalizer
+from protection.cash_gate.cash_gate import CashGate
+from protection.circuit_breaker import CircuitBreaker
+from protection.health_monitor import ExchangeHealthMonitor
+from protection.portfolio_risk import PortfolioRiskManager
+from protection.risk_manager import RiskManager
+from protection.technical_guard import TechnicalGuard
+from strategies.rsi_volume_strategy import RSIVolumeStrategy
+
+logger = logging.getLogger('MariaHelena.Bot')
+
+Pair = Tuple[str, str]
+
+
+def parse_universe(config: Dict[str, Any]) -> List[Pair]:
+    """
+    UNIVERSE → [(símbolo, timeframe), ...]
+
+    Aceita 'BTC/USDT:15m,ETH/USDT' (timeframe omitido = TIMEFRAME) ou uma
+    lista de pares/strings. Vazio = [(SYMBOL, TIMEFRAME)]. Duplicatas saem.
+    """
+    universe = config.get('UNIVERSE') or []
+    if isinstance(universe, str):
+        universe = [item for item in universe.split(',') if item.strip()]
+    pairs: List[Pair] = []
+    for item in universe:
+        if isinstance(item, str):
+            symbol, _, timeframe = item.strip().partition(':')
+        else:
+            symbol, timeframe = item
+        pair = (symbol.strip().upper(), (timeframe or config['TIMEFRAME']).strip())
+        if pair not in pairs:
+            pairs.append(pair)
+    return pairs or [(config['SYMBOL'], config['TIMEFRAME'])]
+
+
+def create_exchange(config: Dict[str, Any]) -> Any:
+    """Exchange ccxt compartilhada por todos os pares (mercados carregados uma vez)."""
+    name = config['EXCHANGE']
+    params: Dict[str, Any] = {'enableRateLimit': True, 'options': dict(config['OPTIONS'])}
+    if config['TESTNET'] and name == 'binance':
+        params['urls'] = {'api': 'https://testnet.binance.vision/api', 'www': 'https://testnet.binance.com'}
+    if config['LIVE_MODE']:
+        if not (config['API_KEY'] and config['SECRET_KEY']):
+            raise ValueError("Modo AO VIVO exige API_KEY/SECRET_KEY")
+        params['apiKey'] = config['API_KEY']
+        params['secret'] = config['SECRET_KEY']
+
+    exchange = getattr(ccxt, name)(params)
+    if config.get('MARKET_RECORD_FILE'):
+        exchange = RecordingExchange(exchange, config['MARKET_RECORD_FILE'])
+    exchange.load_markets()
+    logger.info(f"🔌 {name.upper()}: {len(exchange.markets)} mercados carregados")
+    if not config['LIVE_MODE']:
+        # Modo TESTE: ordens na exchange de papel, dados de mercado da exchange real
+        symbols = list(dict.fromkeys(symbol for symbol, _ in parse_universe(config)))
+        exchange = create_paper_exchange(config, exchange, symbols)
+    return exchange
+
+
+class PairWorker:
+    """
+    Estado e decisão de um par (símbolo, timeframe).
+
+    on_candles() roda numa thread do pool; o lock garante um candle por vez
+    por par, mesmo que uma rodada atrase e a próxima já tenha chegado. O sinal
+    devolvido vai para o ExecutionEngine; on_result() recebe a execução.
+    """
+
+    def __init__(self, symbol: str, timeframe: str, config: Dict[str, Any], exchange: Any,
+                 cash_gate: CashGate, circuit_breaker: CircuitBreaker, technical_guard: TechnicalGuard,
+                 portfolio: Optional[PortfolioRiskManager] = None):
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.key: Pair = (symbol, timeframe)
+        self.config = dict(config, SYMBOL=symbol, TIMEFRAME=timeframe)
+
+        self.risk_manager = RiskManager(self.config, portfolio, self.key)
+        self.normalizer = Normalizer(self.config)
+        self.strategy = RSIVolumeStrategy(self.config, verbose=False)
+        self.order_manager = OrderManager(exchange, self.risk_manager, technical_guard, circuit_breaker,
+                                          cash_gate, symbol=symbol)
+        self.window = self.normalizer.lookback + 5
+
+        self.last_candle_time: Optional[float] = None
+        self._lock = threading.Lock()
+        self.stats = {'candles': 0, 'signals': 0, 'entries': 0, 'exits': 0, 'rejected': 0, 'errors': 0}
+
+    def on_candles(self, ohlcv: List[List[float]]) -> Optional[Dict[str, Any]]:
+        """
+        Processa as velas fechadas (mais antiga → mais recente).
+
+        Returns:
+            dict: sinal a executar, ou None (sem candle novo / sem sinal)
+        """
+        with self._lock:
+            if not ohlcv or ohlcv[-1][0] == self.last_candle_time:
+                return None
+            self.last_candle_time = ohlcv[-1][0]
+            ts, _, high, low, price, volume = ohlcv[-1][:6]
+            self.stats['candles'] += 1
+
+            # Stop-loss / take-profit da posição aberta, pela máxima/mínima do candle
+            # (com carteira, quem dispara é o índice de níveis em process_close)
+            rm = self.risk_manager
+            if rm.portfolio is None and rm.is_in_position and (low <= rm.stop_loss or high >= rm.take_profit):
+                reason = 'stop_loss' if low <= rm.stop_loss else 'take_profit'
+                return {'action': 'SELL', 'symbol': self.symbol, 'price': price, 'timestamp': ts, 'reason': reason}
+
+            data = self.normalizer.process(ohlcv[-self.window:],
+                                           {'last': price, 'quoteVolume': volume, 'timestamp': ts})
+            signal = self.strategy.evaluate(data)
+            if signal is None:
+                return None
+            self.stats['signals'] += 1
+            if signal['action'] == 'BUY' and rm.is_in_position:
+                return None
+            if signal['action'] == 'SELL' and not rm.is_in_position:
+                return None
+            signal['symbol'] = self.symbol
+            return signal
+
+    def exit_signal(self, price: float, timestamp: float, reason: str) -> Dict[str, Any]:
+        """Venda da posição cujo stop/alvo o índice da carteira viu cruzar (vela ou tick)."""
+        return {'action': 'SELL', 'symbol': self.symbol, 'price': price, 'timestamp': timestamp, 'reason': reason}
+
+    def on_result(self, result: Dict[str, Any]) -> None:
+        """Callback do ExecutionEngine (CashGate/RiskManager já atualizados pelo OrderManager)."""
+        rm = self.risk_manager
+        if result['action'] == 'SELL' and rm.portfolio is not None and rm.is_in_position:
+            rm.portfolio.arm(self.key)  # venda não saiu: stop/alvo voltam a valer
+        if result['status'] == 'executed':
+            self.stats['entries' if result['action'] == 'BUY' else 'exits'] += 1
+            order = result['order']
+            logger.info(f"{'🟢' if result['action'] == 'BUY' else '🔴'} {self.symbol} ({self.timeframe}) "
+                        f"{result['action']} @ {float(order.get('average') or 0):.4f} "
+                        f"em {result['latency_ms']:.0f}ms")
+        else:
+            self.stats['rejected'] += 1
+
+
+class MultiSymbolStrategist:
+    """
+    Parâmetros:
+    - config (dict): CONFIG do bot (UNIVERSE, DATA_SOURCE, ...)
+    - pairs: [(símbolo, timeframe), ...] (padrão: parse_universe(config))
+    - exchange: Exchange ccxt já conectada (padrão: create_exchange(config))
+    - fetcher: AsyncKlineFetcher das velas no modo polling (padrão: um novo em STREAM_REST_URL)
+    - max_workers (int): Threads de avaliação/ordens (padrão: UNIVERSE_WORKERS)
+    - cash_gate / circuit_breaker / portfolio: Instâncias compartilhadas (padrão: a partir do config)
+    """
+
+    def __init__(self, config: Dict[str, Any] = CONFIG, pairs: Optional[Iterable[Pair]] = None,
+                 exchange: Any = None, fetcher: Optional[AsyncKlineFetcher] = None,
+                 max_workers: Optional[int] = None, cash_gate: Optional[CashGate] = None,
+                 circuit_breaker: Optional[CircuitBreaker] = None,
+                 portfolio: Optional[PortfolioRiskManager] = None):
+        self.config = config
+        self.pairs: List[Pair] = [tuple(pair) for pair in pairs] if pairs else parse_universe(config)
+        self.exchange = exchange if exchange is not None else create_exchange(config)
+        self.cash_gate = cash_gate or CashGate(config['INITIAL_CAPITAL'])
+        self.circuit_breaker = circuit_breaker or CircuitBreaker(config)
+        self.portfolio = portfolio or PortfolioRiskManager(config)
+        self.health_monitor = ExchangeHealthMonitor(self.exchange, config.get('HEALTH_CHECK_INTERVAL', 15.0),
+                                                    config.get('HEALTH_MAX_AGE', 60.0))
+        self.technical_guard = TechnicalGuard(self.health_monitor)
+
+        self.workers: Dict[Pair, PairWorker] = {
+            pair: PairWorker(*pair, config, self.exchange, self.cash_gate, self.circuit_breaker,
+                             self.technical_guard, self.portfolio)
+            for pair in self.pairs
+        }
+        self.limit = next(iter(self.workers.values())).window + 1  # +1: a vela em formação
+        self.max_workers = max_workers or config.get('UNIVERSE_WORKERS', 8)
+        self.executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix='MariaHelenaPar')
+        self.engine = ExecutionEngine(self.max_workers)
+        self.fetcher = fetcher or AsyncKlineFetcher(config.get('STREAM_REST_URL', REST_URL))
+        self.stream: Optional[KlineStream] = None
+        self.scheduler = CandleScheduler(config.get('CANDLE_CLOSE_OFFSET', 0.0), sleep=lambda _: None)
+        self.check_interval = config.get('CHECK_INTERVAL', 60)
+        self.exit_monitor: Optional[ExitMonitor] = None
+        if config.get('EXIT_MONITOR', True):
+            self.exit_monitor = ExitMonitor(self.portfolio, self._exit_from_monitor)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._tasks: set = set()
+
+        self.stats = {'rounds': 0, 'last_round_ms': None, 'max_round_ms': 0.0, 'fetch_errors': 0, 'retries': 0}
+        logger.info(f"🎼 Estrategista multi-ativo: {len(self.pairs)} pares, "
+                    f"{self.max_workers} threads, fonte {config.get('DATA_SOURCE', 'polling')}")
+
+    async def _fetch(self, keys: List[Pair]) -> Dict[Pair, List[List[float]]]:
+        """Velas fechadas dos pares devidos: buffer do stream ou REST em paralelo por timeframe."""
+        if self.stream is not None:
+            return {key: self.stream.candles(*key) for key in keys}
+
+        by_timeframe: Dict[str, List[str]] = {}
+        for symbol, timeframe in keys:
+            by_timeframe.setdefault(timeframe, []).append(symbol)
+        responses = await asyncio.gather(*(
+            self.fetcher.fetch_many([market_id(symbol) for symbol in symbols], timeframe, self.limit)
+            for timeframe, symbols in by_timeframe.items()
+        ))
+
+        now = time.time()
+        candles: Dict[Pair, List[List[float]]] = {}
+        for (timeframe, symbols), response in zip(by_timeframe.items(), responses):
+            for symbol in symbols:
+                rows = response.get(market_id(symbol)) or []
+                if not rows:
+                    self.stats['fetch_errors'] += 1
+                    continue
+                candles[(symbol, timeframe)] = closed_candles([parse_rest_kline(row) for row in rows],
+                                                              timeframe, now)
+        return candles
+
+    async def process_close(self, keys: Iterable[Pair]) -> Dict[Pair, Any]:
+        """
+        Uma rodada: busca as velas dos pares devidos, avalia todos em paralelo
+        e envia os sinais ao ExecutionEngine (símbolos diferentes em paralelo).
+
+        Returns:
+            dict: par → resultado da ordem (só pares que enviaram ordem ou falharam)
+        """
+        started = time.perf_counter()
+        keys = [key for key in keys if key in self.workers]
+        candles = await self._fetch(keys)
+        if self.stream is None:
+            self._retry_lagging(keys, candles)
+
+        loop = asyncio.get_running_loop()
+        ready = [key for key in keys if candles.get(key)]
+        if isinstance(self.exchange, PaperExchange):
+            for symbol, timeframe in ready:
+                self.exchange.on_candle(symbol, candles[(symbol, timeframe)][-1])
+
+        # Stops/alvos: por símbolo, só as posições cujo nível a vela cruzou; esses pares só saem nesta rodada
+        exits: Dict[Pair, Dict[str, Any]] = {}
+        for key in ready:
+            candle = candles[key][-1]
+            for hit in self.portfolio.triggered(key[0], candle[3], candle[2]):
+                worker = self.workers.get(hit['key'])
+                if worker is None:
+                    self.portfolio.arm(hit['key'])
+                    continue
+                exits[hit['key']] = worker.exit_signal(candle[4], candle[0], hit['reason'])
+        evaluate = [key for key in ready if key not in exits]
+        outcomes = await asyncio.gather(*(
+            loop.run_in_executor(self.executor, self.workers[key].on_candles, candles[key]) for key in evaluate
+        ), return_exceptions=True)
+
+        results: Dict[Pair, Any] = {}
+        orders: Dict[Pair, asyncio.Future] = {
+            key: self.engine.submit(self.workers[key].order_manager, signal, self.workers[key].on_result)
+            for key, signal in exits.items()
+        }
+        for key, outcome in zip(evaluate, outcomes):
+            worker = self.workers[key]
+            if isinstance(outcome, Exception):
+                worker.stats['errors'] += 1
+                logger.error(f"❌ {key[0]} ({key[1]}): {outcome}", exc_info=outcome)
+                results[key] = {'status': 'error', 'reason': str(outcome)}
+            elif outcome is not None:
+                orders[key] = self.engine.submit(worker.order_manager, outcome, worker.on_result)
+        results.update(zip(orders, await asyncio.gather(*orders.values())))
+
+        elapsed = (time.perf_counter() - started) * 1000
+        self.stats['rounds'] += 1
+        self.stats['last_round_ms'] = elapsed
+        self.stats['max_round_ms'] = max(self.stats['max_round_ms'], elapsed)
+        return results
+
+    def _retry_lagging(self, keys: List[Pair], candles: Dict[Pair, List[List[float]]]) -> List[Pair]:
+        """
+        Polling: agenda nova busca, após CHECK_INTERVAL, dos pares sem a vela
+        recém-fechada (busca falhou ou a exchange ainda não a tem). Se o
+        próximo fechamento do par vem antes, a rodada normal já o cobre.
+
+        Returns:
+            list: pares reagendados
+        """
+        now = self.scheduler.clock()
+        retry = []
+        for key in keys:
+            period = timeframe_seconds(key[1])
+            last_close = self.scheduler.last_close(key[1])
+            rows = candles.get(key)
+            if rows and rows[-1][0] + period * 1000 >= last_close * 1000:
+                continue
+            if now + self.check_interval < last_close + period + self.scheduler.offset:
+                retry.append(key)
+        if retry:
+            self.stats['retries'] += len(retry)
+            logger.info(f"🔁 {len(retry)} par(es) sem a última vela; nova busca em {self.check_interval}s")
+            self._track(asyncio.create_task(self._retry(retry)))
+        return retry
+
+    async def _retry(self, keys: List[Pair]) -> None:
+        await asyncio.sleep(self.check_interval)
+        self._dispatch(keys)
+
+    def _exit_from_monitor(self, hit: Dict[str, Any], price: float, timestamp: float) -> bool:
+        """Thread do ExitMonitor: a saída vai para o ExecutionEngine, no event loop."""
+        if self._loop is None or self._loop.is_closed():
+            return False
+        self._loop.call_soon_threadsafe(self._submit_exit, hit, price, timestamp)
+        return True
+
+    def _submit_exit(self, hit: Dict[str, Any], price: float, timestamp: float) -> None:
+        worker = self.workers.get(hit['key'])
+        if worker is None:
+            self.portfolio.arm(hit['key'])
+            return
+        if isinstance(self.exchange, PaperExchange):
+            self.exchange.update_market(int(timestamp), price, hit['symbol'])
+        self.engine.submit(worker.order_manager, worker.exit_signal(price, timestamp, hit['reason']),
+                           worker.on_result)
+
+    def _dispatch(self, keys: List[Pair]) -> None:
+        """Agenda uma rodada sem bloquear o loop (pares lentos não atrasam o próximo fechamento)."""
+        self._track(asyncio.create_task(self.process_close(keys)))
+
+    def _track(self, task: asyncio.Task) -> None:
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def run(self) -> None:
+        """Loop principal: uma rodada inicial com todos os pares e depois a cada fechamento."""
+        self._loop = asyncio.get_running_loop()
+        await self._loop.run_in_executor(None, self.health_monitor.start)
+        if self.exit_monitor is not None:
+            self.exit_monitor.start()
+            if self.config.get('DATA_SOURCE') != 'stream':
+                market = self.exchange.market if isinstance(self.exchange, PaperExchange) else self.exchange
+                self.exit_monitor.poll(market.fetch_ticker, self.config.get('EXIT_POLL_INTERVAL', 1.0))
+        if self.config.get('DATA_SOURCE') == 'stream':
+            await self._run_stream()
+        else:
+            await self._run_polling()
+
+    async def _run_polling(self) -> None:
+        scheduler = self.scheduler
+        for pair in self.pairs:
+            scheduler.add(pair, pair[1])
+        self._dispatch(list(self.pairs))
+        while True:
+            await asyncio.sleep(scheduler.seconds_until_next())
+            self._dispatch([key for key, _ in scheduler.wait()])
+
+    async def _run_stream(self) -> None:
+        closes: asyncio.Queue = asyncio.Queue()
+        self.stream = KlineStream(
+            self.pairs, on_close=lambda symbol, timeframe, candle: closes.put_nowait((symbol, timeframe)),
+            url=self.config.get('STREAM_URL', STREAM_URL), buffer_size=self.limit + 50, fetcher=self.fetcher,
+            on_trade=self._on_trade if self.exit_monitor is not None else None,
+            trade_symbols=list(dict.fromkeys(symbol for symbol, _ in self.pairs)) if self.exit_monitor else (),
+        )
+        await self.stream.start()
+        self._dispatch(list(self.pairs))
+        while True:
+            due = [await closes.get()]
+            while not closes.empty():  # fechamentos do mesmo minuto saem na mesma rodada
+                due.append(closes.get_nowait())
+            self._dispatch(list(dict.fromkeys(due)))
+
+    def _on_trade(self, symbol: str, price: float, amount: float, timestamp: float) -> None:
+        self.exit_monitor.on_price(symbol, price, timestamp)
+
+    async def stop(self) -> None:
+        if self.exit_monitor is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self.exit_monitor.stop)
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self.stream is not None:
+            await self.stream.stop()
+        else:
+            await self.fetcher.close()
+        await self.engine.stop()
+        self.executor.shutdown(wait=True)
+        self.health_monitor.stop()
+        self.cash_gate.close()
+
+    def status(self) -> Dict[str, Any]:
+        positions = {position['symbol']: position['entry_price'] for position in self.portfolio.list_positions()}
+        totals: Dict[str, int] = {}
+        for worker in self.workers.values():
+            for name, value in worker.stats.items():
+                totals[name] = totals.get(name, 0) + value
+        return {
+            'pairs': len(self.pairs),
+            'positions': positions,
+            'cash': self.cash_gate.get_status(),
+            'risk': self.portfolio.get_status(),
+            'exits': self.exit_monitor.metrics() if self.exit_monitor is not None else None,
+            'circuit_breaker': self.circuit_breaker.is_tripped,
+            'health': self.health_monitor.metrics(),
+            'execution': self.engine.status(),
+            **totals,
+            **self.stats,
+        }
+
+
+async def _main(config: Dict[str, Any]) -> None:
+    strategist = MultiSymbolStrategist(config)
+    try:
+        await strategist.run()
+    finally:
+        await strategist.stop()
+        logger.info(f"🎼 Encerrado: {strategist.status()}")
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    try:
+        asyncio.run(_main(CONFIG))
+    except KeyboardInterrupt:
+        logger.info("🛑 Interrompido pelo usuário")
+    except ValueError as e:
+        logger.error(f"❌ {e}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+"""
+🎯 Monitor de Saídas - Maria Helena
+"Stop que espera o próximo candle não é stop, é esperança"
+
+Stop-loss e take-profit disparados pelo preço corrente, fora do loop
+principal (que só acorda no fechamento do candle):
+
+- on_price(símbolo, preço) a cada negócio/ticker (KlineStream on_trade, ou
+  poll() consultando fetch_ticker): consulta o índice ordenado de níveis
+  do PortfolioRiskManager — O(log n + disparos) por tick, com qualquer
+  número de posições abertas — e só enfileira o que cruzou
+- Uma thread própria executa as saídas (on_exit → OrderManager ou
+  ExecutionEngine), sem segurar quem entrega os ticks (ex: o event loop do
+  stream)
+- Saída que falha (on_exit devolve False ou levanta erro) volta ao índice
+  e dispara de novo no próximo tick que cruzar o nível
+- Latência tick → saída concluída (p50/p95) em metrics()
+"""
+
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from protection.portfolio_risk import PortfolioRiskManager
+
+logger = logging.getLogger('MariaHelena.ExitMonitor')
+
+
+class ExitMonitor:
+    """
+    Parâmetros:
+    - portfolio (PortfolioRiskManager): Posições e índice de stops/alvos
+    - on_exit: callback(disparo, preço, timestamp_ms) → bool, executa a saída
+      (disparo: {'key', 'symbol', 'reason', 'level'}); False = não saiu
+    - window (int): Saídas consideradas nas métricas de latência (padrão: 500)
+    """
+
+    def __init__(self, portfolio: PortfolioRiskManager, on_exit: Callable[[Dict[str, Any], float, float], bool],
+                 window: int = 500):
+        self.portfolio = portfolio
+        self.on_exit = on_exit
+
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._poller: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._latencies: deque = deque(maxlen=window)  # ms, tick → saída concluída
+
+        self.stats = {'ticks': 0, 'triggers': 0, 'exits': 0, 'failed': 0, 'polls': 0, 'poll_errors': 0}
+
+    def start(self) -> "ExitMonitor":
+        """Sobe a thread que executa as saídas."""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name='MariaHelenaExitMonitor', daemon=True)
+        self._thread.start()
+        logger.info("🎯 Monitor de saídas ativo")
+        return self
+
+    def on_price(self, symbol: str, price: float, timestamp: Optional[float] = None,
+                 high: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Novo preço de `symbol` (ou faixa [price, high]); thread-safe e não bloqueia.
+
+        Returns:
+            list: disparos enfileirados para saída
+        """
+        self.stats['ticks'] += 1
+        hits = self.portfolio.triggered(symbol, price, high)
+        if hits:
+            received = time.perf_counter()
+            timestamp = timestamp if timestamp is not None else time.time() * 1000
+            self.stats['triggers'] += len(hits)
+            for hit in hits:
+                logger.info(f"🎯 {hit['key']}: {hit['reason']} em {hit['level']:.4f} (preço {price:.4f})")
+                self._queue.put((hit, price, timestamp, received))
+        return hits
+
+    def _loop(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            hit, price, timestamp, received = item
+            try:
+                done = self.on_exit(hit, price, timestamp)
+            except Exception as e:
+                logger.error(f"🎯 Saída de {hit['key']} falhou: {e}", exc_info=True)
+                done = False
+            if done is False:
+                self.stats['failed'] += 1
+                self.portfolio.arm(hit['key'])
+                continue
+            self.stats['exits'] += 1
+            self._latencies.append((time.perf_counter() - received) * 1000)
+
+    def poll(self, fetch_ticker: Callable[[str], Dict[str, Any]], interval: float = 1.0) -> "ExitMonitor":
+        """
+        Sem stream de negócios: consulta o ticker dos símbolos com posição
+        aberta a cada `interval` segundos (nenhuma chamada sem posição).
+        """
+        def run():
+            while not self._stop.wait(interval):
+                for symbol in {position['symbol'] for position in self.portfolio.list_positions()}:
+                    try:
+                        ticker = fetch_ticker(symbol)
+                    except Exception as e:
+                        self.stats['poll_errors'] += 1
+                        logger.warning(f"🎯 Ticker de {symbol} indisponível: {e}")
+                        continue
+                    self.stats['polls'] += 1
+                    if ticker.get('last'):
+                        self.on_price(symbol, float(ticker['last']), ticker.get('timestamp'))
+
+        self._poller = threading.Thread(target=run, name='MariaHelenaExitPoller', daemon=True)
+        self._poller.start()
+        return self
+
+    def metrics(self) -> Dict[str, Any]:
+        latencies = np.array(self._latencies) if self._latencies else None
+        return {
+            **self.stats,
+            'pending': self._queue.qsize(),
+            'latency_p50_ms': float(np.percentile(latencies, 50)) if latencies is not None else None,
+            'latency_p95_ms': float(np.percentile(latencies, 95)) if latencies is not None else None,
+        }
+
+    def stop(self) -> None:
+        """Para o poll e termina as saídas já enfileiradas."""
+        self._stop.set()
+        if self._poller is not None:
+            self._poller.join(timeout=10)
+            self._poller = None
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout=30)
+            self._thread = None
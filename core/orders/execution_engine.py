@@ -0,0 +1,285 @@
+"""
+⚙️ Motor de Execução Assíncrono - Maria Helena
+"Cada fila no seu caixa, e nenhum cliente fura a fila do outro"
+
+Fila de envio de ordens para vários símbolos:
+
+- Uma fila (e um worker) por símbolo: ordens do mesmo ativo saem na ordem
+  de chegada (uma compra seguida de venda nunca se inverte)
+- Símbolos diferentes executam em paralelo (até max_concurrency ordens)
+- clientOrderId idempotente: o mesmo sinal gera sempre o mesmo ID. Após erro
+  de rede, a ordem é procurada pelo ID antes de reenviar, e DuplicateOrderId
+  recupera a original — um retry nunca compra duas vezes
+- Tamanho e reserva por compare-and-reserve no CashGate: se uma execução
+  de outro símbolo mudou o capital entre os dois, o tamanho é recalculado
+  (sem lock global em volta do dimensionamento)
+- Ao concluir, o OrderManager atualiza CashGate e RiskManager
+  (prepare_order / complete_order / complete_close) e o callback do
+  chamador recebe o resultado
+- Exchange ccxt síncrona roda num pool de threads; a async_support é aguardada direto
+"""
+
+import asyncio
+import hashlib
+import logging
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+import ccxt  # type: ignore
+import numpy as np
+
+from protection.cash_gate.cash_gate import ReservationConflict
+
+logger = logging.getLogger('MariaHelena.Execution')
+
+MAX_CLIENT_ID = 36  # limite da Binance para newClientOrderId
+
+
+def client_order_id(symbol: str, action: str, signal: Dict[str, Any], prefix: str = 'mh') -> str:
+    """
+    ID determinístico do sinal (símbolo, lado, timestamp, estratégia, razão).
+
+    Sem timestamp não há como reconhecer o mesmo sinal: o ID é aleatório,
+    mas continua fixo entre as tentativas daquele envio.
+    """
+    if signal.get('timestamp') is None:
+        return f"{prefix}{uuid.uuid4().hex}"[:MAX_CLIENT_ID]
+    key = f"{symbol}|{action}|{signal['timestamp']}|{signal.get('strategy', '')}|{signal.get('reason', '')}"
+    return f"{prefix}{hashlib.sha1(key.encode()).hexdigest()}"[:MAX_CLIENT_ID]
+
+
+class ExecutionEngine:
+    """
+    Parâmetros:
+    - max_concurrency (int): Ordens em voo ao mesmo tempo, somando os símbolos (padrão: 8)
+    - max_retries (int): Tentativas por ordem em erro de rede (padrão: 3)
+    - retry_delay (float): Espera inicial entre tentativas, dobrando a cada uma (padrão: 0.5s)
+    - executor: Pool para a exchange síncrona (padrão: um próprio com max_concurrency threads)
+    - prefix (str): Prefixo dos clientOrderId (padrão: 'mh')
+
+    Uso (dentro de um loop asyncio):
+        engine = ExecutionEngine()
+        results = await asyncio.gather(*(engine.submit(om, signal) for om, signal in ordens))
+        await engine.stop()
+    """
+
+    def __init__(self, max_concurrency: int = 8, max_retries: int = 3, retry_delay: float = 0.5,
+                 executor: Optional[ThreadPoolExecutor] = None, prefix: str = 'mh'):
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.prefix = prefix
+        self.max_conflicts = 20
+        self._own_executor = executor is None
+        self.executor = executor or ThreadPoolExecutor(max_concurrency, thread_name_prefix='MariaHelenaOrdem')
+
+        self._queues: Dict[str, asyncio.Queue] = {}
+        self._workers: Dict[str, asyncio.Task] = {}
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._recent: "OrderedDict[str, asyncio.Future]" = OrderedDict()  # clientOrderId → resultado
+        self._max_recent = 1000
+
+        self.latencies: deque = deque(maxlen=1000)
+        self.stats = {'submitted': 0, 'executed': 0, 'rejected': 0, 'failed': 0,
+                      'retries': 0, 'deduplicated': 0, 'recovered': 0, 'conflicts': 0}
+
+    def submit(self, order_manager: Any, signal: Dict[str, Any],
+               callback: Optional[Callable[[Dict[str, Any]], Any]] = None) -> asyncio.Future:
+        """
+        Enfileira um sinal: BUY abre posição (tamanho pelo RiskManager na hora
+        da execução), SELL fecha a posição aberta do símbolo.
+
+        Reenviar um sinal já enfileirado (mesmo clientOrderId) devolve o mesmo Future.
+
+        Returns:
+            asyncio.Future: resultado {'status': 'executed'|'rejected'|'failed', ...}
+        """
+        loop = asyncio.get_running_loop()
+        symbol = signal.setdefault('symbol', order_manager.symbol)
+        cid = signal.get('client_order_id') or client_order_id(symbol, signal['action'], signal, self.prefix)
+        if cid in self._recent:
+            self.stats['deduplicated'] += 1
+            logger.info(f"♻️  {symbol}: sinal já enviado ({cid}); reaproveitando o resultado")
+            return self._recent[cid]
+
+        future = loop.create_future()
+        self._recent[cid] = future
+        while len(self._recent) > self._max_recent:
+            self._recent.popitem(last=False)
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        queue = self._queues.get(symbol)
+        if queue is None:
+            queue = self._queues[symbol] = asyncio.Queue()
+            self._workers[symbol] = asyncio.create_task(self._worker(queue), name=f"ordens-{symbol}")
+        queue.put_nowait((order_manager, signal, cid, callback, future, time.perf_counter()))
+        self.stats['submitted'] += 1
+        return future
+
+    async def _worker(self, queue: asyncio.Queue) -> None:
+        while True:
+            request = await queue.get()
+            try:
+                await self._process(*request)
+            finally:
+                queue.task_done()
+
+    async def _process(self, order_manager: Any, signal: Dict[str, Any], cid: str, callback: Optional[Callable],
+                       future: asyncio.Future, submitted: float) -> None:
+        async with self._semaphore:
+            try:
+                result = await self._execute(order_manager, signal, cid)
+            except Exception as e:
+                logger.error(f"❌ {signal['symbol']}: falha ao executar {signal['action']} ({cid}): {e}")
+                result = {'status': 'failed', 'reason': str(e)}
+
+        latency = (time.perf_counter() - submitted) * 1000
+        self.latencies.append(latency)
+        result.update(symbol=signal['symbol'], action=signal['action'], client_order_id=cid, latency_ms=latency)
+        self.stats[result['status']] += 1
+        if not future.done():
+            future.set_result(result)
+        if callback is not None:
+            try:
+                callback(result)
+            except Exception as e:
+                logger.error(f"❌ Callback de {signal['symbol']} falhou: {e}", exc_info=True)
+
+    async def _execute(self, order_manager: Any, signal: Dict[str, Any], cid: str) -> Dict[str, Any]:
+        symbol = signal['symbol']
+        price = signal.get('price')
+        risk_manager = order_manager.risk_manager
+        if not price or price <= 0:
+            return {'status': 'rejected', 'reason': 'Preço inválido'}
+
+        if signal['action'] == 'SELL':
+            # Spot: venda só fecha a posição aberta; saídas não passam pelo Cash Gate
+            if not risk_manager.is_in_position:
+                return {'status': 'rejected', 'reason': 'Sem posição aberta'}
+            amount = risk_manager.position_size
+            order = await self._send(order_manager.exchange, symbol, 'sell', amount, cid)
+            order = await self._run(order_manager.complete_close, order, amount, price, signal)
+            return {'status': 'executed', 'order': order}
+
+        # Validação pode consultar a exchange (status vencido): fora do loop
+        prepared = await self._run(self._prepare, order_manager, price, signal)
+        if prepared is None:
+            return {'status': 'rejected', 'reason': 'Rejeitada pelo Cash Gate'}
+        amount, reservation_id = prepared
+        try:
+            order = await self._send(order_manager.exchange, symbol, 'buy', amount, cid)
+        except BaseException:
+            order_manager.abort_order(reservation_id)
+            raise
+        try:
+            await self._run(order_manager.complete_order, order, 'BUY', amount, price, reservation_id, signal)
+        except Exception as e:
+            # A compra já executou na exchange: liberar a reserva devolveria ao caixa um dinheiro gasto
+            logger.critical(f"🚨 {symbol}: ordem {cid} executada, mas o registro falhou ({e}); "
+                            f"reconciliando a posição pela ordem", exc_info=True)
+            await self._run(order_manager.reconcile_order, order, 'BUY', amount, price, signal)
+            return {'status': 'executed', 'order': order, 'reconciled': True}
+        return {'status': 'executed', 'order': order}
+
+    def _prepare(self, order_manager: Any, price: float, signal: Dict[str, Any]) -> Optional[tuple]:
+        """
+        Tamanho pelo RiskManager e reserva no CashGate → (quantidade, ID da reserva) ou None.
+
+        Compare-and-reserve: a reserva só vale se o capital usado no tamanho
+        ainda é o atual; se outro símbolo executou no meio, recalcula.
+        """
+        for _ in range(self.max_conflicts):
+            version, capital = order_manager.cash_gate.capital_version()
+            quote = order_manager.risk_manager.calculate_position_size(capital, signal)
+            if quote <= 0:
+                return None
+            amount = quote / price
+            try:
+                reservation_id = order_manager.prepare_order(amount, price, signal, expected_version=version)
+            except ReservationConflict:
+                self.stats['conflicts'] += 1
+                continue
+            return None if reservation_id is None else (amount, reservation_id)
+        logger.warning(f"⚔️  {signal['symbol']}: capital mudou em {self.max_conflicts} tentativas seguidas de reserva")
+        order_manager.abort_order(None)
+        return None
+
+    async def _send(self, exchange: Any, symbol: str, side: str, amount: float, cid: str) -> Dict[str, Any]:
+        """create_order com retry idempotente pelo clientOrderId."""
+        params = {'clientOrderId': cid}
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                return await self._run(exchange.create_order, symbol, 'market', side, amount, None, params)
+            except ccxt.DuplicateOrderId:
+                # Uma tentativa anterior chegou à exchange: recupera a ordem original
+                order = await self._find_order(exchange, symbol, cid)
+                if order is None:
+                    raise
+                self.stats['recovered'] += 1
+                return order
+            except ccxt.NetworkError as e:
+                if attempt == self.max_retries:
+                    raise
+                # A resposta pode ter se perdido com a ordem já executada
+                order = await self._find_order(exchange, symbol, cid)
+                if order is not None:
+                    self.stats['recovered'] += 1
+                    logger.info(f"🔎 {symbol}: ordem {cid} encontrada na exchange após erro de rede")
+                    return order
+                self.stats['retries'] += 1
+                delay = self.retry_delay * 2 ** (attempt - 1)
+                logger.warning(f"🔁 {symbol}: erro de rede ({e}); tentativa {attempt + 1}/{self.max_retries} "
+                               f"em {delay:.1f}s")
+                await asyncio.sleep(delay)
+        raise RuntimeError("max_retries deve ser >= 1")
+
+    async def _find_order(self, exchange: Any, symbol: str, cid: str) -> Optional[Dict[str, Any]]:
+        """Procura a ordem pelo clientOrderId nas abertas e nas fechadas recentes."""
+        for method in ('fetch_open_orders', 'fetch_closed_orders'):
+            fetch = getattr(exchange, method, None)
+            if fetch is None:
+                continue
+            try:
+                orders = await self._run(fetch, symbol)
+            except Exception as e:
+                logger.debug(f"{method}({symbol}) indisponível: {e}")
+                continue
+            for order in orders or []:
+                if order.get('clientOrderId') == cid:
+                    return order
+        return None
+
+    async def _run(self, fn: Callable, *args) -> Any:
+        """Aguarda fn: direto se for corrotina (ccxt.async_support), senão no pool de threads."""
+        if asyncio.iscoroutinefunction(fn):
+            return await fn(*args)
+        return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+    async def drain(self) -> None:
+        """Espera todas as filas esvaziarem."""
+        await asyncio.gather(*(queue.join() for queue in self._queues.values()))
+
+    async def stop(self) -> None:
+        """Conclui as ordens enfileiradas e encerra os workers."""
+        await self.drain()
+        for task in self._workers.values():
+            task.cancel()
+        await asyncio.gather(*self._workers.values(), return_exceptions=True)
+        self._queues.clear()
+        self._workers.clear()
+        if self._own_executor:
+            self.executor.shutdown(wait=True)
+
+    def status(self) -> Dict[str, Any]:
+        latencies = np.array(self.latencies) if self.latencies else None
+        return {
+            **self.stats,
+            'symbols': len(self._queues),
+            'queued': sum(queue.qsize() for queue in self._queues.values()),
+            'p50_ms': float(np.percentile(latencies, 50)) if latencies is not None else None,
+            'p95_ms': float(np.percentile(latencies, 95)) if latencies is not None else None,
+        }
@@ -27,7 +27,7 @@ class OrderManager:
 
     def __init__(self, exchange: ccxt.Exchange, risk_manager: RiskManager, 
                  technical_guard: TechnicalGuard, circuit_breaker: CircuitBreaker,
-                 cash_gate: CashGate):
+                 cash_gate: CashGate, symbol: Optional[str] = None):
         
         self.exchange = exchange
         self.risk_manager = risk_manager
@@ -35,7 +35,7 @@ class OrderManager:
         self.circuit_breaker = circuit_breaker
         self.cash_gate = cash_gate  # Nova dependência
         
-        self.symbol = CONFIG['SYMBOL']
+        self.symbol = symbol or CONFIG['SYMBOL']  # um OrderManager por símbolo no multi-ativo
         # O OrderManager não mantém seu próprio current_capital, ele consulta o CashGate
         
         logger.info("OrderManager inicializado.")
@@ -72,7 +72,8 @@ class OrderManager:
             return False, f"Risk Manager rejeitou: {rm_reason}"
 
         # 4. Validação de Alocação de Capital pelo Cash Gate (agora com regras de negócio!)
-        cg_approved, cg_reason = self.cash_gate.can_reserve(amount_in_quote_currency)
+        cg_approved, cg_reason = self.cash_gate.can_reserve(amount_in_quote_currency,
+                                                            signal.get('symbol', self.symbol))
         if not cg_approved:
             logger.warning(f"Cash Gate REJEITADO: Cash Gate não aprovou alocação. Razão: {cg_reason}")
             return False, f"Cash Gate rejeitou: {cg_reason}"
@@ -94,7 +95,58 @@ class OrderManager:
             Dicionário com detalhes da ordem ou None se falhar
         """
         symbol = signal.get('symbol', self.symbol)
+        reservation_id = self.prepare_order(amount, price, signal)
+        if reservation_id is None:
+            return None
+        amount_in_quote_currency = amount * price
+
+        order_type = 'market'
+        
+        logger.info(f"Executando ordem {action} de {amount:.8f} {symbol} @ {price:.2f} (total: {amount_in_quote_currency:.2f})")
         
+        try:
+            order = self.exchange.create_order(
+                symbol=symbol,
+                type=order_type,
+                side=action.lower(),
+                amount=amount,
+            )
+            
+        except ccxt.NetworkError as e:
+            logger.error(f"Erro de rede: {e}")
+            self.abort_order(reservation_id)
+            return None
+        except ccxt.ExchangeError as e:
+            logger.error(f"Erro da exchange: {e}")
+            self.abort_order(reservation_id)
+            return None
+        except Exception as e:
+            logger.error(f"Erro desconhecido: {e}")
+            self.abort_order(reservation_id)
+            return None
+
+        logger.info(f"✅ Ordem executada: {order}")
+        try:
+            self.complete_order(order, action, amount, price, reservation_id, signal)
+        except Exception as e:
+            # Ordem já executada: a reserva não pode voltar ao caixa
+            logger.critical(f"🚨 Ordem executada, mas o registro falhou ({e}); reconciliando pela ordem",
+                            exc_info=True)
+            self.reconcile_order(order, action, amount, price, signal)
+        return order
+
+    def prepare_order(self, amount: float, price: float, signal: Dict[str, Any],
+                      expected_version: Optional[int] = None) -> Optional[str]:
+        """
+        Validação pelo Cash Gate e reserva dos fundos, antes de enviar a ordem.
+        
+        Args:
+            expected_version: Versão do capital usada no dimensionamento (compare-and-reserve;
+                              ReservationConflict se o capital mudou)
+
+        Returns:
+            ID da reserva no CashGate, ou None se a ordem não pode seguir
+        """
         if not price or price <= 0:
             logger.error("Preço inválido para execução de ordem.")
             return None
@@ -110,58 +162,113 @@ class OrderManager:
         approved, reason = self._can_execute_trade(signal, amount_in_quote_currency)
         if not approved:
             logger.error(f"Ordem rejeitada: {reason}")
+            self.risk_manager.cancel_entry()
             return None
         
         # Reserva os fundos
-        if not self.cash_gate.reserve(amount_in_quote_currency):
+        reservation_id = self.cash_gate.reserve(amount_in_quote_currency, symbol=signal.get('symbol', self.symbol),
+                                                expected_version=expected_version)
+        if reservation_id is None:
             logger.error(f"Falha ao reservar fundos: {amount_in_quote_currency:.2f}")
+            self.risk_manager.cancel_entry()
             return None
+        return reservation_id
 
-        order_type = 'market'
-        
-        logger.info(f"Executando ordem {action} de {amount:.8f} {symbol} @ {price:.2f} (total: {amount_in_quote_currency:.2f})")
+    def abort_order(self, reservation_id: Optional[str]) -> None:
+        """Entrada que não foi executada: libera a reserva no CashGate e a exposição pendente no RiskManager."""
+        if reservation_id is not None:
+            self.cash_gate.release(reservation_id)
+        self.risk_manager.cancel_entry()
+
+    def complete_order(self, order: Dict[str, Any], action: str, amount: float, price: float,
+                       reservation_id: str, signal: Dict[str, Any]) -> None:
+        """Ordem de entrada executada: commit da reserva e registro da posição no RiskManager."""
+        symbol = signal.get('symbol', self.symbol)
+
+        # Commit da reserva (custo real, com taxa) e devolução da sobra
+        reserved = self.cash_gate.get_reservation(reservation_id)
+        executed_cost = self._order_cost(order, reserved or amount * price, symbol)
+        self.cash_gate.commit(executed_cost, reservation_id, symbol)
+        self.cash_gate.release(reservation_id)
+        self._record_position(order, action, amount, price, executed_cost, signal)
+
+    def reconcile_order(self, order: Dict[str, Any], action: str, amount: float, price: float,
+                        signal: Dict[str, Any]) -> None:
+        """
+        complete_order falhou com a ordem já executada na exchange.
+        A reserva fica retida no CashGate (o dinheiro saiu de fato) e a posição
+        é registrada a partir da ordem, para que stops e a venda a encontrem.
+        """
+        if self.risk_manager.is_in_position:
+            return
+        cost = self._order_cost(order, amount * price, signal.get('symbol', self.symbol))
+        self._record_position(order, action, amount, price, cost, signal)
+
+    def _record_position(self, order: Dict[str, Any], action: str, amount: float, price: float,
+                         executed_cost: float, signal: Dict[str, Any]) -> None:
+        """Registra no RiskManager a posição aberta pela ordem executada."""
+        symbol = signal.get('symbol', self.symbol)
+        entry_price = float(order.get('average') or order.get('price') or price)
+        stop_loss = self.risk_manager.calculate_stop_loss(entry_price, action)
+        take_profit = self.risk_manager.calculate_take_profit(entry_price, action)
         
-        try:
-            order = self.exchange.create_order(
-                symbol=symbol,
-                type=order_type,
-                side=action.lower(),
-                amount=amount,
-            )
-            
-            logger.info(f"✅ Ordem executada: {order}")
-            
-            # Commit da reserva
-            executed_cost = float(order.get('cost', amount_in_quote_currency))
-            self.cash_gate.commit(executed_cost)
-
-            # Registra posição no RiskManager
-            entry_price = float(order.get('price', price))
-            stop_loss = self.risk_manager.calculate_stop_loss(entry_price, action)
-            take_profit = self.risk_manager.calculate_take_profit(entry_price, action)
-            
-            self.risk_manager.open_position(
-                entry_price=entry_price,
-                size=amount,
-                stop_loss=stop_loss,
-                take_profit=take_profit,
-                action=action
-            )
-            
-            return order
+        self.risk_manager.open_position(
+            entry_price=entry_price,
+            size=float(order.get('filled') or amount),
+            stop_loss=stop_loss,
+            take_profit=take_profit,
+            action=action,
+            cost=executed_cost,
+            signal=signal,
+            symbol=symbol
+        )
 
-        except ccxt.NetworkError as e:
-            logger.error(f"Erro de rede: {e}")
-            self.cash_gate.release(amount_in_quote_currency)
-            return None
-        except ccxt.ExchangeError as e:
-            logger.error(f"Erro da exchange: {e}")
-            self.cash_gate.release(amount_in_quote_currency)
+    @staticmethod
+    def _quote_fee(order: Dict[str, Any], symbol: str) -> float:
+        """Taxa da ordem quando cobrada na moeda de cotação (ex: USDT)."""
+        fee = order.get('fee') or {}
+        if fee.get('cost') and fee.get('currency') == symbol.split('/')[1]:
+            return float(fee['cost'])
+        return 0.0
+
+    def _order_cost(self, order: Dict[str, Any], fallback: float, symbol: str) -> float:
+        """Custo executado em moeda de cotação, incluindo a taxa."""
+        return float(order.get('cost') or fallback) + self._quote_fee(order, symbol)
+
+    def close_position(self, price: float, signal: Dict[str, Any], reason: str = "") -> Optional[Dict[str, Any]]:
+        """
+        Fecha a posição aberta no RiskManager com uma ordem de venda a mercado.
+        Saídas não passam pelo Cash Gate: reduzir risco é sempre permitido.
+        
+        Returns:
+            Ordem executada (com 'pnl') ou None se não há posição / falhou
+        """
+        if not self.risk_manager.is_in_position:
             return None
+        symbol = signal.get('symbol', self.symbol)
+        amount = self.risk_manager.position_size
+        
+        logger.info(f"Fechando posição de {amount:.8f} {symbol} @ {price:.2f} {reason}".rstrip())
+        try:
+            order = self.exchange.create_order(symbol=symbol, type='market', side='sell', amount=amount)
         except Exception as e:
-            logger.error(f"Erro desconhecido: {e}")
-            self.cash_gate.release(amount_in_quote_currency)
+            logger.error(f"Erro ao fechar posição: {e}")
             return None
+        
+        return self.complete_close(order, amount, price, signal)
+
+    def complete_close(self, order: Dict[str, Any], amount: float, price: float,
+                       signal: Dict[str, Any]) -> Dict[str, Any]:
+        """Venda executada: devolve os recursos ao CashGate e fecha a posição (ordem ganha 'pnl')."""
+        symbol = signal.get('symbol', self.symbol)
+        proceeds = float(order.get('cost') or amount * price) - self._quote_fee(order, symbol)
+        self.cash_gate.deposit(proceeds, symbol, cost=self.risk_manager.entry_cost)
+        
+        exit_price = float(order.get('average') or order.get('price') or price)
+        pnl = self.risk_manager.close_position(exit_price, proceeds, signal)
+        self.circuit_breaker.record_trade(pnl)
+        order['pnl'] = pnl
+        return order
 
     def execute_trade(self, signal: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -174,6 +281,15 @@ class OrderManager:
         
         if not price or price <= 0:
             return {"status": "rejected", "reason": "Preço inválido"}
+        
+        if action == 'SELL':
+            # Spot: venda só fecha a posição aberta
+            if not self.risk_manager.is_in_position:
+                return {"status": "rejected", "reason": "Sem posição aberta"}
+            order = self.close_position(price, signal, signal.get('reason', ''))
+            if order:
+                return {"status": "executed", "order": order}
+            return {"status": "failed", "reason": "Falha ao fechar posição"}
 
         amount_in_quote_currency = self.risk_manager.calculate_position_size(
             self.cash_gate.current_capital, 
@@ -0,0 +1,460 @@
+"""
+📝 Exchange de Papel - Maria Helena
+"Dinheiro de mentira, fila de verdade"
+
+Exchange em processo, compatível com o subconjunto do ccxt usado pelo bot
+(create_order, fetch_order, cancel_order, fetch_balance, fetch_open_orders,
+fetch_closed_orders, fetch_ticker, fetch_order_book, ...):
+
+- Livro sintético por símbolo em torno do último preço: spread e uma escada
+  de depth_levels níveis de level_notional (quote) cada, afastados level_step
+  entre si. Ordens a mercado percorrem os níveis (preço médio pior quanto
+  maior a ordem) e o que passar da profundidade é cancelado (execução parcial)
+- Ordens limitadas: a parte que cruza o livro executa na hora (taker); o
+  resto fica no livro e executa nas próximas velas/trades que atingirem o
+  preço (maker), limitado a `participation` do volume de cada vela
+- Liquidez consumida só volta na próxima atualização de mercado
+- Taxas taker/maker na moeda de cotação; latência injetável por ordem
+- Preços vêm de on_candle / on_trade / update_market (os bots alimentam a
+  vela fechada de cada ciclo). Com uma exchange de dados (`market`: real,
+  gravação ou replay), a API de dados (fetch_ohlcv, load_markets, ...) é
+  repassada a ela, e um símbolo ainda sem preço usa o fetch_ticker dela
+
+Também serve de motor de execução do backtest: com level_notional=None e
+spread = 2 × slippage, reproduz a SimulatedExchange (backtest/exchange.py).
+"""
+
+import bisect
+import logging
+import math
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+
+import ccxt  # type: ignore
+
+logger = logging.getLogger('MariaHelena.Paper')
+
+EPSILON = 1e-12
+
+
+class _Book:
+    """Estado de mercado de um símbolo: último preço, liquidez consumida e ordens no livro"""
+
+    __slots__ = ('symbol', 'base', 'quote', 'price', 'timestamp', 'taken_bid', 'taken_ask', 'bids', 'asks')
+
+    def __init__(self, symbol: str):
+        self.symbol = symbol
+        self.base, self.quote = symbol.split('/')
+        self.price = 0.0
+        self.timestamp = 0
+        self.taken_bid = 0.0  # quantidade já consumida dos níveis de compra/venda
+        self.taken_ask = 0.0
+        self.bids: List[tuple] = []  # (-preço, seq, id): melhor compra primeiro
+        self.asks: List[tuple] = []  # (preço, seq, id): melhor venda primeiro
+
+
+class PaperExchange:
+    """
+    Parâmetros:
+    - symbols: Símbolo ou lista (o primeiro é o padrão de update_market/equity)
+    - balances: Saldo inicial ({'USDT': 1000}) ou um número (na moeda de cotação do primeiro símbolo)
+    - fee_rate (float): Taxa taker (padrão: 0,1%)
+    - maker_fee (float): Taxa maker (padrão: fee_rate)
+    - spread (float): Spread relativo total entre melhor compra e melhor venda (padrão: 0,1%)
+    - level_notional (float): Liquidez por nível em moeda de cotação (None = profundidade infinita)
+    - depth_levels (int): Níveis do livro sintético por lado (padrão: 10)
+    - level_step (float): Distância relativa entre níveis (padrão: 5 bps)
+    - participation (float): Fração do volume da vela disponível às ordens no livro (padrão: 10%)
+    - latency: Segundos (ou função que devolve segundos) de espera por create/cancel (padrão: 0)
+    - market: Exchange ccxt de dados de mercado (opcional)
+    """
+
+    def __init__(self, symbols: Union[str, Sequence[str]] = (), balances: Union[float, Dict[str, float]] = 0.0,
+                 fee_rate: float = 0.001, maker_fee: Optional[float] = None, spread: float = 0.001,
+                 level_notional: Optional[float] = None, depth_levels: int = 10, level_step: float = 0.0005,
+                 participation: float = 0.1, latency: Union[float, Callable[[], float]] = 0.0, market: Any = None):
+        self.id = 'paper'
+        self.market = market
+        self.fee_rate = fee_rate
+        self.maker_fee = fee_rate if maker_fee is None else maker_fee
+        self.half_spread = spread / 2
+        self.level_notional = level_notional
+        self.depth_levels = depth_levels
+        self.level_step = level_step
+        self.participation = participation
+        self.latency = latency
+
+        symbols = [symbols] if isinstance(symbols, str) else list(symbols)
+        self.books: Dict[str, _Book] = {}
+        self.balances: Dict[str, float] = {}  # total por moeda (livre + em uso)
+        self.used: Dict[str, float] = {}
+        for symbol in symbols:
+            self._book(symbol)
+        self.symbol = symbols[0] if symbols else None
+        self.base, self.quote = self.symbol.split('/') if self.symbol else (None, None)
+        if not isinstance(balances, dict):
+            balances = {self.quote: float(balances)} if self.quote else {}
+        for currency, amount in balances.items():
+            self.balances[currency] = float(amount)
+            self.used.setdefault(currency, 0.0)
+
+        self.orders: Dict[str, Dict[str, Any]] = {}
+        self.open_orders: Dict[str, Dict[str, Any]] = {}  # ordens no livro
+        self._client_ids: Dict[str, str] = {}
+        self._next_id = 1
+        self._lock = threading.RLock()
+        self.total_fees = 0.0
+        self.stats = {'orders': 0, 'fills': 0, 'partial': 0, 'canceled': 0, 'rejected': 0}
+        logger.info(f"📝 Exchange de papel: {', '.join(symbols) or 'símbolos sob demanda'} | taxa {fee_rate:.2%} | "
+                    f"spread {spread:.2%} | profundidade "
+                    f"{'infinita' if level_notional is None else f'{depth_levels} × {level_notional:,.0f}'}")
+
+    def __getattr__(self, name: str) -> Any:
+        # Dados de mercado (fetch_ohlcv, fetch_trades, ...) vêm da exchange de dados
+        market = self.__dict__.get('market')
+        if market is None:
+            raise AttributeError(name)
+        return getattr(market, name)
+
+    def _book(self, symbol: str) -> _Book:
+        book = self.books.get(symbol)
+        if book is None:
+            book = self.books[symbol] = _Book(symbol)
+            for currency in (book.base, book.quote):
+                self.balances.setdefault(currency, 0.0)
+                self.used.setdefault(currency, 0.0)
+        return book
+
+    # ------------------------------------------------------------------ #
+    #                            Dados de mercado                         #
+    # ------------------------------------------------------------------ #
+
+    def update_market(self, timestamp: int, price: float, symbol: Optional[str] = None,
+                      high: Optional[float] = None, low: Optional[float] = None,
+                      volume: Optional[float] = None) -> None:
+        """Novo preço (e faixa/volume da vela): renova a liquidez e executa as ordens atingidas no livro."""
+        book = self._book(symbol or self.symbol)
+        with self._lock:
+            book.timestamp = timestamp
+            book.price = price
+            book.taken_bid = book.taken_ask = 0.0
+            if book.bids or book.asks:
+                capacity = math.inf if volume is None else volume * self.participation
+                self._match_resting(book, price if high is None else high, price if low is None else low, capacity)
+
+    def on_candle(self, symbol: str, candle: Sequence[float]) -> None:
+        """Vela [open_time, o, h, l, c, v] (ex: replay, KlineStream on_close)."""
+        self.update_market(int(candle[0]), float(candle[4]), symbol, float(candle[2]), float(candle[3]),
+                           float(candle[5]))
+
+    def on_trade(self, symbol: str, timestamp: int, price: float, amount: float) -> None:
+        """Negócio a mercado: ordens no livro atingidas executam até `amount`."""
+        book = self._book(symbol)
+        with self._lock:
+            book.timestamp = timestamp
+            book.price = price
+            book.taken_bid = book.taken_ask = 0.0
+            if book.bids or book.asks:
+                self._match_resting(book, price, price, amount)
+
+    def equity(self, price: Optional[float] = None) -> float:
+        """Valor da carteira na moeda de cotação do símbolo padrão"""
+        price = self.books[self.symbol].price if price is None else price
+        return self.balances[self.quote] + self.balances[self.base] * price
+
+    # ------------------------------------------------------------------ #
+    #                              Execução                               #
+    # ------------------------------------------------------------------ #
+
+    def _walk(self, book: _Book, side: str, amount: float, limit: Optional[float] = None) -> tuple:
+        """Percorre os níveis do lado oposto → (quantidade executável, custo). Não altera o livro."""
+        if side == 'buy':
+            best, sign, taken = book.price * (1 + self.half_spread), 1.0, book.taken_ask
+        else:
+            best, sign, taken = book.price * (1 - self.half_spread), -1.0, book.taken_bid
+
+        if self.level_notional is None:
+            if limit is not None and sign * (best - limit) > EPSILON * best:
+                return 0.0, 0.0
+            return amount, amount * best
+
+        size = self.level_notional / book.price
+        level = int(taken / size)
+        room = size * (level + 1) - taken
+        filled = cost = 0.0
+        remaining = amount
+        while remaining > EPSILON and level < self.depth_levels:
+            price = best * (1 + sign * level * self.level_step)
+            if limit is not None and sign * (price - limit) > EPSILON * price:
+                break
+            take = remaining if remaining < room else room
+            filled += take
+            cost += take * price
+            remaining -= take
+            level += 1
+            room = size
+        return filled, cost
+
+    def _apply_fill(self, order: Dict[str, Any], book: _Book, amount: float, cost: float, fee_rate: float) -> None:
+        fee = cost * fee_rate
+        if order['side'] == 'buy':
+            self.balances[book.quote] -= cost + fee
+            self.balances[book.base] += amount
+        else:
+            self.balances[book.base] -= amount
+            self.balances[book.quote] += cost - fee
+        self.total_fees += fee
+        order['filled'] += amount
+        order['remaining'] = max(0.0, order['amount'] - order['filled'])
+        order['cost'] += cost
+        order['average'] = order['cost'] / order['filled']
+        order['fee']['cost'] += fee
+        order['lastTradeTimestamp'] = book.timestamp
+        self.stats['fills'] += 1
+
+    def _sleep(self) -> None:
+        if self.latency:
+            time.sleep(self.latency() if callable(self.latency) else self.latency)
+
+    def create_order(self, symbol: str, type: str, side: str, amount: float,
+                     price: Optional[float] = None, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        self._sleep()
+        params = params or {}
+        book = self.books.get(symbol)
+        if self.market is not None and (book is None or book.price <= 0):
+            self.fetch_ticker(symbol)  # fora do lock: é uma ida à rede
+        with self._lock:
+            book = self.books.get(symbol)
+            if book is None:
+                raise ccxt.BadSymbol(f"{self.id}: sem mercado para {symbol}")
+            if type not in ('market', 'limit'):
+                raise ccxt.NotSupported(f"{self.id}: tipo de ordem '{type}' não suportado")
+            if side not in ('buy', 'sell'):
+                raise ccxt.InvalidOrder(f"{self.id}: lado inválido '{side}'")
+            if amount <= 0 or book.price <= 0:
+                raise ccxt.InvalidOrder(f"{self.id}: quantidade ou preço de mercado inválido")
+            if type == 'limit' and (price is None or price <= 0):
+                raise ccxt.InvalidOrder(f"{self.id}: ordem limitada sem preço")
+            client_id = params.get('clientOrderId')
+            if client_id and client_id in self._client_ids:
+                raise ccxt.DuplicateOrderId(f"{self.id}: clientOrderId {client_id} já usado")
+
+            limit = price if type == 'limit' else None
+            filled, cost = self._walk(book, side, amount, limit)
+            if limit is None and filled <= 0:
+                self.stats['rejected'] += 1
+                raise ccxt.InvalidOrder(f"{self.id}: sem liquidez em {symbol} até a próxima atualização")
+            free_quote = self.balances[book.quote] - self.used[book.quote]
+            free_base = self.balances[book.base] - self.used[book.base]
+            if side == 'buy':
+                # Limitada: o que ficar no livro reserva quantidade × preço limite (+ taxa maker)
+                needed = cost * (1 + self.fee_rate)
+                if limit is not None:
+                    needed += (amount - filled) * limit * (1 + self.maker_fee)
+                if needed > free_quote + 1e-9:
+                    self.stats['rejected'] += 1
+                    raise ccxt.InsufficientFunds(f"{self.id}: saldo {free_quote:.2f} {book.quote} < {needed:.2f}")
+            elif amount > free_base * (1 + 1e-9):
+                self.stats['rejected'] += 1
+                raise ccxt.InsufficientFunds(f"{self.id}: saldo {free_base:.8f} {book.base} < {amount:.8f}")
+
+            order_id = str(self._next_id)
+            self._next_id += 1
+            order = {
+                'id': order_id, 'clientOrderId': client_id, 'timestamp': book.timestamp,
+                'lastTradeTimestamp': None, 'symbol': symbol, 'type': type, 'side': side,
+                'timeInForce': params.get('timeInForce', 'GTC' if limit is not None else 'IOC'),
+                'price': limit, 'amount': amount, 'filled': 0.0, 'remaining': amount, 'cost': 0.0,
+                'average': None, 'status': 'open', 'fee': {'cost': 0.0, 'currency': book.quote},
+            }
+            self.orders[order_id] = order
+            if client_id:
+                self._client_ids[client_id] = order_id
+            self.stats['orders'] += 1
+
+            if filled > 0:
+                if side == 'buy':
+                    book.taken_ask += filled
+                else:
+                    book.taken_bid += filled
+                self._apply_fill(order, book, filled, cost, self.fee_rate)
+
+            if order['remaining'] <= EPSILON * amount:
+                order['remaining'] = 0.0
+                order['status'] = 'closed'
+            elif limit is None or order['timeInForce'] in ('IOC', 'FOK'):
+                order['status'] = 'canceled'  # sem profundidade: o resto é cancelado
+                self.stats['partial' if filled > 0 else 'canceled'] += 1
+            else:
+                self._rest(order, book)
+                self.open_orders[order_id] = order
+            if type == 'market':
+                order['price'] = order['average']
+            return self._copy(order)
+
+    def _rest(self, order: Dict[str, Any], book: _Book) -> None:
+        """Coloca o resto da limitada no livro, reservando o saldo."""
+        if order['side'] == 'buy':
+            self.used[book.quote] += order['remaining'] * order['price'] * (1 + self.maker_fee)
+            bisect.insort(book.bids, (-order['price'], int(order['id']), order['id']))
+        else:
+            self.used[book.base] += order['remaining']
+            bisect.insort(book.asks, (order['price'], int(order['id']), order['id']))
+
+    def _unreserve(self, order: Dict[str, Any], book: _Book, amount: float) -> None:
+        if order['side'] == 'buy':
+            currency, value = book.quote, amount * order['price'] * (1 + self.maker_fee)
+        else:
+            currency, value = book.base, amount
+        self.used[currency] = max(0.0, self.used[currency] - value)
+
+    def _match_resting(self, book: _Book, high: float, low: float, capacity: float) -> None:
+        """Executa ordens do livro atingidas pela faixa [low, high], por prioridade de preço e tempo."""
+        for queue, side in ((book.bids, 'buy'), (book.asks, 'sell')):
+            available = capacity
+            done = 0
+            while done < len(queue) and available > EPSILON:
+                key, _, order_id = queue[done]
+                limit = -key if side == 'buy' else key
+                if (side == 'buy' and low > limit) or (side == 'sell' and high < limit):
+                    break
+                order = self.orders[order_id]
+                take = min(order['remaining'], available)
+                self._unreserve(order, book, take)
+                self._apply_fill(order, book, take, take * limit, self.maker_fee)
+                available -= take
+                if order['remaining'] > EPSILON * order['amount']:
+                    break
+                order['remaining'] = 0.0
+                order['status'] = 'closed'
+                del self.open_orders[order_id]
+                done += 1
+            del queue[:done]
+
+    def cancel_order(self, id: str, symbol: Optional[str] = None, params=None) -> Dict[str, Any]:
+        self._sleep()
+        with self._lock:
+            order = self.open_orders.get(id)
+            if order is None:
+                raise ccxt.OrderNotFound(f"{self.id}: ordem {id} não está aberta")
+            book = self.books[order['symbol']]
+            queue = book.bids if order['side'] == 'buy' else book.asks
+            queue[:] = [entry for entry in queue if entry[2] != id]
+            self._unreserve(order, book, order['remaining'])
+            order['status'] = 'canceled'
+            del self.open_orders[id]
+            self.stats['canceled'] += 1
+            return self._copy(order)
+
+    @staticmethod
+    def _copy(order: Dict[str, Any]) -> Dict[str, Any]:
+        copy = dict(order)
+        copy['fee'] = dict(order['fee'])
+        return copy
+
+    # ------------------------------------------------------------------ #
+    #                         Consultas (ccxt)                            #
+    # ------------------------------------------------------------------ #
+
+    def fetch_order(self, id: str, symbol: Optional[str] = None, params=None) -> Dict[str, Any]:
+        with self._lock:
+            order_id = self._client_ids.get((params or {}).get('clientOrderId'), id)
+            if order_id not in self.orders:
+                raise ccxt.OrderNotFound(f"{self.id}: ordem {id} não encontrada")
+            return self._copy(self.orders[order_id])
+
+    def fetch_orders(self, symbol: Optional[str] = None, since=None, limit=None, params=None,
+                     status: Optional[str] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            source = self.open_orders if status == 'open' else self.orders
+            orders = [self._copy(o) for o in source.values()
+                      if (symbol is None or o['symbol'] == symbol)
+                      and (since is None or o['timestamp'] >= since)
+                      and (status is None or (o['status'] == 'open') == (status == 'open'))]
+        return orders[-limit:] if limit else orders
+
+    def fetch_open_orders(self, symbol: Optional[str] = None, since=None, limit=None, params=None) -> List[dict]:
+        return self.fetch_orders(symbol, since, limit, status='open')
+
+    def fetch_closed_orders(self, symbol: Optional[str] = None, since=None, limit=None, params=None) -> List[dict]:
+        return self.fetch_orders(symbol, since, limit, status='closed')
+
+    def fetch_balance(self, params=None) -> Dict[str, Any]:
+        with self._lock:
+            total = dict(self.balances)
+            used = {currency: self.used.get(currency, 0.0) for currency in total}
+        free = {currency: total[currency] - used[currency] for currency in total}
+        balance: Dict[str, Any] = {'free': free, 'used': used, 'total': total}
+        for currency in total:
+            balance[currency] = {'free': free[currency], 'used': used[currency], 'total': total[currency]}
+        return balance
+
+    def fetch_ticker(self, symbol: str, params=None) -> Dict[str, Any]:
+        book = self.books.get(symbol)
+        if (book is None or book.price <= 0) and self.market is not None:
+            # Sem vela recebida ainda: o último preço vem da exchange de dados
+            ticker = self.market.fetch_ticker(symbol)
+            if ticker.get('last'):
+                self.update_market(ticker.get('timestamp') or self.milliseconds(), float(ticker['last']), symbol)
+            return ticker
+        if book is None or book.price <= 0:
+            raise ccxt.BadSymbol(f"{self.id}: sem preço para {symbol}")
+        return {'symbol': symbol, 'timestamp': book.timestamp, 'last': book.price, 'close': book.price,
+                'bid': book.price * (1 - self.half_spread), 'ask': book.price * (1 + self.half_spread)}
+
+    def fetch_order_book(self, symbol: str, limit: Optional[int] = None, params=None) -> Dict[str, Any]:
+        """Livro sintético (níveis restantes) + ordens limitadas próprias"""
+        book = self._book(symbol)
+        with self._lock:
+            levels = min(limit or self.depth_levels, self.depth_levels)
+            size = self.level_notional / book.price if self.level_notional and book.price else math.inf
+            sides = {}
+            for side, sign, taken in (('bids', -1, book.taken_bid), ('asks', 1, book.taken_ask)):
+                best = book.price * (1 + sign * self.half_spread)
+                rows = []
+                for level in range(levels):
+                    left = size - max(0.0, taken - level * size)
+                    if left > EPSILON:
+                        rows.append([best * (1 + sign * level * self.level_step), min(left, size)])
+                sides[side] = rows
+            for key, _, order_id in book.bids:
+                sides['bids'].append([-key, self.orders[order_id]['remaining']])
+            for key, _, order_id in book.asks:
+                sides['asks'].append([key, self.orders[order_id]['remaining']])
+        sides['bids'].sort(key=lambda row: -row[0])
+        sides['asks'].sort(key=lambda row: row[0])
+        return {'symbol': symbol, 'timestamp': book.timestamp, **sides}
+
+    def load_markets(self, reload: bool = False, params=None) -> Dict[str, Any]:
+        if self.market is not None:
+            return self.market.load_markets()
+        self.markets = {symbol: {'symbol': symbol, 'base': book.base, 'quote': book.quote, 'spot': True}
+                        for symbol, book in self.books.items()}
+        return self.markets
+
+    def fetch_status(self, params=None) -> Dict[str, Any]:
+        if self.market is not None:
+            return self.market.fetch_status()
+        return {'status': 'ok', 'updated': None}
+
+    def milliseconds(self) -> int:
+        if self.market is not None:
+            return self.market.milliseconds()
+        return int(time.time() * 1000)
+
+
+def create_paper_exchange(config: Dict[str, Any], market: Any = None,
+                          symbols: Union[str, Sequence[str]] = ()) -> PaperExchange:
+    """PaperExchange com o capital inicial e os parâmetros PAPER_* do config."""
+    symbols = [symbols] if isinstance(symbols, str) else list(symbols) or [config['SYMBOL']]
+    return PaperExchange(
+        symbols,
+        {symbols[0].split('/')[1]: float(config['INITIAL_CAPITAL'])},
+        fee_rate=config.get('PAPER_FEE_RATE', 0.001),
+        spread=config.get('PAPER_SPREAD', 0.001),
+        level_notional=config.get('PAPER_LEVEL_NOTIONAL'),
+        depth_levels=config.get('PAPER_DEPTH_LEVELS', 10),
+        latency=config.get('PAPER_LATENCY', 0.0),
+        market=market,
+    )
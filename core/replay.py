@@ -0,0 +1,347 @@
+"""
+📼 Gravação e Replay de Mercado - Maria Helena
+"Se não dá pra repetir, não dá pra medir"
+
+RecordingExchange envolve a exchange ccxt do bot e grava, em um arquivo
+append-only, cada resposta que ela devolve (fetch_ohlcv, fetch_balance,
+fetch_status, load_markets, ordens...), com horário e duração da chamada.
+
+ReplayExchange lê esse arquivo e devolve as mesmas respostas, na mesma
+ordem, sem rede: no ritmo gravado, acelerado (speed=60 → 1h em 1min) ou o
+mais rápido possível (speed=0). Plugado em MariaHelenaBot._initialize_exchange
+(MARKET_RECORD_FILE / MARKET_REPLAY_FILE no config), permite perfilar e
+medir o loop completo do bot offline, de forma reprodutível.
+
+Formato: sequência de frames [uint32 tamanho][JSON comprimido com zlib];
+o primeiro frame é o cabeçalho. Um frame incompleto no fim (bot morto no
+meio da escrita) é ignorado na leitura. Respostas de fetch_ohlcv que se
+sobrepõem à anterior (mesmos argumentos) guardam só as velas novas.
+"""
+
+import json
+import logging
+import struct
+import threading
+import time
+import zlib
+from collections import Counter, defaultdict, deque
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import ccxt  # type: ignore
+
+logger = logging.getLogger('MariaHelena.Replay')
+
+FORMAT_VERSION = 1
+FRAME_HEADER = struct.Struct('<I')
+
+# Métodos ccxt gravados/servidos (prefixo do nome)
+RECORDED_PREFIXES = ('fetch', 'create', 'cancel', 'edit', 'load_markets')
+
+
+class ReplayFinished(BaseException):
+    """
+    A fita acabou: não há mais resposta gravada para a chamada.
+
+    Herda de BaseException (como KeyboardInterrupt) para atravessar os
+    `except Exception` do loop do bot e encerrar o replay.
+    """
+
+
+class ReplayMismatch(ValueError):
+    """Chamada do replay diferente da gravada (modo strict)"""
+
+
+def _records_of(method: str) -> bool:
+    return method.startswith(RECORDED_PREFIXES)
+
+
+def _plain(value: Any) -> Any:
+    """Forma JSON de argumentos/respostas (tuplas viram listas etc.)"""
+    return json.loads(json.dumps(value, default=str))
+
+
+def write_frame(f, record: Dict[str, Any]) -> int:
+    payload = zlib.compress(json.dumps(record, separators=(',', ':'), default=str).encode('utf-8'), 6)
+    f.write(FRAME_HEADER.pack(len(payload)))
+    f.write(payload)
+    return FRAME_HEADER.size + len(payload)
+
+
+def read_frames(path: Path) -> Iterator[Dict[str, Any]]:
+    """Frames do arquivo, em ordem; para no primeiro frame truncado/corrompido."""
+    with open(path, 'rb') as f:
+        while True:
+            head = f.read(FRAME_HEADER.size)
+            if not head:
+                return
+            if len(head) < FRAME_HEADER.size:
+                logger.warning(f"📼 {path}: frame final truncado ignorado")
+                return
+            (size,) = FRAME_HEADER.unpack(head)
+            payload = f.read(size)
+            try:
+                if len(payload) < size:
+                    raise ValueError("payload incompleto")
+                yield json.loads(zlib.decompress(payload))
+            except (ValueError, zlib.error) as e:
+                logger.warning(f"📼 {path}: frame final ignorado ({e})")
+                return
+
+
+def _call_key(record: Dict[str, Any]) -> str:
+    return json.dumps([record['m'], record['a'], record['k']], separators=(',', ':'))
+
+
+def _ohlcv_delta(previous: Optional[list], current: list) -> Optional[Dict[str, Any]]:
+    """
+    current == previous[drop:drop + keep] + tail? Devolve {'drop', 'keep', 'tail'}.
+
+    A vela em formação muda entre chamadas, então só o trecho idêntico é
+    reaproveitado; o resto vai em 'tail'.
+    """
+    if not previous or not current:
+        return None
+    first = current[0][0]
+    for drop, candle in enumerate(previous):
+        if candle[0] == first:
+            keep = 0
+            limit = min(len(previous) - drop, len(current))
+            while keep < limit and previous[drop + keep] == current[keep]:
+                keep += 1
+            return {'drop': drop, 'keep': keep, 'tail': current[keep:]} if keep else None
+    return None
+
+
+def read_recording(path: Path) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """(cabeçalho, registros) de uma gravação, com as respostas OHLCV remontadas"""
+    frames = read_frames(Path(path))
+    header = next(frames, None)
+    if not header or header.get('type') != 'header':
+        raise ValueError(f"{path} não é uma gravação do Maria Helena")
+    if header.get('version') != FORMAT_VERSION:
+        raise ValueError(f"{path}: versão de gravação {header.get('version')} não suportada")
+    records, last_ohlcv = [], {}
+    for record in frames:
+        if record.get('type') == 'header':
+            last_ohlcv.clear()  # gravação continuada por outra sessão
+            continue
+        if 'o' in record:
+            delta = record.pop('o')
+            previous = last_ohlcv[_call_key(record)]
+            record['r'] = previous[delta['drop']:delta['drop'] + delta['keep']] + delta['tail']
+        if record['m'] == 'fetch_ohlcv' and isinstance(record.get('r'), list):
+            last_ohlcv[_call_key(record)] = record['r']
+        records.append(record)
+    return header, records
+
+
+class RecordingExchange:
+    """
+    Proxy de uma exchange ccxt que grava as respostas.
+
+    Tudo que não é chamada gravada (id, markets, symbols, ...) é repassado
+    direto para a exchange real. Exceções também são gravadas (tipo e
+    mensagem) e relançadas.
+
+    Parâmetros:
+    - exchange: Instância ccxt (ou compatível)
+    - path (Path): Arquivo de gravação (continua um arquivo existente)
+    - clock: Função que devolve o horário em segundos (padrão: time.time)
+    """
+
+    def __init__(self, exchange: Any, path: Path, clock=time.time):
+        self._exchange = exchange
+        self._path = Path(path)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self._path, 'ab')
+        self._last_ohlcv: Dict[str, list] = {}
+        self.records = 0
+        self.bytes_written = 0
+        # Continuação: um cabeçalho novo zera as referências de delta OHLCV na leitura
+        self._write({
+            'type': 'header', 'version': FORMAT_VERSION,
+            'exchange': getattr(exchange, 'id', None), 'created': int(clock() * 1000),
+        })
+        logger.info(f"📼 Gravando respostas da exchange em {self._path}")
+
+    def __getattr__(self, name: str) -> Any:
+        attribute = getattr(self._exchange, name)
+        if not callable(attribute) or not _records_of(name):
+            return attribute
+
+        def recorded(*args, **kwargs):
+            started = self._clock()
+            record = {'t': int(started * 1000), 'm': name, 'a': _plain(args), 'k': _plain(kwargs)}
+            try:
+                result = attribute(*args, **kwargs)
+            except Exception as e:
+                record['e'] = {'type': type(e).__name__, 'message': str(e)}
+                record['d'] = round((self._clock() - started) * 1000, 3)
+                self._write(record)
+                raise
+            record['d'] = round((self._clock() - started) * 1000, 3)
+            if name == 'fetch_ohlcv' and isinstance(result, list):
+                plain = _plain(result)
+                key = _call_key(record)
+                delta = _ohlcv_delta(self._last_ohlcv.get(key), plain)
+                self._last_ohlcv[key] = plain
+                if delta is not None:
+                    record['o'] = delta
+                else:
+                    record['r'] = plain
+            else:
+                record['r'] = result
+            self._write(record)
+            return result
+
+        return recorded
+
+    def _write(self, record: Dict[str, Any]) -> None:
+        with self._lock:
+            self.bytes_written += write_frame(self._file, record)
+            self._file.flush()
+            if record.get('type') != 'header':
+                self.records += 1
+
+    def close(self) -> None:
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+
+class ReplayExchange:
+    """
+    Exchange offline que serve as respostas de uma gravação.
+
+    Cada método gravado tem sua fila: a n-ésima chamada de fetch_ohlcv
+    recebe a n-ésima resposta gravada de fetch_ohlcv. Exceções gravadas
+    são relançadas com o mesmo tipo ccxt. Quando a fila do método acaba,
+    ReplayFinished encerra o loop.
+
+    Ritmo: speed=0 responde imediatamente; speed=N serve cada resposta
+    quando o relógio real alcança (horário gravado - início) / N. As
+    esperas do bot (wait) não dormem — o ritmo vem das respostas.
+
+    Parâmetros:
+    - path (Path): Arquivo gravado pela RecordingExchange
+    - speed (float): Fator de aceleração (0 = o mais rápido possível)
+    - strict (bool): Exige os mesmos argumentos da gravação (ReplayMismatch)
+    """
+
+    def __init__(self, path: Path, speed: float = 0.0, strict: bool = False):
+        self.path = Path(path)
+        header, records = read_recording(self.path)
+        self.id = header.get('exchange') or 'replay'
+        self.speed = float(speed or 0.0)
+        self.strict = strict
+        self.markets: Dict[str, Any] = {}
+        self.calls: Counter = Counter()
+
+        self._queues: Dict[str, deque] = defaultdict(deque)
+        for record in records:
+            self._queues[record['m']].append(record)
+        self.total = len(records)
+        self.remaining = len(records)
+        self._origin = records[0]['t'] if records else 0
+        self._now = self._origin
+        self._started: Optional[float] = None
+        logger.info(f"📼 Replay de {self.path}: {self.total} respostas ({self.id}, velocidade "
+                    f"{'máxima' if not self.speed else f'{self.speed:g}x'})")
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith('_') or not (_records_of(name) or name in self._queues):
+            raise AttributeError(f"ReplayExchange não tem '{name}'")
+
+        def served(*args, **kwargs):
+            return self._serve(name, args, kwargs)
+
+        return served
+
+    def _serve(self, method: str, args, kwargs) -> Any:
+        queue = self._queues.get(method)
+        if not queue:
+            raise ReplayFinished(f"Sem respostas gravadas de {method} (chamadas servidas: {sum(self.calls.values())})")
+        record = queue.popleft()
+        self.remaining -= 1
+        self.calls[method] += 1
+        if self.strict and [_plain(args), _plain(kwargs)] != [record['a'], record['k']]:
+            raise ReplayMismatch(
+                f"{method}{tuple(args)} {kwargs} ≠ gravado {record['a']} {record['k']}"
+            )
+        self._pace(record['t'])
+
+        error = record.get('e')
+        if error:
+            error_class = getattr(ccxt, error['type'], None)
+            if not (isinstance(error_class, type) and issubclass(error_class, ccxt.BaseError)):
+                error_class = ccxt.ExchangeError
+            raise error_class(error['message'])
+        result = record['r']
+        if method == 'load_markets' and isinstance(result, dict):
+            self.markets = result
+        return result
+
+    def _pace(self, recorded_ms: int) -> None:
+        self._now = recorded_ms
+        if not self.speed:
+            return
+        if self._started is None:
+            self._started = time.monotonic()
+        delay = self._started + (recorded_ms - self._origin) / 1000 / self.speed - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def milliseconds(self) -> int:
+        """Horário gravado da última resposta servida (relógio do replay)"""
+        return int(self._now)
+
+    def wait(self, seconds: float) -> None:
+        """Substitui o time.sleep do loop do bot durante o replay (não dorme)"""
+
+    def progress(self) -> Dict[str, Any]:
+        return {
+            'served': self.total - self.remaining,
+            'remaining': self.remaining,
+            'calls': dict(self.calls),
+            'replayed_ms': self._now - self._origin,
+        }
+
+
+def summarize(path: Path) -> Dict[str, Any]:
+    """Resumo de uma gravação: respostas por método, período, tamanho"""
+    header, records = read_recording(Path(path))
+    methods = Counter(record['m'] for record in records)
+    errors = Counter(record['m'] for record in records if 'e' in record)
+    latency = defaultdict(list)
+    for record in records:
+        latency[record['m']].append(record.get('d', 0.0))
+    return {
+        'exchange': header.get('exchange'),
+        'records': len(records),
+        'bytes': Path(path).stat().st_size,
+        'start': records[0]['t'] if records else None,
+        'end': records[-1]['t'] if records else None,
+        'methods': {
+            method: {'calls': count, 'errors': errors[method],
+                     'mean_ms': sum(latency[method]) / count if count else 0.0}
+            for method, count in methods.most_common()
+        },
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Resumo de uma gravação de mercado')
+    parser.add_argument('path', type=Path)
+    args = parser.parse_args()
+
+    info = summarize(args.path)
+    span = (info['end'] - info['start']) / 1000 if info['records'] else 0
+    print(f"📼 {args.path} ({info['exchange']}): {info['records']} respostas em {span / 3600:.2f}h, "
+          f"{info['bytes'] / 1024:.1f} KiB")
+    for method, data in info['methods'].items():
+        print(f"  {method:>20}: {data['calls']:>6} chamadas | {data['errors']} erros | {data['mean_ms']:.1f} ms")
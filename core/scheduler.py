@@ -0,0 +1,121 @@
+"""
+⏰ Agendador por Fechamento de Candle - Maria Helena
+"Não adianta chegar antes do pão sair do forno"
+
+Acorda o loop no fechamento de cada candle (mais um pequeno offset para a
+exchange consolidar a vela), em vez de dormir um CHECK_INTERVAL fixo.
+
+- As fronteiras são absolutas (múltiplos do timeframe desde a época), então
+  o tempo de processamento já sai descontado e o loop não acumula atraso
+- Vários símbolos/timeframes no mesmo agendador: wait() devolve quais
+  chaves tiveram candle fechado naquele despertar
+- Se o processamento passou de uma fronteira, a chave sai na hora e os
+  candles pulados são contados em 'missed'
+- clock/sleep injetáveis (replay offline, testes)
+"""
+
+import logging
+import math
+import time
+from typing import Any, Callable, Dict, Hashable, List, Tuple
+
+import ccxt  # type: ignore
+
+logger = logging.getLogger('MariaHelena.Scheduler')
+
+
+def timeframe_seconds(timeframe: str) -> int:
+    """'1m' → 60, '15m' → 900, '4h' → 14400, '1d' → 86400 (notação ccxt)"""
+    return int(ccxt.Exchange.parse_timeframe(timeframe))
+
+
+def closed_candles(ohlcv: List[List[float]], timeframe: str, now: float) -> List[List[float]]:
+    """Remove do fim as velas ainda em formação (open_time + timeframe > now)."""
+    period_ms = timeframe_seconds(timeframe) * 1000
+    now_ms = now * 1000
+    end = len(ohlcv)
+    while end and ohlcv[end - 1][0] + period_ms > now_ms:
+        end -= 1
+    return ohlcv if end == len(ohlcv) else ohlcv[:end]
+
+
+class CandleScheduler:
+    """
+    Parâmetros:
+    - offset (float): Segundos após o fechamento para acordar (padrão: 0)
+    - clock: Função que devolve o horário em segundos (padrão: time.time)
+    - sleep: Função de espera (padrão: time.sleep)
+    """
+
+    def __init__(self, offset: float = 0.0, clock: Callable[[], float] = time.time,
+                 sleep: Callable[[float], Any] = time.sleep):
+        self.offset = float(offset)
+        self.clock = clock
+        self.sleep = sleep
+        self._periods: Dict[Hashable, int] = {}
+        self._last: Dict[Hashable, int] = {}  # última fronteira entregue por chave
+
+        self.wakeups = 0
+        self.missed = 0
+
+    def add(self, key: Hashable, timeframe: str) -> None:
+        """Agenda `key` (ex: (símbolo, timeframe)); o próximo aviso é o próximo fechamento."""
+        period = timeframe_seconds(timeframe)
+        self._periods[key] = period
+        self._last[key] = self._boundary(self.clock(), period)
+
+    def remove(self, key: Hashable) -> None:
+        self._periods.pop(key, None)
+        self._last.pop(key, None)
+
+    def _boundary(self, now: float, period: int) -> int:
+        """Último fechamento (sem offset) já alcançado em `now`"""
+        return int(math.floor((now - self.offset) / period)) * period
+
+    def last_close(self, timeframe: str) -> int:
+        """Último fechamento de `timeframe` (s) já coberto pelo agendador agora"""
+        return self._boundary(self.clock(), timeframe_seconds(timeframe))
+
+    def next_wake(self) -> float:
+        """Horário (s) do próximo despertar: fechamento mais próximo + offset"""
+        if not self._periods:
+            raise RuntimeError("Nenhum timeframe agendado")
+        return min(self._last[key] + period for key, period in self._periods.items()) + self.offset
+
+    def seconds_until_next(self) -> float:
+        return max(0.0, self.next_wake() - self.clock())
+
+    def wait(self) -> List[Tuple[Hashable, int]]:
+        """
+        Dorme até o próximo fechamento.
+
+        Returns:
+            list: (chave, fechamento em segundos) de cada chave com candle novo
+        """
+        wake = self.next_wake()
+        delay = wake - self.clock()
+        if delay > 0:
+            self.sleep(delay)
+        now = max(self.clock(), wake)
+        self.wakeups += 1
+
+        due = []
+        for key, period in self._periods.items():
+            boundary = self._boundary(now, period)
+            last = self._last[key]
+            if boundary > last:
+                skipped = (boundary - last) // period - 1
+                if skipped:
+                    self.missed += skipped
+                    logger.warning(f"⏰ {key}: {skipped} candle(s) fechado(s) sem processamento (loop atrasado)")
+                self._last[key] = boundary
+                due.append((key, boundary))
+        return due
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            'keys': len(self._periods),
+            'next_wake': self.next_wake() if self._periods else None,
+            'wakeups': self.wakeups,
+            'missed': self.missed,
+        }
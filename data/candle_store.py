@@ -0,0 +1,123 @@
+"""
+🗃️ Cache Local de Velas - Maria Helena
+"Não se compra o mercado inteiro de novo só porque chegou um pão fresco"
+
+Guarda uma janela de velas por ativo, semeada uma única vez e depois
+estendida apenas com as velas novas (startTime = última abertura guardada).
+As velas ficam num SQLite próprio e sobrevivem a reinícios, então o
+aquecimento não dispara uma rajada de chamadas à API.
+"""
+
+import logging
+import sqlite3
+from pathlib import Path
+from typing import Dict, List, Optional
+
+logger = logging.getLogger('MariaHelena.CandleStore')
+
+CACHE_PATH = Path.home() / 'maria-helena' / 'data' / 'candle_cache.db'
+
+INTERVAL_MS = {
+    '1m': 60_000, '3m': 180_000, '5m': 300_000, '15m': 900_000, '30m': 1_800_000,
+    '1h': 3_600_000, '2h': 7_200_000, '4h': 14_400_000, '6h': 21_600_000,
+    '8h': 28_800_000, '12h': 43_200_000, '1d': 86_400_000,
+}
+
+
+class CandleStore:
+    """
+    Janela de velas [open_time, o, h, l, c, v] por ativo com persistência.
+
+    Parâmetros:
+    - path (Path): Arquivo SQLite do cache
+    - interval (str): Intervalo das velas (ex: '1m')
+    - window (int): Quantidade de velas mantidas por ativo
+    """
+
+    def __init__(self, path: Path = CACHE_PATH, interval: str = '1m', window: int = 100):
+        self.path = Path(path)
+        self.interval = interval
+        self.interval_ms = INTERVAL_MS[interval]
+        self.window = window
+        self._candles: Dict[str, List[list]] = {}
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS candles (
+                asset TEXT NOT NULL,
+                interval TEXT NOT NULL,
+                open_time INTEGER NOT NULL,
+                open REAL, high REAL, low REAL, close REAL, volume REAL,
+                PRIMARY KEY (asset, interval, open_time)
+            )
+        """)
+        self._conn.commit()
+
+    def get(self, asset: str) -> List[list]:
+        """Retorna a janela atual do ativo (carrega do disco na primeira vez)."""
+        if asset not in self._candles:
+            rows = self._conn.execute("""
+                SELECT open_time, open, high, low, close, volume FROM candles
+                WHERE asset = ? AND interval = ?
+                ORDER BY open_time DESC LIMIT ?
+            """, (asset, self.interval, self.window)).fetchall()
+            self._candles[asset] = [list(row) for row in reversed(rows)]
+            if rows:
+                logger.info(f"📂 {len(rows)} velas de {asset} carregadas do cache")
+        return self._candles[asset]
+
+    def start_time(self, asset: str, now_ms: int) -> Optional[int]:
+        """
+        startTime para a próxima busca incremental, ou None se o ativo
+        precisa ser semeado (cache vazio ou mais velho que a janela).
+        """
+        candles = self.get(asset)
+        if not candles:
+            return None
+        last_open = int(candles[-1][0])
+        if now_ms - last_open >= (self.window - 1) * self.interval_ms:
+            return None
+        return last_open
+
+    def merge(self, asset: str, klines: Optional[List[list]]) -> Optional[List[list]]:
+        """
+        Incorpora velas da API (substitui a vela em formação, acrescenta as
+        novas), corta a janela e persiste só o que mudou.
+
+        Returns:
+            list: a janela atualizada, ou None se a busca não trouxe velas
+            (falhou): nada mudou e o ativo fica de fora do ciclo
+        """
+        if not klines:
+            return None
+
+        candles = self.get(asset)
+        incoming = [
+            [int(k[0]), float(k[1]), float(k[2]), float(k[3]), float(k[4]), float(k[5])]
+            for k in klines
+        ]
+
+        first_new = incoming[0][0]
+        if candles and first_new > candles[-1][0] + self.interval_ms:
+            # Buraco entre o cache e a resposta: recomeça a janela
+            candles.clear()
+        while candles and candles[-1][0] >= first_new:
+            candles.pop()
+        candles.extend(incoming)
+        del candles[:-self.window]
+
+        self._conn.executemany("""
+            INSERT OR REPLACE INTO candles
+            (asset, interval, open_time, open, high, low, close, volume)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, [(asset, self.interval, *c) for c in incoming])
+        self._conn.execute(
+            "DELETE FROM candles WHERE asset = ? AND interval = ? AND open_time < ?",
+            (asset, self.interval, candles[0][0])
+        )
+        self._conn.commit()
+        return candles
+
+    def close(self) -> None:
+        self._conn.close()
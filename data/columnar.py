@@ -0,0 +1,234 @@
+"""
+📦 Armazenamento Colunar de Histórico - Maria Helena
+"Quem guarda cada ingrediente no seu pote acha tudo mais rápido"
+
+Exporta o market_analysis_v2 (ou as velas brutas do cache) para arquivos
+colunares por ativo — um .npy por coluna, ordenado por timestamp — e lê de
+volta com memory-map: a carga de um intervalo de tempo é um searchsorted no
+timestamp e fatias (views) dos arrays mapeados, sem cópia e sem SQL.
+
+Layout:
+    <raiz>/<ATIVO>/timestamp.npy, price.npy, ..., meta.json
+
+Formato .npy (NumPy puro) em vez de Parquet/Arrow: é mapeável em memória
+sem dependências extras e já é o formato nativo do resto do pipeline.
+"""
+
+import json
+import logging
+import shutil
+import sqlite3
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger('MariaHelena.Columnar')
+
+COLUMNAR_ROOT = Path.home() / 'maria-helena' / 'data' / 'columnar'
+
+TREND_CODES = {'BEARISH': -1, 'NEUTRAL': 0, 'BULLISH': 1, 'UNKNOWN': 0, None: 0}
+
+# (coluna, dtype) exportados por fonte
+ANALYSIS_COLUMNS = (
+    ('timestamp', np.int64), ('price', np.float64), ('volume', np.float64), ('rsi', np.float64),
+    ('bb_upper', np.float64), ('bb_lower', np.float64), ('bb_middle', np.float64),
+    ('macd', np.float64), ('macd_signal', np.float64), ('macd_histogram', np.float64),
+    ('sma', np.float64), ('obv', np.float64), ('trend', np.int8),
+)
+CANDLE_COLUMNS = (
+    ('open_time', np.int64), ('open', np.float64), ('high', np.float64),
+    ('low', np.float64), ('close', np.float64), ('volume', np.float64),
+)
+
+SOURCES = {
+    # fonte: (SQL por ativo, colunas, coluna de tempo)
+    'analysis': (
+        "SELECT {cols} FROM market_analysis_v2 WHERE asset = ? ORDER BY timestamp",
+        ANALYSIS_COLUMNS, 'timestamp'
+    ),
+    'candles': (
+        "SELECT {cols} FROM candles WHERE asset = ? AND interval = ? ORDER BY open_time",
+        CANDLE_COLUMNS, 'open_time'
+    ),
+}
+
+
+def write_columns(dest: Path, columns: Dict[str, np.ndarray], time_column: str, meta: Optional[dict] = None) -> None:
+    """Grava arrays já prontos como um diretório colunar (troca atômica)."""
+    dest = Path(dest)
+    tmp = dest.with_name(dest.name + '.tmp')
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+    for name, values in columns.items():
+        np.save(tmp / f'{name}.npy', np.ascontiguousarray(values))
+    times = columns[time_column]
+    info = {
+        'time_column': time_column,
+        'columns': {name: str(values.dtype) for name, values in columns.items()},
+        'rows': int(len(times)),
+        'start': int(times[0]) if len(times) else None,
+        'end': int(times[-1]) if len(times) else None,
+    }
+    info.update(meta or {})
+    (tmp / 'meta.json').write_text(json.dumps(info, indent=2), encoding='utf-8')
+    shutil.rmtree(dest, ignore_errors=True)
+    tmp.rename(dest)
+
+
+def _copy_rows(cursor: sqlite3.Cursor, columns, n_rows: int, dest: Path, fetch_rows: int) -> int:
+    """Copia o cursor, em blocos, para arrays .npy pré-alocados (open_memmap)."""
+    arrays = {
+        name: np.lib.format.open_memmap(dest / f'{name}.npy', mode='w+', dtype=dtype, shape=(n_rows,))
+        for name, dtype in columns
+    }
+    offset = 0
+    while offset < n_rows:
+        rows = cursor.fetchmany(min(fetch_rows, n_rows - offset))
+        if not rows:
+            break
+        end = offset + len(rows)
+        for (name, dtype), values in zip(columns, zip(*rows)):
+            if name == 'trend':
+                values = [TREND_CODES.get(v, 0) for v in values]
+            else:
+                values = np.array(values, dtype=dtype)  # NULL -> NaN
+            arrays[name][offset:end] = values
+        offset = end
+    for values in arrays.values():
+        values.flush()
+    return offset
+
+
+def export_asset(conn: sqlite3.Connection, asset: str, root: Path = COLUMNAR_ROOT,
+                 source: str = 'analysis', interval: str = '1m', fetch_rows: int = 100_000) -> int:
+    """
+    Exporta um ativo para <raiz>/<ATIVO> (velas: <raiz>/<ATIVO>_<intervalo>).
+    Os dados vão do cursor direto para os arquivos, em blocos de
+    `fetch_rows`, sem montar o histórico inteiro em memória.
+
+    Returns:
+        Número de linhas exportadas
+    """
+    sql, columns, time_column = SOURCES[source]
+    names = [name for name, _ in columns]
+    params = (asset,) if source == 'analysis' else (asset, interval)
+
+    dest = Path(root) / (asset if source == 'analysis' else f'{asset}_{interval}')
+    tmp = dest.with_name(dest.name + '.tmp')
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+
+    # COUNT e SELECT no mesmo snapshot, para o tamanho pré-alocado bater
+    own_txn = not conn.in_transaction
+    if own_txn:
+        conn.execute("BEGIN")
+    try:
+        count_sql = sql.format(cols='COUNT(*)').split(' ORDER BY')[0]
+        n_rows = conn.execute(count_sql, params).fetchone()[0]
+        offset = _copy_rows(conn.execute(sql.format(cols=', '.join(names)), params), columns, n_rows, tmp, fetch_rows)
+    finally:
+        if own_txn:
+            conn.rollback()
+
+    times = np.load(tmp / f'{time_column}.npy', mmap_mode='r')
+    meta = {
+        'asset': asset, 'source': source, 'interval': interval, 'time_column': time_column,
+        'columns': {name: np.dtype(dtype).name for name, dtype in columns},
+        'rows': int(offset),
+        'start': int(times[0]) if offset else None,
+        'end': int(times[-1]) if offset else None,
+    }
+    if source == 'analysis':
+        meta['trend_codes'] = {k: v for k, v in TREND_CODES.items() if k}
+    del times
+    (tmp / 'meta.json').write_text(json.dumps(meta, indent=2), encoding='utf-8')
+    shutil.rmtree(dest, ignore_errors=True)
+    tmp.rename(dest)
+
+    logger.info(f"📦 {asset}: {offset} linhas exportadas para {dest}")
+    return offset
+
+
+def export_all(db_path: Path, root: Path = COLUMNAR_ROOT, assets: Optional[Iterable[str]] = None,
+               source: str = 'analysis', interval: str = '1m') -> Dict[str, int]:
+    """Exporta todos os ativos (ou os informados) de um banco."""
+    conn = sqlite3.connect(str(db_path))
+    try:
+        if assets is None:
+            table = 'market_analysis_v2' if source == 'analysis' else 'candles'
+            assets = [row[0] for row in conn.execute(f"SELECT DISTINCT asset FROM {table}")]
+        return {asset: export_asset(conn, asset, root, source, interval) for asset in assets}
+    finally:
+        conn.close()
+
+
+class ColumnarStore:
+    """
+    Leitor colunar com memory-map.
+
+    load() devolve views dos arrays mapeados: nada é copiado nem lido do
+    disco até os dados serem tocados, e o cache de páginas do SO é
+    compartilhado entre processos que mapeiam o mesmo arquivo.
+    """
+
+    def __init__(self, root: Path = COLUMNAR_ROOT):
+        self.root = Path(root)
+        self._open: Dict[str, Dict[str, np.ndarray]] = {}
+        self._meta: Dict[str, dict] = {}
+
+    def assets(self):
+        return sorted(p.name for p in self.root.iterdir() if (p / 'meta.json').exists()) if self.root.exists() else []
+
+    def meta(self, asset: str) -> dict:
+        if asset not in self._meta:
+            self._meta[asset] = json.loads((self.root / asset / 'meta.json').read_text(encoding='utf-8'))
+        return self._meta[asset]
+
+    def _column(self, asset: str, name: str) -> np.ndarray:
+        columns = self._open.setdefault(asset, {})
+        if name not in columns:
+            columns[name] = np.load(self.root / asset / f'{name}.npy', mmap_mode='r')
+        return columns[name]
+
+    def load(self, asset: str, start: Optional[int] = None, end: Optional[int] = None,
+             columns: Optional[Sequence[str]] = None) -> Dict[str, np.ndarray]:
+        """
+        Colunas de `asset` com tempo em [start, end) como views sem cópia.
+
+        Args:
+            asset: Ativo (nome do diretório)
+            start/end: Limites na unidade da coluna de tempo (None = aberto)
+            columns: Subconjunto de colunas (padrão: todas)
+        """
+        meta = self.meta(asset)
+        time_column = meta['time_column']
+        times = self._column(asset, time_column)
+        lo = 0 if start is None else int(np.searchsorted(times, start, side='left'))
+        hi = len(times) if end is None else int(np.searchsorted(times, end, side='left'))
+        names = columns or list(meta['columns'])
+        return {name: self._column(asset, name)[lo:hi] for name in names}
+
+    def matrix(self, asset: str, columns: Sequence[str], start: Optional[int] = None,
+               end: Optional[int] = None) -> np.ndarray:
+        """Matriz (linhas × colunas) float64 para treino — aqui sim há uma cópia."""
+        views = self.load(asset, start, end, columns)
+        return np.column_stack([views[name] for name in columns]).astype(np.float64, copy=False)
+
+    def close(self) -> None:
+        self._open.clear()
+        self._meta.clear()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(name)s: %(message)s')
+    parser = argparse.ArgumentParser(description='Exporta histórico para arquivos colunares (.npy)')
+    parser.add_argument('--db', type=Path, default=Path.home() / 'maria-helena' / 'data' / 'maria_helena_signals.db')
+    parser.add_argument('--root', type=Path, default=COLUMNAR_ROOT)
+    parser.add_argument('--source', choices=sorted(SOURCES), default='analysis')
+    parser.add_argument('--interval', default='1m', help="Intervalo das velas (fonte 'candles')")
+    parser.add_argument('assets', nargs='*', help='Ativos (padrão: todos)')
+    args = parser.parse_args()
+    export_all(args.db, args.root, args.assets or None, args.source, args.interval)
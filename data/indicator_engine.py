@@ -0,0 +1,290 @@
+"""
+⚡ Motor de Indicadores Incremental - Maria Helena
+"Quem guarda a conta do dia não precisa somar o mês inteiro de novo"
+
+Mantém estado corrente (somas móveis, janelas circulares, variância de
+Welford) e atualiza cada indicador em O(1) quando chega um candle novo.
+Um recálculo completo só acontece no aquecimento ou quando um buraco na
+série de candles é detectado.
+"""
+
+import math
+from collections import deque
+
+
+class RollingWindow:
+    """
+    Janela deslizante de tamanho fixo com estatísticas em O(1).
+
+    - soma e média móveis
+    - variância deslizante (Welford com remoção)
+    - mínimo/máximo via deques monotônicos (opcional)
+
+    As somas são recalculadas do zero a cada `size` inserções para
+    evitar acúmulo de erro de ponto flutuante (custo amortizado O(1)).
+    """
+
+    def __init__(self, size, track_extremes=False):
+        self.size = max(0, int(size))
+        self.track_extremes = track_extremes
+        self.values = deque()
+        self.sum = 0.0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self._pushes = 0
+        self._index = 0
+        self._min = deque()  # (índice, valor) crescente
+        self._max = deque()  # (índice, valor) decrescente
+
+    def __len__(self):
+        return len(self.values)
+
+    @property
+    def full(self):
+        return len(self.values) == self.size
+
+    def push(self, value):
+        """Insere um valor, removendo o mais antigo se a janela estiver cheia."""
+        if self.size == 0:
+            return
+
+        value = float(value)
+        if len(self.values) == self.size:
+            old = self.values.popleft()
+            self.values.append(value)
+            self.sum += value - old
+            old_mean = self.mean
+            self.mean += (value - old) / self.size
+            self.m2 += (value - old) * (value - self.mean + old - old_mean)
+        else:
+            self.values.append(value)
+            self.sum += value
+            delta = value - self.mean
+            self.mean += delta / len(self.values)
+            self.m2 += delta * (value - self.mean)
+
+        if self.track_extremes:
+            idx = self._index
+            while self._min and self._min[-1][1] >= value:
+                self._min.pop()
+            self._min.append((idx, value))
+            while self._max and self._max[-1][1] <= value:
+                self._max.pop()
+            self._max.append((idx, value))
+            oldest = idx - self.size
+            if self._min[0][0] <= oldest:
+                self._min.popleft()
+            if self._max[0][0] <= oldest:
+                self._max.popleft()
+        self._index += 1
+
+        self._pushes += 1
+        if self._pushes >= self.size:
+            self._resync()
+
+    def _resync(self):
+        """Recalcula soma/média/M2 exatamente a partir dos valores guardados."""
+        self._pushes = 0
+        n = len(self.values)
+        if n == 0:
+            self.sum = self.mean = self.m2 = 0.0
+            return
+        self.sum = math.fsum(self.values)
+        self.mean = self.sum / n
+        self.m2 = math.fsum((v - self.mean) ** 2 for v in self.values)
+
+    def mean_with(self, extra):
+        """Média da janela acrescida de `extra` (o candle em formação)."""
+        return (self.sum + extra) / (len(self.values) + 1)
+
+    def std_with(self, extra, ddof=1):
+        """Desvio padrão da janela acrescida de `extra` (Welford, sem inserir)."""
+        n = len(self.values) + 1
+        if n - ddof <= 0:
+            return float('nan')
+        delta = extra - self.mean
+        mean = self.mean + delta / n
+        m2 = self.m2 + delta * (extra - mean)
+        return math.sqrt(max(m2, 0.0) / (n - ddof))
+
+    def min(self):
+        return self._min[0][1] if self._min else float('nan')
+
+    def max(self):
+        return self._max[0][1] if self._max else float('nan')
+
+
+class StreamingIndicatorEngine:
+    """
+    Motor de indicadores em streaming usado pelo Normalizer.
+
+    O último candle da lista é tratado como "em formação": o estado guarda
+    apenas os candles fechados e o candle atual é combinado na consulta.
+    Assim, a chamada a cada tick custa O(1) quando nenhum candle fechou e
+    O(k) quando k candles novos fecharam desde a última chamada.
+
+    Os resultados reproduzem a semântica do cálculo com pandas feito pelo
+    Normalizer sobre a lista inteira de candles (RSI por médias simples de
+    ganhos/perdas, MAs 20/50, Min-Max na janela de lookback, momentum de 10
+    períodos e desvio padrão amostral dos retornos).
+
+    Parâmetros:
+    - rsi_period (int): Período do RSI.
+    - lookback (int): Janela de Min-Max do preço.
+    - fast (int), slow (int): Períodos das médias móveis.
+    - momentum_period (int): Período do momentum.
+    - max_catchup (int): Máximo de candles novos aceitos antes de forçar
+      um aquecimento completo.
+    """
+
+    def __init__(self, rsi_period=14, lookback=100, fast=20, slow=50,
+                 momentum_period=10, max_catchup=50):
+        self.rsi_period = rsi_period
+        self.lookback = lookback
+        self.fast = fast
+        self.slow = slow
+        self.momentum_period = momentum_period
+        self.max_catchup = max_catchup
+
+        self.full_passes = 0
+        self.incremental_updates = 0
+        self._reset(0)
+
+    def _reset(self, window_size):
+        self._window_size = window_size
+        self._warm = False
+        self._interval = None
+        self._last_closed_ts = None
+        self._last_closed_close = None
+        self._closed_count = 0
+
+        n_closed = max(window_size - 1, 0)
+        self._gains = RollingWindow(min(self.rsi_period - 1, n_closed))
+        self._losses = RollingWindow(min(self.rsi_period - 1, n_closed))
+        self._ma_fast = RollingWindow(min(self.fast - 1, n_closed))
+        self._ma_slow = RollingWindow(min(self.slow - 1, n_closed))
+        self._range = RollingWindow(min(self.lookback, window_size) - 1, track_extremes=True)
+        self._returns = RollingWindow(max(window_size - 2, 0))
+        self._recent = deque(maxlen=max(self.momentum_period - 1, 1))
+
+    def _push_closed(self, candle):
+        close = float(candle[4])
+        prev = self._last_closed_close
+        if prev is not None:
+            delta = close - prev
+            self._gains.push(delta if delta > 0 else 0.0)
+            self._losses.push(-delta if delta < 0 else 0.0)
+            if prev != 0:
+                self._returns.push(close / prev - 1.0)
+        self._ma_fast.push(close)
+        self._ma_slow.push(close)
+        self._range.push(close)
+        self._recent.append(close)
+        self._last_closed_close = close
+        self._last_closed_ts = candle[0]
+        self._closed_count += 1
+
+    def _warm_up(self, ohlcv):
+        """Recalcula todo o estado a partir da lista (aquecimento ou gap)."""
+        self._reset(len(ohlcv))
+        if len(ohlcv) >= 2:
+            self._interval = ohlcv[-1][0] - ohlcv[-2][0]
+        for candle in ohlcv[:-1]:
+            self._push_closed(candle)
+        self._warm = True
+        self.full_passes += 1
+
+    def update(self, ohlcv):
+        """
+        Sincroniza o estado com a lista de candles e retorna os indicadores.
+
+        Args:
+            ohlcv: Lista de candles [[time, o, h, l, c, v], ...]
+
+        Returns:
+            dict: Indicadores brutos (NaN quando não há dados suficientes)
+        """
+        if not ohlcv:
+            return self._snapshot(None)
+
+        if not self._warm or len(ohlcv) != self._window_size:
+            self._warm_up(ohlcv)
+        elif not self._catch_up(ohlcv):
+            self._warm_up(ohlcv)
+        else:
+            self.incremental_updates += 1
+
+        return self._snapshot(ohlcv[-1])
+
+    def _catch_up(self, ohlcv):
+        """Empurra os candles que fecharam desde a última chamada. False = gap."""
+        n = len(ohlcv)
+        start = None
+        for k in range(2, min(n, self.max_catchup + 2) + 1):
+            if ohlcv[-k][0] == self._last_closed_ts:
+                start = n - k + 1
+                break
+        if start is None:
+            return False
+
+        for candle in ohlcv[start:-1]:
+            if candle[0] - self._last_closed_ts != self._interval:
+                return False
+            self._push_closed(candle)
+
+        if n >= 2 and ohlcv[-1][0] - ohlcv[-2][0] != self._interval:
+            return False
+        return True
+
+    def _snapshot(self, current):
+        nan = float('nan')
+        result = {
+            'rsi': 50.0,
+            'ma_fast': nan,
+            'ma_slow': nan,
+            'price_min': nan,
+            'price_max': nan,
+            'momentum': 0.0,
+            'volatility': nan,
+            'length': 0,
+        }
+        if current is None:
+            return result
+
+        close = float(current[4])
+        length = min(self._closed_count, self._window_size - 1) + 1
+        result['length'] = length
+        prev = self._last_closed_close
+
+        # RSI (médias simples de ganhos/perdas, como no Normalizer)
+        if length >= self.rsi_period + 1 and prev is not None:
+            delta = close - prev
+            avg_gain = (self._gains.sum + (delta if delta > 0 else 0.0)) / self.rsi_period
+            avg_loss = (self._losses.sum + (-delta if delta < 0 else 0.0)) / self.rsi_period
+            if avg_loss == 0:
+                avg_loss = 0.0001
+            rsi = 100 - (100 / (1 + avg_gain / avg_loss))
+            result['rsi'] = rsi if not math.isnan(rsi) else 50.0
+
+        # Médias móveis
+        if length >= self.fast:
+            result['ma_fast'] = self._ma_fast.mean_with(close)
+        if length >= self.slow:
+            result['ma_slow'] = self._ma_slow.mean_with(close)
+
+        # Faixa de preço na janela de lookback
+        if length >= 2:
+            result['price_min'] = min(self._range.min(), close)
+            result['price_max'] = max(self._range.max(), close)
+
+        # Momentum
+        if length >= self.momentum_period + 1:
+            old_price = self._recent[0]
+            if old_price != 0:
+                result['momentum'] = (close - old_price) / old_price
+
+        # Volatilidade (desvio padrão amostral dos retornos)
+        if prev is not None and prev != 0:
+            result['volatility'] = self._returns.std_with(close / prev - 1.0)
+
+        return result
@@ -0,0 +1,243 @@
+"""
+🧮 Kernels de Indicadores - Maria Helena
+"Corta a cebola uma vez só e usa em todas as panelas"
+
+Converte as velas para arrays float64 uma única vez e calcula RSI, Bandas
+de Bollinger, MACD, SMA, OBV e tendência com operações vetorizadas do
+NumPy, reaproveitando os mesmos arrays (e as EMAs) entre indicadores.
+
+Os resultados reproduzem os métodos calculate_* do Analista
+(maria_helena_analista.py), inclusive o arredondamento.
+"""
+
+import numpy as np
+
+# Limite de (1 - alpha) ** -bloco na EMA vetorizada (longe do overflow de float64).
+# O erro relativo da forma fechada não cresce com o bloco, só o risco de overflow.
+EMA_MAX_SCALE = 1e200
+EMA_MAX_BLOCK = 4096
+
+# Janelas móveis: cumsum recomeçado a cada bloco (erro de arredondamento limitado
+# ao bloco, não à série inteira)
+ROLLING_BLOCK = 1 << 16
+
+
+def klines_to_arrays(klines):
+    """
+    Converte velas [[open_time, o, h, l, c, v, ...], ...] em arrays float64.
+
+    Returns:
+        (closes, volumes, open_times)
+    """
+    if len(klines) == 0:
+        empty = np.empty(0, dtype=np.float64)
+        return empty, empty, empty
+    try:
+        # Caminho rápido: linhas de mesmo tamanho (inclusive strings da Binance)
+        data = np.array(klines, dtype=object)[:, :6].astype(np.float64)
+    except (IndexError, ValueError):
+        data = np.array([k[:6] for k in klines], dtype=np.float64)
+    return data[:, 4], data[:, 5], data[:, 0]
+
+
+def ema(values, span):
+    """
+    EMA com adjust=False (mesma definição do pandas .ewm(span, adjust=False)).
+
+    Cada bloco é resolvido em forma fechada com cumsum, partindo do último
+    valor do bloco anterior. O bloco é o maior possível sem que
+    (1 - alpha) ** -bloco passe de EMA_MAX_SCALE.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    out = np.empty_like(values)
+    if values.size == 0:
+        return out
+
+    alpha = 2.0 / (span + 1.0)
+    decay = 1.0 - alpha
+    if decay <= 0:
+        return values.copy()
+    block_size = EMA_MAX_BLOCK
+    if decay < 1:
+        block_size = max(1, min(EMA_MAX_BLOCK, int(np.log(EMA_MAX_SCALE) / -np.log(decay))))
+    block_size = min(block_size, values.size)
+    powers = decay ** np.arange(block_size + 1)
+    inv_powers = 1.0 / powers
+
+    out[0] = values[0]
+    prev = values[0]
+    start = 1
+    while start < values.size:
+        block = values[start:start + block_size]
+        n = block.size
+        # ema[k] = decay^(k+1) * prev + alpha * sum_{i<=k} decay^(k-i) * x_i
+        acc = np.cumsum(block * inv_powers[:n]) * powers[:n]
+        out[start:start + n] = powers[1:n + 1] * prev + alpha * acc
+        prev = out[start + n - 1]
+        start += n
+    return out
+
+
+def rsi(closes, period=14):
+    """RSI pelas médias simples dos últimos `period` ganhos/perdas."""
+    if len(closes) < period:
+        return 50.0
+    if len(closes) == period:
+        return float('nan')
+    deltas = np.diff(closes[-(period + 1):])
+    gain = np.clip(deltas, 0, None).mean()
+    loss = np.clip(-deltas, 0, None).mean()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        value = 100 - (100 / (1 + gain / loss))
+    return round(float(value), 2)
+
+
+def bollinger_bands(closes, period=20, num_std=2):
+    """Retorna (upper, middle, lower)."""
+    if len(closes) < period:
+        return None, None, None
+    window = closes[-period:]
+    middle = window.mean()
+    std = window.std(ddof=1)
+    return (round(float(middle + std * num_std), 2),
+            round(float(middle), 2),
+            round(float(middle - std * num_std), 2))
+
+
+def macd(closes, fast=12, slow=26, signal=9):
+    """Retorna (macd, signal, histogram)."""
+    if len(closes) < slow:
+        return None, None, None
+    macd_line = ema(closes, fast) - ema(closes, slow)
+    signal_line = ema(macd_line, signal)
+    return (round(float(macd_line[-1]), 4),
+            round(float(signal_line[-1]), 4),
+            round(float(macd_line[-1] - signal_line[-1]), 4))
+
+
+def sma(closes, period=50):
+    if len(closes) < period:
+        return None
+    return round(float(closes[-period:].mean()), 2)
+
+
+def obv_series(closes, volumes):
+    """OBV acumulado: cumsum(sign(diff(close)) * volume)."""
+    return np.concatenate(([0.0], np.cumsum(np.sign(np.diff(closes)) * volumes[1:])))
+
+
+def obv(closes, volumes):
+    if len(closes) < 2:
+        return 0.0
+    return round(float(np.dot(np.sign(np.diff(closes)), volumes[1:])), 2)
+
+
+def trend(closes, short_period=12, long_period=50):
+    if len(closes) < long_period:
+        return "NEUTRAL"
+    sma_short = closes[-short_period:].mean()
+    sma_long = closes[-long_period:].mean()
+    if sma_short > sma_long:
+        return "BULLISH"
+    elif sma_short < sma_long:
+        return "BEARISH"
+    return "NEUTRAL"
+
+
+def compute_indicators(closes, volumes):
+    """Calcula todos os indicadores do Analista a partir dos mesmos arrays."""
+    bb_upper, bb_middle, bb_lower = bollinger_bands(closes)
+    macd_value, macd_signal, macd_histogram = macd(closes)
+    return {
+        'rsi': rsi(closes),
+        'bb_upper': bb_upper, 'bb_middle': bb_middle, 'bb_lower': bb_lower,
+        'macd': macd_value, 'macd_signal': macd_signal, 'macd_histogram': macd_histogram,
+        'sma': sma(closes),
+        'obv': obv(closes, volumes),
+        'trend': trend(closes),
+    }
+
+
+# ---------------------------------------------------------------------- #
+#             Janelas móveis sobre a série inteira (backtest)            #
+# ---------------------------------------------------------------------- #
+
+def _head(values, size, min_count, reducer, out):
+    """Janelas parciais do início da série (menos de `size` valores)."""
+    for i in range(max(min_count, 1) - 1, min(size - 1, len(values))):
+        out[i] = reducer(values[:i + 1])
+    return out
+
+
+def rolling_sum(values, size, min_count=None):
+    """
+    out[i] = soma de values[i-size+1:i+1]; janelas parciais a partir de
+    `min_count` valores (padrão: só janelas completas). NaN fora disso.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n = values.size
+    out = np.full(n, np.nan)
+    if size <= 0:
+        return out
+    for start in range(size - 1, n, ROLLING_BLOCK):
+        stop = min(start + ROLLING_BLOCK, n)
+        csum = np.concatenate(([0.0], np.cumsum(values[start - size + 1:stop])))
+        out[start:stop] = csum[size:] - csum[:-size]
+    return _head(values, size, min_count or size, np.sum, out)
+
+
+def rolling_mean_var(values, size, ddof=0, min_count=None):
+    """
+    Média e variância móveis (janela `size`). Cada bloco é deslocado pela
+    própria média antes das somas de quadrados, evitando cancelamento.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n = values.size
+    mean = np.full(n, np.nan)
+    var = np.full(n, np.nan)
+    if size <= 0:
+        return mean, var
+    for start in range(size - 1, n, ROLLING_BLOCK):
+        stop = min(start + ROLLING_BLOCK, n)
+        segment = values[start - size + 1:stop]
+        shift = segment.mean()
+        centered = segment - shift
+        s1 = np.concatenate(([0.0], np.cumsum(centered)))
+        s2 = np.concatenate(([0.0], np.cumsum(centered * centered)))
+        w1 = s1[size:] - s1[:-size]
+        w2 = s2[size:] - s2[:-size]
+        mean[start:stop] = shift + w1 / size
+        var[start:stop] = np.maximum(w2 - w1 * w1 / size, 0.0) / (size - ddof) if size > ddof else np.nan
+    count = min_count or size
+    _head(values, size, count, np.mean, mean)
+    _head(values, size, count, lambda w: w.var(ddof=ddof) if w.size > ddof else np.nan, var)
+    return mean, var
+
+
+def rolling_min(values, size, min_count=None):
+    return _rolling_extreme(values, size, min_count, np.minimum, np.min)
+
+
+def rolling_max(values, size, min_count=None):
+    return _rolling_extreme(values, size, min_count, np.maximum, np.max)
+
+
+def _rolling_extreme(values, size, min_count, ufunc, reducer):
+    """
+    Mínimo/máximo móvel por dobramento: log2(size) passadas de
+    np.minimum/np.maximum e uma combinação de duas janelas sobrepostas
+    de tamanho potência de 2.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n = values.size
+    out = np.full(n, np.nan)
+    if size <= 0:
+        return out
+    if n >= size:
+        level, span = values, 1
+        while span * 2 <= size:
+            level = ufunc(level[:-span], level[span:])  # extremo de values[i:i + 2*span]
+            span *= 2
+        starts = n - size + 1
+        out[size - 1:] = ufunc(level[:starts], level[size - span:size - span + starts])
+    return _head(values, size, min_count or size, reducer, out)
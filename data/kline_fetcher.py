@@ -0,0 +1,188 @@
+"""
+🌐 Coletor Assíncrono de Klines - Maria Helena
+"Quem pede tudo de uma vez não fica esperando na fila"
+
+Busca velas de vários ativos em paralelo com aiohttp, usando um pool de
+conexões compartilhado e um token bucket que respeita o peso de requisição
+informado pela Binance (header X-MBX-USED-WEIGHT-1M).
+
+HTTP 429/418 pausa o limitador pelo Retry-After e tenta de novo; 5xx e
+erros de rede tentam de novo com backoff exponencial (até max_retries).
+"""
+
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional
+
+import aiohttp
+
+logger = logging.getLogger('MariaHelena.KlineFetcher')
+
+# Peso da rota /klines por faixa de `limit` (documentação da Binance):
+# 1 abaixo de 100, 2 até 499, 5 até 1000, 10 acima
+KLINES_WEIGHTS = ((99, 1), (499, 2), (1000, 5))
+
+
+def klines_weight(limit: int) -> int:
+    """Retorna o peso de uma chamada /klines para o `limit` informado."""
+    for max_limit, weight in KLINES_WEIGHTS:
+        if limit <= max_limit:
+            return weight
+    return 10
+
+
+class WeightRateLimiter:
+    """
+    Token bucket de peso de requisição.
+
+    - capacity: peso máximo por janela (Binance spot: 6000/min)
+    - O bucket recarrega continuamente (capacity / window por segundo)
+    - sync_used_weight() alinha o bucket com o peso que a exchange diz
+      que já foi usado, cobrindo outros processos na mesma API key/IP
+    - pause() bloqueia todos os pedidos (HTTP 429/418 com Retry-After)
+    """
+
+    def __init__(self, capacity: int = 6000, window: float = 60.0):
+        self.capacity = float(capacity)
+        self.refill_rate = self.capacity / window
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.refill_rate)
+        self._updated = now
+
+    async def acquire(self, weight: int = 1) -> None:
+        """Aguarda até haver `weight` tokens disponíveis e os consome."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._refill()
+                if self.tokens >= weight:
+                    self.tokens -= weight
+                    return
+                await asyncio.sleep((weight - self.tokens) / self.refill_rate)
+
+    def sync_used_weight(self, used_weight: int) -> None:
+        """Ajusta o bucket ao peso usado reportado pela exchange."""
+        self._refill()
+        self.tokens = min(self.tokens, max(0.0, self.capacity - used_weight))
+
+    def pause(self, seconds: float) -> None:
+        """Suspende todos os pedidos por `seconds` segundos."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self.tokens = 0.0
+
+
+class AsyncKlineFetcher:
+    """
+    Coletor de klines com sessão aiohttp compartilhada.
+
+    Uso:
+        async with AsyncKlineFetcher() as fetcher:
+            klines = await fetcher.fetch_many(['BTCUSDT', 'ETHUSDT'])
+
+    Parâmetros:
+    - base_url (str): URL base da API (permite apontar para um servidor local em testes)
+    - max_connections (int): Tamanho do pool de conexões
+    - timeout (float): Timeout total por requisição, em segundos
+    - limiter (WeightRateLimiter): Limitador compartilhado (opcional)
+    - max_retries (int): Novas tentativas após 429/418, 5xx ou erro de rede (padrão: 3)
+    - retry_delay (float): Espera base do backoff exponencial de 5xx/rede, em segundos
+    """
+
+    def __init__(self, base_url: str = "https://api.binance.com/api/v3",
+                 max_connections: int = 20, timeout: float = 10.0,
+                 limiter: Optional[WeightRateLimiter] = None, max_retries: int = 3,
+                 retry_delay: float = 0.5):
+        self.base_url = base_url.rstrip('/')
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.limiter = limiter or WeightRateLimiter()
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def __aenter__(self) -> "AsyncKlineFetcher":
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    async def open(self) -> None:
+        """Cria a sessão e o pool de conexões (idempotente)."""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_connections, ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def fetch_klines(self, symbol: str, interval: str = '1m', limit: int = 100,
+                           start_time: Optional[int] = None) -> List[list]:
+        """Busca velas de um ativo. Retorna [] em caso de erro."""
+        await self.open()
+        params = {'symbol': symbol, 'interval': interval, 'limit': limit}
+        if start_time is not None:
+            params['startTime'] = int(start_time)
+
+        for attempt in range(self.max_retries + 1):
+            # Depois de um 429 o limitador está pausado: acquire espera o Retry-After
+            await self.limiter.acquire(klines_weight(limit))
+            try:
+                async with self._session.get(f"{self.base_url}/klines", params=params) as response:
+                    used = response.headers.get('X-MBX-USED-WEIGHT-1M')
+                    if used is not None and used.isdigit():
+                        self.limiter.sync_used_weight(int(used))
+
+                    if response.status in (418, 429):
+                        retry_after = float(response.headers.get('Retry-After', 60))
+                        self.limiter.pause(retry_after)
+                        logger.warning(f"⏳ Rate limit da Binance ({response.status}) em {symbol}. "
+                                       f"Pausando {retry_after:.0f}s.")
+                        continue
+                    if response.status >= 500:
+                        logger.warning(f"⚠️ Binance respondeu {response.status} para {symbol} "
+                                       f"(tentativa {attempt + 1}/{self.max_retries + 1})")
+                    elif response.status >= 400:
+                        logger.error(f"❌ Erro ao buscar klines para {symbol}: HTTP {response.status}")
+                        return []
+                    else:
+                        return await response.json()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.warning(f"⚠️ Falha de rede em {symbol} (tentativa {attempt + 1}/{self.max_retries + 1}): {e}")
+            except Exception as e:
+                logger.error(f"❌ Erro ao buscar klines para {symbol}: {e}")
+                return []
+            if attempt < self.max_retries:
+                await asyncio.sleep(self.retry_delay * 2 ** attempt)
+        logger.error(f"❌ Klines de {symbol} indisponíveis após {self.max_retries + 1} tentativas")
+        return []
+
+    async def fetch_many(self, symbols: List[str], interval: str = '1m', limit: int = 100,
+                         start_times: Optional[Dict[str, int]] = None) -> Dict[str, List[list]]:
+        """
+        Busca velas de todos os ativos em paralelo.
+
+        A latência do ciclo fica limitada pela requisição mais lenta, e não
+        pela soma de todas.
+        """
+        start_times = start_times or {}
+        results = await asyncio.gather(*(
+            self.fetch_klines(symbol, interval, limit, start_times.get(symbol))
+            for symbol in symbols
+        ))
+        return dict(zip(symbols, results))
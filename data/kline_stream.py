@@ -0,0 +1,394 @@
+"""
+📡 Stream de Klines via WebSocket - Maria Helena
+"Quem fica perguntando toda hora se já chegou, chega sempre atrasado"
+
+Mantém em memória um buffer de velas por (símbolo, timeframe) alimentado
+pelo stream combinado de klines da Binance, em vez de fetch_ohlcv a cada
+ciclo:
+
+- Cada mensagem atualiza a vela em formação (preço corrente, serve de
+  ticker); a mensagem final (k.x = true) fecha a vela e dispara on_close
+  em milissegundos após o fechamento
+- Gap: vela fechada que não é a seguinte da última conhecida → backfill
+  via REST (AsyncKlineFetcher) antes de aceitar a vela
+- Reconexão com backoff exponencial e jitter; ao reconectar, backfill de
+  tudo que fechou durante a queda
+- Stream sem mensagens por stale_after segundos → reconecta (conexão zumbi)
+- Negócios (aggTrade) dos trade_symbols na mesma conexão → on_trade, em
+  tempo real (a kline em formação só é empurrada a cada ~2s): alimenta o
+  monitor de stop/alvo (core/exit_monitor.py)
+
+O peso REST fica no backfill inicial e nos gaps. StreamingSource é a ponte
+síncrona para o Estrategista (thread com event loop próprio).
+
+URLs configuráveis: os testes apontam para um servidor WebSocket local
+(ver scripts/bench_stream.py).
+"""
+
+import asyncio
+import json
+import logging
+import queue
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import aiohttp
+
+from data.kline_fetcher import AsyncKlineFetcher
+
+logger = logging.getLogger('MariaHelena.KlineStream')
+
+STREAM_URL = "wss://stream.binance.com:9443/stream"
+REST_URL = "https://api.binance.com/api/v3"
+
+TIMEFRAME_MS = {
+    '1m': 60_000, '3m': 180_000, '5m': 300_000, '15m': 900_000, '30m': 1_800_000,
+    '1h': 3_600_000, '2h': 7_200_000, '4h': 14_400_000, '6h': 21_600_000,
+    '8h': 28_800_000, '12h': 43_200_000, '1d': 86_400_000,
+}
+
+Key = Tuple[str, str]  # (símbolo ccxt, timeframe)
+
+
+def market_id(symbol: str) -> str:
+    """'BTC/USDT' → 'BTCUSDT'"""
+    return symbol.replace('/', '').upper()
+
+
+def stream_name(symbol: str, timeframe: str) -> str:
+    """'BTC/USDT', '15m' → 'btcusdt@kline_15m'"""
+    return f"{market_id(symbol).lower()}@kline_{timeframe}"
+
+
+def parse_kline(k: Dict[str, Any]) -> Tuple[List[float], bool]:
+    """Payload 'k' do evento de kline → ([open_time, o, h, l, c, v], fechada)"""
+    return [float(k['t']), float(k['o']), float(k['h']), float(k['l']), float(k['c']), float(k['v'])], bool(k['x'])
+
+
+def trade_stream_name(symbol: str) -> str:
+    """'BTC/USDT' → 'btcusdt@aggTrade'"""
+    return f"{market_id(symbol).lower()}@aggTrade"
+
+
+def parse_rest_kline(row: Sequence[Any]) -> List[float]:
+    """Linha do /api/v3/klines → [open_time, o, h, l, c, v]"""
+    return [float(row[0]), float(row[1]), float(row[2]), float(row[3]), float(row[4]), float(row[5])]
+
+
+class CandleBuffer:
+    """
+    Velas fechadas (deque limitado) + a vela em formação de um par/timeframe.
+
+    Leituras de outras threads (snapshot) são protegidas por lock.
+    """
+
+    def __init__(self, period_ms: int, maxlen: int = 500):
+        self.period_ms = period_ms
+        self.closed: deque = deque(maxlen=maxlen)
+        self.forming: Optional[List[float]] = None
+        self._lock = threading.Lock()
+
+    @property
+    def last_closed_time(self) -> Optional[float]:
+        return self.closed[-1][0] if self.closed else None
+
+    def apply(self, candle: List[float], is_closed: bool) -> str:
+        """
+        Aplica uma atualização do stream.
+
+        Returns:
+            str: 'update' (vela em formação), 'closed' (vela nova fechada),
+                 'gap' (faltam velas antes desta; nada aplicado) ou 'stale'
+        """
+        last = self.last_closed_time
+        if last is not None and candle[0] <= last:
+            return 'stale'
+        if not is_closed:
+            self.forming = candle
+            return 'update'
+        if last is not None and candle[0] > last + self.period_ms:
+            return 'gap'
+        with self._lock:
+            self.closed.append(candle)
+            if self.forming is not None and self.forming[0] <= candle[0]:
+                self.forming = None
+        return 'closed'
+
+    def merge(self, candles: Sequence[List[float]], now_ms: float) -> int:
+        """Acrescenta velas do REST já fechadas e mais novas que a última. Retorna quantas."""
+        added = 0
+        with self._lock:
+            for candle in candles:
+                last = self.closed[-1][0] if self.closed else None
+                if candle[0] + self.period_ms > now_ms:
+                    if self.forming is None or candle[0] >= self.forming[0]:
+                        self.forming = candle
+                    continue
+                if last is None or candle[0] > last:
+                    self.closed.append(candle)
+                    added += 1
+        return added
+
+    def snapshot(self, include_forming: bool = False) -> List[List[float]]:
+        with self._lock:
+            candles = [list(c) for c in self.closed]
+            if include_forming and self.forming is not None:
+                candles.append(list(self.forming))
+        return candles
+
+
+class KlineStream:
+    """
+    Cliente assíncrono do stream combinado de klines.
+
+    Parâmetros:
+    - pairs: [(símbolo, timeframe), ...] (ex: [('BTC/USDT', '15m')])
+    - on_close: callback(símbolo, timeframe, vela) a cada vela fechada
+    - on_update: callback(símbolo, timeframe, vela) a cada atualização da vela em formação
+    - on_trade: callback(símbolo, preço, quantidade, timestamp_ms) a cada negócio dos trade_symbols
+    - trade_symbols: Símbolos com stream de negócios (aggTrade) na mesma conexão
+    - url / rest_url: Endpoints (servidor local nos testes)
+    - buffer_size (int): Velas fechadas mantidas por par
+    - stale_after (float): Segundos sem mensagem até reconectar
+    - max_backoff (float): Teto da espera entre reconexões
+    - fetcher (AsyncKlineFetcher): Cliente REST do backfill (padrão: um novo em rest_url)
+    """
+
+    def __init__(self, pairs: Sequence[Key], on_close: Optional[Callable] = None,
+                 on_update: Optional[Callable] = None, url: str = STREAM_URL, rest_url: str = REST_URL,
+                 buffer_size: int = 500, stale_after: float = 30.0, max_backoff: float = 60.0,
+                 fetcher: Optional[AsyncKlineFetcher] = None, on_trade: Optional[Callable] = None,
+                 trade_symbols: Sequence[str] = ()):
+        self.pairs = [tuple(pair) for pair in pairs]
+        self.on_close = on_close
+        self.on_update = on_update
+        self.on_trade = on_trade
+        self.url = url
+        self.buffer_size = buffer_size
+        self.stale_after = stale_after
+        self.max_backoff = max_backoff
+        self.fetcher = fetcher or AsyncKlineFetcher(base_url=rest_url)
+        self.buffers: Dict[Key, CandleBuffer] = {
+            pair: CandleBuffer(TIMEFRAME_MS[pair[1]], buffer_size) for pair in self.pairs
+        }
+        self._by_stream = {stream_name(*pair): pair for pair in self.pairs}
+        self._trade_symbols = {market_id(symbol): symbol for symbol in trade_symbols}
+        self._task: Optional[asyncio.Task] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._running = False
+        self.connected = asyncio.Event()
+
+        self.stats = {
+            'messages': 0, 'trades': 0, 'closes': 0, 'gaps': 0, 'backfilled': 0, 'rest_calls': 0,
+            'reconnects': 0, 'last_latency_ms': None,
+        }
+
+    async def start(self) -> None:
+        """Carrega o histórico via REST e abre o stream em segundo plano."""
+        self._running = True
+        await asyncio.gather(*(self._backfill(pair, initial=True) for pair in self.pairs))
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        self._running = False
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        if self._session is not None:
+            await self._session.close()
+        await self.fetcher.close()
+
+    def candles(self, symbol: str, timeframe: str, include_forming: bool = False) -> List[List[float]]:
+        return self.buffers[(symbol, timeframe)].snapshot(include_forming)
+
+    def last_price(self, symbol: str, timeframe: str) -> Optional[float]:
+        """Último preço visto (vela em formação ou última fechada)"""
+        buffer = self.buffers[(symbol, timeframe)]
+        candle = buffer.forming or (buffer.closed[-1] if buffer.closed else None)
+        return candle[4] if candle else None
+
+    # ------------------------------------------------------------------ #
+    #                              Conexão                                #
+    # ------------------------------------------------------------------ #
+
+    async def _run(self) -> None:
+        backoff = 1.0
+        streams = [*self._by_stream, *(trade_stream_name(symbol) for symbol in self._trade_symbols.values())]
+        url = f"{self.url}?streams={'/'.join(streams)}"
+        self._session = aiohttp.ClientSession()
+        first = True
+        while self._running:
+            try:
+                async with self._session.ws_connect(url, heartbeat=self.stale_after / 2) as ws:
+                    self.connected.set()
+                    logger.info(f"📡 Stream conectado ({len(self.pairs)} pares, "
+                                f"{len(self._trade_symbols)} símbolos com negócios)")
+                    if not first:
+                        # Tudo que fechou durante a queda
+                        await asyncio.gather(*(self._backfill(pair) for pair in self.pairs))
+                    first = False
+                    while self._running:
+                        msg = await ws.receive(timeout=self.stale_after)
+                        if msg.type != aiohttp.WSMsgType.TEXT:
+                            logger.warning(f"📡 Stream encerrado pelo servidor ({msg.type.name})")
+                            break
+                        backoff = 1.0
+                        await self._handle(json.loads(msg.data))
+            except asyncio.CancelledError:
+                raise
+            except asyncio.TimeoutError:
+                logger.warning(f"📡 Stream sem mensagens há {self.stale_after:.0f}s, reconectando")
+            except Exception as e:
+                logger.warning(f"📡 Erro no stream: {e}")
+            self.connected.clear()
+            if not self._running:
+                break
+            self.stats['reconnects'] += 1
+            delay = backoff * (0.5 + random.random() / 2)
+            logger.info(f"📡 Reconectando em {delay:.1f}s")
+            await asyncio.sleep(delay)
+            backoff = min(backoff * 2, self.max_backoff)
+
+    async def _handle(self, message: Dict[str, Any]) -> None:
+        data = message.get('data', message)
+        if data.get('e') == 'aggTrade':
+            symbol = self._trade_symbols.get(data['s'])
+            if symbol is not None:
+                self.stats['trades'] += 1
+                if self.on_trade:
+                    self.on_trade(symbol, float(data['p']), float(data['q']), data['T'])
+            return
+        if data.get('e') != 'kline':
+            return
+        pair = self._by_stream.get(message.get('stream')) or self._by_stream.get(
+            stream_name(data['s'], data['k']['i']))
+        if pair is None:
+            return
+        self.stats['messages'] += 1
+        candle, is_closed = parse_kline(data['k'])
+        buffer = self.buffers[pair]
+
+        result = buffer.apply(candle, is_closed)
+        if result == 'gap':
+            self.stats['gaps'] += 1
+            logger.warning(f"📡 Gap em {pair}: última {buffer.last_closed_time:.0f}, recebida {candle[0]:.0f}")
+            await self._backfill(pair, emit=False)
+            result = buffer.apply(candle, is_closed)
+            if result == 'stale':  # o backfill já trouxe esta vela
+                result = 'closed'
+        if result == 'update':
+            if self.on_update:
+                self.on_update(pair[0], pair[1], candle)
+        elif result == 'closed':
+            self.stats['closes'] += 1
+            if 'E' in data:
+                self.stats['last_latency_ms'] = time.time() * 1000 - data['E']
+            self._emit(pair)
+
+    def _emit(self, pair: Key) -> None:
+        if self.on_close:
+            buffer = self.buffers[pair]
+            self.on_close(pair[0], pair[1], list(buffer.closed[-1]))
+
+    async def _backfill(self, pair: Key, initial: bool = False, emit: bool = True) -> int:
+        """Completa o buffer via REST a partir da última vela fechada."""
+        buffer = self.buffers[pair]
+        added = 0
+        while True:
+            last = buffer.last_closed_time
+            start = None if last is None else int(last + buffer.period_ms)
+            limit = min(self.buffer_size + 1, 1000) if start is None else 1000
+            self.stats['rest_calls'] += 1
+            rows = await self.fetcher.fetch_klines(market_id(pair[0]), pair[1], limit, start)
+            count = buffer.merge([parse_rest_kline(row) for row in rows], time.time() * 1000)
+            added += count
+            if count == 0 or len(rows) < limit or start is None:
+                break
+        if added and not initial:
+            self.stats['backfilled'] += added
+            logger.info(f"📡 Backfill de {pair}: {added} vela(s)")
+            if emit:
+                self._emit(pair)  # uma avaliação com o estado mais recente
+        return added
+
+
+class StreamingSource:
+    """
+    Ponte síncrona do KlineStream (uso no loop do Estrategista).
+
+    O stream roda numa thread própria com event loop; fechamentos de vela
+    chegam por uma fila thread-safe (wait_close).
+
+    Parâmetros: os mesmos do KlineStream (exceto callbacks)
+    """
+
+    def __init__(self, pairs: Sequence[Key], **stream_kwargs):
+        self.pairs = [tuple(pair) for pair in pairs]
+        self.closes: queue.Queue = queue.Queue()
+        self._stream_kwargs = stream_kwargs
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self.stream: Optional[KlineStream] = None
+
+    def start(self, timeout: float = 30.0) -> None:
+        """Inicia a thread e aguarda o backfill inicial."""
+        ready = threading.Event()
+        errors: List[BaseException] = []
+
+        def runner():
+            self._loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self._loop)
+            self.stream = KlineStream(self.pairs, on_close=self._on_close, **self._stream_kwargs)
+            try:
+                self._loop.run_until_complete(self.stream.start())
+            except Exception as e:
+                errors.append(e)
+                ready.set()
+                return
+            ready.set()
+            self._loop.run_forever()
+            self._loop.run_until_complete(self.stream.stop())
+            self._loop.close()
+
+        self._thread = threading.Thread(target=runner, name='kline-stream', daemon=True)
+        self._thread.start()
+        if not ready.wait(timeout):
+            raise TimeoutError(f"Stream não ficou pronto em {timeout:.0f}s")
+        if errors:
+            raise errors[0]
+        empty = [pair for pair in self.pairs if not self.stream.buffers[pair].closed]
+        if empty:
+            self.stop()
+            raise RuntimeError(f"Backfill inicial vazio para {empty}")
+
+    def _on_close(self, symbol: str, timeframe: str, candle: List[float]) -> None:
+        self.closes.put((symbol, timeframe, candle))
+
+    def wait_close(self, timeout: Optional[float] = None) -> Optional[Tuple[str, str, List[float]]]:
+        """Bloqueia até a próxima vela fechada (ou timeout → None)."""
+        try:
+            return self.closes.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def candles(self, symbol: str, timeframe: str, include_forming: bool = False) -> List[List[float]]:
+        return self.stream.candles(symbol, timeframe, include_forming)
+
+    def last_price(self, symbol: str, timeframe: str) -> Optional[float]:
+        return self.stream.last_price(symbol, timeframe)
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        return dict(self.stream.stats) if self.stream else {}
+
+    def stop(self) -> None:
+        if self._loop is not None and self._loop.is_running():
+            self._loop.call_soon_threadsafe(self._loop.stop)
+        if self._thread is not None:
+            self._thread.join(timeout=10)
@@ -5,8 +5,13 @@
 Transforma dados brutos em valores 0-1 para análise consistente
 """
 
+import math
+
 import pandas as pd
 import numpy as np
+
+from data.indicator_engine import RollingWindow, StreamingIndicatorEngine
+from data.indicators import rolling_max, rolling_mean_var, rolling_min, rolling_sum
 # Importa Console de forma segura, com fallback se rich não estiver instalado
 try:
     from rich.console import Console
@@ -39,10 +44,12 @@ class Normalizer:
 
     Métodos principais:
     - process(ohlcv, ticker): Processa dados brutos e retorna um dicionário com features normalizadas e brutas.
-    - _calculate_rsi(prices, period): Calcula o RSI dos preços.
+      Os indicadores vêm do StreamingIndicatorEngine (data/indicator_engine.py), que atualiza
+      o estado em O(1) por candle e só recalcula tudo no aquecimento ou ao detectar um gap.
+    - process_batch(ohlcv): Normaliza N símbolos (array símbolos × candles × 6) em uma passada vetorizada.
+    - process_series(ohlcv): Features de todos os candles de um símbolo, em arrays (backtest vetorizado).
     - _normalize_volume(current_volume): Normaliza o volume usando Z-score.
     - _normalize_price(current_price, price_series): Normaliza o preço usando Min-Max.
-    - _calculate_momentum(prices, period): Calcula o momentum dos preços.
     - _normalize_momentum(momentum): Normaliza o momentum para faixa 0-1.
     - _normalize_volatility(volatility): Normaliza a volatilidade dos retornos.
     - _identify_trend(prices, short, long): Identifica tendência geral do ativo.
@@ -67,7 +74,14 @@ class Normalizer:
         
         # Histórico para normalização adaptativa
         self.price_history = []
-        self.volume_history = []
+        self.volume_window = RollingWindow(self.lookback)
+        self.volume_history = self.volume_window.values
+        
+        # Motor incremental de indicadores (estado por instância/símbolo)
+        self.engine = StreamingIndicatorEngine(
+            rsi_period=self.rsi_period,
+            lookback=self.lookback
+        )
         
         console.print("[cyan]📊 Normalizer inicializado[/cyan]")
     
@@ -83,13 +97,9 @@ class Normalizer:
             dict: Dados normalizados prontos para estratégia
         """
         
-        # Converte para DataFrame
-        df = pd.DataFrame(ohlcv, columns=[
-            'timestamp', 'open', 'high', 'low', 'close', 'volume'
-        ])
-        
-        # Calcula indicadores técnicos
-        rsi = self._calculate_rsi(df['close'], self.rsi_period)
+        # Indicadores incrementais (O(1) por tick; recálculo só no aquecimento/gap)
+        ind = self.engine.update(ohlcv)
+        rsi = ind['rsi']
         
         # Normaliza RSI (0-100 → 0-1)
         rsi_norm = rsi / 100.0
@@ -98,26 +108,26 @@ class Normalizer:
         volume_norm = self._normalize_volume(ticker.get('quoteVolume', 0))
         
         # Normaliza Preço (Min-Max na janela)
-        price_norm = self._normalize_price(
-            ticker['last'], 
-            df['close'].tail(self.lookback)
+        price_norm = self._normalize_price_range(
+            ticker['last'],
+            ind['price_min'],
+            ind['price_max']
         )
         
-        # Calcula momentum (taxa de mudança)
-        momentum = self._calculate_momentum(df['close'])
+        # Momentum (taxa de mudança)
+        momentum = ind['momentum']
         momentum_norm = self._normalize_momentum(momentum)
         
         # Médias móveis
-        ma_fast = df['close'].rolling(window=20).mean().iloc[-1]
-        ma_slow = df['close'].rolling(window=50).mean().iloc[-1]
+        ma_fast = ind['ma_fast']
+        ma_slow = ind['ma_slow']
         
         # Normaliza MAs em relação ao preço atual
         ma_fast_norm = ma_fast / ticker['last'] if ticker['last'] > 0 else 1.0
         ma_slow_norm = ma_slow / ticker['last'] if ticker['last'] > 0 else 1.0
         
         # Volatilidade (desvio padrão dos retornos)
-        returns = df['close'].pct_change().dropna()
-        volatility = returns.std()
+        volatility = ind['volatility']
         volatility_norm = self._normalize_volatility(volatility)
         
         # Monta resultado
@@ -141,40 +151,211 @@ class Normalizer:
             
             # Features extras
             'ma_cross': 1 if ma_fast > ma_slow else 0,  # Golden cross
-            'trend': self._identify_trend(df['close'])
+            'trend': self._trend_from_mas(ma_fast, ma_slow, ind['length'])
         }
         
         return result
     
-    def _calculate_rsi(self, prices, period=14):
-        """
-        Calcula RSI (Relative Strength Index)
-        
-        RSI = 100 - (100 / (1 + RS))
-        RS = média dos ganhos / média das perdas
+    def process_batch(self, ohlcv):
         """
-        if len(prices) < period + 1:
-            return 50.0  # Neutro se não tem dados suficientes
+        Normaliza N símbolos de uma vez, em uma única passada vetorizada
         
-        # Calcula mudanças
-        deltas = prices.diff()
-        
-        # Separa ganhos e perdas
-        gains = deltas.where(deltas > 0, 0)
-        losses = -deltas.where(deltas < 0, 0)
+        Args:
+            ohlcv: np.ndarray (símbolos × candles × 6) com colunas
+                   [time, o, h, l, c, v]; todos os símbolos com o mesmo
+                   número de candles
         
-        # Médias móveis exponenciais
-        avg_gains = gains.rolling(window=period).mean()
-        avg_losses = losses.rolling(window=period).mean()
+        Returns:
+            dict: Arrays colunares de tamanho N ('rsi_norm', 'volume_norm',
+                  'price_norm', 'momentum_norm', 'volatility_norm',
+                  'ma_fast_norm', 'ma_slow_norm', 'ma_cross', 'trend',
+                  'price', 'volume', 'rsi_raw', 'timestamp')
+        
+        Diferença para process(): sem ticker, o preço atual é o close do
+        último candle e o volume é normalizado pelo Z-score do último candle
+        contra a janela de lookback do próprio array (não há histórico
+        entre chamadas).
+        """
+        data = np.asarray(ohlcv, dtype=np.float64)
+        if data.ndim != 3 or data.shape[2] != 6:
+            raise ValueError(f"Esperado array (símbolos × candles × 6), recebido {data.shape}")
+        
+        n_symbols, n_candles, _ = data.shape
+        closes = data[:, :, 4]
+        volumes = data[:, :, 5]
+        price = closes[:, -1]
+        nan = np.full(n_symbols, np.nan)
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # RSI (médias simples de ganhos/perdas)
+            period = self.rsi_period
+            if n_candles >= period + 1:
+                deltas = np.diff(closes[:, -(period + 1):], axis=1)
+                avg_gains = np.clip(deltas, 0, None).mean(axis=1)
+                avg_losses = np.clip(-deltas, 0, None).mean(axis=1)
+                avg_losses = np.where(avg_losses == 0, 0.0001, avg_losses)
+                rsi = 100 - (100 / (1 + avg_gains / avg_losses))
+                rsi = np.where(np.isnan(rsi), 50.0, rsi)
+            else:
+                rsi = np.full(n_symbols, 50.0)
+            
+            # Volume (Z-score do último candle na janela)
+            vol_window = volumes[:, -self.lookback:]
+            if vol_window.shape[1] >= 10:
+                std_vol = vol_window.std(axis=1)
+                z_score = (volumes[:, -1] - vol_window.mean(axis=1)) / std_vol
+                volume_norm = np.where(std_vol > 0, (np.clip(z_score, -3, 3) + 3) / 6, 0.5)
+            else:
+                volume_norm = np.full(n_symbols, 0.5)
+            
+            # Preço (Min-Max na janela)
+            price_window = closes[:, -self.lookback:]
+            if price_window.shape[1] >= 2:
+                min_price = price_window.min(axis=1)
+                max_price = price_window.max(axis=1)
+                price_norm = np.where(max_price == min_price, 0.5,
+                                      (price - min_price) / (max_price - min_price))
+            else:
+                price_norm = np.full(n_symbols, 0.5)
+            
+            # Momentum (10 períodos)
+            if n_candles >= 11:
+                old_price = closes[:, -10]
+                momentum = np.where(old_price == 0, 0.0, (price - old_price) / old_price)
+            else:
+                momentum = np.zeros(n_symbols)
+            momentum_norm = (np.clip(momentum, -0.10, 0.10) + 0.10) / 0.20
+            
+            # Médias móveis
+            ma_fast = closes[:, -20:].mean(axis=1) if n_candles >= 20 else nan
+            ma_slow = closes[:, -50:].mean(axis=1) if n_candles >= 50 else nan
+            ma_fast_norm = np.where(price > 0, ma_fast / price, 1.0)
+            ma_slow_norm = np.where(price > 0, ma_slow / price, 1.0)
+            
+            # Volatilidade (desvio padrão amostral dos retornos)
+            if n_candles >= 3:
+                returns = closes[:, 1:] / closes[:, :-1] - 1
+                volatility = returns.std(axis=1, ddof=1)
+            else:
+                volatility = nan
+            volatility_norm = np.clip(volatility, 0, 0.05) / 0.05
+            
+            # Tendência
+            if n_candles >= 50:
+                diff_pct = (ma_fast - ma_slow) / ma_slow
+                trend = np.where(diff_pct > 0.02, 'up',
+                                 np.where(diff_pct < -0.02, 'down', 'neutral'))
+            else:
+                trend = np.full(n_symbols, 'neutral')
+        
+        return {
+            'rsi_norm': self._safe_array(rsi / 100.0),
+            'volume_norm': self._safe_array(volume_norm),
+            'price_norm': self._safe_array(price_norm),
+            'momentum_norm': self._safe_array(momentum_norm),
+            'volatility_norm': self._safe_array(volatility_norm),
+            'ma_fast_norm': self._safe_array(ma_fast_norm),
+            'ma_slow_norm': self._safe_array(ma_slow_norm),
+            'price': price,
+            'volume': volumes[:, -1],
+            'rsi_raw': rsi,
+            'timestamp': data[:, -1, 0],
+            'ma_cross': (ma_fast > ma_slow).astype(np.int8),
+            'trend': trend
+        }
+    
+    def process_series(self, ohlcv, window=None):
+        """
+        Features de TODOS os candles de um símbolo, em arrays (backtest)
         
-        # Evita divisão por zero
-        avg_losses = avg_losses.replace(0, 0.0001)
+        Args:
+            ohlcv: np.ndarray (candles × 6) com colunas [time, o, h, l, c, v]
+            window: Tamanho da lista que process() receberia a cada candle
+                    (padrão: lookback + 5, como no Estrategista)
         
-        # Calcula RS e RSI
-        rs = avg_gains / avg_losses
-        rsi = 100 - (100 / (1 + rs))
+        Returns:
+            dict: Mesmas chaves de process_batch, com um valor por candle
         
-        return rsi.iloc[-1] if not np.isnan(rsi.iloc[-1]) else 50.0
+        Equivale a chamar process() candle a candle numa instância nova,
+        passando a janela deslizante terminada em cada candle e o próprio
+        candle como ticker — só que com janelas móveis vetorizadas.
+        """
+        data = np.asarray(ohlcv, dtype=np.float64)
+        if data.ndim != 2 or data.shape[1] < 6:
+            raise ValueError(f"Esperado array (candles × 6), recebido {data.shape}")
+        window = window or self.lookback + 5
+        n = len(data)
+        closes = data[:, 4]
+        volumes = data[:, 5]
+        index = np.arange(n)
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # RSI: médias simples dos últimos rsi_period ganhos/perdas
+            period = self.rsi_period
+            deltas = np.diff(closes, prepend=closes[:1])
+            avg_gains = rolling_sum(np.clip(deltas, 0, None), period) / period
+            avg_losses = rolling_sum(np.clip(-deltas, 0, None), period) / period
+            avg_losses = np.where(avg_losses == 0, 0.0001, avg_losses)
+            rsi = 100 - (100 / (1 + avg_gains / avg_losses))
+            rsi = np.where((index >= period) & ~np.isnan(rsi), rsi, 50.0)
+            
+            # Volume: Z-score contra os últimos `lookback` volumes (inclusive o atual)
+            mean_vol, var_vol = rolling_mean_var(volumes, self.lookback, min_count=10)
+            std_vol = np.sqrt(var_vol)
+            z_score = (volumes - mean_vol) / std_vol
+            flat = ~(std_vol > 1e-12 * np.maximum(np.abs(mean_vol), 1.0))
+            volume_norm = np.where(flat, 0.5, (np.clip(z_score, -3, 3) + 3) / 6)
+            
+            # Preço: Min-Max na janela de lookback
+            range_size = min(self.lookback, window)
+            min_price = rolling_min(closes, range_size, min_count=2)
+            max_price = rolling_max(closes, range_size, min_count=2)
+            price_norm = np.where(max_price == min_price, 0.5,
+                                  (closes - min_price) / (max_price - min_price))
+            price_norm = np.where(np.isnan(min_price), 0.5, price_norm)
+            
+            # Momentum: mesma referência do motor incremental (momentum_period - 1 atrás)
+            mp = self.engine.momentum_period
+            momentum = np.zeros(n)
+            if n > mp:
+                old_price = closes[1:n - mp + 1]
+                momentum[mp:] = np.where(old_price == 0, 0.0, (closes[mp:] - old_price) / old_price)
+            momentum_norm = (np.clip(momentum, -0.10, 0.10) + 0.10) / 0.20
+            
+            # Médias móveis
+            ma_fast = rolling_sum(closes, self.engine.fast) / self.engine.fast
+            ma_slow = rolling_sum(closes, self.engine.slow) / self.engine.slow
+            ma_fast_norm = np.where(closes > 0, ma_fast / closes, 1.0)
+            ma_slow_norm = np.where(closes > 0, ma_slow / closes, 1.0)
+            
+            # Volatilidade: desvio amostral de todos os retornos da janela
+            volatility = np.full(n, np.nan)
+            if n >= 2:
+                returns = closes[1:] / closes[:-1] - 1
+                _, var_ret = rolling_mean_var(returns, window - 1, ddof=1, min_count=2)
+                volatility[1:] = np.sqrt(var_ret)
+            volatility_norm = np.clip(volatility, 0, 0.05) / 0.05
+            
+            # Tendência
+            diff_pct = (ma_fast - ma_slow) / ma_slow
+            trend = np.where(diff_pct > 0.02, 'up', np.where(diff_pct < -0.02, 'down', 'neutral'))
+            trend = np.where((index >= self.engine.slow - 1) & (ma_slow != 0), trend, 'neutral')
+        
+        return {
+            'rsi_norm': self._safe_array(rsi / 100.0),
+            'volume_norm': self._safe_array(volume_norm),
+            'price_norm': self._safe_array(price_norm),
+            'momentum_norm': self._safe_array(momentum_norm),
+            'volatility_norm': self._safe_array(volatility_norm),
+            'ma_fast_norm': self._safe_array(ma_fast_norm),
+            'ma_slow_norm': self._safe_array(ma_slow_norm),
+            'price': closes,
+            'volume': volumes,
+            'rsi_raw': rsi,
+            'timestamp': data[:, 0],
+            'ma_cross': (ma_fast > ma_slow).astype(np.int8),
+            'trend': trend
+        }
     
     def _normalize_volume(self, current_volume):
         """
@@ -183,24 +364,22 @@ class Normalizer:
         Z-score = (valor - média) / desvio_padrão
         Converte para 0-1: (z + 3) / 6  (assume z entre -3 e +3)
         """
-        # Atualiza histórico
-        self.volume_history.append(current_volume)
-        if len(self.volume_history) > self.lookback:
-            self.volume_history = self.volume_history[-self.lookback:]
+        # Atualiza histórico (janela circular com média/variância em O(1))
+        self.volume_window.push(current_volume)
         
         if len(self.volume_history) < 10:
             return 0.5  # Neutro se poucos dados
         
-        mean_vol = np.mean(self.volume_history)
-        std_vol = np.std(self.volume_history)
+        mean_vol = self.volume_window.mean
+        std_vol = np.sqrt(max(self.volume_window.m2, 0.0) / len(self.volume_window))
         
-        if std_vol == 0:
+        if std_vol <= 1e-12 * max(abs(mean_vol), 1.0):
             return 0.5
         
         z_score = (current_volume - mean_vol) / std_vol
         
         # Converte z-score para 0-1 (clipa em -3 e +3)
-        normalized = (np.clip(z_score, -3, 3) + 3) / 6
+        normalized = (min(max(z_score, -3.0), 3.0) + 3) / 6
         
         return normalized
     
@@ -223,22 +402,17 @@ class Normalizer:
         
         return normalized
     
-    def _calculate_momentum(self, prices, period=10):
+    def _normalize_price_range(self, current_price, min_price, max_price):
         """
-        Calcula momentum (taxa de mudança percentual)
+        Normaliza preço usando Min-Max já calculados pelo motor incremental
         """
-        if len(prices) < period + 1:
-            return 0.0
-        
-        old_price = prices.iloc[-period]
-        current_price = prices.iloc[-1]
-        
-        if old_price == 0:
-            return 0.0
+        if np.isnan(min_price) or np.isnan(max_price):
+            return 0.5
         
-        momentum = (current_price - old_price) / old_price
+        if max_price == min_price:
+            return 0.5
         
-        return momentum
+        return (current_price - min_price) / (max_price - min_price)
     
     def _normalize_momentum(self, momentum):
         """
@@ -247,7 +421,7 @@ class Normalizer:
         Assume momentum típico entre -10% e +10%
         """
         # Clipa momentum em -0.10 a +0.10
-        clipped = np.clip(momentum, -0.10, 0.10)
+        clipped = min(max(momentum, -0.10), 0.10)
         
         # Converte para 0-1
         normalized = (clipped + 0.10) / 0.20
@@ -261,7 +435,7 @@ class Normalizer:
         Volatilidade típica: 0-5% ao dia
         """
         # Clipa em 0-0.05 (5%)
-        clipped = np.clip(volatility, 0, 0.05)
+        clipped = min(max(volatility, 0.0), 0.05)
         
         # Normaliza para 0-1
         normalized = clipped / 0.05
@@ -290,14 +464,39 @@ class Normalizer:
         else:
             return 'neutral'
     
+    def _trend_from_mas(self, ma_short, ma_long, length, long=50):
+        """
+        Mesma regra de _identify_trend, a partir das MAs já calculadas
+        """
+        if length < long or np.isnan(ma_long) or ma_long == 0:
+            return 'neutral'
+        
+        diff_pct = (ma_short - ma_long) / ma_long
+        
+        if diff_pct > 0.02:
+            return 'up'
+        elif diff_pct < -0.02:
+            return 'down'
+        else:
+            return 'neutral'
+    
     def _safe_value(self, value):
         """
         Garante que valor está entre 0-1 e não é NaN
         """
-        if np.isnan(value) or np.isinf(value):
+        value = float(value)
+        if not math.isfinite(value):
             return 0.5  # Valor neutro
         
-        return np.clip(float(value), 0.0, 1.0)
+        # min/max puros: np.clip num escalar custa ~10x mais (caminho quente do backtest)
+        return min(max(value, 0.0), 1.0)
+    
+    def _safe_array(self, values):
+        """
+        Versão vetorizada de _safe_value
+        """
+        values = np.asarray(values, dtype=np.float64)
+        return np.clip(np.where(np.isfinite(values), values, 0.5), 0.0, 1.0)
 
 # Teste rápido
 if __name__ == "__main__":
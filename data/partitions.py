@@ -0,0 +1,342 @@
+"""
+🗂️ Particionamento Mensal do market_analysis_v2 - Maria Helena
+"Caderno por mês: jogar fora o ano velho é arrancar as folhas, não apagar linha por linha"
+
+- Uma tabela por mês (market_analysis_v2_pYYYYMM) + partição default
+- `market_analysis_v2` vira uma VIEW (UNION ALL) com trigger INSTEAD OF
+  INSERT que roteia cada linha para a partição do mês, então quem já
+  escreve/lê em market_analysis_v2 continua funcionando
+- Partição criada depois das linhas do seu mês (caídas na default) recebe
+  essas linhas: cada (asset, timestamp) vive numa partição só
+- Retenção: DROP TABLE da partição inteira (sem DELETE + VACUUM)
+- Rollups 5m/1h/1d mantidos incrementalmente por triggers AFTER INSERT
+  (UPSERT), para consultas de horizonte longo não varrerem linhas de 1m
+"""
+
+import logging
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger('MariaHelena.Partitions')
+
+BASE_TABLE = 'market_analysis_v2'
+PARTITION_PREFIX = f'{BASE_TABLE}_p'
+DEFAULT_PARTITION = f'{PARTITION_PREFIX}default'
+LEGACY_TABLE = f'{BASE_TABLE}_legacy'
+
+# Colunas gravadas pelo Analista/Migrador (sem id/created_at)
+DATA_COLUMNS = (
+    'asset', 'timestamp', 'price', 'volume', 'rsi', 'bb_upper', 'bb_lower', 'bb_middle',
+    'macd', 'macd_signal', 'macd_histogram', 'sma', 'obv', 'trend', 'signal', 'confidence',
+)
+
+ROLLUPS = (('5m', 300), ('1h', 3600), ('1d', 86400))
+
+PARTITION_DDL = """
+    CREATE TABLE IF NOT EXISTS {name} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        asset TEXT NOT NULL,
+        timestamp INTEGER NOT NULL,
+        price REAL NOT NULL CHECK(price > 0),
+        volume REAL CHECK(volume >= 0),
+        rsi REAL CHECK(rsi BETWEEN 0 AND 100),
+        bb_upper REAL,
+        bb_lower REAL,
+        bb_middle REAL,
+        macd REAL,
+        macd_signal REAL,
+        macd_histogram REAL,
+        sma REAL,
+        obv REAL,
+        trend TEXT CHECK(trend IN ('BULLISH', 'BEARISH', 'NEUTRAL', 'UNKNOWN')),
+        signal TEXT CHECK(signal IN ('BUY', 'SELL', 'HOLD', NULL)),
+        confidence REAL CHECK(confidence BETWEEN 0 AND 1),
+        created_at INTEGER DEFAULT (strftime('%s', 'now')),
+        UNIQUE(asset, timestamp)
+    )
+"""
+
+ROLLUP_DDL = """
+    CREATE TABLE IF NOT EXISTS market_rollup_{interval} (
+        asset TEXT NOT NULL,
+        bucket INTEGER NOT NULL,      -- início do intervalo (unix s, UTC)
+        open REAL, high REAL, low REAL, close REAL,
+        first_ts INTEGER, last_ts INTEGER,
+        volume REAL DEFAULT 0,
+        rsi_sum REAL DEFAULT 0,
+        rsi_count INTEGER DEFAULT 0,
+        samples INTEGER DEFAULT 0,
+        PRIMARY KEY (asset, bucket)
+    ) WITHOUT ROWID
+"""
+
+ROLLUP_TRIGGER = """
+    CREATE TRIGGER IF NOT EXISTS {partition}_rollup_{interval}
+    AFTER INSERT ON {partition}
+    BEGIN
+        INSERT INTO market_rollup_{interval}
+            (asset, bucket, open, high, low, close, first_ts, last_ts, volume, rsi_sum, rsi_count, samples)
+        VALUES
+            (NEW.asset, NEW.timestamp - NEW.timestamp % {seconds}, NEW.price, NEW.price, NEW.price, NEW.price,
+             NEW.timestamp, NEW.timestamp, COALESCE(NEW.volume, 0), COALESCE(NEW.rsi, 0), NEW.rsi IS NOT NULL, 1)
+        ON CONFLICT(asset, bucket) DO UPDATE SET
+            open = CASE WHEN excluded.first_ts < first_ts THEN excluded.open ELSE open END,
+            close = CASE WHEN excluded.last_ts >= last_ts THEN excluded.close ELSE close END,
+            first_ts = MIN(first_ts, excluded.first_ts),
+            last_ts = MAX(last_ts, excluded.last_ts),
+            high = MAX(high, excluded.high),
+            low = MIN(low, excluded.low),
+            volume = volume + excluded.volume,
+            rsi_sum = rsi_sum + excluded.rsi_sum,
+            rsi_count = rsi_count + excluded.rsi_count,
+            samples = samples + 1;
+    END
+"""
+
+
+def month_bounds(ts: int) -> Tuple[int, int]:
+    """Retorna (início, fim) em unix s do mês UTC que contém `ts`."""
+    dt = datetime.fromtimestamp(ts, timezone.utc)
+    start = datetime(dt.year, dt.month, 1, tzinfo=timezone.utc)
+    end = datetime(dt.year + (dt.month == 12), dt.month % 12 + 1, 1, tzinfo=timezone.utc)
+    return int(start.timestamp()), int(end.timestamp())
+
+
+def partition_name(ts: int) -> str:
+    dt = datetime.fromtimestamp(ts, timezone.utc)
+    return f"{PARTITION_PREFIX}{dt.year:04d}{dt.month:02d}"
+
+
+def partition_bounds(name: str) -> Tuple[int, int]:
+    suffix = name[len(PARTITION_PREFIX):]
+    start = datetime(int(suffix[:4]), int(suffix[4:6]), 1, tzinfo=timezone.utc)
+    return month_bounds(int(start.timestamp()))
+
+
+def list_partitions(conn: sqlite3.Connection) -> List[str]:
+    """Partições mensais existentes, da mais antiga para a mais nova."""
+    rows = conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name GLOB ?",
+        (f"{PARTITION_PREFIX}[0-9][0-9][0-9][0-9][0-9][0-9]",)
+    ).fetchall()
+    return sorted(row[0] for row in rows)
+
+
+def _object_type(conn: sqlite3.Connection, name: str) -> Optional[str]:
+    row = conn.execute("SELECT type FROM sqlite_master WHERE name = ?", (name,)).fetchone()
+    return row[0] if row else None
+
+
+def is_partitioned(conn: sqlite3.Connection) -> bool:
+    """VIEW no lugar da tabela e nenhuma cópia da tabela antiga pela metade."""
+    return _object_type(conn, BASE_TABLE) == 'view' and _object_type(conn, LEGACY_TABLE) is None
+
+
+@contextmanager
+def _transaction(conn: sqlite3.Connection):
+    """
+    BEGIN/COMMIT explícitos: no modo padrão o sqlite3 só abre transação
+    antes de DML, então CREATE/ALTER/DROP seriam gravados na hora e um
+    erro no meio deixaria o esquema pela metade.
+    """
+    previous = conn.isolation_level
+    conn.isolation_level = None
+    try:
+        conn.execute("BEGIN")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+    finally:
+        conn.isolation_level = previous
+
+
+def _create_partition_table(conn: sqlite3.Connection, name: str, triggers: bool = True) -> None:
+    conn.execute(PARTITION_DDL.format(name=name))
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{name}_asset_ts ON {name}(asset, timestamp DESC)")
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{name}_ts ON {name}(timestamp DESC)")
+    if triggers:
+        _create_rollup_triggers(conn, name)
+
+
+def _create_rollup_triggers(conn: sqlite3.Connection, name: str) -> None:
+    for interval, seconds in ROLLUPS:
+        conn.execute(ROLLUP_TRIGGER.format(partition=name, interval=interval, seconds=seconds))
+
+
+def _adopt_default_rows(conn: sqlite3.Connection, name: str) -> int:
+    """Move para `name` as linhas do mês dela que caíram na partição default."""
+    start, end = partition_bounds(name)
+    columns = ', '.join(DATA_COLUMNS)
+    moved = conn.execute(
+        f"INSERT OR IGNORE INTO {name} ({columns}) SELECT {columns} FROM {DEFAULT_PARTITION} "
+        f"WHERE timestamp >= ? AND timestamp < ?", (start, end)
+    ).rowcount
+    conn.execute(f"DELETE FROM {DEFAULT_PARTITION} WHERE timestamp >= ? AND timestamp < ?", (start, end))
+    return moved
+
+
+def _rebuild_view(conn: sqlite3.Connection) -> None:
+    """Recria a VIEW e o trigger de roteamento com as partições atuais."""
+    partitions = list_partitions(conn)
+    tables = partitions + [DEFAULT_PARTITION]
+    columns = ', '.join(DATA_COLUMNS)
+    new_values = ', '.join(f'NEW.{c}' for c in DATA_COLUMNS)
+
+    conn.execute(f"DROP TRIGGER IF EXISTS {BASE_TABLE}_route")
+    conn.execute(f"DROP VIEW IF EXISTS {BASE_TABLE}")
+    conn.execute(f"CREATE VIEW {BASE_TABLE} AS " + " UNION ALL ".join(f"SELECT * FROM {t}" for t in tables))
+
+    ranges = []
+    statements = []
+    for name in partitions:
+        start, end = partition_bounds(name)
+        ranges.append(f"(NEW.timestamp >= {start} AND NEW.timestamp < {end})")
+        statements.append(
+            f"INSERT OR IGNORE INTO {name} ({columns}) SELECT {new_values} "
+            f"WHERE NEW.timestamp >= {start} AND NEW.timestamp < {end};"
+        )
+    outside = f"NOT ({' OR '.join(ranges)})" if ranges else "1"
+    statements.append(
+        f"INSERT OR IGNORE INTO {DEFAULT_PARTITION} ({columns}) SELECT {new_values} WHERE {outside};"
+    )
+    conn.execute(
+        f"CREATE TRIGGER {BASE_TABLE}_route INSTEAD OF INSERT ON {BASE_TABLE} BEGIN "
+        + " ".join(statements) + " END"
+    )
+
+
+def ensure_partitions(conn: sqlite3.Connection, timestamps) -> List[str]:
+    """
+    Garante que existem partições para os meses de `timestamps`.
+    Linhas desses meses que estavam na partição default passam para a
+    partição nova (sem passar de novo pelos rollups, onde já contam).
+    Retorna as partições criadas (a VIEW só é recriada se algo mudou).
+    """
+    existing = set(list_partitions(conn))
+    missing = sorted({partition_name(int(ts)) for ts in timestamps} - existing)
+    if missing:
+        moved = 0
+        with _transaction(conn):
+            for name in missing:
+                _create_partition_table(conn, name, triggers=False)
+                moved += _adopt_default_rows(conn, name)
+                _create_rollup_triggers(conn, name)
+            _rebuild_view(conn)
+        logger.info(f"🗂️ Partições criadas: {missing}" + (f" ({moved} linhas vindas da default)" if moved else ""))
+    return missing
+
+
+def migrate_to_partitions(conn: sqlite3.Connection) -> bool:
+    """
+    Converte a tabela única market_analysis_v2 em partições mensais + VIEW,
+    preenchendo os rollups com o histórico existente. Tudo numa transação:
+    se a cópia falhar, a tabela original fica intacta. Uma
+    market_analysis_v2_legacy deixada por uma migração interrompida é
+    retomada (linhas já copiadas são ignoradas).
+    """
+    if is_partitioned(conn):
+        logger.info("✅ market_analysis_v2 já está particionada")
+        return True
+
+    try:
+        with _transaction(conn):
+            for interval, _ in ROLLUPS:
+                conn.execute(ROLLUP_DDL.format(interval=interval))
+            _create_partition_table(conn, DEFAULT_PARTITION)
+
+            if _object_type(conn, BASE_TABLE) == 'table':
+                conn.execute(f"ALTER TABLE {BASE_TABLE} RENAME TO {LEGACY_TABLE}")
+            legacy = _object_type(conn, LEGACY_TABLE) == 'table'
+            if legacy:
+                logger.info(f"📦 Copiando {LEGACY_TABLE} para as partições")
+                months = conn.execute(
+                    f"SELECT DISTINCT timestamp - (timestamp % 86400) FROM {LEGACY_TABLE}"
+                ).fetchall()
+                existing = set(list_partitions(conn))
+                for name in sorted({partition_name(r[0]) for r in months} - existing):
+                    # Retomada: linhas já copiadas para a default antes da partição existir
+                    _create_partition_table(conn, name, triggers=False)
+                    _adopt_default_rows(conn, name)
+                    _create_rollup_triggers(conn, name)
+
+            now = int(datetime.now(timezone.utc).timestamp())
+            _create_partition_table(conn, partition_name(now))
+            _rebuild_view(conn)
+
+            if legacy:
+                columns = ', '.join(DATA_COLUMNS)
+                conn.execute(f"INSERT INTO {BASE_TABLE} ({columns}) SELECT {columns} FROM {LEGACY_TABLE}")
+                conn.execute(f"DROP TABLE {LEGACY_TABLE}")
+        logger.info(f"✅ market_analysis_v2 particionada: {list_partitions(conn)}")
+        return True
+    except sqlite3.Error as e:
+        logger.error(f"❌ Erro ao particionar market_analysis_v2: {e}")
+        return False
+
+
+def apply_retention(conn: sqlite3.Connection, keep_months: int, now: Optional[int] = None) -> List[str]:
+    """
+    Remove partições inteiras mais antigas que `keep_months` meses
+    (o mês corrente conta como 1). Os rollups são preservados.
+    """
+    now = now if now is not None else int(datetime.now(timezone.utc).timestamp())
+    cutoff, _ = month_bounds(now)
+    for _ in range(max(keep_months, 1) - 1):
+        cutoff, _ = month_bounds(cutoff - 1)
+
+    expired = [name for name in list_partitions(conn) if partition_bounds(name)[1] <= cutoff]
+    if expired:
+        with _transaction(conn):
+            for name in expired:
+                conn.execute(f"DROP TABLE {name}")
+            conn.execute(f"DELETE FROM {DEFAULT_PARTITION} WHERE timestamp < ?", (cutoff,))
+            _rebuild_view(conn)
+        logger.info(f"🧹 Partições removidas pela retenção: {expired}")
+    return expired
+
+
+def live_since(conn: sqlite3.Connection) -> Optional[int]:
+    """
+    Início (dia UTC) do dado mais antigo ainda nas partições, ou None se
+    estão vazias. Buckets de rollup anteriores são de meses já removidos
+    pela retenção.
+    """
+    oldest = None
+    for name in list_partitions(conn) + [DEFAULT_PARTITION]:
+        ts = conn.execute(f"SELECT MIN(timestamp) FROM {name}").fetchone()[0]
+        if ts is not None and (oldest is None or ts < oldest):
+            oldest = ts
+    return None if oldest is None else oldest - oldest % 86400
+
+
+def maintain_partitions(conn: sqlite3.Connection, keep_months: Optional[int] = None) -> None:
+    """Manutenção periódica: cria o mês atual/próximo e aplica a retenção."""
+    if not is_partitioned(conn):
+        return
+    now = int(datetime.now(timezone.utc).timestamp())
+    _, month_end = month_bounds(now)
+    ensure_partitions(conn, (now, month_end))
+    if keep_months:
+        apply_retention(conn, keep_months, now)
+
+
+def query_rollup(conn: sqlite3.Connection, asset: str, interval: str,
+                 start: int, end: int) -> List[tuple]:
+    """
+    Barras agregadas (bucket, open, high, low, close, volume, rsi_médio, amostras)
+    de um ativo em [start, end). `interval` em {'5m', '1h', '1d'}.
+    """
+    if interval not in dict(ROLLUPS):
+        raise ValueError(f"Intervalo de rollup inválido: {interval}")
+    return conn.execute(f"""
+        SELECT bucket, open, high, low, close, volume,
+               CASE WHEN rsi_count > 0 THEN rsi_sum / rsi_count END, samples
+        FROM market_rollup_{interval}
+        WHERE asset = ? AND bucket >= ? AND bucket < ?
+        ORDER BY bucket
+    """, (asset, start, end)).fetchall()
@@ -0,0 +1,225 @@
+"""
+💾 Camada de Armazenamento SQLite - Maria Helena
+"Gaveta que abre e fecha toda hora emperra"
+
+- Conexões de longa duração (uma por thread e por arquivo)
+- WAL: leitores não bloqueiam o escritor (e vice-versa)
+- PRAGMAs ajustados (synchronous, cache_size, mmap_size, busy_timeout)
+- Statements reaproveitados pelo cache de statements do sqlite3
+- Escritor em background que agrupa vários lotes num único commit
+"""
+
+import logging
+from concurrent.futures import Future
+import queue
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger('MariaHelena.Storage')
+
+DB_PATH = Path.home() / 'maria-helena' / 'data' / 'maria_helena_signals.db'
+
+PRAGMAS = (
+    ("journal_mode", "WAL"),
+    ("synchronous", "NORMAL"),     # seguro com WAL; fsync só no checkpoint
+    ("cache_size", "-65536"),      # 64 MiB de page cache
+    ("mmap_size", "268435456"),    # 256 MiB mapeados em memória
+    ("temp_store", "MEMORY"),
+    ("busy_timeout", "5000"),
+)
+
+INSERT_ANALYSIS_SQL = """
+    INSERT OR IGNORE INTO market_analysis_v2
+    (asset, timestamp, price, volume, rsi, bb_upper, bb_lower, bb_middle,
+     macd, macd_signal, macd_histogram, sma, obv, trend)
+    VALUES (:asset, :timestamp, :price, :volume, :rsi, :bb_upper, :bb_lower, :bb_middle,
+     :macd, :macd_signal, :macd_histogram, :sma, :obv, :trend)
+"""
+
+
+def configure_connection(conn: sqlite3.Connection, readonly: bool = False) -> sqlite3.Connection:
+    """Aplica os PRAGMAs de desempenho numa conexão."""
+    for name, value in PRAGMAS:
+        if readonly and name == "journal_mode":
+            continue
+        conn.execute(f"PRAGMA {name} = {value}")
+    if readonly:
+        conn.execute("PRAGMA query_only = ON")
+    return conn
+
+
+def connect(db_path: Path = DB_PATH, readonly: bool = False) -> sqlite3.Connection:
+    """Abre uma conexão nova já configurada."""
+    conn = sqlite3.connect(str(db_path), cached_statements=256, check_same_thread=False)
+    return configure_connection(conn, readonly=readonly)
+
+
+class ConnectionPool:
+    """
+    Conexões de leitura reaproveitadas: uma por thread e por arquivo.
+
+    Substitui o padrão "sqlite3.connect → consulta → close" a cada chamada.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._all: List[sqlite3.Connection] = []
+
+    def get(self, db_path: Path = DB_PATH, readonly: bool = True) -> sqlite3.Connection:
+        conns: Dict[Tuple[str, bool], sqlite3.Connection] = getattr(self._local, 'conns', None)
+        if conns is None:
+            conns = self._local.conns = {}
+        key = (str(db_path), readonly)
+        conn = conns.get(key)
+        if conn is None:
+            conn = conns[key] = connect(db_path, readonly=readonly)
+            with self._lock:
+                self._all.append(conn)
+        return conn
+
+    def close_all(self) -> None:
+        with self._lock:
+            for conn in self._all:
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    pass
+            self._all.clear()
+        self._local = threading.local()
+
+
+pool = ConnectionPool()
+
+
+class SQLiteWriter:
+    """
+    Escritor em background com group commit.
+
+    submit() só enfileira (não bloqueia o chamador). A thread escritora
+    drena a fila e grava tudo o que acumulou — até max_batch_rows linhas
+    ou max_delay segundos — numa única transação, na ordem dos submits.
+    Se a transação falhar, os lotes são regravados um a um: só o lote com
+    problema se perde, e o Future dele recebe a exceção (de qualquer tipo:
+    a thread escritora segue viva).
+
+    Parâmetros:
+    - db_path (Path): Arquivo do banco
+    - max_batch_rows (int): Linhas por transação
+    - max_delay (float): Espera máxima para juntar lotes (s)
+    """
+
+    _STOP = object()
+
+    def __init__(self, db_path: Path = DB_PATH, max_batch_rows: int = 5000, max_delay: float = 0.05):
+        self.db_path = Path(db_path)
+        self.max_batch_rows = max_batch_rows
+        self.max_delay = max_delay
+        self.rows_written = 0
+        self.commits = 0
+        self.errors = 0
+
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='sqlite-writer', daemon=True)
+        self._thread.start()
+
+    def submit(self, sql: str, rows: Iterable) -> Future:
+        """
+        Enfileira linhas para `sql` (executemany).
+
+        Returns:
+            Future: linhas gravadas quando o lote for commitado, ou a
+            exceção que o impediu (sqlite3.Error, TypeError de linhas inválidas...)
+        """
+        rows = list(rows)
+        future: Future = Future()
+        if rows:
+            self._queue.put((sql, rows, future))
+        else:
+            future.set_result(0)
+        return future
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Bloqueia até tudo o que foi enfileirado antes estar commitado."""
+        done = threading.Event()
+        self._queue.put((None, done, None))
+        return done.wait(timeout)
+
+    def close(self) -> None:
+        self._queue.put(self._STOP)
+        self._thread.join()
+
+    def _run(self) -> None:
+        conn = connect(self.db_path)
+        stopping = False
+        try:
+            while not stopping:
+                item = self._queue.get()
+                batch, events = [], []
+                n_rows = 0
+                deadline = time.monotonic() + self.max_delay
+                while True:
+                    if item is self._STOP:
+                        stopping = True
+                    elif item[0] is None:
+                        events.append(item[1])
+                    else:
+                        batch.append(item)
+                        n_rows += len(item[1])
+                    if stopping or n_rows >= self.max_batch_rows:
+                        break
+                    try:
+                        item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                    except queue.Empty:
+                        break
+                if batch:
+                    self._write(conn, batch, n_rows)
+                for event in events:
+                    event.set()
+        finally:
+            conn.close()
+
+    def _write(self, conn: sqlite3.Connection, batch: list, n_rows: int) -> None:
+        try:
+            with conn:
+                self._execute(conn, batch)
+        except Exception as e:  # sqlite3.Error ou linhas inválidas (ex: TypeError): a thread não pode morrer
+            logger.warning(f"⚠️ Transação de {n_rows} linhas falhou ({e}); regravando lote a lote")
+            for item in batch:
+                self._write_one(conn, item)
+            return
+        for _, rows, future in batch:
+            future.set_result(len(rows))
+        self.rows_written += n_rows
+        self.commits += 1
+        logger.debug(f"💾 {n_rows} linhas gravadas em 1 transação")
+
+    @staticmethod
+    def _execute(conn: sqlite3.Connection, batch: list) -> None:
+        # Na ordem dos submits; lotes seguidos do mesmo SQL viram um executemany só
+        sql, rows = None, []
+        for item_sql, item_rows, _ in batch:
+            if item_sql != sql and rows:
+                conn.executemany(sql, rows)
+                rows = []
+            sql = item_sql
+            rows.extend(item_rows)
+        if rows:
+            conn.executemany(sql, rows)
+
+    def _write_one(self, conn: sqlite3.Connection, item: tuple) -> None:
+        sql, rows, future = item
+        try:
+            with conn:
+                conn.executemany(sql, rows)
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"❌ ERRO ao gravar lote de {len(rows)} linhas: {e}")
+            future.set_exception(e)
+            return
+        self.rows_written += len(rows)
+        self.commits += 1
+        future.set_result(len(rows))
@@ -11,18 +11,26 @@
 MARIA HELENA v4.0 - DATA ANALYST BOT
 """
 
-import sqlite3
+import asyncio
+import os
 from datetime import datetime
 import logging
 import time
 import sys
 import requests
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
 # CORREÇÃO: Imports que faltavam
 import numpy as np
 import pandas as pd
 
+from data.kline_fetcher import AsyncKlineFetcher
+from data.candle_store import CandleStore
+from data import indicators
+from data.storage import INSERT_ANALYSIS_SQL, SQLiteWriter, connect as storage_connect, pool
+from data.partitions import ensure_partitions, is_partitioned, maintain_partitions, partition_name
+
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
@@ -34,14 +42,92 @@ logging.basicConfig(
 logger = logging.getLogger('MariaHelena.Analista')
 
 
+def analyze_shard(shard):
+    """Analisa um lote [(ativo, velas), ...] num worker e devolve as linhas para save_analysis."""
+    rows = []
+    for symbol, klines in shard:
+        row = MariaHelenaAnalystBot.analyze_klines(symbol, klines)
+        if row:
+            rows.append(row)
+    return rows
+
+
+class AnalysisStage:
+    """
+    Estágio de análise com pool de threads ou processos.
+
+    Os ativos são divididos em lotes contíguos (shards_per_worker lotes por
+    worker, para equilibrar ativos mais lentos) e cada lote vira uma tarefa
+    do executor. Com workers <= 1 a análise roda em série no processo
+    principal, como antes.
+
+    Parâmetros:
+    - workers (int): Tamanho do pool
+    - kind (str): 'process' (contorna o GIL) ou 'thread'
+    - shards_per_worker (int): Lotes por worker
+    """
+
+    def __init__(self, workers=0, kind='process', shards_per_worker=4):
+        if kind not in ('process', 'thread'):
+            raise ValueError(f"Tipo de executor inválido: {kind}")
+        self.workers = int(workers or 0)
+        self.kind = kind
+        self.shards_per_worker = shards_per_worker
+        self._executor = None
+
+    def _get_executor(self):
+        if self._executor is None:
+            if self.kind == 'process':
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='analista')
+            logger.info(f"⚙️ Pool de análise iniciado: {self.workers} {self.kind}(s)")
+        return self._executor
+
+    def shard(self, items):
+        """Divide os itens em lotes contíguos de tamanho parecido."""
+        n_shards = max(1, min(len(items), self.workers * self.shards_per_worker))
+        size, extra = divmod(len(items), n_shards)
+        shards, start = [], 0
+        for i in range(n_shards):
+            end = start + size + (1 if i < extra else 0)
+            shards.append(items[start:end])
+            start = end
+        return shards
+
+    async def analyze(self, items):
+        """Analisa [(ativo, velas), ...] e retorna as linhas na ordem dos ativos."""
+        if self.workers <= 1 or len(items) < 2:
+            return analyze_shard(items)
+
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        results = await asyncio.gather(*(
+            loop.run_in_executor(executor, analyze_shard, shard)
+            for shard in self.shard(items)
+        ))
+        return [row for rows in results for row in rows]
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
 class MariaHelenaAnalystBot:
     """Bot de análise de mercado que calcula 5 indicadores e salva no DB."""
     
-    def __init__(self):
+    def __init__(self, workers=0, executor_kind='process', retention_months=None):
         self.db_path = Path.home() / 'maria-helena' / 'data' / 'maria_helena_signals.db'
+        self.retention_months = retention_months
         self.binance_url = "https://api.binance.com/api/v3"
         self.assets = ['BTCUSDT', 'ETHUSDT', 'BNBUSDT', 'ADAUSDT', 'XRPUSDT', 'DOGEUSDT']
+        self.cycle_interval = 60
         self.init_database()
+        self.candle_store = CandleStore(self.db_path.parent / 'candle_cache.db', interval='1m', window=100)
+        self.analysis_stage = AnalysisStage(workers=workers, kind=executor_kind)
+        self.writer = SQLiteWriter(self.db_path)
+        self._current_partition = None
     
     def init_database(self):
         """Garante que o banco de dados e a tabela principal existem."""
@@ -52,12 +138,14 @@ class MariaHelenaAnalystBot:
             sys.exit(1)
             
         try:
-            conn = sqlite3.connect(self.db_path)
+            # Abre já em WAL: o escritor do Analista não bloqueia leitores
+            conn = storage_connect(self.db_path)
             cursor = conn.cursor()
-            cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='market_analysis_v2'")
+            cursor.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'view') AND name='market_analysis_v2'")
             if not cursor.fetchone():
                 logger.error("❌ Tabela 'market_analysis_v2' não encontrada no banco de dados!")
                 sys.exit(1)
+            maintain_partitions(conn, self.retention_months)
             conn.close()
             logger.info("✅ Banco de dados e tabela verificados com sucesso!")
         except Exception as e:
@@ -76,7 +164,10 @@ class MariaHelenaAnalystBot:
             logger.error(f"❌ Erro ao buscar klines para {symbol}: {e}")
             return []
 
-    def calculate_rsi(self, prices, period=14):
+    # Implementações de referência (pandas). O caminho quente usa os kernels
+    # de data/indicators.py; scripts/bench_indicators.py checa a paridade.
+    @staticmethod
+    def calculate_rsi(prices, period=14):
         if len(prices) < period: return 50.0
         prices_series = pd.Series(prices)
         delta = prices_series.diff()
@@ -85,7 +176,8 @@ class MariaHelenaAnalystBot:
         rs = gain / loss
         return round(100 - (100 / (1 + rs.iloc[-1])), 2)
 
-    def calculate_bollinger_bands(self, prices, period=20, num_std=2):
+    @staticmethod
+    def calculate_bollinger_bands(prices, period=20, num_std=2):
         if len(prices) < period: return None, None, None
         prices_series = pd.Series(prices)
         rolling_mean = prices_series.rolling(window=period).mean()
@@ -93,7 +185,8 @@ class MariaHelenaAnalystBot:
         upper_band = rolling_mean.iloc[-1] + (rolling_std.iloc[-1] * num_std)
         return round(upper_band, 2), round(rolling_mean.iloc[-1], 2), round(rolling_mean.iloc[-1] - (rolling_std.iloc[-1] * num_std), 2)
 
-    def calculate_macd(self, prices, fast=12, slow=26, signal=9):
+    @staticmethod
+    def calculate_macd(prices, fast=12, slow=26, signal=9):
         if len(prices) < slow: return None, None, None
         prices_series = pd.Series(prices)
         ema_fast = prices_series.ewm(span=fast, adjust=False).mean()
@@ -102,11 +195,13 @@ class MariaHelenaAnalystBot:
         signal_line = macd_line.ewm(span=signal, adjust=False).mean()
         return round(macd_line.iloc[-1], 4), round(signal_line.iloc[-1], 4), round((macd_line - signal_line).iloc[-1], 4)
 
-    def calculate_sma(self, prices, period=50):
+    @staticmethod
+    def calculate_sma(prices, period=50):
         if len(prices) < period: return None
         return round(np.mean(prices[-period:]), 2)
 
-    def calculate_obv(self, prices, volumes):
+    @staticmethod
+    def calculate_obv(prices, volumes):
         if len(prices) < 2: return 0.0
         obv = 0
         for i in range(1, len(prices)):
@@ -114,7 +209,8 @@ class MariaHelenaAnalystBot:
             elif prices[i] < prices[i-1]: obv -= volumes[i]
         return round(obv, 2)
 
-    def determine_trend(self, prices, short_period=12, long_period=50):
+    @staticmethod
+    def determine_trend(prices, short_period=12, long_period=50):
         if len(prices) < long_period: return "NEUTRAL"
         sma_short = np.mean(prices[-short_period:])
         sma_long = np.mean(prices[-long_period:])
@@ -122,74 +218,108 @@ class MariaHelenaAnalystBot:
         elif sma_short < sma_long: return "BEARISH"
         else: return "NEUTRAL"
 
-    def save_analysis(self, analysis_data):
-        """Salva um lote de análises no banco de dados."""
+    def maintain_storage(self, analysis_data):
+        """Cria a partição do mês antes de gravar (virada de mês) e aplica a retenção."""
+        month = partition_name(analysis_data[0]['timestamp'])
+        if month == self._current_partition:
+            return
+        conn = pool.get(self.db_path, readonly=False)
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.executemany("""
-                INSERT OR IGNORE INTO market_analysis_v2 
-                (asset, timestamp, price, volume, rsi, bb_upper, bb_lower, bb_middle, 
-                 macd, macd_signal, macd_histogram, sma, obv, trend)
-                VALUES (:asset, :timestamp, :price, :volume, :rsi, :bb_upper, :bb_lower, :bb_middle, 
-                 :macd, :macd_signal, :macd_histogram, :sma, :obv, :trend)
-            """, analysis_data)
-            conn.commit()
-            logger.info(f"💾 {cursor.rowcount} novos registros salvos no banco de dados.")
-        except sqlite3.Error as e:
-            logger.error(f"❌ ERRO ao salvar lote no banco de dados: {e}")
-        finally:
-            if conn: conn.close()
+            maintain_partitions(conn, self.retention_months)
+            if is_partitioned(conn):
+                ensure_partitions(conn, [row['timestamp'] for row in analysis_data])
+            self._current_partition = month
+        except Exception as e:
+            logger.error(f"❌ Erro na manutenção de partições: {e}")
+
+    def save_analysis(self, analysis_data):
+        """Enfileira um lote de análises no escritor em background (group commit)."""
+        future = self.writer.submit(INSERT_ANALYSIS_SQL, analysis_data)
+        future.add_done_callback(self._on_saved)
+        logger.info(f"💾 {len(analysis_data)} registros enfileirados para o banco de dados.")
+        return future
+
+    @staticmethod
+    def _on_saved(future):
+        if future.exception() is not None:
+            logger.error(f"❌ Lote de análises descartado pelo banco: {future.exception()}")
 
     def analyze_asset(self, symbol):
         """Análise completa de um único ativo."""
         klines = self.fetch_klines(symbol, interval='1m', limit=100)
+        return self.analyze_klines(symbol, klines)
+
+    @classmethod
+    def analyze_klines(cls, symbol, klines):
+        """Calcula os indicadores a partir de velas já baixadas (sem estado, roda em workers)."""
         if not klines or len(klines) < 50:
             logger.warning(f"⚠️ Dados insuficientes para análise de {symbol}")
             return None
         
-        prices = [float(k[4]) for k in klines]
-        volumes = [float(k[5]) for k in klines]
-        timestamp = int(klines[-1][0] / 1000)
-
-        rsi = self.calculate_rsi(prices)
-        bb_upper, bb_middle, bb_lower = self.calculate_bollinger_bands(prices)
-        macd, macd_signal, macd_histogram = self.calculate_macd(prices)
-        sma = self.calculate_sma(prices)
-        obv = self.calculate_obv(prices, volumes)
-        trend = self.determine_trend(prices)
-        
+        # Converte uma única vez para float64 e reaproveita nos kernels
+        closes, volumes, open_times = indicators.klines_to_arrays(klines)
+        timestamp = int(open_times[-1] / 1000)
 
-        return {
-            'asset': symbol, 'timestamp': timestamp, 'price': prices[-1], 'volume': volumes[-1],
-            'rsi': rsi, 'bb_upper': bb_upper, 'bb_lower': bb_lower, 'bb_middle': bb_middle,
-            'macd': macd, 'macd_signal': macd_signal, 'macd_histogram': macd_histogram,
-            'sma': sma, 'obv': obv, 'trend': trend
-        }
+        analysis = {'asset': symbol, 'timestamp': timestamp, 'price': float(closes[-1]), 'volume': float(volumes[-1])}
+        analysis.update(indicators.compute_indicators(closes, volumes))
+        return analysis
 
-    def run(self):
-        """Executa o bot continuamente."""
+    async def run_cycle(self, fetcher):
+        """
+        Busca em paralelo só as velas novas de cada ativo (startTime = última
+        abertura no cache) e analisa a janela cacheada.
+        """
+        now_ms = int(time.time() * 1000)
+        start_times = {}
+        for asset in self.assets:
+            start_time = self.candle_store.start_time(asset, now_ms)
+            if start_time is not None:
+                start_times[asset] = start_time
+        
+        klines_by_asset = await fetcher.fetch_many(
+            self.assets, interval='1m', limit=self.candle_store.window, start_times=start_times
+        )
+        
+        items = []
+        for asset in self.assets:
+            candles = self.candle_store.merge(asset, klines_by_asset.get(asset))
+            if candles is None:
+                # Busca falhou: sem velas novas, não reanalisa nem regrava a mesma janela
+                logger.warning(f"⚠️ {asset}: sem velas novas neste ciclo, ativo ignorado")
+                continue
+            items.append((asset, list(candles)))
+        return await self.analysis_stage.analyze(items)
+
+    async def run_async(self):
+        """Loop principal assíncrono com um único pool de conexões."""
         logger.info("\n" + "="*60)
         logger.info("🚀 MARIA HELENA v4.0 - ANALYST BOT - INICIANDO")
         logger.info("="*60)
         
-        cycle = 0
-        while True:
-            cycle += 1
-            logger.info(f"\n🔄 CICLO DE ANÁLISE #{cycle} - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-            
-            all_analyses = []
-            for asset in self.assets:
-                analysis = self.analyze_asset(asset)
-                if analysis:
-                    all_analyses.append(analysis)
-                time.sleep(1) # Rate limit para a API
-            
-            if all_analyses:
-                self.save_analysis(all_analyses)
-            
-            logger.info(f"✅ Ciclo #{cycle} concluído. Próximo em 60 segundos...")
-            time.sleep(60)
+        try:
+            async with AsyncKlineFetcher(self.binance_url) as fetcher:
+                cycle = 0
+                while True:
+                    cycle += 1
+                    started = time.monotonic()
+                    logger.info(f"\n🔄 CICLO DE ANÁLISE #{cycle} - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+                    
+                    all_analyses = await self.run_cycle(fetcher)
+                    
+                    if all_analyses:
+                        self.maintain_storage(all_analyses)
+                        self.save_analysis(all_analyses)
+                    
+                    elapsed = time.monotonic() - started
+                    logger.info(f"✅ Ciclo #{cycle} concluído em {elapsed:.2f}s. Próximo em {self.cycle_interval} segundos...")
+                    await asyncio.sleep(self.cycle_interval)
+        finally:
+            self.analysis_stage.shutdown()
+            self.writer.close()
+
+    def run(self):
+        """Executa o bot continuamente."""
+        asyncio.run(self.run_async())
 
 if __name__ == "__main__":
     try:
@@ -197,7 +327,11 @@ if __name__ == "__main__":
         log_dir = Path('logs')
         log_dir.mkdir(exist_ok=True)
         
-        bot = MariaHelenaAnalystBot()
+        bot = MariaHelenaAnalystBot(
+            workers=int(os.getenv('ANALYST_WORKERS', '0')),
+            executor_kind=os.getenv('ANALYST_EXECUTOR', 'process'),
+            retention_months=int(os.getenv('ANALYST_RETENTION_MONTHS', '0')) or None
+        )
         bot.run()
     except KeyboardInterrupt:
         logger.info("\n🛑 Bot interrompido pelo usuário.")
@@ -9,6 +9,11 @@ from pathlib import Path
 from datetime import datetime
 from typing import Optional
 
+from data.storage import configure_connection
+from data.partitions import (
+    apply_retention, is_partitioned, list_partitions, live_since, migrate_to_partitions
+)
+
 # ==========================================
 # CONFIGURAÇÃO
 # ==========================================
@@ -39,64 +44,73 @@ def ensure_directory() -> bool:
         return False
 
 
+def create_market_analysis_table(cursor: sqlite3.Cursor) -> None:
+    """Cria a tabela única market_analysis_v2 e seus índices"""
+    # Tabela principal de análise de mercado
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS market_analysis_v2 (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            asset TEXT NOT NULL,
+            timestamp INTEGER NOT NULL,  -- Unix timestamp para melhor performance
+            price REAL NOT NULL CHECK(price > 0),
+            volume REAL CHECK(volume >= 0),
+            
+            -- Indicadores técnicos
+            rsi REAL CHECK(rsi BETWEEN 0 AND 100),
+            bb_upper REAL,
+            bb_lower REAL,
+            bb_middle REAL,
+            macd REAL,
+            macd_signal REAL,
+            macd_histogram REAL,
+            sma REAL,
+            obv REAL,
+            
+            -- Análise
+            trend TEXT CHECK(trend IN ('BULLISH', 'BEARISH', 'NEUTRAL', 'UNKNOWN')),
+            signal TEXT CHECK(signal IN ('BUY', 'SELL', 'HOLD', NULL)),
+            confidence REAL CHECK(confidence BETWEEN 0 AND 1),
+            
+            -- Metadados
+            created_at INTEGER DEFAULT (strftime('%s', 'now')),
+            
+            -- Constraint de unicidade
+            UNIQUE(asset, timestamp)
+        )
+    """)
+    logger.info("✅ Tabela 'market_analysis_v2' criada/verificada")
+    
+    # Criar índices para performance
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_asset_timestamp 
+        ON market_analysis_v2(asset, timestamp DESC)
+    """)
+    logger.info("✅ Índice 'idx_asset_timestamp' criado")
+    
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_timestamp 
+        ON market_analysis_v2(timestamp DESC)
+    """)
+    logger.info("✅ Índice 'idx_timestamp' criado")
+    
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_signal 
+        ON market_analysis_v2(signal, timestamp DESC) 
+        WHERE signal IS NOT NULL
+    """)
+    logger.info("✅ Índice 'idx_signal' criado")
+
+
 def create_tables(conn: sqlite3.Connection) -> bool:
     """Cria todas as tabelas necessárias com índices e constraints"""
     cursor = conn.cursor()
     
     try:
-        # Tabela principal de análise de mercado
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS market_analysis_v2 (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                asset TEXT NOT NULL,
-                timestamp INTEGER NOT NULL,  -- Unix timestamp para melhor performance
-                price REAL NOT NULL CHECK(price > 0),
-                volume REAL CHECK(volume >= 0),
-                
-                -- Indicadores técnicos
-                rsi REAL CHECK(rsi BETWEEN 0 AND 100),
-                bb_upper REAL,
-                bb_lower REAL,
-                bb_middle REAL,
-                macd REAL,
-                macd_signal REAL,
-                macd_histogram REAL,
-                sma REAL,
-                obv REAL,
-                
-                -- Análise
-                trend TEXT CHECK(trend IN ('BULLISH', 'BEARISH', 'NEUTRAL', 'UNKNOWN')),
-                signal TEXT CHECK(signal IN ('BUY', 'SELL', 'HOLD', NULL)),
-                confidence REAL CHECK(confidence BETWEEN 0 AND 1),
-                
-                -- Metadados
-                created_at INTEGER DEFAULT (strftime('%s', 'now')),
-                
-                -- Constraint de unicidade
-                UNIQUE(asset, timestamp)
-            )
-        """)
-        logger.info("✅ Tabela 'market_analysis_v2' criada/verificada")
-        
-        # Criar índices para performance
-        cursor.execute("""
-            CREATE INDEX IF NOT EXISTS idx_asset_timestamp 
-            ON market_analysis_v2(asset, timestamp DESC)
-        """)
-        logger.info("✅ Índice 'idx_asset_timestamp' criado")
-        
-        cursor.execute("""
-            CREATE INDEX IF NOT EXISTS idx_timestamp 
-            ON market_analysis_v2(timestamp DESC)
-        """)
-        logger.info("✅ Índice 'idx_timestamp' criado")
-        
-        cursor.execute("""
-            CREATE INDEX IF NOT EXISTS idx_signal 
-            ON market_analysis_v2(signal, timestamp DESC) 
-            WHERE signal IS NOT NULL
-        """)
-        logger.info("✅ Índice 'idx_signal' criado")
+        if is_partitioned(conn):
+            # market_analysis_v2 é uma VIEW sobre partições mensais
+            logger.info("✅ 'market_analysis_v2' particionada: partições verificadas")
+        else:
+            create_market_analysis_table(cursor)
         
         # Tabela de configurações
         cursor.execute("""
@@ -165,7 +179,7 @@ def verify_database(conn: sqlite3.Connection) -> bool:
         # Verificar tabelas
         cursor.execute("""
             SELECT name FROM sqlite_master 
-            WHERE type='table' 
+            WHERE type IN ('table', 'view') 
             ORDER BY name
         """)
         tables = [row[0] for row in cursor.fetchall()]
@@ -212,23 +226,44 @@ def get_database_stats(conn: sqlite3.Connection) -> dict:
         # Tamanho do arquivo
         stats['db_size_mb'] = DB_PATH.stat().st_size / (1024 * 1024)
         
-        # Contagem de registros
-        cursor.execute("SELECT COUNT(*) FROM market_analysis_v2")
-        stats['total_records'] = cursor.fetchone()[0]
-        
-        # Registros por asset
-        cursor.execute("""
-            SELECT asset, COUNT(*) 
-            FROM market_analysis_v2 
-            GROUP BY asset
-        """)
-        stats['records_by_asset'] = dict(cursor.fetchall())
-        
-        # Último registro
-        cursor.execute("""
-            SELECT MAX(timestamp) 
-            FROM market_analysis_v2
-        """)
+        if is_partitioned(conn):
+            # Contagens pelo rollup diário: sem varrer as linhas de 1m. A
+            # retenção preserva os rollups, então só contam os dias a partir
+            # do dado mais antigo que ainda está nas partições
+            since = live_since(conn)
+            if since is None:
+                since = int(datetime.now().timestamp()) + 86400  # partições vazias: nada conta
+            cursor.execute("SELECT COALESCE(SUM(samples), 0) FROM market_rollup_1d WHERE bucket >= ?", (since,))
+            stats['total_records'] = cursor.fetchone()[0]
+            
+            cursor.execute("""
+                SELECT asset, SUM(samples) 
+                FROM market_rollup_1d 
+                WHERE bucket >= ?
+                GROUP BY asset
+            """, (since,))
+            stats['records_by_asset'] = dict(cursor.fetchall())
+            
+            cursor.execute("SELECT MAX(last_ts) FROM market_rollup_1d WHERE bucket >= ?", (since,))
+            stats['partitions'] = list_partitions(conn)
+        else:
+            # Contagem de registros
+            cursor.execute("SELECT COUNT(*) FROM market_analysis_v2")
+            stats['total_records'] = cursor.fetchone()[0]
+            
+            # Registros por asset
+            cursor.execute("""
+                SELECT asset, COUNT(*) 
+                FROM market_analysis_v2 
+                GROUP BY asset
+            """)
+            stats['records_by_asset'] = dict(cursor.fetchall())
+            
+            # Último registro
+            cursor.execute("""
+                SELECT MAX(timestamp) 
+                FROM market_analysis_v2
+            """)
         last_ts = cursor.fetchone()[0]
         if last_ts:
             stats['last_record_time'] = datetime.fromtimestamp(last_ts).isoformat()
@@ -266,13 +301,16 @@ def optimize_database(conn: sqlite3.Connection) -> bool:
 # FUNÇÃO PRINCIPAL
 # ==========================================
 
-def create_database(verify: bool = True, optimize: bool = False) -> bool:
+def create_database(verify: bool = True, optimize: bool = False,
+                    partition: bool = False, retention_months: Optional[int] = None) -> bool:
     """
     Cria e configura o banco de dados completo
     
     Args:
         verify: Se True, verifica a integridade após criação
         optimize: Se True, otimiza o banco após criação
+        partition: Se True, converte market_analysis_v2 em partições mensais + rollups
+        retention_months: Se definido, remove partições mais antigas que N meses
     
     Returns:
         bool: True se sucesso, False caso contrário
@@ -293,6 +331,10 @@ def create_database(verify: bool = True, optimize: bool = False) -> bool:
         # Habilitar foreign keys
         conn.execute("PRAGMA foreign_keys = ON")
         
+        # WAL (persistente no arquivo) + PRAGMAs de desempenho
+        configure_connection(conn)
+        logger.info("✅ Journal mode: WAL")
+        
     except sqlite3.Error as e:
         logger.error(f"❌ Erro ao conectar: {e}")
         return False
@@ -307,6 +349,17 @@ def create_database(verify: bool = True, optimize: bool = False) -> bool:
         conn.close()
         return False
     
+    # 4.1 Particionamento e retenção
+    if partition and not migrate_to_partitions(conn):
+        conn.close()
+        return False
+    
+    if retention_months:
+        if is_partitioned(conn):
+            apply_retention(conn, retention_months)
+        else:
+            logger.warning("⚠️ Retenção por partição requer --partition")
+    
     # 5. Verificar integridade
     if verify:
         if not verify_database(conn):
@@ -353,6 +406,7 @@ Exemplos de uso:
   python create_db.py --verify           # Com verificação de integridade
   python create_db.py --optimize         # Com otimização
   python create_db.py --verify --optimize # Completo
+  python create_db.py --partition --retention-months 12  # Particionado, 12 meses
         """
     )
     
@@ -368,6 +422,19 @@ Exemplos de uso:
         help='Otimizar banco após criação'
     )
     
+    parser.add_argument(
+        '--partition',
+        action='store_true',
+        help='Particionar market_analysis_v2 por mês (VIEW + rollups 5m/1h/1d)'
+    )
+    
+    parser.add_argument(
+        '--retention-months',
+        type=int,
+        default=None,
+        help='Remover partições mais antigas que N meses'
+    )
+    
     parser.add_argument(
         '--verbose',
         action='store_true',
@@ -381,7 +448,9 @@ Exemplos de uso:
     
     success = create_database(
         verify=args.verify,
-        optimize=args.optimize
+        optimize=args.optimize,
+        partition=args.partition,
+        retention_months=args.retention_months
     )
     
     exit(0 if success else 1)
@@ -11,8 +11,8 @@
 🤖 MARIA HELENA Trading Bot v0.2
 """
 # Standard library imports
-import time
 import logging
+import threading
 from datetime import datetime
 from typing import Dict, Any, Optional, List
 import os
@@ -32,13 +32,20 @@ load_dotenv()
 # Local imports
 from config import CONFIG  # Ensure CONFIG is imported after load_dotenv
 from protection.risk_manager import RiskManager
+from protection.portfolio_risk import PortfolioRiskManager
 from protection.technical_guard import TechnicalGuard
+from protection.health_monitor import ExchangeHealthMonitor
 from protection.circuit_breaker import CircuitBreaker
 from strategies.mentor_signal_processor import MentorSignalProcessor
 from data.normalizer import Normalizer
 from strategies.rsi_volume_strategy import RSIVolumeStrategy
 from protection.cash_gate.cash_gate import CashGate
 from core.orders.order_manager import OrderManager
+from core.exit_monitor import ExitMonitor
+from core.paper_exchange import PaperExchange, create_paper_exchange
+from core.replay import RecordingExchange, ReplayExchange, ReplayFinished
+from core.scheduler import CandleScheduler, closed_candles, timeframe_seconds
+from data.kline_stream import StreamingSource
 
 # Configure logging
 logging.basicConfig(
@@ -86,11 +93,23 @@ class MariaHelenaBot:
         self.capital: float = config['INITIAL_CAPITAL']  # Initial capital for tracking purposes
         self.current_balance: float = self.capital  # This would be updated from exchange for live trading
 
-        self.exchange = self._initialize_exchange()
+        # Dados de mercado: exchange real, gravação ou replay. Fora do modo AO
+        # VIVO, as ordens vão para a exchange de papel sobre ela
+        self.market_exchange = self._initialize_exchange()
+        self.paper: Optional[PaperExchange] = None
+        if not self.live_mode:
+            self.paper = create_paper_exchange(self.config, self.market_exchange, self.symbol)
+        self.exchange = self.paper or self.market_exchange
+        self.scheduler: CandleScheduler = self._build_scheduler()
+        self.exit_monitor: Optional[ExitMonitor] = None  # sobe depois do OrderManager; o stream já entrega ticks
+        self.stream: Optional[StreamingSource] = self._start_stream()
+        self.last_candle_time: Optional[float] = None  # open_time do último candle fechado analisado
         
         # Initialize protection modules
-        self.risk_manager: RiskManager = RiskManager(self.config)
-        self.technical_guard: TechnicalGuard = TechnicalGuard()
+        self.portfolio: PortfolioRiskManager = PortfolioRiskManager(self.config)  # índice de stops/alvos
+        self.risk_manager: RiskManager = RiskManager(self.config, self.portfolio, self.symbol)
+        self.health_monitor: ExchangeHealthMonitor = self._build_health_monitor()
+        self.technical_guard: TechnicalGuard = TechnicalGuard(self.health_monitor)
         self.circuit_breaker: CircuitBreaker = CircuitBreaker(self.config)
         self.cash_gate: CashGate = CashGate(self.config["INITIAL_CAPITAL"])
         
@@ -108,8 +127,11 @@ class MariaHelenaBot:
             self.risk_manager, 
             self.technical_guard, 
             self.circuit_breaker, 
-            self.cash_gate
+            self.cash_gate,
+            symbol=self.symbol
         )
+        self.order_lock = threading.Lock()  # loop principal e monitor de saídas não operam ao mesmo tempo
+        self.exit_monitor = self._build_exit_monitor()
 
         self._print_startup_panel()
         logger.info(f"Maria Helena Bot inicializado para {self.symbol} ({self.timeframe}) no modo {'AO VIVO' if self.live_mode else 'TESTE'}.")
@@ -118,7 +140,15 @@ class MariaHelenaBot:
         """
         Inicializa a instância da exchange CCXT.
         Carrega chaves de API do ambiente ou usa valores padrão.
+
+        Com MARKET_REPLAY_FILE, usa a ReplayExchange (offline, respostas
+        gravadas); com MARKET_RECORD_FILE, grava as respostas da exchange real.
         """
+        if self.config.get('MARKET_REPLAY_FILE'):
+            exchange = ReplayExchange(self.config['MARKET_REPLAY_FILE'], self.config.get('MARKET_REPLAY_SPEED', 0))
+            logger.info(f"📼 Replay offline de {self.config['MARKET_REPLAY_FILE']}")
+            return self._connect_exchange(exchange)
+
         exchange_class = getattr(ccxt, self.exchange_name)
         
         exchange_params: Dict[str, Any] = {
@@ -148,7 +178,12 @@ class MariaHelenaBot:
             sys.exit(1)
         
         exchange = exchange_class(exchange_params)
+        if self.config.get('MARKET_RECORD_FILE'):
+            exchange = RecordingExchange(exchange, self.config['MARKET_RECORD_FILE'])
+        return self._connect_exchange(exchange)
 
+    def _connect_exchange(self, exchange: Any) -> Any:
+        """Carrega mercados (e saldo, no modo AO VIVO); encerra o bot se falhar."""
         try:
             exchange.load_markets()
             logger.info(f"Conectado à exchange: {self.exchange_name.upper()} (Testnet: {self.config['TESTNET']})")
@@ -163,20 +198,112 @@ class MariaHelenaBot:
             
         return exchange
 
+    def _build_scheduler(self) -> CandleScheduler:
+        """Agendador por fechamento de candle (no replay, relógio e espera vêm da gravação)."""
+        offset = self.config.get('CANDLE_CLOSE_OFFSET', 0.0)
+        if isinstance(self.market_exchange, ReplayExchange):
+            scheduler = CandleScheduler(offset, clock=lambda: self.market_exchange.milliseconds() / 1000,
+                                        sleep=self.market_exchange.wait)
+        else:
+            scheduler = CandleScheduler(offset)
+        scheduler.add((self.symbol, self.timeframe), self.timeframe)
+        return scheduler
+
+    def _build_health_monitor(self) -> ExchangeHealthMonitor:
+        """
+        Status da exchange em cache para o caminho da ordem.
+
+        Na gravação/replay não há thread: o status é renovado sob demanda pelo
+        relógio da exchange, e as chamadas a fetch_status coincidem nos dois lados.
+        """
+        max_age = self.config.get('HEALTH_MAX_AGE', 60.0)
+        if isinstance(self.market_exchange, (ReplayExchange, RecordingExchange)):
+            return ExchangeHealthMonitor(self.exchange, interval=0, max_age=max_age,
+                                         clock=lambda: self.market_exchange.milliseconds() / 1000)
+        monitor = ExchangeHealthMonitor(self.exchange, self.config.get('HEALTH_CHECK_INTERVAL', 15.0), max_age)
+        return monitor.start()
+
+    def _start_stream(self) -> Optional[StreamingSource]:
+        """Fonte por WebSocket (DATA_SOURCE='stream'); se não subir, segue no polling."""
+        if self.config.get('DATA_SOURCE') != 'stream' or isinstance(self.market_exchange, ReplayExchange):
+            return None
+        stream = StreamingSource(
+            [(self.symbol, self.timeframe)],
+            url=self.config['STREAM_URL'],
+            rest_url=self.config['STREAM_REST_URL'],
+            buffer_size=self.config['LOOKBACK_PERIOD'] + 50,
+            on_trade=self._on_tick,
+            trade_symbols=[self.symbol] if self.config.get('EXIT_MONITOR', True) else [],
+        )
+        try:
+            stream.start()
+        except Exception as e:
+            logger.warning(f"📡 Stream de klines indisponível ({e}); usando polling.")
+            return None
+        logger.info(f"📡 Velas de {self.symbol} ({self.timeframe}) via WebSocket")
+        return stream
+
+    def _build_exit_monitor(self) -> Optional[ExitMonitor]:
+        """
+        Stop/alvo pelo preço corrente numa thread própria: negócios do stream
+        ou, no polling, fetch_ticker a cada EXIT_POLL_INTERVAL. Na
+        gravação/replay fica desligado (as respostas gravadas não têm esses
+        tickers): os níveis são checados no fechamento do candle.
+        """
+        if not self.config.get('EXIT_MONITOR', True) or \
+                isinstance(self.market_exchange, (ReplayExchange, RecordingExchange)):
+            return None
+        monitor = ExitMonitor(self.portfolio, self._exit_position).start()
+        if self.stream is None:
+            monitor.poll(self.market_exchange.fetch_ticker, self.config.get('EXIT_POLL_INTERVAL', 1.0))
+        return monitor
+
+    def _on_tick(self, symbol: str, price: float, amount: float, timestamp: float) -> None:
+        """Negócio do stream (thread do stream): só consulta o índice; a saída roda no monitor."""
+        if self.exit_monitor is not None:
+            self.exit_monitor.on_price(symbol, price, timestamp)
+
+    def _exit_position(self, hit: Dict[str, Any], price: float, timestamp: float) -> bool:
+        """Fecha a posição cujo stop/alvo foi cruzado (monitor de saídas ou fechamento do candle)."""
+        with self.order_lock:
+            if not self.risk_manager.is_in_position:
+                return True  # já fechada por um sinal de venda
+            if self.paper is not None:
+                self.paper.update_market(int(timestamp), price, hit['symbol'])
+            signal = {'action': 'SELL', 'symbol': hit['symbol'], 'price': price, 'timestamp': timestamp,
+                      'reason': hit['reason']}
+            order = self.order_manager.close_position(price, signal, hit['reason'])
+        if order is None:
+            return False
+        console.print(f"[yellow]🎯 {hit['reason']}: posição fechada @ {price:,.2f} (PnL {order['pnl']:+.2f})[/yellow]")
+        return True
+
+    def _check_exits(self, candle: List[float]) -> None:
+        """Stop/alvo pela máxima/mínima do candle fechado (o que o monitor não viu, ex: replay)."""
+        for hit in self.portfolio.triggered(self.symbol, candle[3], candle[2]):
+            if not self._exit_position(hit, candle[4], candle[0]):
+                self.portfolio.arm(hit['key'])
+
     def _fetch_ohlcv(self) -> Optional[List[List[float]]]:
         """
         Busca os dados OHLCV (Open, High, Low, Close, Volume) da exchange.
+        Devolve só velas fechadas (a vela em formação é descartada).
+        Com o stream ativo, lê o buffer em memória (sem REST).
         """
+        if self.stream is not None:
+            ohlcv = self.stream.candles(self.symbol, self.timeframe)
+            return ohlcv[-(self.config['LOOKBACK_PERIOD'] + 5):] or None
         try:
             ohlcv = self.exchange.fetch_ohlcv(
                 self.symbol,
                 self.timeframe,
-                limit=self.config['LOOKBACK_PERIOD'] + 5
+                limit=self.config['LOOKBACK_PERIOD'] + 6
             )
+            ohlcv = closed_candles(ohlcv or [], self.timeframe, self.scheduler.clock())
             if not ohlcv:
                 console.print(f"[yellow]⚠️ Nenhum dado OHLCV recebido para {self.symbol}.[/yellow]")
                 return None
-            return ohlcv
+            return ohlcv[-(self.config['LOOKBACK_PERIOD'] + 5):]
         except ccxt.NetworkError as e:
             console.print(f"[red]❌ Erro de rede ao buscar OHLCV: {e}[/red]")
             logger.warning(f"Erro de rede ao buscar OHLCV: {e}")
@@ -254,10 +381,18 @@ class MariaHelenaBot:
         if current_price <= 0:
             logger.error("Preço inválido no sinal")
             return
-        
-        # 2. Calcula tamanho da posição
+
+        if action == 'SELL':
+            # Spot: venda só fecha a posição aberta (saídas não passam pelo CashGate)
+            self._close_on_signal(signal, current_price)
+            return
+
+        # 2. Calcula tamanho da posição. No modo AO VIVO, pelo saldo da
+        #    exchange; no papel, pelo capital do CashGate (é sobre ele que o
+        #    limite por posição é checado, e ele acompanha ganhos e perdas)
+        capital = self.current_balance if self.live_mode else self.cash_gate.current_capital
         position_size_usd = self.risk_manager.calculate_position_size(
-            self.current_balance, 
+            capital,
             signal
         )
         
@@ -272,32 +407,49 @@ class MariaHelenaBot:
             logger.warning(f"🚫 CashGate bloqueou: {reason}")
             return
         
-        # 4. Reserva o capital
-        if not self.cash_gate.reserve(position_size_usd):
+        # 4. Reserva o capital (o OrderManager faz a própria reserva da ordem;
+        #    esta segura o valor enquanto ela é validada e é sempre devolvida)
+        reservation_id = self.cash_gate.reserve(position_size_usd)
+        if reservation_id is None:
             logger.error("Falha ao reservar capital no CashGate")
             return
         
         # 5. Executa ordem via OrderManager
         try:
-            order = self.order_manager.execute_order(
-                action=action,
-                amount=position_size_usd / current_price,
-                price=current_price,
-                signal=signal
-            )
+            with self.order_lock:
+                order = self.order_manager.execute_order(
+                    action=action,
+                    amount=position_size_usd / current_price,
+                    price=current_price,
+                    signal=signal
+                )
             
             if order:
                 console.print(f"[green]✅ Ordem executada: {order.get('id', 'N/A')}[/green]")
                 logger.info(f"Ordem executada com sucesso: {order}")
             else:
-                self.cash_gate.release(position_size_usd)
                 console.print("[red]❌ Falha ao executar ordem[/red]")
                 logger.error("OrderManager retornou None")
         
         except Exception as e:
-            self.cash_gate.release(position_size_usd)
             logger.error(f"Erro ao executar ordem: {e}", exc_info=True)
             console.print(f"[red]❌ Erro: {e}[/red]")
+        finally:
+            self.cash_gate.release(reservation_id)
+
+    def _close_on_signal(self, signal: Dict[str, Any], price: float) -> None:
+        """Sinal de VENDA da estratégia: fecha a posição aberta, como as saídas do monitor."""
+        with self.order_lock:
+            if not self.risk_manager.is_in_position:
+                logger.info("Sinal de VENDA sem posição aberta: nada a fechar")
+                return
+            order = self.order_manager.close_position(price, signal, signal.get('reason', ''))
+        if order is None:
+            console.print("[red]❌ Falha ao fechar posição[/red]")
+            logger.error("OrderManager não fechou a posição no sinal de VENDA")
+            return
+        console.print(f"[yellow]🔴 Sinal de venda: posição fechada @ {price:,.2f} (PnL {order['pnl']:+.2f})[/yellow]")
+        logger.info(f"Posição fechada pelo sinal de venda: {order}")
 
     def _print_startup_panel(self) -> None:
         """Exibe um painel de informações na inicialização do bot."""
@@ -342,11 +494,28 @@ class MariaHelenaBot:
     def run(self) -> None:
         """
         Executa o loop principal do bot, buscando dados, analisando e processando sinais.
+
+        O loop acorda no fechamento de cada candle (CandleScheduler, ou o
+        evento de fechamento do stream) e só analisa quando há candle
+        fechado novo. No polling, se os dados falham ou a exchange ainda não
+        tem o candle, tenta de novo após CHECK_INTERVAL (sem passar do
+        próximo fechamento).
         """
+        period_ms = timeframe_seconds(self.timeframe) * 1000
         while True:
+            retry = False
             try:
                 ohlcv_data = self._fetch_ohlcv()
-                if ohlcv_data:
+                retry = ohlcv_data is None
+                if ohlcv_data and ohlcv_data[-1][0] == self.last_candle_time:
+                    # Nada novo: exchange atrasada (tenta de novo) ou candle já analisado
+                    retry = ohlcv_data[-1][0] + period_ms < self.scheduler.last_close(self.timeframe) * 1000
+                    logger.debug(f"Sem candle novo para {self.symbol} ({'atrasado' if retry else 'já analisado'})")
+                elif ohlcv_data:
+                    self.last_candle_time = ohlcv_data[-1][0]
+                    if self.paper is not None:
+                        self.paper.on_candle(self.symbol, ohlcv_data[-1])
+                    self._check_exits(ohlcv_data[-1])
                     signal = self._analyze_strategy(ohlcv_data)
                     self._process_signal(signal)
                     
@@ -363,31 +532,52 @@ class MariaHelenaBot:
                         logger.warning(f"Erro ao atualizar saldo: {e}")
             
             except ccxt.NetworkError as e:
+                retry = True
                 console.print(f"[red]❌ Erro de rede: {e}[/red]")
                 logger.warning(f"Erro de rede, tentando novamente em {self.check_interval}s. {e}")
             except ccxt.ExchangeError as e:
+                retry = True
                 console.print(f"[red]❌ Erro da exchange: {e}[/red]")
                 logger.error(f"Erro da exchange, tentando novamente em {self.check_interval}s. {e}")
             except Exception as e:
                 console.print(f"[red]❌ Erro inesperado no loop principal: {e}[/red]")
                 logger.exception("Erro não tratado no loop principal")
 
-            console.print(f"\n[dim]Aguardando {self.check_interval} segundos...[/dim]")
-            time.sleep(self.check_interval)
+            if self.stream is not None:
+                # Fechamento chega pelo stream (gaps e reconexão são tratados lá)
+                self.stream.wait_close(timeout=period_ms / 1000 + self.check_interval)
+            elif retry:
+                delay = min(self.check_interval, self.scheduler.seconds_until_next())
+                console.print(f"\n[dim]Nova tentativa em {delay:.0f} segundos...[/dim]")
+                self.scheduler.sleep(delay)
+            else:
+                console.print(f"\n[dim]Aguardando fechamento do candle ({self.scheduler.seconds_until_next():.0f}s)...[/dim]")
+                self.scheduler.wait()
 
 
 def main() -> None:
     """Função principal de entrada do bot."""
+    bot = None
     try:
         bot = MariaHelenaBot()
         bot.run()
     except KeyboardInterrupt:
         console.print("\n[cyan]🛑 Bot interrompido pelo usuário.[/cyan]")
         logger.info("Bot interrompido pelo usuário.")
+    except ReplayFinished as e:
+        console.print(f"\n[cyan]📼 Replay concluído: {e}[/cyan]")
+        logger.info(f"Replay concluído: {e}")
     except Exception as e:
         console.print(f"[red]❌ Erro fatal: {e}[/red]")
         logger.exception("Erro fatal não tratado no main.")
     finally:
+        if bot is not None and bot.stream is not None:
+            bot.stream.stop()
+        if bot is not None and bot.exit_monitor is not None:
+            bot.exit_monitor.stop()
+        if bot is not None:
+            bot.health_monitor.stop()
+            bot.cash_gate.close()
         console.print("\n[bold blue]🚀 Maria Helena Bot encerrado.[/bold blue]")
 
 
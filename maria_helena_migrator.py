@@ -1,15 +1,23 @@
 #!/usr/bin/env python3
 # ARQUIVO: maria_helena_migrator.py
 # FUNÇÃO NO ECOSSISTEMA MARIA HELENA:
-# Realiza a migração de dados (ETL) de um arquivo CSV legado
-# para o novo banco de dados SQLite v2.0.
+# Realiza a migração de dados (ETL) de arquivos CSV legados
+# para o novo banco de dados SQLite v2.0, em lotes de tamanho fixo,
+# com checkpoint por arquivo (retomável) e arquivos em paralelo.
 
 import csv
+import io
+import json
 import sqlite3
 import logging
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 from datetime import datetime
 
+from data.storage import connect
+from data.partitions import BASE_TABLE, ensure_partitions, is_partitioned, partition_name
+
 # ==========================================
 # CONFIGURAÇÃO
 # ==========================================
@@ -24,6 +32,12 @@ logger = logging.getLogger('MariaHelena.Migrator')
 CSV_SOURCE_PATH = Path('./maria-helena-scripts/maria_helena_data.csv')
 DB_DEST_PATH = Path.home() / 'maria-helena' / 'data' / 'maria_helena_signals.db'
 
+# Ativo padrão quando não dá para deduzir pelo nome do arquivo
+DEFAULT_ASSET = 'BTCUSDT'
+
+# Linhas por transação (cada lote grava dados + checkpoint juntos)
+CHUNK_SIZE = 5000
+
 # Mapeamento de colunas CSV -> DB
 # Formato: 'coluna_db': 'coluna_csv'
 COLUMN_MAPPING = {
@@ -37,6 +51,12 @@ COLUMN_MAPPING = {
     'obv': 'obv',
 }
 
+INSERT_SQL = """
+    INSERT OR IGNORE INTO market_analysis_v2 
+    (asset, timestamp, price, volume, rsi, bb_upper, bb_lower, macd, macd_signal, obv, trend)
+    VALUES (:asset, :timestamp, :price, :volume, :rsi, :bb_upper, :bb_lower, :macd, :macd_signal, :obv, :trend)
+"""
+
 # ==========================================
 # SCRIPT DE MIGRAÇÃO
 # ==========================================
@@ -50,89 +70,227 @@ def safe_float(value: str, default: float = 0.0) -> float:
     except (ValueError, TypeError):
         return default
 
-def migrate_data():
-    """Executa o processo de migração de dados."""
+
+def checkpoint_key(csv_path: Path) -> str:
+    return f"migration_checkpoint:{Path(csv_path).resolve()}"
+
+
+def load_checkpoint(conn: sqlite3.Connection, csv_path: Path) -> dict:
+    """Lê o checkpoint (offset em bytes) salvo em system_config."""
+    row = conn.execute("SELECT value FROM system_config WHERE key = ?", (checkpoint_key(csv_path),)).fetchone()
+    return json.loads(row[0]) if row else {}
+
+
+def save_checkpoint(conn: sqlite3.Connection, csv_path: Path, checkpoint: dict) -> None:
+    conn.execute(
+        "INSERT OR REPLACE INTO system_config (key, value, updated_at) VALUES (?, ?, strftime('%s', 'now'))",
+        (checkpoint_key(csv_path), json.dumps(checkpoint))
+    )
+
+
+def transform_rows(lines, header, asset, line_offset):
+    """Transforma um lote de linhas CSV (bytes) em registros para o DB (T do ETL)."""
+    reader = csv.DictReader(io.StringIO(b''.join(lines).decode('utf-8')), fieldnames=header)
+    records = []
+    for i, row in enumerate(reader):
+        # Transformar timestamp de milissegundos para segundos
+        timestamp_ms = safe_float(row.get('openTime', '0'))
+        if timestamp_ms == 0:
+            logger.warning(f"Linha {line_offset + i + 1} ignorada: timestamp inválido.")
+            continue
+        
+        new_record = {
+            'asset': asset,
+            'timestamp': int(timestamp_ms / 1000),
+            'trend': 'UNKNOWN'  # Preenchendo dados não existentes
+        }
+        
+        # Mapear e converter colunas
+        for db_col, csv_col in COLUMN_MAPPING.items():
+            new_record[db_col] = safe_float(row.get(csv_col))
+        
+        records.append(new_record)
+    return records
+
+
+def migrate_file(csv_path, asset: str, db_path=DB_DEST_PATH, chunk_size: int = CHUNK_SIZE) -> dict:
+    """
+    Migra um CSV em lotes de tamanho fixo, retomando do último checkpoint.
+
+    Cada lote é lido sob demanda (memória constante), gravado numa transação
+    própria e registra na MESMA transação o offset em bytes já processado;
+    um crash perde no máximo o lote em andamento.
+
+    Returns:
+        dict com arquivo, ativo, linhas lidas/inseridas, segundos e linhas/s
+    """
+    csv_path = Path(csv_path)
+    started = time.perf_counter()
+    stats = {'file': str(csv_path), 'asset': asset, 'rows_read': 0, 'rows_inserted': 0}
+
+    conn = connect(db_path)
+    conn.execute("PRAGMA busy_timeout = 60000")  # vários workers disputam o lock de escrita
+    partitioned = is_partitioned(conn)
+    try:
+        file_stat = csv_path.stat()
+        checkpoint = load_checkpoint(conn, csv_path)
+        if checkpoint and (checkpoint.get('size', 0) > file_stat.st_size):
+            logger.warning(f"⚠️ {csv_path.name} encolheu desde o checkpoint; recomeçando do início.")
+            checkpoint = {}
+
+        with open(csv_path, 'rb') as f:
+            header = next(csv.reader([f.readline().decode('utf-8-sig')]))
+            offset = checkpoint.get('offset', f.tell())
+            line_no = checkpoint.get('lines', 0)
+            if checkpoint:
+                logger.info(f"↩️ {csv_path.name}: retomando do byte {offset} (linha {line_no})")
+            f.seek(offset)
+
+            while True:
+                lines = []
+                for _ in range(chunk_size):
+                    line = f.readline()
+                    if not line:
+                        break
+                    if line.strip():
+                        lines.append(line)
+                if not lines:
+                    break
+
+                records = transform_rows(lines, header, asset, line_no)
+                line_no += len(lines)
+                offset = f.tell()
+
+                if partitioned and records:
+                    ensure_partitions(conn, {r['timestamp'] for r in records})
+
+                # LOAD do ETL: dados + checkpoint numa única transação
+                with conn:
+                    stats['rows_inserted'] += insert_records(conn, records, partitioned)
+                    save_checkpoint(conn, csv_path, {
+                        'offset': offset, 'lines': line_no,
+                        'size': file_stat.st_size, 'updated': datetime.now().isoformat()
+                    })
+                stats['rows_read'] += len(lines)
+    finally:
+        conn.close()
+
+    stats['seconds'] = time.perf_counter() - started
+    stats['rows_per_sec'] = stats['rows_read'] / stats['seconds'] if stats['seconds'] > 0 else 0.0
+    return stats
+
+
+def insert_records(conn: sqlite3.Connection, records, partitioned: bool) -> int:
+    """
+    Grava os registros e retorna quantos entraram (duplicatas ignoradas não
+    contam). Particionado: direto na partição de cada mês — o rowcount da
+    VIEW é sempre 0 e o total_changes soma também o que os triggers de
+    roteamento e de rollup escrevem.
+    """
+    if not partitioned:
+        return conn.executemany(INSERT_SQL, records).rowcount
+    by_partition = {}
+    for record in records:
+        by_partition.setdefault(partition_name(record['timestamp']), []).append(record)
+    return sum(conn.executemany(INSERT_SQL.replace(BASE_TABLE, name, 1), rows).rowcount
+               for name, rows in by_partition.items())
+
+
+def discover_sources(paths, default_asset: str = DEFAULT_ASSET):
+    """
+    Monta a lista [(csv, ativo), ...].
+
+    Aceita 'ATIVO=caminho', arquivos ou diretórios (todos os *.csv). Sem
+    ATIVO explícito, usa o prefixo do nome do arquivo (BTCUSDT_1m_2023.csv
+    → BTCUSDT) quando ele termina em USDT/BUSD/BTC, senão o ativo padrão.
+    """
+    sources = []
+    for spec in paths:
+        asset = None
+        spec = str(spec)
+        if '=' in spec:
+            asset, spec = spec.split('=', 1)
+        path = Path(spec)
+        files = sorted(path.glob('*.csv')) if path.is_dir() else [path]
+        for csv_file in files:
+            file_asset = asset
+            if not file_asset:
+                prefix = csv_file.stem.split('_')[0].split('-')[0].upper()
+                file_asset = prefix if prefix.endswith(('USDT', 'BUSD', 'BTC')) else default_asset
+            sources.append((csv_file, file_asset))
+    return sources
+
+
+def migrate_data(sources=None, db_path=DB_DEST_PATH, chunk_size: int = CHUNK_SIZE, workers: int = 1):
+    """Executa o processo de migração de dados (vários CSVs, em paralelo)."""
     logger.info("=" * 60)
     logger.info("🚀 Maria Helena - Iniciando Migração de Dados (ETL)")
     logger.info("=" * 60)
     
+    sources = sources if sources is not None else [(CSV_SOURCE_PATH, DEFAULT_ASSET)]
+    
     # 1. Validar arquivos de origem e destino
-    if not CSV_SOURCE_PATH.exists():
-        logger.error(f"❌ Arquivo de origem não encontrado: {CSV_SOURCE_PATH}")
-        return
-    if not DB_DEST_PATH.exists():
-        logger.error(f"❌ Banco de dados de destino não encontrado: {DB_DEST_PATH}")
+    missing = [str(path) for path, _ in sources if not Path(path).exists()]
+    for path in missing:
+        logger.error(f"❌ Arquivo de origem não encontrado: {path}")
+    sources = [(path, asset) for path, asset in sources if Path(path).exists()]
+    if not sources:
+        return []
+    if not Path(db_path).exists():
+        logger.error(f"❌ Banco de dados de destino não encontrado: {db_path}")
         logger.error("   Execute o 'maria_helena_database_creator.py' primeiro.")
-        return
+        return []
 
-    logger.info(f"Fonte: {CSV_SOURCE_PATH}")
-    logger.info(f"Destino: {DB_DEST_PATH}")
+    logger.info(f"Fontes: {len(sources)} arquivo(s) | Destino: {db_path} | Workers: {workers}")
 
-    try:
-        # 2. Conectar ao banco de dados de destino
-        conn = sqlite3.connect(DB_DEST_PATH)
-        cursor = conn.cursor()
-        
-        # 3. Ler o arquivo CSV
-        with open(CSV_SOURCE_PATH, 'r', encoding='utf-8') as csvfile:
-            reader = csv.DictReader(csvfile)
-            
-            records_to_insert = []
-            total_rows = 0
-            
-            for row in reader:
-                total_rows += 1
-                
-                # --- FASE DE TRANSFORMAÇÃO (T do ETL) ---
-                
-                # Transformar timestamp de milissegundos para segundos
-                timestamp_ms = safe_float(row.get('openTime', '0'))
-                if timestamp_ms == 0:
-                    logger.warning(f"Linha {total_rows} ignorada: timestamp inválido.")
-                    continue
-                
-                new_record = {
-                    'asset': 'BTCUSDT',  # Assumindo o ativo padrão
-                    'timestamp': int(timestamp_ms / 1000),
-                    'trend': 'UNKNOWN' # Preenchendo dados não existentes
-                }
-                
-                # Mapear e converter colunas
-                for db_col, csv_col in COLUMN_MAPPING.items():
-                    new_record[db_col] = safe_float(row.get(csv_col))
-                
-                # Adicionar à lista para inserção em lote
-                records_to_insert.append(new_record)
-
-            logger.info(f"🔎 {len(records_to_insert)} de {total_rows} registros lidos e transformados.")
-
-            # 4. Inserir os dados em lote (LOAD do ETL)
-            if records_to_insert:
-                cursor.executemany("""
-                    INSERT OR IGNORE INTO market_analysis_v2 
-                    (asset, timestamp, price, volume, rsi, bb_upper, bb_lower, macd, macd_signal, obv, trend)
-                    VALUES (:asset, :timestamp, :price, :volume, :rsi, :bb_upper, :bb_lower, :macd, :macd_signal, :obv, :trend)
-                """, records_to_insert)
-                
-                conn.commit()
-                logger.info(f"✅ {cursor.rowcount} novos registros inseridos no banco de dados.")
-            else:
-                logger.warning("⚠️ Nenhum registro novo para inserir.")
-
-    except sqlite3.Error as e:
-        logger.error(f"❌ Erro de SQLite durante a migração: {e}")
-        conn.rollback()
-    except Exception as e:
-        logger.error(f"❌ Erro inesperado: {e}")
-    finally:
-        if 'conn' in locals() and conn:
-            conn.close()
-            logger.info("�� Conexão com o banco de dados fechada.")
+    started = time.perf_counter()
+    results = []
+    if workers <= 1 or len(sources) == 1:
+        for path, asset in sources:
+            results.append(_run_file(path, asset, db_path, chunk_size))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_run_file, path, asset, db_path, chunk_size) for path, asset in sources]
+            for future in as_completed(futures):
+                results.append(future.result())
+
+    elapsed = time.perf_counter() - started
+    total_read = sum(r['rows_read'] for r in results)
+    total_inserted = sum(r['rows_inserted'] for r in results)
 
     logger.info("=" * 60)
-    logger.info("🏁 Migração de dados concluída.")
+    logger.info(f"🏁 Migração concluída: {total_read} linhas lidas, {total_inserted} inseridas "
+                f"em {elapsed:.1f}s ({total_read / elapsed if elapsed else 0:,.0f} linhas/s).")
     logger.info("=" * 60)
+    return results
+
+
+def _run_file(path, asset, db_path, chunk_size):
+    """Wrapper para o pool: loga o resultado e nunca propaga exceção."""
+    try:
+        stats = migrate_file(path, asset, db_path, chunk_size)
+        logger.info(f"✅ {Path(path).name} [{asset}]: {stats['rows_inserted']} novos de {stats['rows_read']} lidos "
+                    f"({stats['rows_per_sec']:,.0f} linhas/s)")
+        return stats
+    except (sqlite3.Error, OSError, ValueError) as e:
+        logger.error(f"❌ Erro migrando {path}: {e}")
+        return {'file': str(path), 'asset': asset, 'rows_read': 0, 'rows_inserted': 0, 'error': str(e)}
 
 
 if __name__ == "__main__":
-    migrate_data()
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Maria Helena - Migrador CSV → SQLite')
+    parser.add_argument('sources', nargs='*',
+                        help="CSVs ou diretórios; use ATIVO=caminho para fixar o ativo")
+    parser.add_argument('--db', type=Path, default=DB_DEST_PATH, help='Banco de destino')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='Linhas por transação')
+    parser.add_argument('--workers', type=int, default=1, help='Arquivos processados em paralelo')
+    args = parser.parse_args()
+
+    migrate_data(
+        sources=discover_sources(args.sources) if args.sources else None,
+        db_path=args.db,
+        chunk_size=args.chunk_size,
+        workers=args.workers
+    )
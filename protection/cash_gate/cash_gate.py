@@ -2,13 +2,16 @@
 
 from __future__ import annotations
 
-import json
+import heapq
+import itertools
 import threading
+import time
 from pathlib import Path
-from typing import Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
 # Importar CONFIG para acessar max_position_size
 from config import CONFIG
+from protection.cash_gate.ledger import CashLedger
 import logging
 
 # Configuração de logging para o CashGate
@@ -16,130 +19,426 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 logger = logging.getLogger(__name__)
 
 STATE_PATH = Path("cash_gate_state.json")
+EPSILON = 1e-9
+
+
+class ReservationConflict(Exception):
+    """O capital mudou entre a leitura (capital_version) e a reserva: recalcular e tentar de novo."""
 
 
 class CashGate:
-    def __init__(self, initial_capital: float = 0.0) -> None:
-        self._lock = threading.Lock()
+    """
+    Capital, reservas por ID e persistência por write-ahead log.
+
+    Cada mutação (reserva, liberação, commit, depósito, expiração) vira um
+    registro no ledger (protection/cash_gate/ledger.py): o lock só cobre a
+    conta em memória e o enfileiramento do registro; a gravação e o fsync
+    (em lote) ficam na thread do ledger. Com sync=True, a chamada só retorna
+    depois do registro estar em disco — esperando fora do lock.
+
+    O estado é o snapshot em state_path (mesmo arquivo JSON de antes) mais o
+    log em <state_path>.wal; reservas abertas sobrevivem a um reinício.
+
+    Reservas:
+    - reserve() devolve o ID da reserva; release(id) e commit(valor, id)
+      mexem exatamente naquela reserva. Valores sem ID (API antiga) consomem
+      as reservas mais recentes
+    - Compare-and-reserve: capital_version() → (versão, capital); o chamador
+      dimensiona a ordem com esse capital e reserva com expected_version. Se
+      um commit/depósito mudou o capital no meio, ReservationConflict
+    - Sub-orçamento por símbolo: reservado + gasto em posições abertas do
+      símbolo <= symbol_budget_pct × capital (set_symbol_budget por símbolo)
+    - TTL: reserva de ordem nunca confirmada (processo travou, resposta
+      perdida) expira sozinha e volta ao disponível
+    - Lock reentrante (RLock): métodos públicos podem chamar uns aos outros
+    """
+
+    def __init__(self, initial_capital: float = 0.0, state_path: Optional[Path] = STATE_PATH,
+                 sync: bool = True, snapshot_every: int = 1000, reservation_ttl: Optional[float] = None,
+                 symbol_budget_pct: Optional[float] = None, clock: Callable[[], float] = time.time) -> None:
+        # state_path=None: só em memória (ex: backtest)
+        self.state_path = Path(state_path) if state_path else None
+        self.sync = sync
+        self.clock = clock
+        self._lock = threading.RLock()
         self.current_capital: float = float(initial_capital)
-        # _reserved: soma dos valores reservados para ordens pendentes
+        # _reserved: soma dos valores reservados para ordens pendentes (= soma de _reservations)
         self._reserved: float = 0.0
-        
+        self._reservations: Dict[str, List[Any]] = {}  # id → [valor, símbolo, expira_em]
+        self._expiry: List[Tuple[float, str]] = []    # heap (expira_em, id)
+        self._symbol_reserved: Dict[str, float] = {}
+        self._symbol_spent: Dict[str, float] = {}     # custo das posições abertas por símbolo
+        self._version = 0                             # muda a cada commit/depósito
+        self._seq = 0
+        self._ids = itertools.count(1)
+
         # --- REGRA DE NEGÓCIO INTRODUZIDA NO CASHGATE ---
         # Pega do CONFIG, default 3% se não estiver definido
-        self.max_position_size_pct = CONFIG.get('max_position_size', 0.03) 
+        self.max_position_size_pct = CONFIG.get('max_position_size', 0.03)
         # --- FIM REGRA DE NEGÓCIO ---
+        self.reservation_ttl = CONFIG.get('CASH_RESERVATION_TTL') if reservation_ttl is None else reservation_ttl
+        self.symbol_budget_pct = CONFIG.get('CASH_SYMBOL_BUDGET_PCT') if symbol_budget_pct is None \
+            else symbol_budget_pct
+        self._symbol_budgets: Dict[str, float] = {}
+        self.stats = {'reserved': 0, 'rejected': 0, 'conflicts': 0, 'expired': 0}
 
+        self.ledger: Optional[CashLedger] = None
+        if self.state_path is not None:
+            self.ledger = CashLedger(self.state_path.with_suffix('.wal'), self.state_path, snapshot_every)
         self._load_state()
+        if self.ledger is not None:
+            self.ledger.start(self._snapshot_state)
         logger.info(f"CashGate inicializado com capital: {self.current_capital:.2f}, reservado: {self._reserved:.2f}. Max position size: {self.max_position_size_pct:.2%}")
 
 
     def _load_state(self) -> None:
-        """Carrega o estado do CashGate de um arquivo JSON."""
+        """Recupera o estado: snapshot JSON + registros do write-ahead log posteriores a ele."""
+        if self.ledger is None:
+            return
         try:
-            if STATE_PATH.exists():
-                data = json.loads(STATE_PATH.read_text(encoding="utf-8"))
-                self.current_capital = float(data.get("current_capital", self.current_capital))
-                self._reserved = float(data.get("reserved", self._reserved))
-                logger.info(f"CashGate estado carregado: capital={self.current_capital:.2f}, reservado={self._reserved:.2f}")
+            snapshot, records = self.ledger.recover()
         except Exception as e:
-            logger.error(f"Falha ao carregar estado do CashGate de '{STATE_PATH}': {e}. Mantendo estado em memória.")
+            logger.error(f"Falha ao carregar estado do CashGate de '{self.state_path}': {e}. Mantendo estado em memória.")
             # falha silenciosa — mantém estado em memória
-            pass
+            return
 
-    def _persist(self) -> None:
-        """Persiste o estado atual do CashGate em um arquivo JSON."""
-        try:
-            STATE_PATH.write_text(
-                json.dumps({"current_capital": self.current_capital, "reserved": self._reserved}, indent=2),
-                encoding="utf-8",
-            )
-        except Exception as e:
-            logger.error(f"Falha ao persistir estado do CashGate em '{STATE_PATH}': {e}")
-            pass
+        if snapshot:
+            self.current_capital = float(snapshot.get("current_capital", self.current_capital))
+            for rid, entry in snapshot.get("reservations", {}).items():
+                if not isinstance(entry, dict):
+                    entry = {"amount": entry}  # snapshot sem símbolo/prazo
+                self._apply({"op": "reserve", "id": rid, "amount": float(entry["amount"]),
+                             "symbol": entry.get("symbol"), "expires": entry.get("expires")})
+            if not self._reservations and snapshot.get("reserved"):
+                # Arquivo do formato antigo: só o total reservado
+                self._apply({"op": "reserve", "id": "legado", "amount": float(snapshot["reserved"])})
+            self._symbol_spent = {symbol: float(spent) for symbol, spent in snapshot.get("symbol_spent", {}).items()}
+            self._seq = int(snapshot.get("seq", 0))
+        for record in records:
+            self._apply(record)
+            self._seq = record["seq"]
+        self._reserved = sum(entry[0] for entry in self._reservations.values())
+        self._ids = itertools.count(self._seq + 1)
+        if snapshot or records:
+            logger.info(f"CashGate estado carregado: capital={self.current_capital:.2f}, reservado={self._reserved:.2f} "
+                        f"({len(records)} registros do log após o snapshot)")
+        if self._reservations:
+            # Órfãs de uma execução anterior: sem prazo próprio, ganham o TTL padrão a partir de agora
+            if self.reservation_ttl:
+                for rid, entry in self._reservations.items():
+                    if entry[2] is None:
+                        entry[2] = self.clock() + self.reservation_ttl
+                        heapq.heappush(self._expiry, (entry[2], rid))
+            logger.warning(f"CashGate: {len(self._reservations)} reserva(s) abertas de uma execução anterior: "
+                           f"{ {rid: round(entry[0], 2) for rid, entry in self._reservations.items()} }")
+
+    def _snapshot_state(self) -> Tuple[int, Dict[str, Any]]:
+        """(seq, estado) consistente para o snapshot do ledger."""
+        with self._lock:
+            return self._seq, {
+                "current_capital": self.current_capital,
+                "reserved": self._reserved,
+                "reservations": {rid: {"amount": amount, "symbol": symbol, "expires": expires}
+                                 for rid, (amount, symbol, expires) in self._reservations.items()},
+                "symbol_spent": dict(self._symbol_spent),
+            }
+
+    def _apply(self, record: Dict[str, Any]) -> None:
+        """Aplica um registro ao estado em memória (operação ao vivo e recuperação do log)."""
+        op = record["op"]
+        if op == "reserve":
+            entry = self._reservations.get(record["id"])
+            if entry is None:
+                entry = self._reservations[record["id"]] = [0.0, record.get("symbol"), record.get("expires")]
+                if entry[2] is not None:
+                    heapq.heappush(self._expiry, (entry[2], record["id"]))
+            entry[0] += record["amount"]
+            self._reserved += record["amount"]
+            if entry[1] is not None:
+                self._symbol_reserved[entry[1]] = self._symbol_reserved.get(entry[1], 0.0) + record["amount"]
+        for rid, amount in record.get("take", {}).items():
+            entry = self._reservations.get(rid)
+            if entry is None:
+                continue
+            entry[0] -= amount
+            if entry[1] is not None:
+                self._symbol_reserved[entry[1]] = max(0.0, self._symbol_reserved.get(entry[1], 0.0) - amount)
+            if entry[0] <= EPSILON:
+                del self._reservations[rid]
+            self._reserved = max(0.0, self._reserved - amount)
+        symbol = record.get("symbol")
+        if op == "commit":
+            self.current_capital = max(0.0, self.current_capital - record["amount"])
+            if symbol is not None:
+                self._symbol_spent[symbol] = self._symbol_spent.get(symbol, 0.0) + record["amount"]
+            self._version += 1
+        elif op == "deposit":
+            self.current_capital += record["amount"]
+            if symbol is not None and symbol in self._symbol_spent:
+                left = self._symbol_spent[symbol] - record.get("cost", record["amount"])
+                if left > EPSILON:
+                    self._symbol_spent[symbol] = left
+                else:
+                    del self._symbol_spent[symbol]
+            self._version += 1
+
+    def _log(self, record: Dict[str, Any]) -> int:
+        """Aplica e enfileira no ledger. Chamar com self._lock adquirido."""
+        self._seq += 1
+        record["seq"] = self._seq
+        self._apply(record)
+        if self.ledger is not None:
+            self.ledger.append(record)
+        if len(self._expiry) > 2 * len(self._reservations) + 1024:
+            # Prazos de reservas já liberadas: reconstrói o heap só com as abertas
+            self._expiry = [(entry[2], rid) for rid, entry in self._reservations.items() if entry[2] is not None]
+            heapq.heapify(self._expiry)
+        return self._seq
+
+    def _durable(self, seq: int) -> None:
+        """Com sync=True, espera (fora do lock) o registro chegar ao disco."""
+        if self.sync and self.ledger is not None and seq and not self.ledger.wait(seq):
+            logger.error(f"CashGate: registro {seq} não confirmado em disco")
+
+    def _take(self, amount: Optional[float], reservation_id: Optional[str]) -> Dict[str, float]:
+        """
+        Quanto sai de cada reserva: da reserva indicada (amount=None → tudo)
+        ou, sem ID, das mais recentes. Chamar com self._lock adquirido.
+        """
+        if reservation_id is not None:
+            entry = self._reservations.get(reservation_id)
+            held = entry[0] if entry else 0.0
+            taken = held if amount is None else min(amount, held)
+            return {reservation_id: taken} if taken > 0 else {}
+        take: Dict[str, float] = {}
+        left = amount or 0.0
+        for rid in reversed(list(self._reservations)):
+            if left <= EPSILON:
+                break
+            taken = min(left, self._reservations[rid][0])
+            take[rid] = taken
+            left -= taken
+        return take
+
+    def _expire(self) -> int:
+        """Libera as reservas vencidas (O(1) quando nenhuma venceu). Chamar com self._lock adquirido."""
+        if not self._expiry or self._expiry[0][0] > self.clock():
+            return 0
+        now = self.clock()
+        expired: Dict[str, float] = {}
+        while self._expiry and self._expiry[0][0] <= now:
+            deadline, rid = heapq.heappop(self._expiry)
+            entry = self._reservations.get(rid)
+            if entry is not None and entry[2] == deadline:
+                expired[rid] = entry[0]
+        if not expired:
+            return 0
+        seq = self._log({"op": "expire", "take": expired})
+        self.stats['expired'] += len(expired)
+        logger.warning(f"Reserva(s) vencida(s) sem confirmação, devolvidas: "
+                       f"{ {rid: round(amount, 2) for rid, amount in expired.items()} }")
+        return seq
+
+    def expire(self) -> int:
+        """Devolve agora as reservas vencidas. Retorna quantas expiraram."""
+        with self._lock:
+            before = self.stats['expired']
+            seq = self._expire()
+            count = self.stats['expired'] - before
+        self._durable(seq)
+        return count
+
+    def close(self) -> None:
+        """Grava o pendente e compacta o log num snapshot final."""
+        if self.ledger is not None:
+            self.ledger.close()
 
     def get_available(self) -> float:
         """Retorna o capital disponível para novas reservas (capital total - capital reservado)."""
         with self._lock:
-            return max(0.0, self.current_capital - self._reserved)
+            self._expire()
+            return self._available()
+
+    def _available(self) -> float:
+        # Chamar com self._lock já adquirido
+        return max(0.0, self.current_capital - self._reserved)
 
-    def can_reserve(self, amount: float) -> (bool, str):
+    def capital_version(self) -> Tuple[int, float]:
+        """(versão, capital) para dimensionar uma ordem e reservar com expected_version."""
+        with self._lock:
+            return self._version, self.current_capital
+
+    def set_symbol_budget(self, symbol: str, pct: Optional[float]) -> None:
+        """Sub-orçamento do símbolo (fração do capital); None volta ao padrão symbol_budget_pct."""
+        with self._lock:
+            if pct is None:
+                self._symbol_budgets.pop(symbol, None)
+            else:
+                self._symbol_budgets[symbol] = pct
+
+    def _check(self, amount: float, symbol: Optional[str] = None) -> Tuple[bool, str]:
+        # Chamar com self._lock já adquirido
+        # 1. Verificar disponibilidade de fundos
+        available = self._available()
+        if amount > available:
+            return False, f"Capital insuficiente. Disponível: {available:.2f}, Requerido: {amount:.2f}."
+
+        # 2. Verificar regra de negócio: Tamanho máximo por posição
+        # O capital total atual é a base para calcular o tamanho máximo da posição.
+        max_single_position_value = self.current_capital * self.max_position_size_pct
+        # Tolerância de arredondamento (quantidade × preço de volta em USDT)
+        if amount > max_single_position_value * (1 + 1e-9):
+            return False, f"Alocação de {amount:.2f} excede o limite máximo por posição ({max_single_position_value:.2f})."
+
+        # 3. Sub-orçamento do símbolo: reservado + posições abertas
+        budget_pct = self._symbol_budgets.get(symbol, self.symbol_budget_pct) if symbol is not None else None
+        if budget_pct is not None:
+            used = self._symbol_reserved.get(symbol, 0.0) + self._symbol_spent.get(symbol, 0.0)
+            budget = self.current_capital * budget_pct
+            if used + amount > budget * (1 + 1e-9):
+                return False, f"Sub-orçamento de {symbol} esgotado. Em uso: {used:.2f}, Limite: {budget:.2f}."
+
+        return True, "Reserva aprovada pelo CashGate."
+
+    def can_reserve(self, amount: float, symbol: Optional[str] = None) -> (bool, str):
         """
         Verifica se `amount` pode ser reservado, aplicando regras de negócio.
         Retorna (True, "Razão") se aprovado, (False, "Razão") se rejeitado.
         """
         if amount <= 0:
             return False, "Valor a reservar deve ser positivo."
-        
+
         with self._lock:
-            # 1. Verificar disponibilidade de fundos
-            if amount > self.get_available():
-                return False, f"Capital insuficiente. Disponível: {self.get_available():.2f}, Requerido: {amount:.2f}."
-            
-            # 2. Verificar regra de negócio: Tamanho máximo por posição
-            # O capital total atual é a base para calcular o tamanho máximo da posição.
-            max_single_position_value = self.current_capital * self.max_position_size_pct
-            if amount > max_single_position_value:
-                return False, f"Alocação de {amount:.2f} excede o limite máximo por posição ({max_single_position_value:.2f})."
-            
-            return True, "Reserva aprovada pelo CashGate."
-
-    def reserve(self, amount: float) -> bool:
+            self._expire()
+            return self._check(amount, symbol)
+
+    def reserve(self, amount: float, reservation_id: Optional[str] = None, symbol: Optional[str] = None,
+                ttl: Optional[float] = None, expected_version: Optional[int] = None) -> Optional[str]:
         """
-        Tenta reservar `amount` do capital disponível.
-        Retorna True se reservado, False se insuficiente ou se regras de negócio não forem atendidas.
+        Tenta reservar `amount` do capital disponível (checagem e reserva no mesmo lock).
+
+        Args:
+            symbol: Símbolo da ordem (sub-orçamento)
+            ttl: Segundos até a reserva expirar sem confirmação (padrão: reservation_ttl; 0 = sem prazo)
+            expected_version: Versão de capital_version() usada no dimensionamento
+
+        Retorna o ID da reserva, ou None se insuficiente ou se regras de negócio não forem atendidas.
+        Levanta ReservationConflict se o capital mudou desde expected_version.
         """
-        approved, reason = self.can_reserve(amount)
+        if amount <= 0:
+            logger.warning(f"Reserva de {amount:.2f} REJEITADA pelo CashGate: Valor a reservar deve ser positivo.")
+            return None
+
+        ttl = self.reservation_ttl if ttl is None else ttl
+        with self._lock:
+            expired_seq = self._expire()
+            if expected_version is not None and expected_version != self._version:
+                self.stats['conflicts'] += 1
+                raise ReservationConflict(f"capital mudou (versão {expected_version} → {self._version})")
+            approved, reason = self._check(amount, symbol)
+            if approved:
+                rid = reservation_id or f"r{next(self._ids)}"
+                record = {"op": "reserve", "id": rid, "amount": amount}
+                if symbol is not None:
+                    record["symbol"] = symbol
+                if ttl:
+                    record["expires"] = self.clock() + ttl
+                seq = self._log(record)
+                reserved = self._reserved
+                self.stats['reserved'] += 1
+            else:
+                self.stats['rejected'] += 1
         if not approved:
+            self._durable(expired_seq)
             logger.warning(f"Reserva de {amount:.2f} REJEITADA pelo CashGate: {reason}")
-            return False
-        
-        with self._lock:
-            self._reserved += amount
-            self._persist()
-            logger.info(f"Reserva de {amount:.2f} APROVADA. Total reservado: {self._reserved:.2f}.")
-            return True
+            return None
 
-    def release(self, amount: float) -> None:
-        """Libera uma reserva (rollback)."""
-        if amount <= 0:
-            return
+        self._durable(seq)
+        logger.info(f"Reserva {rid} de {amount:.2f} APROVADA. Total reservado: {reserved:.2f}.")
+        return rid
+
+    def release(self, reservation: Union[str, float], amount: Optional[float] = None) -> None:
+        """
+        Libera uma reserva (rollback).
+
+        release(id) devolve tudo o que resta da reserva; release(id, valor),
+        só parte dela; release(valor) sem ID libera das reservas mais recentes.
+        """
+        if isinstance(reservation, str):
+            rid = reservation
+        else:
+            rid, amount = None, reservation
+            if amount <= 0:
+                return
         with self._lock:
-            self._reserved = max(0.0, self._reserved - amount)
-            self._persist()
-            logger.info(f"Reserva de {amount:.2f} LIBERADA. Total reservado: {self._reserved:.2f}.")
+            take = self._take(amount, rid)
+            if not take:
+                return
+            seq = self._log({"op": "release", "take": take})
+            reserved = self._reserved
+        self._durable(seq)
+        logger.info(f"Reserva de {sum(take.values()):.2f} LIBERADA ({', '.join(take)}). Total reservado: {reserved:.2f}.")
 
 
-    def commit(self, amount: float) -> None:
+    def commit(self, amount: float, reservation_id: Optional[str] = None, symbol: Optional[str] = None) -> None:
         """
         Confirma gasto: remove da reserva e do capital (quando ordem executa).
-        Use commit depois que a execução foi confirmada.
+        Use commit depois que a execução foi confirmada; com reservation_id, a
+        reserva consumida é exatamente aquela (a sobra continua reservada até release(id)).
+        O gasto conta no sub-orçamento do símbolo (o da reserva, se não informado).
         """
         if amount <= 0:
             return
         with self._lock:
             # remove da reserva e do capital real
-            self._reserved = max(0.0, self._reserved - amount)
-            self.current_capital = max(0.0, self.current_capital - amount)
-            self._persist()
-            logger.info(f"Gasto de {amount:.2f} CONFIRMADO. Capital atual: {self.current_capital:.2f}, reservado: {self._reserved:.2f}.")
+            if symbol is None and reservation_id in self._reservations:
+                symbol = self._reservations[reservation_id][1]
+            record = {"op": "commit", "amount": amount, "take": self._take(amount, reservation_id)}
+            if symbol is not None:
+                record["symbol"] = symbol
+            seq = self._log(record)
+            capital, reserved = self.current_capital, self._reserved
+        self._durable(seq)
+        logger.info(f"Gasto de {amount:.2f} CONFIRMADO. Capital atual: {capital:.2f}, reservado: {reserved:.2f}.")
 
 
-    def deposit(self, amount: float) -> None:
-        """Aumenta capital (ex.: após venda ou ajuste manual)."""
+    def deposit(self, amount: float, symbol: Optional[str] = None, cost: Optional[float] = None) -> None:
+        """
+        Aumenta capital (ex.: após venda ou ajuste manual).
+        Com symbol, a posição encerrada (custo `cost`, padrão: o próprio valor) sai do sub-orçamento.
+        """
         if amount <= 0:
             return
         with self._lock:
-            self.current_capital += amount
-            self._persist()
-            logger.info(f"Depósito de {amount:.2f} realizado. Capital atual: {self.current_capital:.2f}.")
+            record = {"op": "deposit", "amount": amount}
+            if symbol is not None:
+                record["symbol"] = symbol
+                if cost is not None:
+                    record["cost"] = cost
+            seq = self._log(record)
+            capital = self.current_capital
+        self._durable(seq)
+        logger.info(f"Depósito de {amount:.2f} realizado. Capital atual: {capital:.2f}.")
+
+    def get_reservation(self, reservation_id: str) -> float:
+        """Valor ainda reservado sob o ID (0 se não existe mais)."""
+        with self._lock:
+            entry = self._reservations.get(reservation_id)
+            return entry[0] if entry else 0.0
 
     def get_status(self) -> dict:
         """Retorna o status atual do CashGate."""
         with self._lock:
+            self._expire()
             return {
                 "current_capital": self.current_capital,
                 "reserved_capital": self._reserved,
-                "available_capital": self.get_available(),
-                "max_position_size_pct": self.max_position_size_pct
+                "available_capital": self._available(),
+                "max_position_size_pct": self.max_position_size_pct,
+                "open_reservations": len(self._reservations),
+                "symbols": {symbol: {"reserved": self._symbol_reserved.get(symbol, 0.0),
+                                     "spent": self._symbol_spent.get(symbol, 0.0)}
+                            for symbol in set(self._symbol_reserved) | set(self._symbol_spent)
+                            if self._symbol_reserved.get(symbol) or self._symbol_spent.get(symbol)},
+                **self.stats,
             }
@@ -0,0 +1,201 @@
+"""
+📒 Livro-Razão do Cash Gate - Maria Helena
+"Primeiro anota no caderno, depois mexe no cofre"
+
+Write-ahead log das mutações do CashGate (reserva, liberação, commit, depósito):
+
+- append() só enfileira o registro na memória (microssegundos, dentro do
+  lock do CashGate); uma thread grava e faz fsync em lote (group commit:
+  tudo o que chegou durante um fsync sai no seguinte)
+- wait(seq) bloqueia, fora do lock, até o registro estar em disco
+- A cada snapshot_every registros, snapshot atômico do estado (tmp + fsync
+  + rename) e o log recomeça vazio
+- recover(): snapshot + registros do log com seq maior que o dele; uma
+  última linha cortada (queda no meio da escrita) é descartada
+
+Formato: uma linha JSON por registro ({"seq": 12, "op": "reserve", ...}).
+"""
+
+import json
+import logging
+import os
+import threading
+from collections import deque
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger('MariaHelena.CashLedger')
+
+
+def write_atomic(path: Path, data: Dict[str, Any]) -> None:
+    """Grava JSON em arquivo temporário, fsync e rename (nunca deixa o arquivo pela metade)."""
+    tmp = path.with_name(path.name + '.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    try:
+        fd = os.open(path.parent, os.O_RDONLY)
+    except OSError:
+        return  # sem fsync de diretório (ex: Windows)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class CashLedger:
+    """
+    Parâmetros:
+    - wal_path (Path): Arquivo do log (append-only)
+    - snapshot_path (Path): Arquivo do snapshot (JSON do estado)
+    - snapshot_every (int): Registros entre snapshots/compactações (padrão: 1000)
+    """
+
+    def __init__(self, wal_path: Path, snapshot_path: Path, snapshot_every: int = 1000):
+        self.wal_path = Path(wal_path)
+        self.snapshot_path = Path(snapshot_path)
+        self.snapshot_every = snapshot_every
+
+        self._pending: deque = deque()
+        self._cond = threading.Condition()
+        self._durable_seq = 0
+        self._since_snapshot = 0
+        self._state_fn: Optional[Callable[[], Tuple[int, Dict[str, Any]]]] = None
+        self._file = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = False
+        self.error: Optional[BaseException] = None
+
+        self.stats = {'records': 0, 'flushes': 0, 'snapshots': 0}
+
+    def recover(self) -> Tuple[Optional[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Estado salvo: (snapshot ou None, registros posteriores a ele, em ordem).
+        """
+        snapshot = None
+        if self.snapshot_path.exists():
+            snapshot = json.loads(self.snapshot_path.read_text(encoding='utf-8'))
+        base_seq = int(snapshot.get('seq', 0)) if snapshot else 0
+
+        records: List[Dict[str, Any]] = []
+        if self.wal_path.exists():
+            with open(self.wal_path, 'rb') as f:
+                lines = f.read().split(b'\n')
+            for number, line in enumerate(lines, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    if number == len(lines):
+                        logger.warning(f"📒 Última linha de {self.wal_path} incompleta (queda na escrita): descartada")
+                        break
+                    raise ValueError(f"{self.wal_path}: linha {number} corrompida")
+                if record['seq'] > base_seq:
+                    records.append(record)
+        self._durable_seq = records[-1]['seq'] if records else base_seq
+        self._since_snapshot = len(records)
+        return snapshot, records
+
+    def start(self, state_fn: Callable[[], Tuple[int, Dict[str, Any]]]) -> "CashLedger":
+        """Abre o log e sobe a thread de gravação. state_fn() → (seq, estado) consistente, para os snapshots."""
+        self._state_fn = state_fn
+        self.wal_path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.wal_path, 'ab')
+        self._stop = False
+        self._thread = threading.Thread(target=self._loop, name='MariaHelenaCashLedger', daemon=True)
+        self._thread.start()
+        return self
+
+    def append(self, record: Dict[str, Any]) -> int:
+        """Enfileira o registro (já com 'seq'); chamar na ordem do seq. Não espera o disco."""
+        with self._cond:
+            self._pending.append(record)
+            self._cond.notify_all()
+        return record['seq']
+
+    def wait(self, seq: int, timeout: Optional[float] = 5.0) -> bool:
+        """Espera o registro seq ficar durável (True) ou o timeout/erro de disco (False)."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._durable_seq >= seq or self.error is not None or
+                                       self._thread is None, timeout):
+                logger.error(f"📒 Registro {seq} não gravado em {timeout}s")
+                return False
+            return self._durable_seq >= seq
+
+    def _loop(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending or self._stop, timeout=1.0)
+                if self._stop and not self._pending:
+                    return
+            try:
+                self._flush()
+            except Exception as e:
+                # Disco cheio/sem permissão: quem espera recebe False; a thread tenta de novo
+                logger.error(f"📒 Falha ao gravar {self.wal_path}: {e}")
+                with self._cond:
+                    self.error = e
+                    self._cond.notify_all()
+                    self._cond.wait(1.0)
+
+    def _flush(self) -> None:
+        with self._cond:
+            batch = list(self._pending)
+            self._pending.clear()
+        if not batch:
+            return
+        position = self._file.tell()
+        try:
+            self._file.write(b''.join(json.dumps(record, separators=(',', ':')).encode() + b'\n'
+                                      for record in batch))
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        except BaseException:
+            # Sem linha pela metade no meio do log: desfaz e devolve o lote à fila
+            with self._cond:
+                self._pending.extendleft(reversed(batch))
+            try:
+                self._file.truncate(position)
+            except OSError:
+                pass
+            raise
+        self.stats['records'] += len(batch)
+        self.stats['flushes'] += 1
+        self._since_snapshot += len(batch)
+        with self._cond:
+            self.error = None
+            self._durable_seq = batch[-1]['seq']
+            self._cond.notify_all()
+        if self._since_snapshot >= self.snapshot_every:
+            self.snapshot()
+
+    def snapshot(self) -> None:
+        """
+        Snapshot do estado atual e log zerado. Roda na thread de gravação
+        (ou com ela parada): tudo no log tem seq <= o do snapshot.
+        """
+        seq, state = self._state_fn()
+        write_atomic(self.snapshot_path, dict(state, seq=seq))
+        self._file.truncate(0)
+        os.fsync(self._file.fileno())
+        self._since_snapshot = 0
+        self.stats['snapshots'] += 1
+        logger.debug(f"📒 Snapshot em seq {seq}; log compactado")
+
+    def close(self) -> None:
+        """Grava o pendente, faz o snapshot final e fecha o log."""
+        if self._thread is None:
+            return
+        with self._cond:
+            self._stop = True
+            self._cond.notify_all()
+        self._thread.join(timeout=10)
+        self._flush()
+        self.snapshot()
+        self._file.close()
+        with self._cond:
+            self._thread = None
+            self._cond.notify_all()
@@ -9,7 +9,7 @@ console = Console()
 
 class CircuitBreaker:
     def __init__(self, config):
-        self.state_file = 'maria_helena_state.json'
+        self.state_file = config.get('state_file', 'maria_helena_state.json')
         self.emergency_log = 'logs/emergency.log'
         self.max_capital_loss_pct = config.get('max_capital_loss', 0.20)
         self.max_consecutive_losses = config.get('max_consecutive_losses', 5)
@@ -30,7 +30,7 @@ class CircuitBreaker:
             open(self.emergency_log, 'w').close()
         
         # Método load_state movido para dentro da classe
-        if os.path.exists(self.state_file):
+        if self.state_file and os.path.exists(self.state_file):
             try:
                 with open(self.state_file, 'r') as f:
                     state = json.load(f)
@@ -48,4 +48,33 @@ class CircuitBreaker:
         """Método mantido para compatibilidade"""
         pass
 
-    # ... (outros métodos permanecem iguais) ...
+    def should_continue(self):
+        """
+        Verifica se o bot pode continuar operando
+
+        Returns:
+            (bool, str): (pode continuar, razão)
+        """
+        if self.kill_switch_active:
+            return False, f"Kill switch ativo: {', '.join(self.emergency_reasons) or 'manual'}"
+        if self.is_tripped:
+            return False, f"{self.consecutive_losses} perdas consecutivas"
+        return True, "OK"
+
+    def record_trade(self, pnl):
+        """Registra o resultado de um trade fechado e dispara após perdas consecutivas"""
+        self.daily_pnl += pnl
+        if pnl < 0:
+            self.consecutive_losses += 1
+        else:
+            self.consecutive_losses = 0
+        self.current_losses = self.consecutive_losses
+        if self.consecutive_losses >= self.max_consecutive_losses and not self.is_tripped:
+            self.is_tripped = True
+            logger.warning(f"[red]⚡ Circuit Breaker disparado: {self.consecutive_losses} perdas consecutivas[/red]")
+
+    def reset(self):
+        """Rearma o disjuntor (após revisão manual)"""
+        self.is_tripped = False
+        self.consecutive_losses = 0
+        self.current_losses = 0
@@ -0,0 +1,147 @@
+"""
+🩺 Monitor de Saúde da Exchange - Maria Helena
+"Quem mede a pressão na hora da cirurgia já chegou atrasado"
+
+Tira o exchange.fetch_status() do caminho da ordem: uma thread consulta o
+status a cada `interval` segundos e guarda o resultado; o TechnicalGuard
+só lê o cache (sem ida e volta de rede na hora de executar).
+
+- Latência (último, p50, p95) e taxa de erro numa janela das últimas checagens
+- Staleness: cache mais velho que `max_age` é renovado na hora (se a
+  thread morreu ou nem foi iniciada, vira um cache com TTL)
+- Saudável = última checagem 'ok' e taxa de erro da janela <= max_error_rate
+- clock injetável: no replay/gravação usa o relógio da exchange, para a
+  sequência de fetch_status ser a mesma nos dois lados
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import ccxt  # type: ignore
+import numpy as np
+
+logger = logging.getLogger('MariaHelena.Health')
+
+
+class ExchangeHealthMonitor:
+    """
+    Parâmetros:
+    - exchange: Exchange ccxt (ou compatível com fetch_status)
+    - interval (float): Segundos entre checagens da thread (padrão: 15)
+    - max_age (float): Idade máxima do status lido pela ordem (padrão: 60)
+    - window (int): Checagens consideradas em latência/taxa de erro (padrão: 20)
+    - max_error_rate (float): Taxa de erro máxima na janela (padrão: 0.5)
+    - clock: Horário em segundos (padrão: time.time)
+    """
+
+    def __init__(self, exchange: Any, interval: float = 15.0, max_age: float = 60.0, window: int = 20,
+                 max_error_rate: float = 0.5, clock: Callable[[], float] = time.time):
+        self.exchange = exchange
+        self.interval = interval
+        self.max_age = max_age
+        self.max_error_rate = max_error_rate
+        self.clock = clock
+
+        self._history: deque = deque(maxlen=window)  # (ok, latência em ms)
+        self._last: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+        self._check_lock = threading.Lock()  # uma checagem de rede por vez
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.checks = 0
+        self.errors = 0
+        self.stale_refreshes = 0
+
+    def start(self) -> "ExchangeHealthMonitor":
+        """Primeira checagem síncrona e a thread de renovação em segundo plano."""
+        self.check()
+        if self.interval > 0 and self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name='MariaHelenaHealth', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def check(self) -> Dict[str, Any]:
+        """Consulta fetch_status agora e atualiza o cache."""
+        with self._check_lock:
+            started = time.perf_counter()
+            try:
+                status = self.exchange.fetch_status() or {}
+                ok = status.get('status') == 'ok'
+                reason = "✅ Exchange online" if ok else \
+                    f"⚠️  Exchange retornou status: {status.get('status', 'desconhecido')}"
+            except ccxt.NetworkError as e:
+                ok, reason = False, f"🌐 Erro de rede: {str(e)[:50]}"
+            except ccxt.ExchangeError as e:
+                ok, reason = False, f"⚠️  Erro da exchange: {str(e)[:50]}"
+            except Exception as e:
+                ok, reason = False, f"❌ Erro desconhecido: {str(e)[:50]}"
+            latency = (time.perf_counter() - started) * 1000
+
+            with self._lock:
+                self._history.append((ok, latency))
+                self.checks += 1
+                if not ok:
+                    self.errors += 1
+                    logger.warning(f"🩺 {reason} ({latency:.0f}ms)")
+                self._last = {'ok': ok, 'reason': reason, 'checked_at': self.clock(), 'latency_ms': latency}
+                return dict(self._last)
+
+    def status(self) -> Dict[str, Any]:
+        """Último status (com 'age' em segundos), renovando na hora se passou de max_age."""
+        with self._lock:
+            last = dict(self._last) if self._last else None
+        if last is None or self.clock() - last['checked_at'] > self.max_age:
+            self.stale_refreshes += 1
+            last = self.check()
+        last['age'] = self.clock() - last['checked_at']
+        return last
+
+    def error_rate(self) -> float:
+        with self._lock:
+            return sum(not ok for ok, _ in self._history) / len(self._history) if self._history else 0.0
+
+    def is_healthy(self) -> Tuple[bool, str]:
+        """
+        Leitura do cache para o caminho da ordem.
+
+        Returns:
+            (bool, str): (saudável, mensagem)
+        """
+        last = self.status()
+        if not last['ok']:
+            return False, last['reason']
+        rate = self.error_rate()
+        if rate > self.max_error_rate:
+            return False, f"⚠️  Instável: {rate:.0%} de erros nas últimas {len(self._history)} checagens"
+        return True, last['reason']
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            latencies = np.array([latency for _, latency in self._history]) if self._history else None
+            last = dict(self._last) if self._last else {}
+        return {
+            'ok': last.get('ok'),
+            'age': self.clock() - last['checked_at'] if last else None,
+            'latency_ms': last.get('latency_ms'),
+            'p50_ms': float(np.percentile(latencies, 50)) if latencies is not None else None,
+            'p95_ms': float(np.percentile(latencies, 95)) if latencies is not None else None,
+            'error_rate': self.error_rate(),
+            'checks': self.checks,
+            'errors': self.errors,
+            'stale_refreshes': self.stale_refreshes,
+        }
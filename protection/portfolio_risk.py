@@ -0,0 +1,293 @@
+"""
+📚 Risco da Carteira - Maria Helena
+"Quem vigia cem panelas não destampa uma por uma a cada estalo"
+
+Visão de carteira do risco quando vários pares operam no mesmo capital
+(core/bot.py): cada RiskManager de par registra aqui as posições que abre
+e fecha, e as regras que valem para a conta inteira passam a olhar o todo.
+
+- Posições indexadas por chave (o par) e por símbolo
+- Stops e alvos num índice ordenado por preço, por símbolo (bisect): uma
+  vela/tick só toca as posições cujo nível ela cruzou — O(log n + disparos),
+  não uma varredura de todas as posições abertas
+- Exposição total, por símbolo e PnL diário mantidos incrementalmente na
+  abertura/fechamento; o MAX_TOTAL_EXPOSURE é checado contra o total da
+  carteira (não só a posição do próprio par)
+- Entradas aprovadas e ainda sem execução contam como exposição pendente
+  (evita que pares em paralelo passem todos pelo limite); a pendência some
+  na abertura, no cancelamento ou depois de pending_ttl segundos
+- Posição que disparou sai do índice (não dispara de novo enquanto a venda
+  está em andamento); se a venda falhar, arm() a recoloca
+"""
+
+import logging
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+logger = logging.getLogger('MariaHelena.Portfolio')
+
+
+class _Levels:
+    """Níveis de um símbolo em ordem de preço: os que disparam na queda e os que disparam na alta"""
+
+    __slots__ = ('below', 'below_keys', 'above', 'above_keys')
+
+    def __init__(self):
+        self.below: List[float] = []
+        self.below_keys: List[Tuple[Hashable, str]] = []
+        self.above: List[float] = []
+        self.above_keys: List[Tuple[Hashable, str]] = []
+
+
+def _insert(levels: List[float], keys: List[Tuple[Hashable, str]], level: float, entry: Tuple[Hashable, str]) -> None:
+    i = bisect_right(levels, level)
+    levels.insert(i, level)
+    keys.insert(i, entry)
+
+
+def _remove(levels: List[float], keys: List[Tuple[Hashable, str]], level: float, entry: Tuple[Hashable, str]) -> None:
+    i = bisect_left(levels, level)
+    while i < len(levels) and levels[i] == level:
+        if keys[i] == entry:
+            del levels[i]
+            del keys[i]
+            return
+        i += 1
+
+
+class PortfolioRiskManager:
+    """
+    Parâmetros:
+    - config (dict): MAX_TOTAL_EXPOSURE e CASH_RESERVATION_TTL (validade da exposição pendente)
+    - clock: Horário em segundos da exposição pendente (padrão: time.time)
+    """
+
+    def __init__(self, config: Dict[str, Any], clock: Callable[[], float] = time.time):
+        self.max_total_exposure = config.get('MAX_TOTAL_EXPOSURE', 0.15)
+        self.pending_ttl = config.get('CASH_RESERVATION_TTL') or 300.0
+        self.clock = clock
+
+        self._lock = threading.Lock()
+        self.positions: Dict[Hashable, Dict[str, Any]] = {}
+        self._by_symbol: Dict[str, Dict[Hashable, Dict[str, Any]]] = {}
+        self._levels: Dict[str, _Levels] = {}
+        self._pending: Dict[Hashable, Tuple[float, float]] = {}  # chave → (valor, vencimento)
+
+        # Agregados incrementais
+        self.exposure = 0.0
+        self.symbol_exposure: Dict[str, float] = {}
+        self.daily_pnl = 0.0
+        self.daily_trades = 0
+        self.daily_start = datetime.now().date()
+        self.realized_pnl = 0.0
+        self.total_trades = 0
+
+        self.stats = {'triggers': 0, 'admitted': 0, 'rejected': 0, 'pending_expired': 0}
+        logger.info(f"📚 Risco da carteira: exposição máxima {self.max_total_exposure:.0%}")
+
+    def _roll_day(self, now: datetime) -> None:
+        if now.date() != self.daily_start:
+            self.daily_start = now.date()
+            self.daily_pnl = 0.0
+            self.daily_trades = 0
+
+    def get_daily_pnl(self, now: Optional[datetime] = None) -> float:
+        """PnL realizado da carteira no dia de `now` (zera na virada do dia)."""
+        with self._lock:
+            self._roll_day(now or datetime.now())
+            return self.daily_pnl
+
+    def _pending_total(self, exclude: Hashable) -> float:
+        now = self.clock()
+        total = 0.0
+        for key, (amount, expires) in list(self._pending.items()):
+            if expires <= now:
+                del self._pending[key]
+                self.stats['pending_expired'] += 1
+            elif key != exclude:
+                total += amount
+        return total
+
+    def admit(self, key: Hashable, amount: float, capital: float) -> Tuple[bool, str]:
+        """
+        Checa uma entrada de `amount` contra o MAX_TOTAL_EXPOSURE da carteira
+        (abertas + pendentes) e, se couber, registra como pendente.
+
+        Returns:
+            (bool, str): (aprovada, razão)
+        """
+        with self._lock:
+            used = self.exposure + self._pending_total(key)
+            limit = capital * self.max_total_exposure
+            if used + amount > limit:
+                self.stats['rejected'] += 1
+                return False, f"Exposição total excedida ({used:.2f} + {amount:.2f} > {limit:.2f})"
+            self._pending[key] = (amount, self.clock() + self.pending_ttl)
+            self.stats['admitted'] += 1
+            return True, "Exposição da carteira OK"
+
+    def cancel_pending(self, key: Hashable) -> None:
+        """Entrada aprovada que não foi executada: devolve a exposição pendente."""
+        with self._lock:
+            self._pending.pop(key, None)
+
+    def _arm(self, position: Dict[str, Any]) -> None:
+        levels = self._levels.setdefault(position['symbol'], _Levels())
+        key = position['key']
+        long = position['action'] == 'BUY'
+        if position['stop_loss']:
+            if long:
+                _insert(levels.below, levels.below_keys, position['stop_loss'], (key, 'stop_loss'))
+            else:
+                _insert(levels.above, levels.above_keys, position['stop_loss'], (key, 'stop_loss'))
+        if position['take_profit']:
+            if long:
+                _insert(levels.above, levels.above_keys, position['take_profit'], (key, 'take_profit'))
+            else:
+                _insert(levels.below, levels.below_keys, position['take_profit'], (key, 'take_profit'))
+        position['armed'] = True
+
+    def _disarm(self, position: Dict[str, Any]) -> None:
+        if not position['armed']:
+            return
+        levels = self._levels[position['symbol']]
+        key = position['key']
+        long = position['action'] == 'BUY'
+        if position['stop_loss']:
+            if long:
+                _remove(levels.below, levels.below_keys, position['stop_loss'], (key, 'stop_loss'))
+            else:
+                _remove(levels.above, levels.above_keys, position['stop_loss'], (key, 'stop_loss'))
+        if position['take_profit']:
+            if long:
+                _remove(levels.above, levels.above_keys, position['take_profit'], (key, 'take_profit'))
+            else:
+                _remove(levels.below, levels.below_keys, position['take_profit'], (key, 'take_profit'))
+        position['armed'] = False
+
+    def open_position(self, key: Hashable, symbol: str, entry_price: float, size: float, stop_loss: float,
+                      take_profit: float, action: str = 'BUY', cost: Optional[float] = None,
+                      now: Optional[datetime] = None) -> None:
+        """Registra a posição do par `key` (substitui a anterior da mesma chave, se houver)."""
+        now = now or datetime.now()
+        cost = cost if cost is not None else entry_price * size
+        with self._lock:
+            self._roll_day(now)
+            if key in self.positions:
+                logger.warning(f"📚 {key}: posição substituída sem fechamento")
+                self._drop(key)
+            self._pending.pop(key, None)
+            position = {
+                'key': key, 'symbol': symbol, 'action': action, 'entry_price': entry_price, 'size': size,
+                'cost': cost, 'stop_loss': stop_loss, 'take_profit': take_profit, 'opened_at': now, 'armed': False,
+            }
+            self.positions[key] = position
+            self._by_symbol.setdefault(symbol, {})[key] = position
+            self._arm(position)
+            self.exposure += cost
+            self.symbol_exposure[symbol] = self.symbol_exposure.get(symbol, 0.0) + cost
+            self.daily_trades += 1
+            self.total_trades += 1
+
+    def _drop(self, key: Hashable) -> Optional[Dict[str, Any]]:
+        position = self.positions.pop(key, None)
+        if position is None:
+            return None
+        symbol = position['symbol']
+        self._disarm(position)
+        del self._by_symbol[symbol][key]
+        if not self._by_symbol[symbol]:
+            del self._by_symbol[symbol]
+            self._levels.pop(symbol, None)
+            self.symbol_exposure.pop(symbol, None)
+        else:
+            self.symbol_exposure[symbol] -= position['cost']
+        # Sem posições, zera o acumulado (sem resíduo de ponto flutuante)
+        self.exposure = self.exposure - position['cost'] if self.positions else 0.0
+        return position
+
+    def close_position(self, key: Hashable, pnl: float, now: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+        """
+        Fecha a posição do par `key` e soma o PnL realizado ao dia.
+
+        Returns:
+            dict: a posição fechada, ou None se não havia
+        """
+        with self._lock:
+            self._roll_day(now or datetime.now())
+            position = self._drop(key)
+            if position is None:
+                return None
+            self.daily_pnl += pnl
+            self.realized_pnl += pnl
+            return position
+
+    def triggered(self, symbol: str, low: float, high: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Posições de `symbol` cujo stop ou alvo foi cruzado pelo intervalo
+        [low, high] (um tick: só low). Stop antes do alvo quando os dois
+        cruzam na mesma vela. As posições devolvidas saem do índice até a
+        venda concluir (close_position) ou falhar (arm).
+
+        Returns:
+            list: [{'key', 'symbol', 'reason', 'level'}, ...]
+        """
+        high = low if high is None else high
+        with self._lock:
+            levels = self._levels.get(symbol)
+            if levels is None:
+                return []
+            hits: Dict[Hashable, Tuple[str, float]] = {}
+            start = bisect_left(levels.below, low)  # níveis >= mínima: a queda chegou neles
+            for level, (key, reason) in zip(levels.below[start:], levels.below_keys[start:]):
+                hits[key] = (reason, level)
+            end = bisect_right(levels.above, high)  # níveis <= máxima: a alta chegou neles
+            for level, (key, reason) in zip(levels.above[:end], levels.above_keys[:end]):
+                if key not in hits or reason == 'stop_loss':
+                    hits[key] = (reason, level)
+            if not hits:
+                return []
+            for key in hits:
+                self._disarm(self.positions[key])
+            self.stats['triggers'] += len(hits)
+            return [{'key': key, 'symbol': symbol, 'reason': reason, 'level': level}
+                    for key, (reason, level) in hits.items()]
+
+    def arm(self, key: Hashable) -> None:
+        """Recoloca no índice uma posição que disparou mas cuja venda não saiu."""
+        with self._lock:
+            position = self.positions.get(key)
+            if position is not None and not position['armed']:
+                self._arm(position)
+
+    def get_position(self, key: Hashable) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            position = self.positions.get(key)
+            return dict(position) if position else None
+
+    def list_positions(self) -> List[Dict[str, Any]]:
+        """Todas as posições abertas (cópias)."""
+        with self._lock:
+            return [dict(position) for position in self.positions.values()]
+
+    def positions_for(self, symbol: str) -> List[Dict[str, Any]]:
+        """Posições abertas de um símbolo (cópias)."""
+        with self._lock:
+            return [dict(position) for position in self._by_symbol.get(symbol, {}).values()]
+
+    def get_status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'positions': len(self.positions),
+                'exposure': self.exposure,
+                'pending': sum(amount for amount, _ in self._pending.values()),
+                'symbols': dict(self.symbol_exposure),
+                'daily_pnl': self.daily_pnl,
+                'daily_trades': self.daily_trades,
+                'realized_pnl': self.realized_pnl,
+                'total_trades': self.total_trades,
+                **self.stats,
+            }
@@ -20,7 +20,7 @@ class RiskManager:
     4. Exposição total SEMPRE monitorada
     """
     
-    def __init__(self, config):
+    def __init__(self, config, portfolio=None, key=None):
         self.max_position_pct = config['MAX_POSITION_SIZE']  # 3%
         self.max_daily_loss_pct = config['MAX_DAILY_LOSS']   # 5%
         self.stop_loss_pct = config['STOP_LOSS']         # 2%
@@ -45,6 +45,153 @@ class RiskManager:
         self.stop_loss = 0.0
         self.take_profit = 0.0
         
+        self.take_profit_pct = config.get('TAKE_PROFIT', 0.05)
+        self.entry_cost = 0.0
+        self.entry_time = None
+        
+        # Carteira compartilhada (multi-ativo): exposição total e perda diária da conta
+        self.portfolio = portfolio
+        self.key = key if key is not None else config.get('SYMBOL')
+        
         logger.info("[green]🛡️  Camada 1: Risk Manager ativado[/green]")
     
-    # ... (mantenha todos os outros métodos existentes) ...
\ No newline at end of file
+    @staticmethod
+    def _now(signal=None):
+        """Horário do sinal (ms, ex: backtest) ou o relógio atual"""
+        timestamp = (signal or {}).get('timestamp')
+        if timestamp:
+            return datetime.fromtimestamp(timestamp / 1000)
+        return datetime.now()
+    
+    def _roll_day(self, now):
+        """Zera os contadores diários na virada do dia"""
+        if now.date() != self.daily_start:
+            self.daily_start = now.date()
+            self.daily_pnl = 0.0
+            self.daily_trades = 0
+    
+    def calculate_position_size(self, capital, signal):
+        """
+        Tamanho da posição em moeda de cotação (ex: USDT)
+        
+        Returns:
+            float: capital × MAX_POSITION_SIZE (0 se não há capital)
+        """
+        if capital <= 0:
+            return 0.0
+        return capital * self.max_position_pct
+    
+    def calculate_stop_loss(self, entry_price, action):
+        if action == 'BUY':
+            return entry_price * (1 - self.stop_loss_pct)
+        return entry_price * (1 + self.stop_loss_pct)
+    
+    def calculate_take_profit(self, entry_price, action):
+        if action == 'BUY':
+            return entry_price * (1 + self.take_profit_pct)
+        return entry_price * (1 - self.take_profit_pct)
+    
+    def validate_trade(self, signal, capital):
+        """
+        Valida uma nova entrada contra as regras inegociáveis
+        
+        Returns:
+            (bool, str, dict): (aprovado, razão, detalhes)
+        """
+        now = self._now(signal)
+        self._roll_day(now)
+        daily_pnl = self.portfolio.get_daily_pnl(now) if self.portfolio is not None else self.daily_pnl
+        details = {
+            'daily_pnl': daily_pnl,
+            'daily_trades': self.daily_trades,
+            'capital': capital
+        }
+        
+        if signal.get('action') == 'BUY' and self.is_in_position:
+            return False, "Posição já aberta", details
+        
+        if capital <= 0:
+            return False, "Sem capital", details
+        
+        if daily_pnl <= -self.max_daily_loss_pct * capital:
+            return False, f"Perda diária máxima atingida ({daily_pnl:.2f})", details
+        
+        if self.daily_trades >= self.max_trades_per_day:
+            return False, f"Limite de {self.max_trades_per_day} trades/dia atingido", details
+        
+        if self.last_trade_time is not None:
+            elapsed = (now - self.last_trade_time).total_seconds()
+            if elapsed < self.min_time_between_trades:
+                return False, f"Último trade há {elapsed:.0f}s (< {self.min_time_between_trades}s)", details
+        
+        if self.portfolio is not None:
+            # Por último: aprovada, a entrada fica como exposição pendente na carteira
+            admitted, reason = self.portfolio.admit(self.key, capital * self.max_position_pct, capital)
+            if not admitted:
+                return False, reason, details
+            return True, "✅ Trade aprovado", details
+        
+        exposure = self.entry_cost if self.is_in_position else 0.0
+        if exposure + capital * self.max_position_pct > capital * self.max_total_exposure:
+            return False, "Exposição total excedida", details
+        
+        return True, "✅ Trade aprovado", details
+    
+    def cancel_entry(self):
+        """Entrada aprovada que não foi executada: libera a exposição pendente na carteira"""
+        if self.portfolio is not None:
+            self.portfolio.cancel_pending(self.key)
+    
+    def open_position(self, entry_price, size, stop_loss, take_profit, action, cost=None, signal=None,
+                      symbol=None):
+        """Registra a posição aberta (uma por vez; na carteira, sob self.key)"""
+        now = self._now(signal)
+        self._roll_day(now)
+        self.is_in_position = True
+        self.entry_price = entry_price
+        self.position_size = size
+        self.stop_loss = stop_loss
+        self.take_profit = take_profit
+        self.entry_cost = cost if cost is not None else entry_price * size
+        self.entry_time = now
+        self.open_positions = [{
+            'entry_price': entry_price, 'size': size, 'action': action,
+            'stop_loss': stop_loss, 'take_profit': take_profit, 'opened_at': now
+        }]
+        self.daily_trades += 1
+        self.total_trades += 1
+        self.last_trade_time = now
+        if self.portfolio is not None:
+            self.portfolio.open_position(self.key, symbol or (signal or {}).get('symbol') or self.key, entry_price,
+                                         size, stop_loss, take_profit, action, self.entry_cost, now)
+        logger.info(f"📈 Posição aberta: {size:.8f} @ {entry_price:.2f} | SL {stop_loss:.2f} | TP {take_profit:.2f}")
+    
+    def close_position(self, exit_price, proceeds=None, signal=None):
+        """
+        Fecha a posição aberta
+        
+        Returns:
+            float: PnL realizado (proceeds - custo de entrada)
+        """
+        if not self.is_in_position:
+            return 0.0
+        now = self._now(signal)
+        self._roll_day(now)
+        if proceeds is None:
+            proceeds = exit_price * self.position_size
+        pnl = proceeds - self.entry_cost
+        self.daily_pnl += pnl
+        self.last_trade_time = now
+        if self.portfolio is not None:
+            self.portfolio.close_position(self.key, pnl, now)
+        logger.info(f"📉 Posição fechada @ {exit_price:.2f} | PnL {pnl:+.2f}")
+        
+        self.is_in_position = False
+        self.entry_price = 0.0
+        self.position_size = 0.0
+        self.stop_loss = 0.0
+        self.take_profit = 0.0
+        self.entry_cost = 0.0
+        self.entry_time = None
+        self.open_positions = []
+        return pnl
\ No newline at end of file
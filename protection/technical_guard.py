@@ -21,11 +21,13 @@ class TechnicalGuard:
     4. Exchange offline
     """
     
-    def __init__(self):
+    def __init__(self, health_monitor=None):
         self.error_count = 0
         self.max_errors = 5
         self.last_error_time = None
         self.exchange_status = 'unknown'
+        # ExchangeHealthMonitor: status em cache, sem fetch_status a cada ordem
+        self.health_monitor = health_monitor
         
         logger.info("[yellow]🔧 Camada 2: Technical Guard ativado[/yellow]")
     
@@ -33,9 +35,21 @@ class TechnicalGuard:
         """
         Valida conexão com exchange
         
+        Com health_monitor (da mesma exchange), lê o status em cache.
+        
         Returns:
             (bool, str): (conectado, mensagem)
         """
+        if self.health_monitor is not None and self.health_monitor.exchange is exchange:
+            ok, reason = self.health_monitor.is_healthy()
+            if ok:
+                self.exchange_status = 'online'
+                self.reset_error_counter()
+            else:
+                self.error_count += 1
+                self.last_error_time = datetime.now()
+            return ok, reason
+        
         try:
             # Tenta pegar status da exchange
             # Usamos fetch_status para Binance, que é mais leve que load_markets
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Benchmark dos backtests (backtest/engine.py e backtest/vectorized.py).
+
+Gera um passeio aleatório de candles de 1m e mede:
+- o replay completo orientado a eventos (Normalizer → RSIVolumeStrategy →
+  OrderManager → exchange simulada), em candles/min
+- o modo vetorizado sobre a mesma série (e a diferença entre as curvas)
+- o modo vetorizado sobre --years anos de 1m
+
+Uso (na raiz do projeto):
+    python scripts/bench_backtest.py [--candles 500000] [--years 3]
+"""
+import argparse
+import logging
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from backtest.engine import EventBacktester  # noqa: E402
+from backtest.vectorized import VectorizedBacktester  # noqa: E402
+
+
+def synthetic_candles(n, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.standard_normal(n) * 0.002))
+    open_ = np.concatenate(([100.0], close[:-1]))
+    high = np.maximum(open_, close) * (1 + rng.random(n) * 0.001)
+    low = np.minimum(open_, close) * (1 - rng.random(n) * 0.001)
+    volume = rng.lognormal(0, 1, n)
+    times = 1_700_000_000_000 + np.arange(n, dtype=np.int64) * 60_000
+    return np.column_stack([times, open_, high, low, close, volume])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--candles', type=int, default=500_000)
+    parser.add_argument('--years', type=float, default=3)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    candles = synthetic_candles(args.candles)
+    event = EventBacktester().run(candles)
+    stats = event['stats']
+    print(f"Eventos:    {stats['candles']} candles em {stats['elapsed']:.2f}s → "
+          f"{stats['candles_per_sec'] * 60 / 1e6:.2f}M candles/min | "
+          f"{stats['trades']} trades | retorno {stats['total_return']:+.2%}")
+
+    vectorized = VectorizedBacktester().run(candles)
+    stats = vectorized['stats']
+    print(f"Vetorizado: {stats['candles']} candles em {stats['elapsed']:.3f}s | "
+          f"{stats['trades']} trades | retorno {stats['total_return']:+.2%} | "
+          f"diferença máx. da curva {np.abs(event['equity'] - vectorized['equity']).max():.2e}")
+
+    years = synthetic_candles(int(args.years * 365 * 24 * 60), seed=1)
+    stats = VectorizedBacktester().run(years)['stats']
+    print(f"Vetorizado: {args.years:g} anos de 1m ({stats['candles']} candles) em {stats['elapsed']:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Benchmark da persistência do CashGate (protection/cash_gate/ledger.py).
+
+1. --threads threads fazendo reserva → commit → liberação → depósito:
+   - reescrita do JSON inteiro a cada mutação, dentro do lock (o que o
+     CashGate fazia antes do ledger)
+   - write-ahead log com fsync em lote, esperando o disco (sync=True)
+   - write-ahead log sem esperar o disco (sync=False)
+   Mede operações/s e o tempo com o lock do CashGate em mãos (p50/p99).
+2. Queda: um processo filho faz depósitos com sync=True e é morto com
+   SIGKILL; a recuperação deve ter todos os depósitos já confirmados.
+
+Uso (na raiz do projeto):
+    python scripts/bench_cash_gate.py [--threads 8] [--ops 500]
+"""
+import argparse
+import json
+import logging
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from protection.cash_gate.cash_gate import CashGate  # noqa: E402
+
+
+class TimedLock:
+    """threading.RLock que anota quanto tempo ficou adquirido (da entrada externa à saída)"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.holds = []
+        self._since = 0.0
+        self._depth = 0
+
+    def __enter__(self):
+        self._lock.acquire()
+        self._depth += 1
+        if self._depth == 1:
+            self._since = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self._depth -= 1
+        if self._depth == 0:
+            self.holds.append(time.perf_counter() - self._since)
+        self._lock.release()
+
+
+class RewriteCashGate(CashGate):
+    """Persistência anterior: o estado inteiro reescrito em JSON (indent=2) a cada mutação, com o lock"""
+
+    def _log(self, record):
+        self._seq += 1
+        record['seq'] = self._seq
+        self._apply(record)
+        self.state_path.write_text(json.dumps({'current_capital': self.current_capital, 'reserved': self._reserved,
+                                               'reservations': self._reservations}, indent=2), encoding='utf-8')
+        return 0
+
+
+def worker(gate, ops):
+    for _ in range(ops):
+        rid = gate.reserve(1.0)
+        gate.commit(0.5, rid)
+        gate.release(rid)
+        gate.deposit(0.5)
+
+
+def run(label, gate_class, threads, ops, **kwargs):
+    workdir = Path(tempfile.mkdtemp(prefix='mh_cash_'))
+    gate = gate_class(1_000_000, workdir / 'cash_gate_state.json', **kwargs)
+    lock = gate._lock = TimedLock()
+    pool = [threading.Thread(target=worker, args=(gate, ops)) for _ in range(threads)]
+    started = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    gate.close()
+    holds = np.array(lock.holds) * 1e6
+    mutations = threads * ops * 4
+    ledger = gate.ledger.stats if gate.ledger and gate_class is CashGate else None
+    print(f"{label:>34}: {mutations / elapsed:9,.0f} mutações/s | lock p50 {np.percentile(holds, 50):7.1f}µs "
+          f"p99 {np.percentile(holds, 99):8.1f}µs"
+          + (f" | {ledger['records']} registros em {ledger['flushes']} fsyncs, {ledger['snapshots']} snapshots"
+             if ledger else ''))
+
+
+def crash_child(path):
+    gate = CashGate(0.0, path)
+    acked = 0
+    while True:
+        gate.deposit(1.0)
+        acked += 1
+        print(acked, flush=True)
+
+
+def crash_test(seconds):
+    path = Path(tempfile.mkdtemp(prefix='mh_cash_crash_')) / 'cash_gate_state.json'
+    child = subprocess.Popen([sys.executable, __file__, '--crash-child', str(path)], stdout=subprocess.PIPE,
+                             stderr=subprocess.DEVNULL, text=True, cwd=ROOT)
+    time.sleep(seconds)
+    os.kill(child.pid, signal.SIGKILL)
+    lines = child.stdout.read().split()
+    child.wait()
+    acked = int(lines[-1]) if lines else 0
+    recovered = CashGate(0.0, path).current_capital
+    verdict = 'OK' if acked <= recovered <= acked + 1 else 'PERDA DE DADOS'
+    print(f"SIGKILL após {seconds:.1f}s: {acked} depósitos confirmados, capital recuperado {recovered:.0f} → {verdict}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--ops', type=int, default=500, help='ciclos reserva/commit/liberação/depósito por thread')
+    parser.add_argument('--crash-child', type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+    if args.crash_child:
+        crash_child(args.crash_child)
+        return
+
+    for threads in (1, args.threads):
+        print(f"--- {threads} thread(s), {threads * args.ops * 4:,} mutações")
+        run('JSON reescrito por mutação', RewriteCashGate, threads, args.ops)
+        run('WAL, fsync em lote (sync=True)', CashGate, threads, args.ops)
+        run('WAL, sem esperar o disco (sync=False)', CashGate, threads, args.ops, sync=False)
+    crash_test(1.0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Teste de estresse do CashGate (protection/cash_gate/cash_gate.py) com
+muitas threads de estrategistas dividindo um só capital.
+
+Cada thread escolhe um símbolo e:
+- dimensiona a ordem pelo capital atual (tamanho máximo por posição) e
+  reserva — por compare-and-reserve (capital_version + expected_version)
+  ou do jeito ingênuo (lê o capital e reserva sem checar a versão)
+- executa (commit parcial + release da sobra), desiste (release) ou
+  "trava" e abandona a reserva, que expira pelo TTL
+- fecha posições abertas (deposit com o custo da posição)
+
+Uma thread verificadora confere os invariantes durante a carga
+(reservado = soma das reservas <= capital, sub-orçamentos); no fim, com as
+reservas abandonadas expiradas, o reservado tem que ser zero e o capital
+tem que bater com a soma dos commits e depósitos.
+
+Uso (na raiz do projeto):
+    python scripts/bench_cash_stress.py [--threads 16] [--symbols 50] [--ops 2000]
+"""
+import argparse
+import logging
+import random
+import sys
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from protection.cash_gate.cash_gate import CashGate, ReservationConflict  # noqa: E402
+from scripts.bench_cash_gate import TimedLock  # noqa: E402
+
+EPSILON = 1e-6
+
+
+def strategist(gate, symbols, ops, cas, seed, totals, lock):
+    rng = random.Random(seed)
+    positions = {}  # símbolo → custo
+    committed = deposited = 0.0
+    counts = {'entries': 0, 'rejected': 0, 'abandoned': 0, 'conflicts': 0}
+    for _ in range(ops):
+        symbol = rng.choice(symbols)
+        if symbol in positions:
+            cost = positions.pop(symbol)
+            proceeds = cost * rng.uniform(0.97, 1.04)
+            gate.deposit(proceeds, symbol, cost=cost)
+            deposited += proceeds
+            continue
+        for _ in range(50):
+            version, capital = gate.capital_version()
+            amount = capital * gate.max_position_size_pct * rng.uniform(0.9, 1.0)
+            try:
+                rid = gate.reserve(amount, symbol=symbol, expected_version=version if cas else None)
+                break
+            except ReservationConflict:
+                counts['conflicts'] += 1
+        else:
+            rid = None
+        if rid is None:
+            counts['rejected'] += 1
+            continue
+        roll = rng.random()
+        if roll < 0.05:
+            counts['abandoned'] += 1  # ordem sem resposta: a reserva fica até o TTL
+        elif roll < 0.15:
+            gate.release(rid)
+        else:
+            cost = amount * rng.uniform(0.98, 1.0)
+            gate.commit(cost, rid)
+            gate.release(rid)
+            positions[symbol] = cost
+            committed += cost
+            counts['entries'] += 1
+    for symbol, cost in positions.items():
+        gate.deposit(cost, symbol, cost=cost)
+        deposited += cost
+    with lock:
+        totals['committed'] += committed
+        totals['deposited'] += deposited
+        for name, value in counts.items():
+            totals[name] += value
+
+
+def checker(gate, stop, violations):
+    while not stop.is_set():
+        with gate._lock:
+            total = sum(entry[0] for entry in gate._reservations.values())
+            if abs(total - gate._reserved) > EPSILON:
+                violations.append(f"reservado {gate._reserved:.6f} != soma {total:.6f}")
+            if gate._reserved > gate.current_capital + EPSILON:
+                violations.append(f"reservado {gate._reserved:.2f} > capital {gate.current_capital:.2f}")
+            by_symbol = {}
+            for amount, symbol, _ in gate._reservations.values():
+                by_symbol[symbol] = by_symbol.get(symbol, 0.0) + amount
+            for symbol, amount in by_symbol.items():
+                if abs(amount - gate._symbol_reserved.get(symbol, 0.0)) > EPSILON:
+                    violations.append(f"{symbol}: reservado por símbolo divergente")
+        time.sleep(0.001)
+
+
+def run(label, args, cas):
+    initial = 1_000_000.0
+    gate = CashGate(initial, state_path=None, reservation_ttl=args.ttl, symbol_budget_pct=args.budget)
+    lock = gate._lock = TimedLock()
+    symbols = [f"C{i:03d}/USDT" for i in range(args.symbols)]
+    totals = {'committed': 0.0, 'deposited': 0.0, 'entries': 0, 'rejected': 0, 'abandoned': 0, 'conflicts': 0}
+    totals_lock = threading.Lock()
+    stop, violations = threading.Event(), []
+    check = threading.Thread(target=checker, args=(gate, stop, violations))
+    check.start()
+    pool = [threading.Thread(target=strategist, args=(gate, symbols, args.ops, cas, seed, totals, totals_lock))
+            for seed in range(args.threads)]
+    started = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    stop.set()
+    check.join()
+
+    time.sleep(args.ttl)
+    gate.expire()
+    status = gate.get_status()
+    expected = initial - totals['committed'] + totals['deposited']
+    holds = np.array(lock.holds) * 1e6
+    ok = not violations and status['reserved_capital'] < EPSILON and abs(status['current_capital'] - expected) < 1e-3
+    print(f"{label:>18}: {len(lock.holds) / elapsed:9,.0f} operações/s | lock p50 {np.percentile(holds, 50):5.1f}µs "
+          f"p99 {np.percentile(holds, 99):6.1f}µs | entradas {totals['entries']:6d} | rejeitadas "
+          f"{totals['rejected']:5d} | conflitos {totals['conflicts']:5d} | expiradas {status['expired']:4d}/"
+          f"{totals['abandoned']} | reservado final {status['reserved_capital']:.2f} | capital "
+          f"{'confere' if abs(status['current_capital'] - expected) < 1e-3 else 'DIVERGE'} | "
+          f"invariantes {'OK' if ok else f'FALHOU: {violations[:3]}'}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--symbols', type=int, default=50)
+    parser.add_argument('--ops', type=int, default=2000, help='operações por thread')
+    parser.add_argument('--ttl', type=float, default=0.2, help='TTL das reservas (s)')
+    parser.add_argument('--budget', type=float, default=0.05, help='sub-orçamento por símbolo (fração do capital)')
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    print(f"{args.threads} threads, {args.symbols} símbolos, {args.ops} operações/thread, TTL {args.ttl}s, "
+          f"sub-orçamento {args.budget:.0%}")
+    run('ingênuo', args, cas=False)
+    run('compare-and-reserve', args, cas=True)
+
+
+if __name__ == '__main__':
+    main()
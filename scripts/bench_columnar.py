@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Benchmark do armazenamento colunar (data/columnar.py).
+
+1. Popula um market_analysis_v2 sintético e compara a leitura de todo o
+   histórico por SQL (fetchall + np.array, como o MLStrategy) com o
+   export_asset + ColumnarStore.load.
+2. Mede ColumnarStore.load de um intervalo de tempo para muitos ativos
+   (arquivos gerados direto com write_columns).
+
+Uso (na raiz do projeto):
+    python scripts/bench_columnar.py [--sql-rows 200000] [--assets 50] [--days 365]
+"""
+import argparse
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from data.columnar import ColumnarStore, export_asset, write_columns  # noqa: E402
+from data.storage import INSERT_ANALYSIS_SQL, connect  # noqa: E402
+from maria_helena_database_creator import create_tables  # noqa: E402
+
+MINUTE = 60
+
+
+def bench_sql_vs_columnar(tmp: Path, n_rows: int):
+    conn = connect(tmp / 'bench.db')
+    create_tables(conn)
+    base = 1_700_000_000
+    rows = (
+        {'asset': 'BTC', 'timestamp': base + i * MINUTE, 'price': 100.0 + i % 97, 'volume': 1.0 + i % 7,
+         'rsi': 50.0, 'bb_upper': 1.0, 'bb_lower': 1.0, 'bb_middle': 1.0, 'macd': 0.0,
+         'macd_signal': 0.0, 'macd_histogram': 0.0, 'sma': 1.0, 'obv': 0.0, 'trend': 'NEUTRAL'}
+        for i in range(n_rows)
+    )
+    with conn:
+        conn.executemany(INSERT_ANALYSIS_SQL, rows)
+
+    t0 = time.perf_counter()
+    data = conn.execute(
+        "SELECT rsi, price, volume, macd, sma FROM market_analysis_v2 WHERE asset = ? ORDER BY timestamp",
+        ('BTC',)
+    ).fetchall()
+    matrix = np.array(data)
+    sql_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    export_asset(conn, 'BTC', tmp / 'columnar')
+    export_s = time.perf_counter() - t0
+
+    store = ColumnarStore(tmp / 'columnar')
+    t0 = time.perf_counter()
+    views = store.load('BTC', columns=['rsi', 'price', 'volume', 'macd', 'sma'])
+    load_s = time.perf_counter() - t0
+    assert np.array_equal(views['price'], matrix[:, 1])
+    conn.close()
+
+    print(f"SQL fetchall + np.array ({n_rows} linhas): {sql_s * 1000:9.1f} ms")
+    print(f"export_asset (uma vez):                  {export_s * 1000:9.1f} ms")
+    print(f"ColumnarStore.load (mmap):                {load_s * 1000:9.3f} ms")
+
+
+def bench_many_assets(tmp: Path, n_assets: int, days: int):
+    root = tmp / 'many'
+    n = days * 24 * 60
+    times = 1_700_000_000 + np.arange(n, dtype=np.int64) * MINUTE
+    rng = np.random.default_rng(0)
+    t0 = time.perf_counter()
+    for a in range(n_assets):
+        write_columns(root / f'A{a}', {
+            'timestamp': times,
+            'price': 100 + rng.standard_normal(n).cumsum(),
+            'volume': rng.random(n),
+        }, 'timestamp')
+    print(f"\nGerados {n_assets} ativos × {n} velas de 1m em {time.perf_counter() - t0:.1f} s")
+
+    store = ColumnarStore(root)
+    start, end = int(times[n // 4]), int(times[3 * n // 4])
+    t0 = time.perf_counter()
+    total = 0
+    for a in range(n_assets):
+        total += len(store.load(f'A{a}', start, end)['price'])
+    load_s = time.perf_counter() - t0
+    print(f"load de {total} linhas ({n_assets} ativos, meio intervalo): {load_s * 1000:.2f} ms")
+
+    t0 = time.perf_counter()
+    checksum = sum(float(store.load(f'A{a}', start, end)['price'].sum()) for a in range(n_assets))
+    print(f"load + soma (toca todas as páginas): {(time.perf_counter() - t0) * 1000:.1f} ms "
+          f"(checksum {checksum:.1f})")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sql-rows', type=int, default=200_000)
+    parser.add_argument('--assets', type=int, default=50)
+    parser.add_argument('--days', type=int, default=365)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        bench_sql_vs_columnar(Path(tmp), args.sql_rows)
+        bench_many_assets(Path(tmp), args.assets, args.days)
+
+
+if __name__ == "__main__":
+    main()
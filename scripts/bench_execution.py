@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Benchmark do motor de execução (core/orders/execution_engine.py).
+
+--symbols sinais de compra no mesmo ciclo, numa exchange com --rtt ms de
+ida e volta: em série pelo OrderManager.execute_trade vs. em paralelo pelo
+ExecutionEngine. Na segunda parte, parte das respostas de create_order se
+"perde" (a ordem executa, mas o cliente recebe NetworkError): o retry pelo
+clientOrderId deve recuperar a ordem sem executar duas vezes.
+
+Uso (na raiz do projeto):
+    python scripts/bench_execution.py [--symbols 20] [--rtt 50]
+"""
+import argparse
+import asyncio
+import logging
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+import ccxt  # type: ignore
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from config import CONFIG  # noqa: E402
+from core.orders.execution_engine import ExecutionEngine  # noqa: E402
+from core.orders.order_manager import OrderManager  # noqa: E402
+from protection.cash_gate.cash_gate import CashGate  # noqa: E402
+from protection.circuit_breaker import CircuitBreaker  # noqa: E402
+from protection.health_monitor import ExchangeHealthMonitor  # noqa: E402
+from protection.risk_manager import RiskManager  # noqa: E402
+from protection.technical_guard import TechnicalGuard  # noqa: E402
+
+
+class LatencyExchange:
+    """Ordens a mercado com latência fixa; lose_every=N perde a resposta de 1 em N envios"""
+
+    def __init__(self, rtt, lose_every=0):
+        self.rtt = rtt
+        self.lose_every = lose_every
+        self.orders = []
+        self.sent = 0
+        self._lock = threading.Lock()
+
+    def fetch_status(self):
+        return {'status': 'ok'}
+
+    def create_order(self, symbol, type, side, amount, price=None, params=None):
+        time.sleep(self.rtt)
+        cid = (params or {}).get('clientOrderId')
+        with self._lock:
+            self.sent += 1
+            lost = self.lose_every and self.sent % self.lose_every == 0
+            if cid and any(o['clientOrderId'] == cid for o in self.orders):
+                raise ccxt.DuplicateOrderId(f"Duplicate order sent: {cid}")
+            order = {'id': str(len(self.orders) + 1), 'clientOrderId': cid, 'symbol': symbol, 'side': side,
+                     'amount': amount, 'filled': amount, 'average': 100.0, 'cost': amount * 100.0,
+                     'status': 'closed'}
+            self.orders.append(order)
+        if lost:
+            raise ccxt.RequestTimeout("resposta perdida")
+        return dict(order)
+
+    def fetch_open_orders(self, symbol):
+        return []
+
+    def fetch_closed_orders(self, symbol):
+        time.sleep(self.rtt)
+        with self._lock:
+            return [dict(o) for o in self.orders if o['symbol'] == symbol]
+
+
+def build(symbols, exchange):
+    config = dict(CONFIG, state_file=None)
+    cash_gate = CashGate(config['INITIAL_CAPITAL'], state_path=None)
+    breaker = CircuitBreaker(config)
+    guard = TechnicalGuard(ExchangeHealthMonitor(exchange, interval=0))
+    return [OrderManager(exchange, RiskManager(config), guard, breaker, cash_gate, symbol=s) for s in symbols]
+
+
+def signals(symbols):
+    return [{'action': 'BUY', 'symbol': s, 'price': 100.0, 'timestamp': 1_700_000_000_000, 'confidence': 1.0}
+            for s in symbols]
+
+
+async def engine_cycle(managers, batch, max_concurrency):
+    engine = ExecutionEngine(max_concurrency, retry_delay=0.01)
+    started = time.perf_counter()
+    results = await asyncio.gather(*(engine.submit(m, s) for m, s in zip(managers, batch)))
+    elapsed = time.perf_counter() - started
+    # Reenvio do mesmo ciclo: deduplicado pelo clientOrderId
+    again = await engine.submit(managers[0], dict(batch[0]))
+    await engine.stop()
+    return elapsed, results, again, engine.status()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--symbols', type=int, default=20)
+    parser.add_argument('--rtt', type=float, default=50, help='ida e volta de rede simulada (ms)')
+    parser.add_argument('--concurrency', type=int, default=8)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR)
+    logging.getLogger().setLevel(logging.ERROR)
+
+    symbols = [f"C{i:03d}/USDT" for i in range(args.symbols)]
+    rtt = args.rtt / 1000
+
+    exchange = LatencyExchange(rtt)
+    managers = build(symbols, exchange)
+    started = time.perf_counter()
+    serial = [m.execute_trade(s) for m, s in zip(managers, signals(symbols))]
+    serial_elapsed = time.perf_counter() - started
+    print(f"em série   : {serial_elapsed * 1000:7.0f}ms | executadas: "
+          f"{sum(r['status'] == 'executed' for r in serial)}/{args.symbols}")
+
+    exchange = LatencyExchange(rtt)
+    managers = build(symbols, exchange)
+    elapsed, results, again, status = asyncio.run(engine_cycle(managers, signals(symbols), args.concurrency))
+    print(f"motor ({args.concurrency:>2}) : {elapsed * 1000:7.0f}ms | executadas: "
+          f"{sum(r['status'] == 'executed' for r in results)}/{args.symbols} | "
+          f"{serial_elapsed / elapsed:.1f}x | reenvio do mesmo sinal: {status['deduplicated']} deduplicado "
+          f"({again['client_order_id']})")
+
+    exchange = LatencyExchange(rtt, lose_every=3)
+    managers = build(symbols, exchange)
+    elapsed, results, _, status = asyncio.run(engine_cycle(managers, signals(symbols), args.concurrency))
+    fills = Counter(o['clientOrderId'] for o in exchange.orders)
+    positions = sum(m.risk_manager.is_in_position for m in managers)
+    print(f"respostas perdidas (1 em 3): {elapsed * 1000:.0f}ms | envios: {exchange.sent} | "
+          f"recuperadas: {status['recovered']} | retries: {status['retries']} | "
+          f"ordens na exchange: {len(exchange.orders)} (máx. por clientOrderId: {max(fills.values())}) | "
+          f"posições: {positions} | reservado no CashGate: {managers[0].cash_gate.get_status()['reserved_capital']:.2f}")
+
+
+if __name__ == '__main__':
+    main()
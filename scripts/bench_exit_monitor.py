@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Benchmark do monitor de saídas (core/exit_monitor.py) com negócios vindos
+de um servidor WebSocket local que imita o aggTrade da Binance.
+
+--positions posições (stop 1–5% abaixo, alvo 2–8% acima) em --symbols
+símbolos; o servidor publica --ticks negócios em passeio aleatório. Mede:
+
+- custo de on_price por tick (índice ordenado do PortfolioRiskManager)
+- latência negócio enviado → saída executada (on_exit)
+- saídas conferidas contra uma varredura da trajetória de preços: cada
+  posição cujo nível foi cruzado sai exatamente uma vez
+- derrapagem média dos stops: saída no tick do disparo vs. no fechamento
+  do candle (o que o loop principal conseguia, acordando por candle)
+
+Uso (na raiz do projeto):
+    python scripts/bench_exit_monitor.py [--positions 1000] [--symbols 100] [--ticks 50000]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from aiohttp import WSMsgType, web
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from config import CONFIG  # noqa: E402
+from core.exit_monitor import ExitMonitor  # noqa: E402
+from data.kline_stream import KlineStream, market_id  # noqa: E402
+from protection.portfolio_risk import PortfolioRiskManager  # noqa: E402
+
+
+def price_path(symbols, ticks, seed):
+    rng = random.Random(seed)
+    prices = {symbol: 100.0 for symbol in symbols}
+    path = []
+    for _ in range(ticks):
+        symbol = rng.choice(symbols)
+        prices[symbol] *= 1 + rng.gauss(0, 0.002)
+        path.append((symbol, round(prices[symbol], 8)))  # o que o servidor publica (8 casas)
+    return path
+
+
+class LocalTradeServer:
+    """Stand-in local do stream combinado de aggTrade"""
+
+    def __init__(self, path, batch, interval):
+        self.path = path
+        self.batch = batch
+        self.interval = interval
+        self.connected = asyncio.Event()
+        self.ws = None
+
+    def app(self):
+        app = web.Application()
+        app.router.add_get('/stream', self.stream)
+        return app
+
+    async def stream(self, request):
+        self.ws = web.WebSocketResponse()
+        await self.ws.prepare(request)
+        self.connected.set()
+        async for msg in self.ws:
+            if msg.type == WSMsgType.ERROR:
+                break
+        return self.ws
+
+    async def publish(self):
+        await self.connected.wait()
+        for start in range(0, len(self.path), self.batch):
+            for i, (symbol, price) in enumerate(self.path[start:start + self.batch], start):
+                data = {'e': 'aggTrade', 's': market_id(symbol), 'a': i, 'p': f"{price:.8f}", 'q': '0.01',
+                        'T': time.time() * 1000}
+                await self.ws.send_str(json.dumps({'stream': f"{market_id(symbol).lower()}@aggTrade", 'data': data}))
+            await asyncio.sleep(self.interval)
+
+
+async def run(args):
+    symbols = [f"C{i:03d}/USDT" for i in range(args.symbols)]
+    rng = random.Random(args.seed)
+    portfolio = PortfolioRiskManager(CONFIG)
+    levels = {}
+    for i in range(args.positions):
+        symbol = symbols[i % len(symbols)]
+        stop, target = 100.0 * (1 - rng.uniform(0.01, 0.05)), 100.0 * (1 + rng.uniform(0.02, 0.08))
+        levels[(symbol, i)] = (stop, target)
+        portfolio.open_position((symbol, i), symbol, 100.0, 0.3, stop, target, cost=30.0)
+
+    exits, latencies = [], []
+
+    def on_exit(hit, price, timestamp):
+        latencies.append(time.time() * 1000 - timestamp)
+        portfolio.close_position(hit['key'], 0.0)
+        exits.append((hit['key'], hit['reason'], price))
+        return True
+
+    monitor = ExitMonitor(portfolio, on_exit).start()
+    tick_cost = []
+
+    def on_trade(symbol, price, amount, timestamp):
+        started = time.perf_counter()
+        monitor.on_price(symbol, price, timestamp)
+        tick_cost.append(time.perf_counter() - started)
+
+    path = price_path(symbols, args.ticks, args.seed)
+    server = LocalTradeServer(path, args.batch, args.interval)
+    runner = web.AppRunner(server.app(), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    stream = KlineStream([], on_trade=on_trade, trade_symbols=symbols, url=f"ws://127.0.0.1:{port}/stream")
+    await stream.start()
+    started = time.perf_counter()
+    await server.publish()
+    while stream.stats['trades'] < len(path):
+        await asyncio.sleep(0.01)
+    elapsed = time.perf_counter() - started
+    await asyncio.get_running_loop().run_in_executor(None, monitor.stop)
+    await stream.stop()
+    await runner.cleanup()
+    return symbols, levels, path, exits, np.array(latencies), np.array(tick_cost) * 1e6, elapsed, monitor
+
+
+def expected_exits(levels, path, candle_ticks):
+    """Varredura da trajetória: primeiro tick que cruza cada posição, e o fechamento do candle desse tick"""
+    by_symbol = {}
+    for i, (symbol, price) in enumerate(path):
+        by_symbol.setdefault(symbol, []).append((i, price))
+    found = {}
+    for key, (stop, target) in levels.items():
+        series = by_symbol.get(key[0], [])
+        for i, price in series:
+            if price <= stop or price >= target:
+                candle_end = (i // candle_ticks + 1) * candle_ticks
+                close = next((p for j, p in reversed(series) if j < candle_end), price)
+                found[key] = ('stop_loss' if price <= stop else 'take_profit', price, close)
+                break
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--positions', type=int, default=1000)
+    parser.add_argument('--symbols', type=int, default=100)
+    parser.add_argument('--ticks', type=int, default=50_000)
+    parser.add_argument('--batch', type=int, default=50, help='negócios por rajada do servidor')
+    parser.add_argument('--interval', type=float, default=0.001, help='pausa entre rajadas (s)')
+    parser.add_argument('--candle-ticks', type=int, default=3000, help='negócios por candle (comparação)')
+    parser.add_argument('--seed', type=int, default=11)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    symbols, levels, path, exits, latencies, tick_cost, elapsed, monitor = asyncio.run(run(args))
+    expected = expected_exits(levels, path, args.candle_ticks)
+    got = {key: (reason, price) for key, reason, price in exits}
+    once = len(got) == len(exits)
+    same = got == {key: (reason, price) for key, (reason, price, _) in expected.items()}
+    print(f"{args.positions} posições em {args.symbols} símbolos | {len(path):,} negócios em {elapsed:.2f}s "
+          f"({len(path) / elapsed:,.0f}/s)")
+    print(f"on_price: p50 {np.percentile(tick_cost, 50):.1f}µs | p99 {np.percentile(tick_cost, 99):.1f}µs por tick")
+    print(f"negócio → saída: p50 {np.percentile(latencies, 50):.2f}ms | p99 {np.percentile(latencies, 99):.2f}ms | "
+          f"máx {latencies.max():.2f}ms")
+    print(f"saídas: {len(exits)} (esperadas {len(expected)}) | uma por posição: {'sim' if once else 'NÃO'} | "
+          f"iguais à varredura: {'sim' if same else 'NÃO'} | métricas {monitor.metrics()['exits']} saídas")
+
+    stops = [(levels[key][0], price, close) for key, (reason, price, close) in expected.items() if reason == 'stop_loss']
+    if stops:
+        tick_slip = np.mean([(stop - price) / stop for stop, price, _ in stops]) * 1e4
+        candle_slip = np.mean([(stop - close) / stop for stop, _, close in stops]) * 1e4
+        print(f"derrapagem média dos stops ({len(stops)}): no tick {tick_slip:.1f} bps | "
+              f"no fechamento do candle ({args.candle_ticks} negócios) {candle_slip:.1f} bps")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark do caminho da ordem com e sem o ExchangeHealthMonitor
+(protection/health_monitor.py).
+
+Uma exchange de mentira responde fetch_status e create_order após --rtt ms
+(a ida e volta de rede). Sem monitor, cada execute_order paga fetch_status
++ create_order; com o monitor, o status vem do cache e sobra só a ordem.
+
+Uso (na raiz do projeto):
+    python scripts/bench_health.py [--orders 40] [--rtt 80]
+"""
+import argparse
+import logging
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from config import CONFIG  # noqa: E402
+from core.orders.order_manager import OrderManager  # noqa: E402
+from protection.cash_gate.cash_gate import CashGate  # noqa: E402
+from protection.circuit_breaker import CircuitBreaker  # noqa: E402
+from protection.health_monitor import ExchangeHealthMonitor  # noqa: E402
+from protection.risk_manager import RiskManager  # noqa: E402
+from protection.technical_guard import TechnicalGuard  # noqa: E402
+
+DAY_MS = 86_400_000
+
+
+class SlowExchange:
+    """fetch_status e create_order com latência fixa de rede"""
+
+    def __init__(self, rtt):
+        self.rtt = rtt
+        self.status_calls = 0
+
+    def fetch_status(self):
+        self.status_calls += 1
+        time.sleep(self.rtt)
+        return {'status': 'ok'}
+
+    def create_order(self, symbol, type, side, amount, price=None, params=None):
+        time.sleep(self.rtt)
+        return {'id': '1', 'symbol': symbol, 'side': side, 'filled': amount, 'average': 100.0,
+                'cost': amount * 100.0, 'status': 'closed'}
+
+
+def order_latencies(orders, rtt, monitor):
+    config = dict(CONFIG, state_file=None)
+    exchange = SlowExchange(rtt)
+    health = ExchangeHealthMonitor(exchange, interval=1.0, max_age=5.0).start() if monitor else None
+    manager = OrderManager(exchange, RiskManager(config), TechnicalGuard(health), CircuitBreaker(config),
+                           CashGate(config['INITIAL_CAPITAL'], state_path=None), symbol='BTC/USDT')
+    latencies = []
+    for i in range(orders):
+        # Um dia por ordem: fora do intervalo mínimo e do limite diário do RiskManager
+        signal = {'action': 'BUY', 'symbol': 'BTC/USDT', 'price': 100.0, 'timestamp': 1_700_000_000_000 + i * DAY_MS}
+        started = time.perf_counter()
+        order = manager.execute_order('BUY', 0.1, 100.0, signal)
+        latencies.append(time.perf_counter() - started)
+        assert order is not None, "ordem rejeitada"
+        manager.close_position(100.0, dict(signal, action='SELL'), 'bench')
+    metrics = health.metrics() if health else None
+    if health:
+        health.stop()
+    return np.array(latencies) * 1000, exchange.status_calls, metrics
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--orders', type=int, default=40)
+    parser.add_argument('--rtt', type=float, default=80, help='ida e volta de rede simulada (ms)')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger().setLevel(logging.WARNING)
+
+    rtt = args.rtt / 1000
+    for label, monitor in (('fetch_status por ordem', False), ('status em cache', True)):
+        latencies, calls, metrics = order_latencies(args.orders, rtt, monitor)
+        print(f"{label:>24}: p50 {np.percentile(latencies, 50):6.1f}ms | p95 {np.percentile(latencies, 95):6.1f}ms "
+              f"| fetch_status: {calls}")
+    print(f"monitor: {metrics}")
+
+
+if __name__ == '__main__':
+    main()
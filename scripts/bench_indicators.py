@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark dos kernels de indicadores (data/indicators.py)
+contra os métodos calculate_* do Analista, com checagem de paridade.
+
+Uso (na raiz do projeto):
+    python scripts/bench_indicators.py [--assets 300] [--candles 100]
+"""
+import argparse
+import math
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+Path('logs').mkdir(exist_ok=True)
+
+from data import indicators  # noqa: E402
+from maria_helena_analista import MariaHelenaAnalystBot as Analyst  # noqa: E402
+
+
+def reference(prices, volumes):
+    bb_upper, bb_middle, bb_lower = Analyst.calculate_bollinger_bands(prices)
+    macd, macd_signal, macd_histogram = Analyst.calculate_macd(prices)
+    return {
+        'rsi': Analyst.calculate_rsi(prices),
+        'bb_upper': bb_upper, 'bb_middle': bb_middle, 'bb_lower': bb_lower,
+        'macd': macd, 'macd_signal': macd_signal, 'macd_histogram': macd_histogram,
+        'sma': Analyst.calculate_sma(prices),
+        'obv': Analyst.calculate_obv(prices, volumes),
+        'trend': Analyst.determine_trend(prices),
+    }
+
+
+def same(a, b):
+    if isinstance(a, str) or a is None or b is None:
+        return a == b
+    if math.isnan(a) and math.isnan(b):
+        return True
+    # Os dois lados arredondam; tolera 1 unidade na última casa
+    return abs(a - b) <= 1e-4 + 1e-9 * abs(a)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark dos kernels de indicadores')
+    parser.add_argument('--assets', type=int, default=300)
+    parser.add_argument('--candles', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=13)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    universe = []
+    for _ in range(args.assets):
+        closes = 100 * np.cumprod(1 + rng.normal(0, 0.003, args.candles))
+        volumes = rng.uniform(1, 1000, args.candles)
+        klines = [[i * 60_000, c, c, c, c, v] for i, (c, v) in enumerate(zip(closes, volumes))]
+        universe.append(klines)
+
+    start = time.perf_counter()
+    expected = []
+    for klines in universe:
+        prices = [float(k[4]) for k in klines]
+        volumes = [float(k[5]) for k in klines]
+        expected.append(reference(prices, volumes))
+    ref_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    got = []
+    for klines in universe:
+        closes, volumes, _ = indicators.klines_to_arrays(klines)
+        got.append(indicators.compute_indicators(closes, volumes))
+    kernel_time = time.perf_counter() - start
+
+    mismatches = [
+        (i, key, exp[key], res[key])
+        for i, (exp, res) in enumerate(zip(expected, got))
+        for key in exp if not same(exp[key], res[key])
+    ]
+
+    print(f"📊 {args.assets} ativos × {args.candles} velas")
+    print(f"   referência (pandas/loop): {ref_time * 1000:8.1f} ms")
+    print(f"   kernels (numpy)         : {kernel_time * 1000:8.1f} ms")
+    print(f"   speedup                 : {ref_time / kernel_time:8.1f}x")
+    if mismatches:
+        print(f"❌ {len(mismatches)} divergências, ex.: {mismatches[:5]}")
+        return 1
+    print("✅ Paridade numérica OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
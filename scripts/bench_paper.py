@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Benchmark da exchange de papel (core/paper_exchange.py).
+
+1. Vazão: ordens a mercado alternando compra/venda em --symbols símbolos,
+   numa thread e em --threads threads; ordens limitadas (criar + cancelar)
+   e execução das limitadas no livro pelas velas
+2. Backtest: EventBacktester com a SimulatedExchange vs. a PaperExchange de
+   profundidade infinita (deve dar o mesmo resultado) e com --depth por nível
+
+Uso (na raiz do projeto):
+    python scripts/bench_paper.py [--orders 100000] [--symbols 10] [--depth 5]
+"""
+import argparse
+import logging
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from backtest.engine import EventBacktester  # noqa: E402
+from core.paper_exchange import PaperExchange  # noqa: E402
+from scripts.bench_backtest import synthetic_candles  # noqa: E402
+
+
+def build(symbols):
+    exchange = PaperExchange(symbols, {'USDT': 1e12}, level_notional=1e6)
+    for symbol in symbols:
+        exchange.balances[symbol.split('/')[0]] = 1e9
+        exchange.update_market(0, 100.0, symbol)
+    return exchange
+
+
+def market_orders(exchange, symbols, orders):
+    for i in range(orders):
+        exchange.create_order(symbols[i % len(symbols)], 'market', 'buy' if i & 1 else 'sell', 0.01)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--orders', type=int, default=100_000)
+    parser.add_argument('--symbols', type=int, default=10)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--candles', type=int, default=20_000)
+    parser.add_argument('--depth', type=float, default=5.0, help='liquidez por nível no backtest (USDT)')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR)
+    logging.getLogger().setLevel(logging.ERROR)
+
+    symbols = [f"C{i:03d}/USDT" for i in range(args.symbols)]
+
+    exchange = build(symbols)
+    started = time.perf_counter()
+    market_orders(exchange, symbols, args.orders)
+    elapsed = time.perf_counter() - started
+    print(f"mercado, 1 thread  : {args.orders / elapsed:10,.0f} ordens/s ({elapsed / args.orders * 1e6:.1f}µs/ordem)")
+
+    exchange = build(symbols)
+    per_thread = args.orders // args.threads
+    threads = [threading.Thread(target=market_orders, args=(exchange, symbols, per_thread))
+               for _ in range(args.threads)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    print(f"mercado, {args.threads} threads : {per_thread * args.threads / elapsed:10,.0f} ordens/s "
+          f"| ordens registradas: {exchange.stats['orders']}")
+
+    exchange = build(symbols)
+    started = time.perf_counter()
+    for i in range(args.orders // 2):
+        order = exchange.create_order(symbols[i % len(symbols)], 'limit', 'buy', 0.01, 99.0 - (i % 50) * 0.01)
+        exchange.cancel_order(order['id'])
+    elapsed = time.perf_counter() - started
+    print(f"limitada + cancela : {args.orders / elapsed:10,.0f} chamadas/s")
+
+    exchange = build(symbols)
+    for i in range(args.orders):
+        exchange.create_order(symbols[i % len(symbols)], 'limit', 'buy', 0.01, 99.0 - (i % 100) * 0.01)
+    started = time.perf_counter()
+    candles = 0
+    while exchange.open_orders and candles < 10_000:
+        for symbol in symbols:
+            exchange.on_candle(symbol, [candles, 100.0, 100.0, 98.0, 99.5, 50.0])
+        candles += 1
+    elapsed = time.perf_counter() - started
+    print(f"livro → execuções  : {args.orders:,} limitadas executadas em {candles} velas/símbolo, "
+          f"{elapsed:.2f}s ({args.orders / elapsed:,.0f} execuções/s)")
+
+    candles = synthetic_candles(args.candles)
+    print(f"\nbacktest ({args.candles:,} velas):")
+    for label, depth in (('SimulatedExchange', None), ('Paper, prof. infinita', 1e18),
+                         (f"Paper, {args.depth:,.0f}/nível", args.depth)):
+        stats = EventBacktester(depth=depth).run(candles)['stats']
+        print(f"  {label:>22}: patrimônio {stats['final_equity']:10.4f} | operações {stats['trades']:3d} | "
+              f"taxas {stats['fees']:7.4f} | {stats['candles_per_sec']:8,.0f} velas/s")
+
+
+if __name__ == '__main__':
+    main()
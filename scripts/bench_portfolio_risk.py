@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Benchmark do risco de carteira (protection/portfolio_risk.py).
+
+--positions posições abertas em --symbols símbolos (várias por símbolo,
+como timeframes diferentes do mesmo par) e um fluxo de velas/ticks:
+
+- varredura: para cada vela, checa stop/alvo de todas as posições abertas e
+  soma a exposição (o que um RiskManager por par obriga a fazer na carteira)
+- índice: PortfolioRiskManager.triggered() só toca as posições cujo nível a
+  vela cruzou; a exposição é o acumulado incremental
+
+Os disparos das duas abordagens são comparados vela a vela; posições que
+disparam fecham e reabrem em outro preço (a carteira fica do mesmo tamanho).
+
+Uso (na raiz do projeto):
+    python scripts/bench_portfolio_risk.py [--positions 100,1000,10000] [--symbols 200] [--ticks 20000]
+"""
+import argparse
+import logging
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from config import CONFIG  # noqa: E402
+from protection.portfolio_risk import PortfolioRiskManager  # noqa: E402
+
+
+def levels(price, rng):
+    return price * (1 - rng.uniform(0.01, 0.05)), price * (1 + rng.uniform(0.02, 0.08))
+
+
+def build(positions, symbols, rng):
+    prices = {symbol: 100.0 for symbol in symbols}
+    book = {}
+    for i in range(positions):
+        symbol = symbols[i % len(symbols)]
+        stop, target = levels(prices[symbol], rng)
+        book[(symbol, i)] = {'symbol': symbol, 'stop_loss': stop, 'take_profit': target, 'cost': 30.0}
+    return prices, book
+
+
+def ticks(symbols, prices, count, rng):
+    for _ in range(count):
+        symbol = rng.choice(symbols)
+        close = prices[symbol] * (1 + rng.gauss(0, 0.004))
+        low, high = sorted((prices[symbol], close))
+        prices[symbol] = close
+        yield symbol, low * (1 - abs(rng.gauss(0, 0.002))), high * (1 + abs(rng.gauss(0, 0.002))), close
+
+
+def scan(book, symbols, count, seed):
+    """Um RiskManager por posição: toda vela passa por todas as posições"""
+    rng = random.Random(seed)
+    prices = {symbol: 100.0 for symbol in symbols}
+    hits = []
+    started = time.perf_counter()
+    for symbol, low, high, close in ticks(symbols, prices, count, rng):
+        exposure = 0.0
+        crossed = []
+        for key, position in book.items():
+            exposure += position['cost']
+            if position['symbol'] != symbol:
+                continue
+            if low <= position['stop_loss']:
+                crossed.append((key, 'stop_loss'))
+            elif high >= position['take_profit']:
+                crossed.append((key, 'take_profit'))
+        for key, _ in crossed:
+            book[key]['stop_loss'], book[key]['take_profit'] = levels(close, rng)
+        hits.append(sorted(crossed))
+    return time.perf_counter() - started, hits
+
+
+def indexed(book, symbols, count, seed):
+    portfolio = PortfolioRiskManager(CONFIG)
+    for key, position in book.items():
+        portfolio.open_position(key, position['symbol'], 100.0, 0.3, position['stop_loss'], position['take_profit'],
+                                cost=position['cost'])
+    rng = random.Random(seed)
+    prices = {symbol: 100.0 for symbol in symbols}
+    hits = []
+    started = time.perf_counter()
+    for symbol, low, high, close in ticks(symbols, prices, count, rng):
+        _ = portfolio.exposure
+        crossed = [(hit['key'], hit['reason']) for hit in portfolio.triggered(symbol, low, high)]
+        for key, _ in sorted(crossed):
+            stop, target = levels(close, rng)
+            portfolio.close_position(key, 0.0)
+            portfolio.open_position(key, symbol, close, 0.3, stop, target, cost=30.0)
+        hits.append(sorted(crossed))
+    return time.perf_counter() - started, hits, portfolio
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--positions', default='100,1000,10000')
+    parser.add_argument('--symbols', type=int, default=200)
+    parser.add_argument('--ticks', type=int, default=20_000)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    symbols = [f"C{i:03d}/USDT" for i in range(args.symbols)]
+    for positions in (int(n) for n in args.positions.split(',')):
+        _, book = build(positions, symbols, random.Random(args.seed))
+        scan_time, scan_hits = scan({key: dict(p) for key, p in book.items()}, symbols, args.ticks, args.seed)
+        index_time, index_hits, portfolio = indexed(book, symbols, args.ticks, args.seed)
+        same = scan_hits == index_hits
+        status = portfolio.get_status()
+        print(f"{positions:6d} posições: varredura {scan_time / args.ticks * 1e6:8.1f}µs/vela | índice "
+              f"{index_time / args.ticks * 1e6:6.1f}µs/vela ({scan_time / index_time:6.1f}x) | disparos "
+              f"{sum(map(len, index_hits)):5d} | mesmos disparos: {'sim' if same else 'NÃO'} | exposição "
+              f"{status['exposure']:.2f} (esperado {positions * 30.0:.2f})")
+
+
+if __name__ == '__main__':
+    main()
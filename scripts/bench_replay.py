@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Benchmark do loop do Estrategista em replay (core/replay.py).
+
+1. Grava --cycles ciclos de um mercado sintético de 1m com a
+   RecordingExchange (relógio simulado: um ciclo por fechamento de candle)
+2. Roda o MariaHelenaBot completo sobre a gravação (speed=0) e mede
+   ciclos/s e o fator de aceleração sobre o tempo real gravado
+
+Roda num diretório temporário (log, estado do CashGate/CircuitBreaker).
+
+Uso (na raiz do projeto):
+    python scripts/bench_replay.py [--cycles 2000] [--profile]
+"""
+import argparse
+import cProfile
+import logging
+import os
+import pstats
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from config import CONFIG  # noqa: E402
+from core.replay import RecordingExchange, ReplayFinished, summarize  # noqa: E402
+from scripts.bench_backtest import synthetic_candles  # noqa: E402
+
+
+class SyntheticMarket:
+    """Fonte ccxt mínima: fetch_ohlcv devolve as velas abertas até o relógio (inclui a em formação)"""
+
+    id = 'synthetic'
+
+    def __init__(self, candles, symbol, clock):
+        self.candles = candles.tolist()
+        self.symbol = symbol
+        self.clock = clock
+
+    def load_markets(self, reload=False, params=None):
+        base, quote = self.symbol.split('/')
+        return {self.symbol: {'symbol': self.symbol, 'base': base, 'quote': quote, 'spot': True}}
+
+    def fetch_status(self, params=None):
+        return {'status': 'ok', 'updated': None}
+
+    def fetch_balance(self, params=None):
+        return {'total': {'USDT': 1000.0, 'BTC': 0.0}, 'free': {'USDT': 1000.0, 'BTC': 0.0}}
+
+    def fetch_ohlcv(self, symbol, timeframe='1m', since=None, limit=None, params=None):
+        end = int((self.clock() * 1000 - self.candles[0][0]) // 60_000) + 1
+        return self.candles[max(0, end - limit):end]
+
+
+def record(path, cycles, config):
+    limit = config['LOOKBACK_PERIOD'] + 6
+    candles = synthetic_candles(cycles + limit + 1)
+    clock = [candles[limit, 0] / 1000 + config['CANDLE_CLOSE_OFFSET']]
+    market = SyntheticMarket(candles, config['SYMBOL'], lambda: clock[0])
+    exchange = RecordingExchange(market, path, clock=lambda: clock[0])
+    exchange.load_markets()
+    for _ in range(cycles):
+        exchange.fetch_ohlcv(config['SYMBOL'], config['TIMEFRAME'], limit=limit)
+        exchange.fetch_status()
+        clock[0] += 60
+    exchange.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--cycles', type=int, default=2000)
+    parser.add_argument('--profile', action='store_true', help='Mostra o perfil (cProfile) do replay')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='mh_replay_')
+    os.chdir(workdir)
+    path = Path(workdir) / 'market.rec'
+    config = dict(CONFIG, TIMEFRAME='1m', LIVE_MODE=False)
+    record(path, args.cycles, config)
+    info = summarize(path)
+    recorded_s = (info['end'] - info['start']) / 1000 + 60
+    print(f"Gravação: {info['records']} respostas, {info['bytes'] / 1024:.1f} KiB "
+          f"({info['bytes'] / info['records']:.0f} B/resposta), {recorded_s / 3600:.1f}h de mercado")
+
+    import maria_helena_estrategista as estrategista
+    logging.getLogger().setLevel(logging.WARNING)
+    estrategista.console.quiet = True
+
+    bot = estrategista.MariaHelenaBot(dict(config, MARKET_REPLAY_FILE=str(path)))
+    profiler = cProfile.Profile() if args.profile else None
+    started = time.perf_counter()
+    try:
+        if profiler:
+            profiler.enable()
+        bot.run()
+    except ReplayFinished:
+        pass
+    finally:
+        if profiler:
+            profiler.disable()
+    elapsed = time.perf_counter() - started
+
+    cycles = bot.exchange.calls['fetch_ohlcv']
+    print(f"Replay: {cycles} ciclos em {elapsed:.2f}s → {cycles / elapsed:,.0f} ciclos/s "
+          f"({recorded_s / elapsed:,.0f}x o tempo real) | {bot.scheduler.wakeups} despertares do agendador")
+    if profiler:
+        pstats.Stats(profiler).sort_stats('cumulative').print_stats(15)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Benchmark da camada de armazenamento (data/storage.py).
+
+Compara o padrão antigo (sqlite3.connect + executemany + commit por lote,
+journal em modo rollback) com o SQLiteWriter (WAL + group commit):
+- inserts/s
+- latência de leitura (consulta do MLStrategy) enquanto há escrita
+
+Uso (na raiz do projeto):
+    python scripts/bench_storage.py [--batches 2000] [--rows 6]
+"""
+import argparse
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from data.storage import INSERT_ANALYSIS_SQL, SQLiteWriter, connect  # noqa: E402
+from maria_helena_database_creator import create_tables  # noqa: E402
+
+READ_SQL = """
+    SELECT rsi, price, volume, macd, sma FROM market_analysis_v2
+    WHERE asset = ? ORDER BY timestamp DESC LIMIT 60
+"""
+
+
+def make_batches(n_batches, rows_per_batch):
+    batches = []
+    for b in range(n_batches):
+        batches.append([
+            {'asset': f"A{r}", 'timestamp': b, 'price': 100.0 + r, 'volume': 1.0, 'rsi': 50.0,
+             'bb_upper': 1.0, 'bb_lower': 1.0, 'bb_middle': 1.0, 'macd': 0.0, 'macd_signal': 0.0,
+             'macd_histogram': 0.0, 'sma': 1.0, 'obv': 0.0, 'trend': 'NEUTRAL'}
+            for r in range(rows_per_batch)
+        ])
+    return batches
+
+
+def new_db(wal):
+    path = Path(tempfile.mkdtemp()) / 'bench.db'
+    conn = sqlite3.connect(path)
+    create_tables(conn)
+    if wal:
+        conn.execute("PRAGMA journal_mode = WAL")
+    conn.close()
+    return path
+
+
+def legacy_write(path, batches):
+    for rows in batches:
+        conn = sqlite3.connect(path, timeout=30)
+        conn.executemany(INSERT_ANALYSIS_SQL, rows)
+        conn.commit()
+        conn.close()
+
+
+def writer_write(path, batches):
+    writer = SQLiteWriter(path)
+    for rows in batches:
+        writer.submit(INSERT_ANALYSIS_SQL, rows)
+    writer.flush()
+    writer.close()
+
+
+def reader(path, pooled, stop, latencies):
+    conn = connect(path, readonly=True) if pooled else None
+    while not stop.is_set():
+        start = time.perf_counter()
+        if pooled:
+            conn.execute(READ_SQL, ('A0',)).fetchall()
+        else:
+            c = sqlite3.connect(path, timeout=30)
+            c.execute(READ_SQL, ('A0',)).fetchall()
+            c.close()
+        latencies.append(time.perf_counter() - start)
+    if conn:
+        conn.close()
+
+
+def run(name, write, path, batches, pooled):
+    stop = threading.Event()
+    latencies = []
+    thread = threading.Thread(target=reader, args=(path, pooled, stop, latencies))
+    thread.start()
+    start = time.perf_counter()
+    write(path, batches)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    thread.join()
+
+    n_rows = sum(len(b) for b in batches)
+    lat = sorted(latencies) or [0.0]
+    p99 = lat[min(len(lat) - 1, int(len(lat) * 0.99))]
+    print(f"{name:28s} {n_rows / elapsed:12,.0f} inserts/s | leitura p50 "
+          f"{statistics.median(lat) * 1e3:7.3f} ms  p99 {p99 * 1e3:7.3f} ms ({len(lat)} leituras)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark da camada SQLite')
+    parser.add_argument('--batches', type=int, default=2000)
+    parser.add_argument('--rows', type=int, default=6)
+    args = parser.parse_args()
+
+    batches = make_batches(args.batches, args.rows)
+    print(f"📊 {args.batches} lotes × {args.rows} linhas, com 1 leitor concorrente")
+    run("connect-por-lote (rollback)", legacy_write, new_db(wal=False), batches, pooled=False)
+    run("SQLiteWriter (WAL+group)", writer_write, new_db(wal=True), batches, pooled=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Benchmark do stream de klines (data/kline_stream.py) contra um servidor
+WebSocket local que imita a Binance (stream combinado + /api/v3/klines).
+
+O servidor publica --candles velas de 1m (cada uma com atualizações
+parciais antes da final), derruba a conexão uma vez (reconexão + backfill)
+e omite uma vela (gap + backfill). Mede a latência entre o envio da vela
+final e o on_close, e confere o buffer contra as velas do servidor.
+
+Uso (na raiz do projeto):
+    python scripts/bench_stream.py [--candles 3000] [--interval 0.002]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from aiohttp import WSMsgType, web
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from data.kline_stream import KlineStream, market_id  # noqa: E402
+from scripts.bench_backtest import synthetic_candles  # noqa: E402
+
+
+class LocalKlineServer:
+    """Stand-in local do stream de klines e do REST /klines da Binance"""
+
+    def __init__(self, candles, history, interval, symbol='BTC/USDT', timeframe='1m',
+                 drop_at=None, skip_at=None, updates=2):
+        self.candles = candles
+        self.published = history  # velas fechadas já disponíveis
+        self.interval = interval
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.drop_at = drop_at
+        self.skip_at = skip_at
+        self.updates = updates
+        self.sockets = set()
+        self.sent_at = {}
+        self.rest_calls = 0
+
+    def app(self):
+        app = web.Application()
+        app.router.add_get('/stream', self.stream)
+        app.router.add_get('/api/v3/klines', self.klines)
+        return app
+
+    async def klines(self, request):
+        self.rest_calls += 1
+        limit = int(request.query.get('limit', 500))
+        start = request.query.get('startTime')
+        closed = self.candles[:self.published]
+        if start is not None:
+            closed = closed[np.searchsorted(closed[:, 0], float(start)):][:limit]
+        else:
+            closed = closed[-limit:]
+        rows = [[int(c[0]), *(f"{v:.8f}" for v in c[1:6]), int(c[0]) + 59_999] for c in closed]
+        return web.json_response(rows)
+
+    async def stream(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.sockets.add(ws)
+        try:
+            async for msg in ws:
+                if msg.type == WSMsgType.ERROR:
+                    break
+        finally:
+            self.sockets.discard(ws)
+        return ws
+
+    def _message(self, candle, closed):
+        t = int(candle[0])
+        k = {'t': t, 'T': t + 59_999, 's': market_id(self.symbol), 'i': self.timeframe,
+             'o': f"{candle[1]:.8f}", 'h': f"{candle[2]:.8f}", 'l': f"{candle[3]:.8f}",
+             'c': f"{candle[4]:.8f}", 'v': f"{candle[5]:.8f}", 'x': closed}
+        data = {'e': 'kline', 'E': int(time.time() * 1000), 's': k['s'], 'k': k}
+        return json.dumps({'stream': f"{k['s'].lower()}@kline_{self.timeframe}", 'data': data})
+
+    async def produce(self):
+        while self.published < len(self.candles):
+            await asyncio.sleep(self.interval)
+            index = self.published
+            candle = self.candles[index]
+            if index == self.drop_at:
+                for ws in list(self.sockets):
+                    await ws.close()
+            if index != self.skip_at:
+                for _ in range(self.updates):
+                    partial = candle.copy()
+                    partial[5] *= 0.5
+                    await self._broadcast(self._message(partial, False))
+                self.sent_at[candle[0]] = time.perf_counter()
+                await self._broadcast(self._message(candle, True))
+            self.published += 1
+
+    async def _broadcast(self, text):
+        for ws in list(self.sockets):
+            try:
+                await ws.send_str(text)
+            except ConnectionResetError:
+                self.sockets.discard(ws)
+
+
+async def main(args):
+    history = 200
+    candles = synthetic_candles(history + args.candles)
+    now_ms = int(time.time() * 1000) // 60_000 * 60_000
+    candles[:, 0] = now_ms - (len(candles) + 1) * 60_000 + np.arange(len(candles)) * 60_000
+    server = LocalKlineServer(candles, history, args.interval,
+                              drop_at=history + args.candles // 3, skip_at=history + 2 * args.candles // 3)
+    runner = web.AppRunner(server.app())
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    latencies = []
+
+    def on_close(symbol, timeframe, candle):
+        sent = server.sent_at.get(candle[0])
+        if sent is not None:
+            latencies.append((time.perf_counter() - sent) * 1000)
+
+    stream = KlineStream([('BTC/USDT', '1m')], on_close=on_close, url=f'ws://127.0.0.1:{port}/stream',
+                         rest_url=f'http://127.0.0.1:{port}/api/v3', buffer_size=1000)
+    await stream.start()
+    await asyncio.wait_for(stream.connected.wait(), 5)
+    started = time.perf_counter()
+    await server.produce()
+    last = candles[-1, 0]
+    while stream.buffers[('BTC/USDT', '1m')].last_closed_time != last and time.perf_counter() - started < 60:
+        await asyncio.sleep(0.01)
+    elapsed = time.perf_counter() - started
+
+    buffered = np.array(stream.candles('BTC/USDT', '1m'))
+    expected = candles[-len(buffered):]
+    await stream.stop()
+    await runner.cleanup()
+
+    lat = np.array(latencies)
+    print(f"{args.candles} velas em {elapsed:.2f}s | fechamentos {stream.stats['closes']} | "
+          f"gaps {stream.stats['gaps']} | reconexões {stream.stats['reconnects']} | "
+          f"backfill {stream.stats['backfilled']} velas em {stream.stats['rest_calls']} chamadas REST")
+    print(f"Latência fechamento → on_close: p50 {np.percentile(lat, 50):.2f} ms | "
+          f"p99 {np.percentile(lat, 99):.2f} ms | máx {lat.max():.2f} ms")
+    print(f"Buffer ({len(buffered)} velas) idêntico ao servidor: {np.allclose(buffered, expected)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--candles', type=int, default=3000)
+    parser.add_argument('--interval', type=float, default=0.002)
+    logging.basicConfig(level=logging.WARNING)
+    asyncio.run(main(parser.parse_args()))
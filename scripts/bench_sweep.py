@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Benchmark da varredura de parâmetros (backtest/sweep.py).
+
+Roda um grid sobre um ano sintético de candles de 1m com todos os núcleos
+e extrapola o tempo de uma varredura de 10 mil combinações.
+
+Uso (na raiz do projeto):
+    python scripts/bench_sweep.py [--candles 525600] [--combos 240] [--workers N]
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from backtest.sweep import ParameterSweep, expand_grid, format_table  # noqa: E402
+from scripts.bench_backtest import synthetic_candles  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--candles', type=int, default=525_600)
+    parser.add_argument('--combos', type=int, default=240)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    grid = expand_grid({
+        'RSI_OVERSOLD': np.round(np.arange(0.20, 0.45, 0.05), 2).tolist(),
+        'VOLUME_THRESHOLD': [0.5, 0.6, 0.7, 0.8],
+        'RSI_OVERBOUGHT': [0.6, 0.65, 0.7, 0.75],
+        'STOP_LOSS': [0.01, 0.015, 0.02, 0.03],
+        'TAKE_PROFIT': [0.02, 0.03, 0.05, 0.08],
+    })[:args.combos]
+    candles = synthetic_candles(args.candles)
+
+    started = time.perf_counter()
+    results = ParameterSweep(workers=args.workers).run(candles, grid)
+    elapsed = time.perf_counter() - started
+    print(format_table(results, 5))
+    print(f"{len(grid)} combinações × {args.candles} candles em {elapsed:.1f}s com {args.workers} processos "
+          f"→ 10k combinações ≈ {elapsed / len(grid) * 10_000 / 60:.1f} min")
+
+
+if __name__ == "__main__":
+    main()
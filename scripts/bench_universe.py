@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Benchmark do Estrategista multi-ativo (core/bot.py): --pairs pares num
+único processo, com velas servidas por um REST /api/v3/klines local e
+ordens na exchange de papel (core/paper_exchange.py).
+
+Cada rodada publica uma vela nova para todos os pares e chama
+process_close() (busca paralela + avaliação no pool). Mede o tempo por
+rodada, a memória por par e o número de load_markets (deve ser 1).
+
+Uso (na raiz do projeto):
+    python scripts/bench_universe.py [--pairs 50] [--rounds 200] [--workers 8]
+"""
+import argparse
+import asyncio
+import logging
+import resource
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from aiohttp import web
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from config import CONFIG  # noqa: E402
+from core.bot import MultiSymbolStrategist  # noqa: E402
+from core.paper_exchange import PaperExchange  # noqa: E402
+from data.kline_fetcher import AsyncKlineFetcher, WeightRateLimiter  # noqa: E402
+from data.kline_stream import market_id  # noqa: E402
+from protection.cash_gate.cash_gate import CashGate  # noqa: E402
+from protection.circuit_breaker import CircuitBreaker  # noqa: E402
+from scripts.bench_backtest import synthetic_candles  # noqa: E402
+
+
+def rss_mb():
+    """RSS atual (Linux) ou o pico, onde /proc não existe"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class LocalKlinesREST:
+    """Stand-in do REST /klines da Binance para vários símbolos"""
+
+    def __init__(self, candles, published):
+        self.candles = candles  # market_id → array (N × 6)
+        self.published = published
+        self.calls = 0
+
+    def app(self):
+        app = web.Application()
+        app.router.add_get('/api/v3/klines', self.klines)
+        return app
+
+    async def klines(self, request):
+        self.calls += 1
+        limit = int(request.query.get('limit', 500))
+        rows = self.candles[request.query['symbol']][max(0, self.published - limit):self.published]
+        return web.json_response([[int(r[0]), *map(str, r[1:6]), int(r[0]) + 59_999] for r in rows])
+
+
+class CountingPaperExchange(PaperExchange):
+    """Exchange de papel que conta os load_markets (deve ser um só para o universo todo)"""
+
+    def __init__(self, symbols, capital):
+        super().__init__(symbols, capital)
+        self.load_markets_calls = 0
+
+    def load_markets(self, reload=False, params=None):
+        self.load_markets_calls += 1
+        return super().load_markets(reload, params)
+
+
+async def bench(args):
+    symbols = [f"C{i:03d}/USDT" for i in range(args.pairs)]
+    history = 200
+    candles = {market_id(s): synthetic_candles(history + args.rounds, seed=i) for i, s in enumerate(symbols)}
+    server = LocalKlinesREST(candles, history)
+    runner = web.AppRunner(server.app())
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    config = dict(CONFIG, TIMEFRAME='1m', state_file=None)
+    # Servidor local: sem o limite de peso de 6000/min da Binance
+    fetcher = AsyncKlineFetcher(f"http://127.0.0.1:{port}/api/v3", limiter=WeightRateLimiter(capacity=10 ** 9))
+    exchange = CountingPaperExchange(symbols, config['INITIAL_CAPITAL'])
+    exchange.load_markets()
+
+    base = rss_mb()
+    started = time.perf_counter()
+    strategist = MultiSymbolStrategist(config, pairs=[(s, '1m') for s in symbols], exchange=exchange,
+                                       fetcher=fetcher, max_workers=args.workers,
+                                       cash_gate=CashGate(config['INITIAL_CAPITAL'], state_path=None),
+                                       circuit_breaker=CircuitBreaker(config))
+    build = time.perf_counter() - started
+    built = rss_mb()
+
+    rounds = []
+    for step in range(args.rounds):
+        server.published = history + step + 1
+        started = time.perf_counter()
+        await strategist.process_close(strategist.pairs)
+        rounds.append(time.perf_counter() - started)
+
+    status = strategist.status()
+    await strategist.stop()
+    await runner.cleanup()
+
+    rounds_ms = np.array(rounds) * 1000
+    print(f"pares: {args.pairs} | threads: {args.workers} | rodadas: {args.rounds}")
+    print(f"construção: {build * 1000:.0f}ms | load_markets: {exchange.load_markets_calls} | "
+          f"REST /klines: {server.calls}")
+    print(f"rodada (busca + avaliação de todos os pares): p50 {np.percentile(rounds_ms, 50):.1f}ms | "
+          f"p95 {np.percentile(rounds_ms, 95):.1f}ms | máx {rounds_ms.max():.1f}ms "
+          f"({np.percentile(rounds_ms, 50) / args.pairs:.2f}ms/par)")
+    print(f"memória: processo com imports {base:.0f}MB | +{built - base:.1f}MB para {args.pairs} pares "
+          f"({(built - base) * 1024 / args.pairs:.0f}KB/par) | final {rss_mb():.0f}MB "
+          f"(vs ~{base * args.pairs:.0f}MB com um processo por par)")
+    print(f"velas: {status['candles']} | sinais: {status['signals']} | entradas: {status['entries']} | "
+          f"saídas: {status['exits']} | rejeitadas: {status['rejected']} | erros: {status['errors']} | "
+          f"ordens: {exchange.stats['orders']} | posições abertas: {len(status['positions'])}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--pairs', type=int, default=50)
+    parser.add_argument('--rounds', type=int, default=200)
+    parser.add_argument('--workers', type=int, default=8)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger().setLevel(logging.WARNING)
+    asyncio.run(bench(args))
+
+
+if __name__ == '__main__':
+    main()
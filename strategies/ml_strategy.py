@@ -5,10 +5,11 @@ Estratégia de trading baseada em um modelo de Machine Learning (LSTM) treinado.
 
 import pickle
 from pathlib import Path
-import sqlite3
 import numpy as np
 from tensorflow.keras.models import load_model
 
+from data.storage import pool
+
 class MLStrategy:
     """
     Carrega um modelo Keras (LSTM) e um scaler Scikit-learn para gerar sinais de trading.
@@ -51,7 +52,8 @@ class MLStrategy:
     def _fetch_latest_data(self, asset: str):
         """Busca os últimos 'timesteps' dados do banco de dados para um ativo."""
         try:
-            conn = sqlite3.connect(self.db_path)
+            # Conexão de leitura reaproveitada (uma por thread), em WAL
+            conn = pool.get(self.db_path)
             cursor = conn.cursor()
             
             # ATENÇÃO: As colunas aqui precisam ser as mesmas usadas para treinar o modelo!
@@ -66,7 +68,6 @@ class MLStrategy:
             
             cursor.execute(query, (asset, self.timesteps))
             data = cursor.fetchall()
-            conn.close()
             
             if len(data) < self.timesteps:
                 print(f"⚠️ Dados insuficientes no DB para {asset}. Encontrados: {len(data)}/{self.timesteps}")
@@ -1,17 +1,53 @@
+import logging
+
+from rich.console import Console
+
+console = Console()
+logger = logging.getLogger('MariaHelena.Strategy')
+
+
 class RSIVolumeStrategy:
-    def __init__(self, config):
-        self.rsi_period = config.get('rsi_period', 14)
-        self.rsi_oversold = config.get('rsi_oversold', 30)
-        self.rsi_overbought = config.get('rsi_overbought', 70)
-        self.volume_threshold = config.get('volume_threshold', 0.6)
-        
+    """
+    COMPRA quando:
+    - RSI < RSI_OVERSOLD (ativo "barato")
+    - Volume > VOLUME_THRESHOLD (confirmação de interesse)
+    - Tendência não está baixista
+
+    VENDE quando:
+    - RSI > RSI_SELL_* da tendência atual (padrão: RSI_OVERBOUGHT)
+
+    Os limiares são lidos em 0-1 (chaves do config.py, ex: 'RSI_OVERSOLD': 0.40)
+    ou nas chaves antigas em minúsculas, em 0-100 (ex: 'rsi_oversold': 30).
+    """
+
+    def __init__(self, config, verbose=True):
+        self.name = "rsi_volume_v1"
+        self.rsi_period = config.get('rsi_period', config.get('RSI_PERIOD', 14))
+        self.rsi_oversold = self._threshold(config, 'RSI_OVERSOLD', 0.30)
+        self.rsi_overbought = self._threshold(config, 'RSI_OVERBOUGHT', 0.70)
+        self.volume_threshold = config.get('volume_threshold', config.get('VOLUME_THRESHOLD', 0.6))
+        self.rsi_sell = {
+            'up': self._threshold(config, 'RSI_SELL_UPTREND', self.rsi_overbought),
+            'neutral': self._threshold(config, 'RSI_SELL_NEUTRAL', self.rsi_overbought),
+            'down': self._threshold(config, 'RSI_SELL_DOWNTREND', self.rsi_overbought),
+        }
+        self.verbose = verbose
+
+        self.signals_generated = 0
+        self.last_signal = None
+
+    @staticmethod
+    def _threshold(config, key, default):
+        value = config.get(key.lower(), config.get(key, default))
+        return value / 100.0 if value > 1 else value
+
     def analyze(self, df):
         """
         Analisa DataFrame com dados OHLCV e retorna sinal de trading
-        
+
         Args:
             df: DataFrame com colunas ['timestamp', 'open', 'high', 'low', 'close', 'volume']
-            
+
         Returns:
             dict: Sinal de trading com 'action', 'confidence' e outros indicadores
         """
@@ -23,3 +59,46 @@ class RSIVolumeStrategy:
             'volume': df['volume'].iloc[-1]
         }
         return signal
+
+    def evaluate(self, normalized_data):
+        """
+        Avalia os dados do Normalizer e gera sinal de compra ou venda
+
+        Args:
+            normalized_data: Dict retornado por Normalizer.process()
+
+        Returns:
+            dict ou None: Sinal de trade ou None se não há setup
+        """
+        rsi = normalized_data['rsi_norm']
+        volume = normalized_data['volume_norm']
+        trend = normalized_data.get('trend', 'neutral')
+
+        if rsi < self.rsi_oversold and volume > self.volume_threshold and trend != 'down':
+            action = 'BUY'
+            confidence = 0.60 + (0.10 if rsi < 0.25 else 0.0) + (0.10 if volume > 0.80 else 0.0)
+            reason = f"RSI oversold ({rsi:.2f}) + Volume alto ({volume:.2f})"
+        elif rsi > self.rsi_sell.get(trend, self.rsi_overbought):
+            action = 'SELL'
+            confidence = 0.75 if rsi > 0.75 else 0.65
+            reason = f"RSI overbought ({rsi:.2f}, tendência {trend})"
+        else:
+            return None
+
+        signal = {
+            'action': action,
+            'price': normalized_data['price'],
+            'confidence': confidence,
+            'reason': reason,
+            'strategy': self.name,
+            'indicators': {'rsi_norm': rsi, 'volume_norm': volume, 'trend': trend},
+            'timestamp': normalized_data.get('timestamp'),
+        }
+        self.signals_generated += 1
+        self.last_signal = signal
+        if self.verbose:
+            label = f"SINAL DE {'COMPRA' if action == 'BUY' else 'VENDA'} #{self.signals_generated}"
+            logger.info(f"{'🟢' if action == 'BUY' else '🔴'} {label}: {reason}")
+            color = 'green' if action == 'BUY' else 'yellow'
+            console.print(f"[{color}]{'🟢' if action == 'BUY' else '🔴'} {label}[/{color}]: {reason}")
+        return signal
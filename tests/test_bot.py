@@ -0,0 +1,80 @@
+"""MultiSymbolStrategist no polling: par sem a vela recém-fechada é buscado de novo após CHECK_INTERVAL."""
+
+import asyncio
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from config import CONFIG
+from core.bot import MultiSymbolStrategist
+from core.paper_exchange import PaperExchange
+from core.scheduler import CandleScheduler
+from data.kline_fetcher import AsyncKlineFetcher
+from protection.cash_gate.cash_gate import CashGate
+from protection.circuit_breaker import CircuitBreaker
+
+PAIR = ('BTC/USDT', '1m')
+CLOSE = 1_000_020  # fechamento de 1m (múltiplo de 60) visto pelo agendador
+
+
+def kline_row(i):
+    return [i * 60_000, '100', '101', '99', '100', '10', i * 60_000 + 59_999]
+
+
+def test_par_atrasado_e_buscado_de_novo_antes_do_proximo_fechamento():
+    last = {'index': CLOSE // 60 - 2}  # exchange ainda sem a vela que fechou em CLOSE
+    calls = []
+
+    async def klines(request):
+        calls.append(last['index'])
+        limit = int(request.query['limit'])
+        return web.json_response([kline_row(i) for i in range(last['index'] - limit + 1, last['index'] + 1)])
+
+    async def scenario():
+        app = web.Application()
+        app.router.add_get('/api/v3/klines', klines)
+        server = TestServer(app)
+        await server.start_server()
+        config = dict(CONFIG, TIMEFRAME='1m', CHECK_INTERVAL=0.05, EXIT_MONITOR=False, state_file=None)
+        strategist = MultiSymbolStrategist(
+            config, pairs=[PAIR], exchange=PaperExchange(PAIR[0], config['INITIAL_CAPITAL']),
+            fetcher=AsyncKlineFetcher(str(server.make_url('/api/v3'))), max_workers=2,
+            cash_gate=CashGate(config['INITIAL_CAPITAL'], state_path=None), circuit_breaker=CircuitBreaker(config))
+        strategist.scheduler = CandleScheduler(clock=lambda: CLOSE + 5.0, sleep=lambda _: None)
+        worker = strategist.workers[PAIR]
+        try:
+            await strategist.process_close([PAIR])
+            assert worker.last_candle_time == (CLOSE - 120) * 1000
+            assert strategist.stats['retries'] == 1
+
+            last['index'] += 1  # a vela chega na exchange
+            for _ in range(50):
+                await asyncio.sleep(0.02)
+                if worker.last_candle_time == (CLOSE - 60) * 1000 and not strategist._tasks:
+                    break
+            return worker.last_candle_time, strategist.stats['retries']
+        finally:
+            await strategist.stop()
+            await server.close()
+
+    last_candle, retries = asyncio.run(scenario())
+    assert last_candle == (CLOSE - 60) * 1000
+    assert retries == 1  # com a vela em mãos, não reagenda
+    assert len(calls) == 2
+
+
+def test_sem_nova_tentativa_quando_o_proximo_fechamento_vem_antes():
+    config = dict(CONFIG, TIMEFRAME='1m', CHECK_INTERVAL=60, EXIT_MONITOR=False, state_file=None)
+
+    async def scenario():
+        strategist = MultiSymbolStrategist(
+            config, pairs=[PAIR], exchange=PaperExchange(PAIR[0], config['INITIAL_CAPITAL']),
+            fetcher=AsyncKlineFetcher('http://127.0.0.1:9/api/v3'), max_workers=2,
+            cash_gate=CashGate(config['INITIAL_CAPITAL'], state_path=None), circuit_breaker=CircuitBreaker(config))
+        strategist.scheduler = CandleScheduler(clock=lambda: CLOSE + 5.0, sleep=lambda _: None)
+        try:
+            return strategist._retry_lagging([PAIR], {})
+        finally:
+            await strategist.stop()
+
+    assert asyncio.run(scenario()) == []
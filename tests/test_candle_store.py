@@ -0,0 +1,66 @@
+"""CandleStore: semeadura, sincronização incremental, reinício e busca que falhou."""
+
+import pytest
+
+from data.candle_store import CandleStore
+
+MINUTE = 60_000
+NOW = 1_700_000_000_000 // MINUTE * MINUTE
+
+
+def kline(open_time, close=100.0):
+    return [open_time, str(close), str(close + 1), str(close - 1), str(close), '5', open_time + MINUTE - 1]
+
+
+@pytest.fixture
+def path(tmp_path):
+    return tmp_path / 'candle_cache.db'
+
+
+def seeded(path, window=10):
+    store = CandleStore(path, interval='1m', window=window)
+    assert store.start_time('BTCUSDT', NOW) is None  # cache vazio: semeia
+    candles = store.merge('BTCUSDT', [kline(NOW - (window - 1 - i) * MINUTE, 100 + i) for i in range(window)])
+    assert len(candles) == window
+    return store
+
+
+def test_sincroniza_so_as_velas_novas(path):
+    store = seeded(path)
+    assert store.start_time('BTCUSDT', NOW + 2 * MINUTE) == NOW  # a partir da última (em formação)
+
+    # Resposta incremental: a vela em formação fechou (novo close) + duas novas
+    candles = store.merge('BTCUSDT', [kline(NOW, 200.0), kline(NOW + MINUTE, 201.0), kline(NOW + 2 * MINUTE, 202.0)])
+    assert len(candles) == 10
+    assert candles[-3][0] == NOW and candles[-3][4] == 200.0
+    assert [c[0] for c in candles] == [NOW - (7 - i) * MINUTE for i in range(10)]
+
+
+def test_reinicio_carrega_a_janela_do_disco(path):
+    store = seeded(path)
+    store.merge('BTCUSDT', [kline(NOW, 200.0), kline(NOW + MINUTE, 201.0)])
+    expected = store.get('BTCUSDT')
+    store.close()
+
+    restarted = CandleStore(path, interval='1m', window=10)
+    assert restarted.get('BTCUSDT') == expected
+    assert restarted.start_time('BTCUSDT', NOW + 2 * MINUTE) == NOW + MINUTE
+    # Só a janela fica no disco
+    count = restarted._conn.execute("SELECT COUNT(*) FROM candles").fetchone()[0]
+    assert count == 10
+    restarted.close()
+
+
+def test_cache_velho_ou_com_buraco_semeia_de_novo(path):
+    store = seeded(path)
+    assert store.start_time('BTCUSDT', NOW + 9 * MINUTE) is None  # mais velho que a janela
+    candles = store.merge('BTCUSDT', [kline(NOW + 20 * MINUTE + i * MINUTE) for i in range(3)])
+    assert [c[0] for c in candles] == [NOW + (20 + i) * MINUTE for i in range(3)]
+
+
+def test_busca_que_falhou_nao_devolve_a_janela_antiga(path):
+    store = seeded(path)
+    before = store.get('BTCUSDT')[:]
+    assert store.merge('BTCUSDT', []) is None
+    assert store.merge('BTCUSDT', None) is None
+    assert store.get('BTCUSDT') == before
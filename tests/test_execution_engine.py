@@ -0,0 +1,118 @@
+"""ExecutionEngine contra a PaperExchange: clientOrderId, recuperação após erro de rede e registro que falha."""
+
+import asyncio
+
+import ccxt
+import pytest
+
+from config import CONFIG
+from core.orders.execution_engine import ExecutionEngine, client_order_id
+from core.orders.order_manager import OrderManager
+from core.paper_exchange import PaperExchange
+from protection.cash_gate.cash_gate import CashGate
+from protection.circuit_breaker import CircuitBreaker
+from protection.health_monitor import ExchangeHealthMonitor
+from protection.risk_manager import RiskManager
+from protection.technical_guard import TechnicalGuard
+
+SYMBOL = 'BTC/USDT'
+
+
+class FlakyPaperExchange(PaperExchange):
+    """A ordem executa, mas a resposta se perde (lost_responses vezes); fetch_closed_orders pode falhar também"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lost_responses = 0
+        self.closed_orders_down = 0
+        self.sent = 0
+
+    def create_order(self, symbol, type, side, amount, price=None, params=None):
+        self.sent += 1
+        order = super().create_order(symbol, type, side, amount, price, params)
+        if self.lost_responses:
+            self.lost_responses -= 1
+            raise ccxt.RequestTimeout("resposta perdida")
+        return order
+
+    def fetch_closed_orders(self, symbol=None, since=None, limit=None, params=None):
+        if self.closed_orders_down:
+            self.closed_orders_down -= 1
+            raise ccxt.ExchangeNotAvailable("indisponível")
+        return super().fetch_closed_orders(symbol, since, limit, params)
+
+
+@pytest.fixture
+def paper():
+    exchange = FlakyPaperExchange(SYMBOL, balances=100_000.0, fee_rate=0.001)
+    exchange.update_market(1_000, 100.0)
+    return exchange
+
+
+@pytest.fixture
+def manager(paper):
+    config = dict(CONFIG, state_file=None)
+    return OrderManager(paper, RiskManager(config), TechnicalGuard(ExchangeHealthMonitor(paper, interval=0)),
+                        CircuitBreaker(config), CashGate(config['INITIAL_CAPITAL'], state_path=None), symbol=SYMBOL)
+
+
+def buy(timestamp=1_700_000_000_000):
+    return {'action': 'BUY', 'symbol': SYMBOL, 'price': 100.0, 'timestamp': timestamp, 'confidence': 1.0}
+
+
+def run(manager, *signals):
+    async def go():
+        engine = ExecutionEngine(retry_delay=0)
+        results = await asyncio.gather(*(engine.submit(manager, s) for s in signals))
+        await engine.stop()
+        return engine, results
+    return asyncio.run(go())
+
+
+def test_client_order_id_deterministico_e_sinal_repetido_deduplicado(manager, paper):
+    signal = buy()
+    assert client_order_id(SYMBOL, 'BUY', signal) == client_order_id(SYMBOL, 'BUY', dict(signal))
+    assert client_order_id(SYMBOL, 'BUY', signal) != client_order_id(SYMBOL, 'BUY', buy(timestamp=1))
+    assert len(client_order_id(SYMBOL, 'BUY', signal)) <= 36
+
+    engine, (first, again) = run(manager, signal, dict(signal))
+    assert first is again
+    assert engine.stats['deduplicated'] == 1
+    assert paper.stats['orders'] == 1
+
+
+def test_resposta_perdida_recupera_a_ordem_sem_comprar_de_novo(manager, paper):
+    paper.lost_responses = 1
+    engine, (result,) = run(manager, buy())
+    assert result['status'] == 'executed'
+    assert result['order']['clientOrderId'] == result['client_order_id']
+    assert engine.stats['recovered'] == 1 and engine.stats['retries'] == 0
+    assert paper.stats['orders'] == 1
+    assert manager.risk_manager.is_in_position
+
+
+def test_duplicate_order_id_recupera_a_ordem_original(manager, paper):
+    paper.lost_responses = 1
+    paper.closed_orders_down = 1  # a busca após o erro de rede não acha: reenvia
+    engine, (result,) = run(manager, buy())
+    assert result['status'] == 'executed'
+    assert paper.sent == 2  # o reenvio bateu em DuplicateOrderId
+    assert engine.stats['retries'] == 1 and engine.stats['recovered'] == 1
+    assert paper.stats['orders'] == 1
+    assert manager.cash_gate.get_status()['reserved_capital'] == pytest.approx(0.0)
+
+
+def test_falha_no_registro_reconcilia_sem_liberar_a_reserva(manager, paper, monkeypatch):
+    capital = manager.cash_gate.current_capital
+
+    def commit_falha(*args, **kwargs):
+        raise OSError("disco cheio")
+    monkeypatch.setattr(manager.cash_gate, 'commit', commit_falha)
+
+    _, (result,) = run(manager, buy())
+    assert result['status'] == 'executed' and result['reconciled']
+    assert manager.risk_manager.is_in_position
+    assert manager.risk_manager.position_size == pytest.approx(result['order']['filled'])
+    assert manager.cash_gate.get_status()['reserved_capital'] > 0  # reserva retida, não devolvida ao caixa
+    assert manager.cash_gate.get_available() < capital
+    assert paper.stats['orders'] == 1
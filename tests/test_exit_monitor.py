@@ -0,0 +1,65 @@
+"""ExitMonitor: saída que falha volta ao índice e dispara de novo no próximo tick que cruzar o nível."""
+
+import queue
+
+import pytest
+
+from core.exit_monitor import ExitMonitor
+from protection.portfolio_risk import PortfolioRiskManager
+
+
+@pytest.fixture
+def portfolio():
+    portfolio = PortfolioRiskManager({'MAX_TOTAL_EXPOSURE': 1.0})
+    portfolio.open_position('btc', 'BTC/USDT', 100.0, 1.0, 95.0, 110.0)
+    return portfolio
+
+
+def monitor_with(portfolio, outcomes):
+    """Monitor cujo on_exit devolve (ou levanta) os resultados em ordem; cada chamada vai para `calls`"""
+    calls: queue.Queue = queue.Queue()
+
+    def on_exit(hit, price, timestamp):
+        outcome = outcomes.pop(0)
+        calls.put((hit['key'], hit['reason'], price))
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+    return ExitMonitor(portfolio, on_exit).start(), calls
+
+
+@pytest.mark.parametrize('failure', [False, RuntimeError("exchange fora do ar")])
+def test_saida_que_falha_e_rearmada(portfolio, failure):
+    monitor, calls = monitor_with(portfolio, [failure, True])
+    try:
+        assert monitor.on_price('BTC/USDT', 94.0, 1_000)
+        assert calls.get(timeout=5) == ('btc', 'stop_loss', 94.0)
+        monitor.stop()  # espera a fila: o rearme já aconteceu
+        assert portfolio.get_position('btc')['armed']
+        assert monitor.stats['failed'] == 1
+
+        monitor.start()
+        assert monitor.on_price('BTC/USDT', 96.0, 2_000) == []  # não cruza o stop
+        assert monitor.on_price('BTC/USDT', 93.5, 3_000)
+        assert calls.get(timeout=5) == ('btc', 'stop_loss', 93.5)
+    finally:
+        monitor.stop()
+    assert monitor.stats['exits'] == 1 and monitor.stats['triggers'] == 2
+    assert not portfolio.get_position('btc')['armed']  # saída concluída: fica fora até fechar
+    assert monitor.metrics()['latency_p50_ms'] is not None
+
+
+def test_poll_consulta_so_simbolos_com_posicao(portfolio):
+    asked: queue.Queue = queue.Queue()
+
+    def fetch_ticker(symbol):
+        asked.put(symbol)
+        return {'last': 111.0, 'timestamp': 1_000}
+
+    monitor, calls = monitor_with(portfolio, [True])
+    try:
+        monitor.poll(fetch_ticker, interval=0.01)
+        assert calls.get(timeout=5) == ('btc', 'take_profit', 111.0)
+    finally:
+        monitor.stop()
+    assert set(asked.queue) == {'BTC/USDT'}
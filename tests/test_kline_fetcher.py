@@ -0,0 +1,142 @@
+"""AsyncKlineFetcher / WeightRateLimiter contra um servidor HTTP local (aiohttp.test_utils)."""
+
+import asyncio
+import time
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from data.kline_fetcher import AsyncKlineFetcher, WeightRateLimiter, klines_weight
+
+
+def kline_row(symbol_index, i):
+    return [i * 60_000, str(100 + symbol_index), '101', '99', '100.5', '10', i * 60_000 + 59_999]
+
+
+async def serve(handler):
+    app = web.Application()
+    app.router.add_get('/api/v3/klines', handler)
+    server = TestServer(app)
+    await server.start_server()
+    return server
+
+
+def test_fetch_many_concorrente():
+    """Seis ativos com 0.2s de latência cada: o ciclo custa ~0.2s, não a soma."""
+    symbols = [f"A{i}USDT" for i in range(6)]
+
+    async def handler(request):
+        await asyncio.sleep(0.2)
+        index = symbols.index(request.query['symbol'])
+        return web.json_response([kline_row(index, i) for i in range(int(request.query['limit']))])
+
+    async def scenario():
+        server = await serve(handler)
+        try:
+            async with AsyncKlineFetcher(str(server.make_url('/api/v3'))) as fetcher:
+                started = time.perf_counter()
+                result = await fetcher.fetch_many(symbols, '1m', 5)
+                return result, time.perf_counter() - started
+        finally:
+            await server.close()
+
+    result, elapsed = asyncio.run(scenario())
+    assert list(result) == symbols
+    for index, symbol in enumerate(symbols):
+        assert result[symbol] == [kline_row(index, i) for i in range(5)]
+    assert elapsed < 0.6
+
+
+def test_peso_por_faixa_de_limit():
+    assert [klines_weight(limit) for limit in (1, 99, 100, 499, 500, 1000, 1500)] == [1, 1, 2, 2, 5, 5, 10]
+
+
+def test_peso_usado_reportado_freia_o_limitador():
+    """X-MBX-USED-WEIGHT-1M no teto zera o bucket: a chamada seguinte espera a recarga."""
+    async def handler(request):
+        return web.json_response([], headers={'X-MBX-USED-WEIGHT-1M': '100'})
+
+    async def scenario():
+        server = await serve(handler)
+        limiter = WeightRateLimiter(capacity=100, window=1.0)  # recarga de 100/s
+        try:
+            async with AsyncKlineFetcher(str(server.make_url('/api/v3')), limiter=limiter) as fetcher:
+                await fetcher.fetch_klines('BTCUSDT', limit=1000)  # peso 5
+                tokens = limiter.tokens
+                started = time.perf_counter()
+                await fetcher.fetch_klines('BTCUSDT', limit=1000)
+                return tokens, time.perf_counter() - started
+        finally:
+            await server.close()
+
+    tokens, waited = asyncio.run(scenario())
+    assert tokens < 1.0
+    assert waited >= 0.04  # 5 de peso a 100/s
+
+
+def test_retry_apos_429_respeita_retry_after():
+    calls = []
+
+    async def handler(request):
+        calls.append(time.perf_counter())
+        if len(calls) == 1:
+            return web.Response(status=429, headers={'Retry-After': '0.3'})
+        return web.json_response([kline_row(0, 0)])
+
+    async def scenario():
+        server = await serve(handler)
+        try:
+            async with AsyncKlineFetcher(str(server.make_url('/api/v3')), retry_delay=0.01) as fetcher:
+                return await fetcher.fetch_klines('BTCUSDT', limit=1)
+        finally:
+            await server.close()
+
+    assert asyncio.run(scenario()) == [kline_row(0, 0)]
+    assert len(calls) == 2
+    assert calls[1] - calls[0] >= 0.3
+
+
+def test_retry_em_5xx_e_desiste_no_limite():
+    statuses = {'BTCUSDT': [503, 500], 'ETHUSDT': [502] * 10}
+    calls = {'BTCUSDT': 0, 'ETHUSDT': 0}
+
+    async def handler(request):
+        symbol = request.query['symbol']
+        calls[symbol] += 1
+        if statuses[symbol]:
+            return web.Response(status=statuses[symbol].pop(0))
+        return web.json_response([kline_row(0, 0)])
+
+    async def scenario():
+        server = await serve(handler)
+        try:
+            async with AsyncKlineFetcher(str(server.make_url('/api/v3')), max_retries=3,
+                                         retry_delay=0.01) as fetcher:
+                return await fetcher.fetch_many(['BTCUSDT', 'ETHUSDT'], limit=1)
+        finally:
+            await server.close()
+
+    result = asyncio.run(scenario())
+    assert result['BTCUSDT'] == [kline_row(0, 0)]
+    assert calls['BTCUSDT'] == 3
+    assert result['ETHUSDT'] == []
+    assert calls['ETHUSDT'] == 4  # 1 + max_retries
+
+
+def test_erro_4xx_nao_repete():
+    calls = []
+
+    async def handler(request):
+        calls.append(1)
+        return web.Response(status=400)
+
+    async def scenario():
+        server = await serve(handler)
+        try:
+            async with AsyncKlineFetcher(str(server.make_url('/api/v3')), retry_delay=0.01) as fetcher:
+                return await fetcher.fetch_klines('XXXUSDT', limit=1)
+        finally:
+            await server.close()
+
+    assert asyncio.run(scenario()) == []
+    assert len(calls) == 1
@@ -0,0 +1,145 @@
+"""CandleBuffer e KlineStream contra um WebSocket + /klines locais (aiohttp)."""
+
+import asyncio
+import json
+import time
+
+from aiohttp import WSMsgType, web
+
+from data.kline_stream import CandleBuffer, KlineStream, market_id
+
+MINUTE = 60_000
+SYMBOL, TIMEFRAME = 'BTC/USDT', '1m'
+
+
+def make_candles(count):
+    # Todas já fechadas no relógio real: o merge do backfill usa time.time()
+    start = (int(time.time() * 1000) // MINUTE - count - 5) * MINUTE
+    return [[float(start + i * MINUTE), 100.0 + i, 101.0 + i, 99.0 + i, 100.5 + i, 10.0 + i] for i in range(count)]
+
+
+class StubBinance:
+    """Stream combinado de klines + REST /api/v3/klines; `published` = velas fechadas visíveis no REST"""
+
+    def __init__(self, candles, published):
+        self.candles = candles
+        self.published = published
+        self.sockets = []
+        self.connections = 0
+        self.rest_calls = []
+
+    def app(self):
+        app = web.Application()
+        app.router.add_get('/stream', self.stream)
+        app.router.add_get('/api/v3/klines', self.klines)
+        return app
+
+    async def klines(self, request):
+        limit = int(request.query['limit'])
+        start = request.query.get('startTime')
+        self.rest_calls.append(start)
+        closed = self.candles[:self.published]
+        closed = [c for c in closed if c[0] >= float(start)][:limit] if start else closed[-limit:]
+        return web.json_response([[int(c[0]), *(str(v) for v in c[1:6]), int(c[0]) + MINUTE - 1] for c in closed])
+
+    async def stream(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.connections += 1
+        self.sockets.append(ws)
+        async for msg in ws:
+            if msg.type == WSMsgType.ERROR:
+                break
+        return ws
+
+    async def send(self, index, closed=True):
+        candle = self.candles[index]
+        t = int(candle[0])
+        k = {'t': t, 'T': t + MINUTE - 1, 's': market_id(SYMBOL), 'i': TIMEFRAME, 'o': str(candle[1]),
+             'h': str(candle[2]), 'l': str(candle[3]), 'c': str(candle[4]), 'v': str(candle[5]), 'x': closed}
+        data = {'e': 'kline', 'E': int(time.time() * 1000), 's': k['s'], 'k': k}
+        await self.sockets[-1].send_str(json.dumps({'stream': f"btcusdt@kline_{TIMEFRAME}", 'data': data}))
+
+
+async def until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condição não atingida a tempo"
+        await asyncio.sleep(0.01)
+
+
+def test_candle_buffer_fecha_detecta_gap_e_ignora_velhas():
+    buffer = CandleBuffer(MINUTE, maxlen=3)
+    first = [0.0, 1, 1, 1, 1, 1]
+    assert buffer.apply(first, True) == 'closed'
+    assert buffer.apply([float(MINUTE), 2, 2, 2, 2, 1], False) == 'update'
+    assert buffer.forming[0] == MINUTE
+    assert buffer.apply([float(MINUTE), 2, 2, 2, 2, 2], True) == 'closed'
+    assert buffer.forming is None
+    assert buffer.apply(first, True) == 'stale'
+    assert buffer.apply([float(3 * MINUTE), 4, 4, 4, 4, 4], True) == 'gap'
+    assert buffer.last_closed_time == MINUTE
+
+    # REST: só entram as fechadas e mais novas; a que ainda está aberta vira a em formação
+    now = 4 * MINUTE + 1
+    rows = [[float(i * MINUTE), i, i, i, i, i] for i in range(5)]
+    assert buffer.merge(rows, now) == 2
+    assert [c[0] for c in buffer.snapshot()] == [MINUTE, 2 * MINUTE, 3 * MINUTE]  # maxlen=3
+    assert buffer.snapshot(include_forming=True)[-1][0] == 4 * MINUTE
+
+
+def test_stream_fechamento_gap_e_reconexao_com_backfill():
+    candles = make_candles(120)
+    server = StubBinance(candles, published=100)
+    closes = []
+
+    async def scenario():
+        runner = web.AppRunner(server.app(), access_log=None)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        stream = KlineStream([(SYMBOL, TIMEFRAME)], on_close=lambda s, tf, c: closes.append(c),
+                             url=f"ws://127.0.0.1:{port}/stream", rest_url=f"http://127.0.0.1:{port}/api/v3",
+                             buffer_size=50, max_backoff=0.5)
+        try:
+            await stream.start()
+            buffer = stream.buffers[(SYMBOL, TIMEFRAME)]
+            assert [c[0] for c in buffer.snapshot()] == [c[0] for c in candles[50:100]]
+            await until(lambda: server.sockets)
+
+            # Vela em formação e fechamento normal
+            await server.send(100, closed=False)
+            await until(lambda: stream.last_price(SYMBOL, TIMEFRAME) == candles[100][4])
+            server.published = 101
+            await server.send(100)
+            await until(lambda: len(closes) == 1)
+            assert closes[-1] == candles[100]
+
+            # Gap: chega o fechamento da 104 sem 101–103; o REST completa antes de aceitar
+            server.published = 105
+            await server.send(104)
+            await until(lambda: len(closes) == 2)
+            assert closes[-1] == candles[104]
+            assert stream.stats['gaps'] == 1
+            assert [c[0] for c in buffer.snapshot()[-5:]] == [c[0] for c in candles[100:105]]
+
+            # Queda: o que fechou enquanto desconectado vem por backfill na reconexão
+            server.published = 110
+            await server.sockets[-1].close()
+            await until(lambda: server.connections == 2 and len(closes) == 3)
+            assert closes[-1] == candles[109]
+            assert stream.stats['reconnects'] == 1
+            assert stream.stats['backfilled'] == 4 + 5  # 101–104 no gap, 105–109 na reconexão
+            assert [c[0] for c in buffer.snapshot()[-10:]] == [c[0] for c in candles[100:110]]
+
+            # E o stream segue depois da reconexão
+            server.published = 111
+            await server.send(110)
+            await until(lambda: len(closes) == 4)
+            assert closes[-1] == candles[110]
+        finally:
+            await stream.stop()
+            await runner.cleanup()
+
+    asyncio.run(scenario())
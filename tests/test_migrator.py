@@ -0,0 +1,45 @@
+"""Migrador: linhas inseridas contadas sem os efeitos dos triggers, com e sem partições."""
+
+import sqlite3
+
+import pytest
+
+import maria_helena_database_creator as creator
+from data.partitions import migrate_to_partitions
+from maria_helena_migrator import migrate_file
+
+HEADER = "openTime,close,volume,rsi_14,bb_upper,bb_lower,macd,macd_signal,obv\n"
+START = 1612134000  # 31/01/2021 23:00 UTC: os lotes atravessam a virada do mês
+
+
+def write_csv(path, start, count):
+    with open(path, 'w') as f:
+        f.write(HEADER)
+        for i in range(count):
+            f.write(f"{(start + i * 60) * 1000},{100 + i},1.5,50,101,99,0.1,0.05,10\n")
+    return path
+
+
+@pytest.fixture(params=[False, True], ids=['tabela', 'particionada'])
+def db_path(request, tmp_path):
+    path = tmp_path / 'signals.db'
+    conn = sqlite3.connect(str(path))
+    if request.param:
+        assert migrate_to_partitions(conn)
+    assert creator.create_tables(conn)
+    conn.close()
+    return path
+
+
+def test_rows_inserted_conta_so_linhas_novas(db_path, tmp_path):
+    first = migrate_file(write_csv(tmp_path / 'a.csv', START, 300), 'BTCUSDT', db_path, chunk_size=64)
+    # Metade repetida (mesmo ativo/timestamp), metade nova
+    overlap = write_csv(tmp_path / 'b.csv', START + 150 * 60, 300)
+    second = migrate_file(overlap, 'BTCUSDT', db_path, chunk_size=64)
+
+    conn = sqlite3.connect(str(db_path))
+    total = conn.execute("SELECT COUNT(*) FROM market_analysis_v2").fetchone()[0]
+    conn.close()
+    assert first['rows_read'] == 300 and first['rows_inserted'] == 300
+    assert second['rows_read'] == 300 and second['rows_inserted'] == 150
+    assert total == 450
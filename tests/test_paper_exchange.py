@@ -0,0 +1,71 @@
+"""PaperExchange: profundidade do livro sintético, ordens limitadas no livro e saldos."""
+
+import ccxt
+import pytest
+
+from core.paper_exchange import PaperExchange
+
+SYMBOL = 'BTC/USDT'
+
+
+@pytest.fixture
+def paper():
+    exchange = PaperExchange(SYMBOL, balances=10_000.0, fee_rate=0.001, spread=0.002,
+                             level_notional=1_000.0, depth_levels=3, level_step=0.001)
+    exchange.update_market(1_000, 100.0)
+    return exchange
+
+
+def test_mercado_percorre_os_niveis_e_cancela_o_que_passa_da_profundidade(paper):
+    order = paper.create_order(SYMBOL, 'market', 'buy', 40.0)  # 3 níveis de 10 BTC
+    assert order['status'] == 'canceled'
+    assert order['filled'] == pytest.approx(30.0)
+    levels = [100.1 * (1 + 0.001 * level) for level in range(3)]
+    assert order['average'] == pytest.approx(sum(levels) / 3)
+    assert order['fee']['cost'] == pytest.approx(order['cost'] * 0.001)
+    assert paper.stats['partial'] == 1
+
+    # Liquidez consumida só volta na próxima atualização de mercado
+    with pytest.raises(ccxt.InvalidOrder):
+        paper.create_order(SYMBOL, 'market', 'buy', 1.0)
+    paper.update_market(2_000, 100.0)
+    assert paper.create_order(SYMBOL, 'market', 'buy', 1.0)['status'] == 'closed'
+
+
+def test_limitada_fica_no_livro_reserva_saldo_e_executa_na_vela(paper):
+    order = paper.create_order(SYMBOL, 'limit', 'buy', 5.0, 99.0, {'clientOrderId': 'c1'})
+    assert order['status'] == 'open' and order['filled'] == 0
+    balance = paper.fetch_balance()
+    assert balance['USDT']['used'] == pytest.approx(5.0 * 99.0 * 1.001)
+    assert [o['id'] for o in paper.fetch_open_orders(SYMBOL)] == [order['id']]
+    with pytest.raises(ccxt.DuplicateOrderId):
+        paper.create_order(SYMBOL, 'limit', 'buy', 1.0, 99.0, {'clientOrderId': 'c1'})
+
+    # Vela que não chega no preço: nada; vela que atinge: executa até participation × volume
+    paper.on_candle(SYMBOL, [3_000, 100.0, 100.5, 99.5, 100.0, 100.0])
+    assert paper.fetch_order(order['id'])['filled'] == 0
+    paper.on_candle(SYMBOL, [4_000, 100.0, 100.0, 98.5, 99.0, 30.0])  # 10% de 30 = 3 BTC
+    partial = paper.fetch_order(order['id'])
+    assert partial['filled'] == pytest.approx(3.0) and partial['status'] == 'open'
+    paper.on_trade(SYMBOL, 5_000, 98.9, 10.0)
+    filled = paper.fetch_order(None, params={'clientOrderId': 'c1'})
+    assert filled['status'] == 'closed' and filled['average'] == pytest.approx(99.0)
+
+    balance = paper.fetch_balance()
+    assert balance['BTC']['total'] == pytest.approx(5.0)
+    assert balance['USDT']['used'] == pytest.approx(0.0)
+    assert balance['USDT']['total'] == pytest.approx(10_000.0 - 5.0 * 99.0 * 1.001)
+
+
+def test_cancelamento_devolve_saldo_e_rejeita_sem_fundos(paper):
+    with pytest.raises(ccxt.InsufficientFunds):
+        paper.create_order(SYMBOL, 'market', 'sell', 1.0)  # sem BTC
+    order = paper.create_order(SYMBOL, 'limit', 'buy', 50.0, 90.0)
+    assert paper.fetch_balance()['USDT']['free'] == pytest.approx(10_000.0 - 50.0 * 90.0 * 1.001)
+    with pytest.raises(ccxt.InsufficientFunds):
+        paper.create_order(SYMBOL, 'limit', 'buy', 70.0, 90.0)
+    canceled = paper.cancel_order(order['id'])
+    assert canceled['status'] == 'canceled'
+    assert paper.fetch_balance()['USDT']['free'] == pytest.approx(10_000.0)
+    with pytest.raises(ccxt.OrderNotFound):
+        paper.cancel_order(order['id'])
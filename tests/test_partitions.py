@@ -0,0 +1,109 @@
+"""Partições mensais: linhas da default adotadas pela partição nova e estatísticas após a retenção."""
+
+import sqlite3
+from datetime import datetime, timezone
+
+import pytest
+
+import maria_helena_database_creator as creator
+from data.partitions import (
+    DEFAULT_PARTITION, apply_retention, ensure_partitions, is_partitioned, list_partitions, migrate_to_partitions,
+    partition_name,
+)
+
+INSERT = "INSERT OR IGNORE INTO market_analysis_v2 (asset, timestamp, price, volume, rsi) VALUES (?, ?, ?, ?, ?)"
+
+
+def ts(year, month, day=1, minute=0):
+    return int(datetime(year, month, day, tzinfo=timezone.utc).timestamp()) + minute * 60
+
+
+@pytest.fixture
+def conn(tmp_path, monkeypatch):
+    path = tmp_path / 'signals.db'
+    monkeypatch.setattr(creator, 'DB_PATH', path)
+    conn = sqlite3.connect(str(path))
+    assert migrate_to_partitions(conn)
+    yield conn
+    conn.close()
+
+
+def samples(conn, asset):
+    return conn.execute("SELECT COALESCE(SUM(samples), 0) FROM market_rollup_1d WHERE asset = ?",
+                        (asset,)).fetchone()[0]
+
+
+def test_particao_nova_adota_linhas_da_default(conn):
+    month = ts(2020, 3)
+    rows = [('BTCUSDT', month + i * 60, 100.0 + i, 1.0, 50.0) for i in range(10)]
+    with conn:
+        conn.executemany(INSERT, rows)  # sem partição de mar/2020: caem na default
+    assert conn.execute(f"SELECT COUNT(*) FROM {DEFAULT_PARTITION}").fetchone()[0] == 10
+
+    assert ensure_partitions(conn, [month]) == [partition_name(month)]
+    with conn:
+        conn.executemany(INSERT, rows)  # reenvio do mesmo lote (ex: migrador rodando de novo)
+
+    assert conn.execute(f"SELECT COUNT(*) FROM {DEFAULT_PARTITION}").fetchone()[0] == 0
+    assert conn.execute(f"SELECT COUNT(*) FROM {partition_name(month)}").fetchone()[0] == 10
+    assert conn.execute("SELECT COUNT(*) FROM market_analysis_v2").fetchone()[0] == 10
+    assert samples(conn, 'BTCUSDT') == 10
+
+
+def test_estatisticas_ignoram_meses_removidos_pela_retencao(conn):
+    ensure_partitions(conn, [ts(2021, 1), ts(2021, 2), ts(2021, 3)])
+    with conn:
+        for month, count in ((1, 5), (2, 7), (3, 11)):
+            conn.executemany(INSERT, [('ETHUSDT', ts(2021, month, 2, i), 10.0, 1.0, None) for i in range(count)])
+            conn.executemany(INSERT, [('BTCUSDT', ts(2021, month, 3, i), 10.0, 1.0, None) for i in range(count)])
+    before = creator.get_database_stats(conn)
+    assert before['total_records'] == 2 * (5 + 7 + 11)
+
+    assert apply_retention(conn, keep_months=2, now=ts(2021, 3, 15)) == [partition_name(ts(2021, 1))]
+    live = conn.execute("SELECT COUNT(*) FROM market_analysis_v2").fetchone()[0]
+    stats = creator.get_database_stats(conn)
+    assert live == 2 * (7 + 11)
+    assert stats['total_records'] == live
+    assert stats['records_by_asset'] == {'BTCUSDT': 18, 'ETHUSDT': 18}
+    assert samples(conn, 'ETHUSDT') == 5 + 7 + 11  # os rollups continuam com o histórico
+    assert partition_name(ts(2021, 1)) not in list_partitions(conn)
+
+
+def legacy_table(conn, name, rows, confidence=True):
+    """Tabela única no formato antigo (com ou sem a coluna confidence)."""
+    conn.execute(f"CREATE TABLE {name} (id INTEGER PRIMARY KEY, asset TEXT, timestamp INTEGER, price REAL, "
+                 "volume REAL, rsi REAL, bb_upper REAL, bb_lower REAL, bb_middle REAL, macd REAL, "
+                 "macd_signal REAL, macd_histogram REAL, sma REAL, obv REAL, trend TEXT, signal TEXT"
+                 + (", confidence REAL" if confidence else "") + ")")
+    with conn:
+        conn.executemany(f"INSERT INTO {name} (asset, timestamp, price, volume, rsi) VALUES (?, ?, ?, ?, ?)", rows)
+
+
+def test_copia_que_falha_desfaz_a_migracao_inteira(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / 'signals.db'))
+    rows = [('BTCUSDT', ts(2022, 5, 1, i), 100.0, 1.0, 50.0) for i in range(5)]
+    legacy_table(conn, 'market_analysis_v2', rows, confidence=False)
+
+    assert not migrate_to_partitions(conn)  # SELECT confidence falha no meio da cópia
+    tables = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert tables == {'market_analysis_v2'}  # nem legacy, nem partições, nem rollups
+    assert conn.execute("SELECT COUNT(*) FROM market_analysis_v2").fetchone()[0] == 5
+
+    conn.execute("ALTER TABLE market_analysis_v2 ADD COLUMN confidence REAL")
+    assert migrate_to_partitions(conn)
+    assert conn.execute("SELECT COUNT(*) FROM market_analysis_v2").fetchone()[0] == 5
+    assert samples(conn, 'BTCUSDT') == 5
+    conn.close()
+
+
+def test_legacy_de_migracao_interrompida_e_retomada(conn):
+    with conn:
+        conn.execute(INSERT, ('BTCUSDT', ts(2022, 6, 1), 100.0, 1.0, 50.0))  # já copiada antes da queda
+    rows = [('BTCUSDT', ts(2022, 6, 1, i), 100.0, 1.0, 50.0) for i in range(4)]
+    legacy_table(conn, 'market_analysis_v2_legacy', rows)
+    assert not is_partitioned(conn)
+
+    assert migrate_to_partitions(conn)
+    assert is_partitioned(conn)
+    assert conn.execute("SELECT COUNT(*) FROM market_analysis_v2").fetchone()[0] == 4
+    assert samples(conn, 'BTCUSDT') == 4
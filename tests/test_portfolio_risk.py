@@ -0,0 +1,78 @@
+"""PortfolioRiskManager: disparos pelo índice de níveis, rearme e exposição pendente com validade."""
+
+import pytest
+
+from protection.portfolio_risk import PortfolioRiskManager
+
+
+class FakeClock:
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock(1_000.0)
+
+
+@pytest.fixture
+def portfolio(clock):
+    return PortfolioRiskManager({'MAX_TOTAL_EXPOSURE': 0.5, 'CASH_RESERVATION_TTL': 60}, clock=clock)
+
+
+def open_long(portfolio, key, symbol='BTC/USDT', entry=100.0, stop=95.0, target=110.0, cost=100.0):
+    portfolio.open_position(key, symbol, entry, cost / entry, stop, target, cost=cost)
+
+
+def test_disparo_toca_so_os_niveis_cruzados(portfolio):
+    open_long(portfolio, 'a', stop=95.0, target=110.0)
+    open_long(portfolio, 'b', stop=90.0, target=105.0)
+    open_long(portfolio, 'c', symbol='ETH/USDT', stop=95.0, target=110.0)
+
+    assert portfolio.triggered('BTC/USDT', 96.0, 104.0) == []
+    hits = portfolio.triggered('BTC/USDT', 94.0, 104.0)
+    assert hits == [{'key': 'a', 'symbol': 'BTC/USDT', 'reason': 'stop_loss', 'level': 95.0}]
+    assert [hit['key'] for hit in portfolio.triggered('BTC/USDT', 106.0)] == ['b']  # tick: só low
+    assert portfolio.get_status()['triggers'] == 2
+
+
+def test_stop_vence_o_alvo_na_mesma_vela(portfolio):
+    open_long(portfolio, 'a', stop=95.0, target=105.0)
+    hits = portfolio.triggered('BTC/USDT', 94.0, 106.0)
+    assert [(hit['key'], hit['reason'], hit['level']) for hit in hits] == [('a', 'stop_loss', 95.0)]
+
+
+def test_disparada_sai_do_indice_ate_arm(portfolio):
+    open_long(portfolio, 'a')
+    assert len(portfolio.triggered('BTC/USDT', 94.0)) == 1
+    assert portfolio.triggered('BTC/USDT', 93.0) == []  # venda em andamento: não dispara de novo
+    assert not portfolio.get_position('a')['armed']
+
+    portfolio.arm('a')  # venda falhou
+    portfolio.arm('a')  # idempotente: não duplica os níveis
+    assert [hit['key'] for hit in portfolio.triggered('BTC/USDT', 93.0)] == ['a']
+    portfolio.arm('a')
+    portfolio.close_position('a', pnl=-5.0)
+    portfolio.arm('a')  # posição fechada: nada a rearmar
+    assert portfolio.triggered('BTC/USDT', 50.0, 200.0) == []
+    assert portfolio.get_status()['exposure'] == 0.0
+
+
+def test_admit_conta_pendentes_ate_vencerem(portfolio, clock):
+    capital = 1_000.0  # limite da carteira: 500
+    open_long(portfolio, 'open', cost=200.0)
+    assert portfolio.admit('a', 200.0, capital)[0]
+    allowed, reason = portfolio.admit('b', 200.0, capital)  # 200 abertos + 200 pendentes + 200
+    assert not allowed and 'Exposição total excedida' in reason
+    assert portfolio.admit('a', 300.0, capital)[0]  # a pendência do próprio par é substituída
+
+    clock.now += 61  # a entrada de 'a' nunca executou: a pendência vence
+    assert portfolio.admit('b', 300.0, capital)[0]
+    assert portfolio.get_status()['pending_expired'] == 1
+
+    portfolio.cancel_pending('b')
+    assert portfolio.get_status()['pending'] == 0.0
+    assert portfolio.get_status()['rejected'] == 1
@@ -0,0 +1,62 @@
+"""CandleScheduler com relógio simulado: fronteiras absolutas, várias chaves e candles perdidos."""
+
+from core.scheduler import CandleScheduler, closed_candles
+
+
+class FakeClock:
+    def __init__(self, now):
+        self.now = now
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def test_acorda_no_fechamento_mais_offset():
+    clock = FakeClock(1_000_030.0)  # 30s depois de um fechamento de 1m (1_000_020 é múltiplo de 60)
+    scheduler = CandleScheduler(offset=2.0, clock=clock, sleep=clock.sleep)
+    scheduler.add('BTC', '1m')
+    assert scheduler.next_wake() == 1_000_080 + 2.0
+    assert scheduler.wait() == [('BTC', 1_000_080)]
+    assert clock.now == 1_000_082.0
+
+    # Processamento de 20s: a próxima espera desconta o tempo gasto (não acumula atraso)
+    clock.now += 20
+    assert scheduler.wait() == [('BTC', 1_000_140)]
+    assert clock.sleeps[-1] == 40.0
+
+
+def test_varios_timeframes_no_mesmo_despertar():
+    clock = FakeClock(3600 * 100 + 10.0)
+    scheduler = CandleScheduler(clock=clock, sleep=clock.sleep)
+    scheduler.add('1m', '1m')
+    scheduler.add('5m', '5m')
+    scheduler.add('1h', '1h')
+    due = [scheduler.wait() for _ in range(5)]
+    assert due[0] == [('1m', 360_060)]
+    assert due[4] == [('1m', 360_300), ('5m', 360_300)]
+    due += [scheduler.wait() for _ in range(55)]
+    assert due[-1] == [('1m', 363_600), ('5m', 363_600), ('1h', 363_600)]
+    assert sum(len(keys) for keys in due) == 60 + 12 + 1
+    assert scheduler.missed == 0
+
+
+def test_loop_atrasado_conta_candles_perdidos():
+    clock = FakeClock(600.0)
+    scheduler = CandleScheduler(clock=clock, sleep=clock.sleep)
+    scheduler.add('BTC', '1m')
+    clock.now = 600 + 60 * 3 + 5  # três fechamentos passaram sem wait()
+    assert scheduler.wait() == [('BTC', 780)]
+    assert clock.sleeps == []
+    assert scheduler.missed == 2
+    assert scheduler.status()['wakeups'] == 1
+
+
+def test_closed_candles_remove_a_vela_em_formacao():
+    candles = [[0, 1, 1, 1, 1, 1], [60_000, 1, 1, 1, 1, 1], [120_000, 1, 1, 1, 1, 1]]
+    assert closed_candles(candles, '1m', now=180.0) is candles
+    assert closed_candles(candles, '1m', now=179.9) == candles[:2]
@@ -0,0 +1,72 @@
+"""SQLiteWriter: ordem dos submits e isolamento de lotes com erro no group commit."""
+
+import sqlite3
+
+import pytest
+
+from data.storage import SQLiteWriter, connect
+
+UPSERT = "INSERT OR REPLACE INTO kv (k, v) VALUES (?, ?)"
+APPEND = "UPDATE kv SET v = v || ? WHERE k = ?"
+INSERT = "INSERT INTO kv (k, v) VALUES (?, ?)"
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = tmp_path / 'kv.db'
+    conn = connect(path)
+    conn.execute("CREATE TABLE kv (k TEXT PRIMARY KEY, v TEXT NOT NULL)")
+    conn.commit()
+    conn.close()
+    return path
+
+
+def read(path):
+    conn = sqlite3.connect(str(path))
+    try:
+        return dict(conn.execute("SELECT k, v FROM kv"))
+    finally:
+        conn.close()
+
+
+def test_submits_gravados_na_ordem(db_path):
+    writer = SQLiteWriter(db_path, max_delay=0.2)
+    writer.submit(UPSERT, [('a', '1')])
+    writer.submit(APPEND, [('2', 'a')])
+    writer.submit(UPSERT, [('a', '3'), ('b', '1')])
+    writer.submit(APPEND, [('2', 'b')])
+    assert writer.flush(5)
+    writer.close()
+    assert read(db_path) == {'a': '3', 'b': '12'}
+    assert writer.commits == 1
+
+
+def test_lote_com_erro_nao_derruba_os_outros(db_path):
+    writer = SQLiteWriter(db_path, max_delay=0.2)
+    first = writer.submit(INSERT, [('a', '1'), ('b', '1')])
+    bad = writer.submit(INSERT, [('c', '1'), ('a', 'dup')])  # PK duplicada
+    last = writer.submit(INSERT, [('d', '1')])
+    assert writer.flush(5)
+    writer.close()
+
+    assert first.result(1) == 2
+    assert last.result(1) == 1
+    assert isinstance(bad.exception(1), sqlite3.IntegrityError)
+    assert read(db_path) == {'a': '1', 'b': '1', 'd': '1'}  # 'c' saiu junto com o lote ruim
+    assert writer.rows_written == 3
+    assert writer.errors == 1
+
+
+def test_linhas_invalidas_nao_matam_a_thread(db_path):
+    writer = SQLiteWriter(db_path, max_delay=0.2)
+    good = writer.submit(INSERT, [('a', '1')])
+    bad = writer.submit(INSERT, [('x', 2 ** 70)])  # OverflowError: não é sqlite3.Error
+    assert writer.flush(5)
+    assert good.result(1) == 1
+    assert isinstance(bad.exception(1), OverflowError)
+
+    later = writer.submit(INSERT, [('b', '1')])
+    assert writer.flush(5)
+    writer.close()
+    assert later.result(1) == 1
+    assert read(db_path) == {'a': '1', 'b': '1'}
@@ -0,0 +1,32 @@
+"""ParameterSweep: grade, faixas e o pool dando o mesmo resultado do VectorizedBacktester direto."""
+
+import pytest
+
+from backtest.sweep import ParameterSweep, combo_params, expand_grid, parse_range
+from backtest.vectorized import VectorizedBacktester
+from config import CONFIG
+from scripts.bench_backtest import synthetic_candles
+
+
+def test_faixas_e_grade():
+    assert parse_range('0.25:0.45:0.05') == [0.25, 0.3, 0.35, 0.4, 0.45]
+    assert parse_range('0.01,0.02') == [0.01, 0.02]
+    grid = expand_grid({'RSI_OVERSOLD': [0.3, 0.4], 'STOP_LOSS': [0.01, 0.02, 0.03]})
+    assert len(grid) == 6 and grid[0] == {'RSI_OVERSOLD': 0.3, 'STOP_LOSS': 0.01}
+    with pytest.raises(ValueError):
+        expand_grid({'MAX_POSITION_SIZE': [0.1]})
+
+
+def test_varredura_no_pool_igual_ao_backtest_direto():
+    candles = synthetic_candles(3_000, seed=0)
+    grid = expand_grid({'RSI_OVERSOLD': [0.3, 0.4], 'STOP_LOSS': [0.002, 0.02]})
+    rows = ParameterSweep(workers=2).run(candles, grid, chunk_size=1)
+
+    assert [row['rank'] for row in rows] == [1, 2, 3, 4]
+    assert [row['total_return'] for row in rows] == sorted((row['total_return'] for row in rows), reverse=True)
+    backtester = VectorizedBacktester()
+    for row in rows:
+        combo = {key: row[key] for key in ('RSI_OVERSOLD', 'STOP_LOSS')}
+        stats = backtester.run(candles, params=combo_params(combo, CONFIG))['stats']
+        assert row['trades'] == stats['trades']
+        assert row['final_equity'] == pytest.approx(stats['final_equity'])
@@ -0,0 +1,34 @@
+"""VectorizedBacktester × EventBacktester: mesma curva de capital numa série sintética fixa."""
+
+import numpy as np
+import pytest
+
+from backtest.engine import EventBacktester
+from backtest.vectorized import VectorizedBacktester
+from config import CONFIG
+from scripts.bench_backtest import synthetic_candles
+
+
+@pytest.mark.parametrize('seed', [0, 1])
+def test_vetorizado_reproduz_o_backtest_por_eventos(seed):
+    candles = synthetic_candles(3_000, seed=seed)
+    event = EventBacktester().run(candles)
+    vectorized = VectorizedBacktester().run(candles)
+
+    assert event['stats']['trades'] > 0
+    np.testing.assert_array_equal(vectorized['timestamps'], event['timestamps'])
+    np.testing.assert_allclose(vectorized['equity'], event['equity'], rtol=0, atol=1e-6)
+    assert [t['reason'] for t in vectorized['trades']] == [t['reason'] for t in event['trades']]
+    assert [t['entry_time'] for t in vectorized['trades']] == [t['entry_time'] for t in event['trades']]
+    assert vectorized['stats']['fees'] == pytest.approx(event['stats']['fees'])
+
+
+def test_saidas_por_stop_e_alvo_batem():
+    candles = synthetic_candles(3_000, seed=1)
+    config = dict(CONFIG, STOP_LOSS=0.002, TAKE_PROFIT=0.002)  # níveis apertados: várias saídas no high/low
+    event = EventBacktester(config).run(candles)
+    vectorized = VectorizedBacktester(config).run(candles)
+
+    reasons = {t['reason'] for t in event['trades']}
+    assert {'stop_loss', 'take_profit'} <= reasons
+    np.testing.assert_allclose(vectorized['equity'], event['equity'], rtol=0, atol=1e-6)
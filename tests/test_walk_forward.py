@@ -0,0 +1,65 @@
+"""walk_forward_windows (móvel, ancorado, último teste curto) e o cache em disco das features."""
+
+import numpy as np
+import pytest
+
+from backtest.walk_forward import cached_features, walk_forward_windows
+from config import CONFIG
+from data.normalizer import Normalizer
+from scripts.bench_backtest import synthetic_candles
+
+HOUR_MS = 3_600_000
+TIMES = np.arange(10 * 24, dtype=np.int64) * HOUR_MS  # 10 dias de candles de 1h
+
+
+def window(train_start, train_end, test_end):
+    return {'train_start': train_start, 'train_end': train_end, 'test_start': train_end, 'test_end': test_end}
+
+
+def test_janelas_moveis_com_ultimo_teste_curto():
+    assert walk_forward_windows(TIMES, train_days=3, test_days=2) == [
+        window(0, 72, 120),
+        window(48, 120, 168),
+        window(96, 168, 216),
+        window(144, 216, 240),  # a série acaba antes: teste de 1 dia
+    ]
+
+
+def test_janelas_ancoradas_e_passo_menor_que_o_teste():
+    anchored = walk_forward_windows(TIMES, train_days=3, test_days=2, anchored=True)
+    assert [w['train_start'] for w in anchored] == [0, 0, 0, 0]
+    assert [(w['test_start'], w['test_end']) for w in anchored] == [(72, 120), (120, 168), (168, 216), (216, 240)]
+
+    overlapping = walk_forward_windows(TIMES, train_days=3, test_days=2, step_days=1)
+    assert [w['test_start'] for w in overlapping] == [72, 96, 120, 144, 168, 192, 216]
+    assert overlapping[-1]['test_end'] == 240
+
+
+def test_janelas_invalidas_ou_serie_vazia():
+    assert walk_forward_windows(np.array([], dtype=np.int64), 3, 2) == []
+    assert walk_forward_windows(TIMES, train_days=20, test_days=2) == []
+    with pytest.raises(ValueError):
+        walk_forward_windows(TIMES, train_days=3, test_days=0)
+
+
+def test_cache_de_features_devolve_os_mesmos_arrays(tmp_path, monkeypatch):
+    candles = synthetic_candles(2_000, seed=0)
+    calls = []
+    process_series = Normalizer.process_series
+
+    def counting(self, series):
+        calls.append(len(series))
+        return process_series(self, series)
+    monkeypatch.setattr(Normalizer, 'process_series', counting)
+
+    first = cached_features(candles, cache_dir=tmp_path)
+    second = cached_features(candles, cache_dir=tmp_path)
+    assert calls == [2_000]  # a segunda chamada vem do disco
+    assert set(first) == set(second)
+    for name in first:
+        np.testing.assert_array_equal(second[name], first[name])
+    np.testing.assert_array_equal(second['rsi_norm'], process_series(Normalizer(CONFIG), candles)['rsi_norm'])
+
+    cached_features(candles[:-1], cache_dir=tmp_path)  # outros candles: outra entrada
+    assert calls == [2_000, 1_999]
+    assert len(list(tmp_path.iterdir())) == 2